@@ -49,6 +49,23 @@
         :param data_study_params['train_increment']: Increment in the train size with each iteration, currently defaults to 100
         :type data_study_params['train_increment']: int (required)
         
+        Encoder Decoder (U-Net) Parameters
+
+        :param encode_decode_params['micro_batch_size']: Micro batch size for gradient accumulation while training the U-Net models, bounds the activation memory, currently defaults to 0 (keras fit with model_parameters['batch_size'], no accumulation), set to a value greater than 0 to train with gradient accumulation
+        :type encode_decode_params['micro_batch_size']: int (required)
+
+        :param encode_decode_params['effective_batch_size']: Number of samples over which gradients are accumulated before each optimizer step (only used when micro_batch_size is greater than 0), currently defaults to 0 (model_parameters['batch_size'])
+        :type encode_decode_params['effective_batch_size']: int (required)
+
+        :param encode_decode_params['recompute_encoder']: Flag to recompute the U-Net encoder blocks during the backward pass instead of storing their activations (activation checkpointing), reduces training memory at the cost of an additional encoder forward pass, currently defaults to 0, the same setting must be used for training and deployment
+        :type encode_decode_params['recompute_encoder']: int (required)
+
+        :param encode_decode_params['sparse_shape_error']: Flag to store the shape error targets only at the voxels occupied by the nodes (mapping index) and evaluate the shape error loss and metrics only on those voxels, target memory and loss compute scale with the number of nodes instead of the voxel grid, currently defaults to 0, the same setting must be used for training and deployment
+        :type encode_decode_params['sparse_shape_error']: int (required)
+
+        :param encode_decode_params['shape_error_components']: Number of PCA basis coefficients used to represent the shape error of each stage (refer core/shape_error_basis.py), the decoder is replaced by a dense head predicting the coefficients and the node deviations are reconstructed during deployment, currently defaults to 0 (complete voxel grid shape error output)
+        :type encode_decode_params['shape_error_components']: int (required)
+
         Key Measurment Characteristics Generation Parameters
 
         :param kmc_params['tree_based_model']: The model to be used while generating feature importance, refer: https://xgboost.readthedocs.io/en/latest/R-package/discoverYourData.html#measure-feature-importance for more details, currently defaults to xgb, random forests can also be used
@@ -91,6 +108,294 @@
         :param transfer_learning['dense_layer_m']: The learning rate multiplier for dense layers (only needed when tl_type is variable_lr), defaults to 1 (100% of the network Learning Rate)
         :type transfer_learning['dense_layer_m']: float (required)
 
+        Checkpoint and Resume Parameters
+
+        :param checkpoint_params['resume_flag']: Flag to record the run state (completed simulations, voxelized data, weights, optimizer state and epoch) and resume an interrupted adaptive training from it, the manifest stores a hash of the configuration and is not resumed with a different configuration, the best monitored value of the best model checkpoint is restored on resume, currently defaults to 0 (always start from scratch), change to 1 to record and resume
+        :type checkpoint_params['resume_flag']: int (required)
+
+        :param checkpoint_params['checkpoint_freq']: Frequency (in epochs) of saving the model and optimizer checkpoint, currently defaults to 1
+        :type checkpoint_params['checkpoint_freq']: int (required)
+
+        :param checkpoint_params['max_to_keep']: Number of checkpoints kept on disk for each run, currently defaults to 2
+        :type checkpoint_params['max_to_keep']: int (required)
+
+        Run Executor Parameters
+
+        :param run_executor_params['isolate_runs']: Flag to execute each training run of the data study, dynamic adaptive training and multi stage sensor optimization in a fresh worker process with memory mapped datasets, keeps the peak memory constant over long studies, currently defaults to 0 (train within the main process), change to 1 to isolate the runs
+        :type run_executor_params['isolate_runs']: int (required)
+
+        Point Cloud Model Parameters
+
+        :param point_cloud_params['mlp_filters']: Number of filters of each layer of the shared multi layer perceptron of the PointNet model (refer core/point_cloud_model.py), currently defaults to [64,64,128,256]
+        :type point_cloud_params['mlp_filters']: list (required)
+
+        :param point_cloud_params['compare_voxel_model']: Flag to train the 3D CNN model on the same samples and compare the throughput and accuracy with the PointNet model, currently defaults to 1, change to 0 to only train the PointNet model
+        :type point_cloud_params['compare_voxel_model']: int (required)
+
+        Sparse Convolution Parameters
+
+        :param sparse_conv_params['sparse_conv']: Flag to train the sparse 3D CNN (submanifold sparse convolutions only at the voxels occupied by the nodes, refer core/custom_layers.py) instead of the dense 3D CNN, currently defaults to 0
+        :type sparse_conv_params['sparse_conv']: int (required)
+
+        :param sparse_conv_params['kernel_size']: Size of the cubic kernel of the sparse convolutions, currently defaults to 3
+        :type sparse_conv_params['kernel_size']: int (required)
+
+        Distributed Training Parameters
+
+        :param distribution_params['distributed']: Flag to train the 3D CNN model with multi-worker data parallel training (refer core/model_train_distributed.py) using local CPU worker processes, currently defaults to 0
+        :type distribution_params['distributed']: int (required)
+
+        :param distribution_params['num_workers']: Number of local worker processes for distributed training, model_parameters['batch_size'] is the batch size of each worker, currently defaults to 2
+        :type distribution_params['num_workers']: int (required)
+
+        :param distribution_params['worker_hosts']: host:port of each worker of a multi machine cluster, each machine runs model_train_distributed.py with its task index as argument, currently defaults to [] (local workers)
+        :type distribution_params['worker_hosts']: list (required)
+
+        :param distribution_params['base_port']: Port of the first local worker, the local workers use consecutive ports, currently defaults to 23456
+        :type distribution_params['base_port']: int (required)
+
+        :param distribution_params['scaling_workers']: Number of local workers for which the throughput is reported by model_train_distributed.py, currently defaults to [1,2,4]
+        :type distribution_params['scaling_workers']: list (required)
+
+        Hyper-parameter Search Parameters
+
+        :param hp_search_params['search_space']: Values of each hyper-parameter of the U-Net search (refer model_selection/model_base_arch.py), the trials are randomly sampled from the search space
+        :type hp_search_params['search_space']: dict (required)
+
+        :param hp_search_params['n_trials']: Number of trials trained at the first rung, currently defaults to 27
+        :type hp_search_params['n_trials']: int (required)
+
+        :param hp_search_params['min_epochs']: Number of epochs of the first rung, currently defaults to 5
+        :type hp_search_params['min_epochs']: int (required)
+
+        :param hp_search_params['max_epochs']: Maximum number of epochs of the trials of the last rung, currently defaults to 135
+        :type hp_search_params['max_epochs']: int (required)
+
+        :param hp_search_params['eta']: Successive halving reduction factor, the best 1/eta trials are trained eta times longer at the next rung, currently defaults to 3
+        :type hp_search_params['eta']: int (required)
+
+        :param hp_search_params['workers']: Number of trials trained in parallel worker processes, currently defaults to 2
+        :type hp_search_params['workers']: int (required)
+
+        Distillation Parameters
+
+        :param distillation_params['epistemic_samples']: Number of stochastic forward passes of the Bayesian U-Net teacher used to compute the teacher targets (refer core/distillation.py), currently defaults to 20
+        :type distillation_params['epistemic_samples']: int (required)
+
+        :param distillation_params['augmentation_copies']: Number of copies of the train samples voxelized with re-sampled measurement noise added to the distillation set, currently defaults to 1
+        :type distillation_params['augmentation_copies']: int (required)
+
+        :param distillation_params['augmentation_noise']: Measurement noise level of the augmentation copies (refer assembly_system['noise_type']), currently defaults to 0.1
+        :type distillation_params['augmentation_noise']: float (required)
+
+        :param distillation_params['student_epochs']: Number of epochs to train the student model, currently defaults to 100
+        :type distillation_params['student_epochs']: int (required)
+
+        :param distillation_params['std_loss_weight']: Loss weight of the log standard deviation outputs of the student relative to the mean outputs, currently defaults to 0.5
+        :type distillation_params['std_loss_weight']: float (required)
+
+        Model Compression Parameters
+
+        :param compression_params['model_files']: Trained model file of each model to be exported (refer core/model_compression.py), relative to the trained_models/<part_type> folder, the unet_hybrid entry is the weights file of the U-Net hybrid model
+        :type compression_params['model_files']: dict (required)
+
+        :param compression_params['sparsity']: Fraction of the convolution and dense kernel weights pruned based on magnitude, currently defaults to 0.5
+        :type compression_params['sparsity']: float (required)
+
+        :param compression_params['quantization']: Post-training quantization types of the TensorFlow Lite models in addition to float32, currently defaults to ['float16','int8']
+        :type compression_params['quantization']: list (required)
+
+        :param compression_params['calibration_samples']: Number of voxelized samples of the test split (assembly_system['test_data_files_x']) used to calibrate the int8 quantization and fine tune the pruned models, currently defaults to 100
+        :type compression_params['calibration_samples']: int (required)
+
+        :param compression_params['validation_samples']: Number of voxelized samples of the test split (following the calibration samples) used to validate the exported models against the float model, currently defaults to 200
+        :type compression_params['validation_samples']: int (required)
+
+        :param compression_params['fine_tune_epochs']: Number of epochs to fine tune the pruned 3D CNN models with the pruning mask fixed, currently defaults to 0 (no fine tuning)
+        :type compression_params['fine_tune_epochs']: int (required)
+
+        Progressive Resolution Training Parameters
+
+        :param progressive_params['resolution_schedule']: List of (voxel dimension, epochs) of each stage of the progressive training of the global pooling 3D CNN (refer core/progressive_model_train.py), the last stage is the full resolution, currently defaults to [(32,150),(64,50)]
+        :type progressive_params['resolution_schedule']: list (required)
+
+        :param progressive_params['mapping_files']: Mapping file of each voxel dimension of the schedule, the mapping index of assembly_system['mapping_index'] is scaled for the voxel dimensions not listed, currently defaults to {} (scaled mapping index)
+        :type progressive_params['mapping_files']: dict (required)
+
+        :param progressive_params['compare_full_resolution']: Flag to train the same model at the full resolution for the same total epochs and report the wall clock time saving, currently defaults to 1
+        :type progressive_params['compare_full_resolution']: int (required)
+
+        Incremental Adaptive Training Parameters
+
+        :param incremental_params['incremental']: Flag to continue each dynamic adaptive training run (refer core/dynamic_adaptive_model_train.py) from the weights of the previous run using the new adaptive samples and a replay of the previous samples instead of training from scratch on all the samples, currently defaults to 0
+        :type incremental_params['incremental']: int (required)
+
+        :param incremental_params['replay_capacity']: Maximum number of previous samples kept in the reservoir replay (refer utilities/replay_buffer.py), currently defaults to 500
+        :type incremental_params['replay_capacity']: int (required)
+
+        :param incremental_params['replay_ratio']: Number of replay samples per new adaptive sample of a run, currently defaults to 1.0
+        :type incremental_params['replay_ratio']: float (required)
+
+        :param incremental_params['incremental_steps']: Maximum number of training steps of an incremental run, the number of epochs is derived from the number of new and replay samples, currently defaults to 1000
+        :type incremental_params['incremental_steps']: int (required)
+
+        Inference Server Parameters
+
+        :param inference_server_params['host']: Host address of the inference server (refer core/inference_server.py), currently defaults to '127.0.0.1' (local only)
+        :type inference_server_params['host']: str (required)
+
+        :param inference_server_params['port']: Port of the inference server, currently defaults to 8501
+        :type inference_server_params['port']: int (required)
+
+        :param inference_server_params['model_type']: Model type (refer model_registry_params['model_files']) served when the request does not specify the model, version 0 of the part of assembly_config is the default model, currently defaults to 'cnn_model_3d'
+        :type inference_server_params['model_type']: str (required)
+
+        :param inference_server_params['max_batch_size']: Maximum number of samples of a micro-batch, concurrent requests are coalesced into a single model prediction, currently defaults to 32
+        :type inference_server_params['max_batch_size']: int (required)
+
+        :param inference_server_params['max_latency_ms']: Maximum time in milliseconds a request waits for other requests before the micro-batch is predicted, currently defaults to 10
+        :type inference_server_params['max_latency_ms']: float (required)
+
+        :param inference_server_params['benchmark_concurrency']: Number of concurrent clients of each benchmark run (refer core/inference_benchmark.py), currently defaults to [1,4,16,32]
+        :type inference_server_params['benchmark_concurrency']: list (required)
+
+        :param inference_server_params['benchmark_requests']: Number of requests of each benchmark run, currently defaults to 200
+        :type inference_server_params['benchmark_requests']: int (required)
+
+        Model Registry Parameters
+
+        :param model_registry_params['model_files']: Model file of each model type relative to the trained model folder of the part, {} is replaced by the model version (run id), the models are loaded by the model registry (refer core/model_registry.py), currently defaults to {'cnn_model_3d':'model/trained_model_{}.h5'}
+        :type model_registry_params['model_files']: dict (required)
+
+        :param model_registry_params['memory_cap_mb']: Maximum memory of the models kept warm by the model registry in MB, the least recently used models are evicted above the cap, currently defaults to 1024
+        :type model_registry_params['memory_cap_mb']: float (required)
+
+        :param model_registry_params['part_configs']: Assembly config files of the parts registered in addition to the part of assembly_config, currently defaults to the halo, inner_rf and cross_member config files
+        :type model_registry_params['part_configs']: list (required)
+
+        Monte Carlo Inference Parameters
+
+        :param mc_inference_params['epistemic_samples']: Number of Monte Carlo draws of each sample for the epistemic uncertainty of the Bayesian models (refer core/bayes_model_deployment.py), currently defaults to 1000
+        :type mc_inference_params['epistemic_samples']: int (required)
+
+        :param mc_inference_params['chunk_size']: Maximum number of draws of a forward pass, the draws of all the samples are tiled into chunks of this size so that the memory of the replicated input is bounded (refer core/mc_inference.py), currently defaults to 32
+        :type mc_inference_params['chunk_size']: int (required)
+
+        :param mc_inference_params['adaptive_mc']: Flag to stop the Monte Carlo draws of each scan when the running std of all the KCCs converges instead of a fixed number of draws (refer core/bayes_model_hybrid_deployment.py and core/bayes_unet_hybrid_deploy.py), currently defaults to 0
+        :type mc_inference_params['adaptive_mc']: int (required)
+
+        :param mc_inference_params['batch_draws']: Number of Monte Carlo draws of each batch of the adaptive sampling, currently defaults to 10
+        :type mc_inference_params['batch_draws']: int (required)
+
+        :param mc_inference_params['min_draws']: Minimum number of Monte Carlo draws of a scan before the convergence is checked, currently defaults to 20
+        :type mc_inference_params['min_draws']: int (required)
+
+        :param mc_inference_params['max_draws']: Maximum number of Monte Carlo draws of a scan (hard cap), currently defaults to 200
+        :type mc_inference_params['max_draws']: int (required)
+
+        :param mc_inference_params['tolerance']: Relative change of the running std of each KCC between consecutive batches below which the sampling of a scan is stopped, currently defaults to 0.05
+        :type mc_inference_params['tolerance']: float (required)
+
+        :param mc_inference_params['abs_tolerance']: Absolute change of the running std of each KCC below which the KCC is considered converged (floor of the relative tolerance for KCCs with a std close to zero), currently defaults to 1e-4
+        :type mc_inference_params['abs_tolerance']: float (required)
+
+        :param mc_inference_params['pred_plots']: Flag to plot the prediction distribution of the Monte Carlo draws of each sample and KCC, currently defaults to 1
+        :type mc_inference_params['pred_plots']: int (required)
+
+        :param mc_inference_params['plot_processes']: Number of background processes generating the prediction distribution plots (refer visualization/uncertainty_viz.py), the plots are generated in the inference loop if 0, currently defaults to 2
+        :type mc_inference_params['plot_processes']: int (required)
+
+        Posterior Ensemble Parameters
+
+        :param posterior_ensemble_params['ensemble_members']: Number of posterior weight samples of the Bayesian model exported as deterministic members (refer core/posterior_ensemble.py), currently defaults to 20
+        :type posterior_ensemble_params['ensemble_members']: int (required)
+
+        :param posterior_ensemble_params['ensemble_seed']: Seed of the posterior weight samples, currently defaults to 0
+        :type posterior_ensemble_params['ensemble_seed']: int (required)
+
+        :param posterior_ensemble_params['stacked_model']: Flag to evaluate all the members in a single stacked model instead of one member after the other, currently defaults to 0
+        :type posterior_ensemble_params['stacked_model']: int (required)
+
+        :param posterior_ensemble_params['compare_mc']: Flag to compare the ensemble with Monte Carlo sampling of the Bayesian model with the same number of draws, currently defaults to 1
+        :type posterior_ensemble_params['compare_mc']: int (required)
+
+        Scan Watcher Parameters
+
+        :param scan_watcher_params['watch_folder']: Path to the shared folder the line scanners export the measurement files to, currently defaults to ../datasets/scan_drop
+        :type scan_watcher_params['watch_folder']: str (required)
+
+        :param scan_watcher_params['file_pattern']: glob pattern of the measurement files, currently defaults to *.txt
+        :type scan_watcher_params['file_pattern']: str (required)
+
+        :param scan_watcher_params['poll_interval']: Interval between the polls of the watch folder in seconds, a file is processed once its size is unchanged between two polls, currently defaults to 0.2
+        :type scan_watcher_params['poll_interval']: float (required)
+
+        :param scan_watcher_params['parse_processes']: Number of processes parsing and voxelizing the measurement files, currently defaults to 2
+        :type scan_watcher_params['parse_processes']: int (required)
+
+        :param scan_watcher_params['max_batch_size']: Maximum number of scans of a model prediction, currently defaults to 16
+        :type scan_watcher_params['max_batch_size']: int (required)
+
+        :param scan_watcher_params['max_latency_ms']: Maximum time the first parsed scan of a batch waits for other scans in milliseconds, currently defaults to 50
+        :type scan_watcher_params['max_latency_ms']: float (required)
+
+        :param scan_watcher_params['max_pending']: Maximum number of scans being parsed or waiting for the model, further scans are held in the watch folder (backpressure), currently defaults to 64
+        :type scan_watcher_params['max_pending']: int (required)
+
+        :param scan_watcher_params['archive_processed']: Flag to move the processed files to the processed sub folder of the watch folder, currently defaults to 1
+        :type scan_watcher_params['archive_processed']: int (required)
+
+        :param scan_watcher_params['metrics_interval']: Interval between the updates of the metrics file in seconds, currently defaults to 5
+        :type scan_watcher_params['metrics_interval']: float (required)
+
+        :param scan_watcher_params['model_type']: Model type of the deployed model (refer model_registry_params['model_files']), currently defaults to cnn_model_3d
+        :type scan_watcher_params['model_type']: str (required)
+
+        :param scan_watcher_params['harness_rate']: Number of synthetic scans dropped per second by the test harness, currently defaults to 5
+        :type scan_watcher_params['harness_rate']: float (required)
+
+        :param scan_watcher_params['harness_duration']: Duration of the test harness in seconds, currently defaults to 60
+        :type scan_watcher_params['harness_duration']: float (required)
+
+        :param scan_watcher_params['harness_timeout']: Maximum time the test harness waits for the remaining scans after the last drop in seconds, currently defaults to 30
+        :type scan_watcher_params['harness_timeout']: float (required)
+
+        Result Store Parameters
+
+        :param result_store_params['store_file']: Path to the SQLite prediction store shared by the deployments of all the parts (refer utilities/result_store.py), replaces user_preds.csv, currently defaults to ../trained_models/predictions.db
+        :type result_store_params['store_file']: str (required)
+
+        :param result_store_params['user_serials_file']: Path to the csv the serials generated for the user predictions are appended to, one serial per row of leaderboard/user_inputs.csv (refer leaderboard/leaderboard_gen.py), currently defaults to ../leaderboard/user_serials.csv
+        :type result_store_params['user_serials_file']: str (required)
+
+        :param result_store_params['buffer_size']: Number of buffered estimates (one per KCC of a part) written in a single transaction, currently defaults to 1000
+        :type result_store_params['buffer_size']: int (required)
+
+        :param result_store_params['flush_interval']: Maximum time the estimates are buffered in seconds, currently defaults to 1.0
+        :type result_store_params['flush_interval']: float (required)
+
+        :param result_store_params['benchmark_parts']: Number of synthetic parts of each part type written by the store benchmark, currently defaults to 100000
+        :type result_store_params['benchmark_parts']: int (required)
+
+        Compiled Prediction Parameters
+
+        :param compiled_predict_params['compiled_predict']: Flag to predict with concrete functions traced for fixed batch sizes when the model is loaded instead of keras predict (refer core/compiled_predict.py), currently defaults to 0
+        :type compiled_predict_params['compiled_predict']: int (required)
+
+        :param compiled_predict_params['batch_sizes']: Batch sizes of the concrete functions, an input is padded to the nearest batch size or split into chunks of the largest, currently defaults to [1,8,32]
+        :type compiled_predict_params['batch_sizes']: list (required)
+
+        :param compiled_predict_params['xla']: Flag to compile the concrete functions with XLA, the functions are traced without XLA if the compilation fails, currently defaults to 0
+        :type compiled_predict_params['xla']: int (required)
+
+        :param compiled_predict_params['benchmark_runs']: Number of predictions of each batch size used to benchmark the latency of keras predict and the compiled functions, currently defaults to 100
+        :type compiled_predict_params['benchmark_runs']: int (required)
+
+        Profiling Parameters
+
+        :param profiling_params['benchmark']: Benchmark run by utilities/profiling.py, 'recompute' (encoder recomputation memory vs time trade-off), 'shape_error_output' (voxel grid decoder vs PCA basis shape error output) or 'sparse_conv' (dense vs sparse 3D CNN models), currently defaults to 'recompute'
+        :type profiling_params['benchmark']: str (required)
+
         
 """
 
@@ -120,7 +425,12 @@ encode_decode_params ={
         'model_depth':4,
         'inital_filter_dim':16,
         'kcc_sublist':0,#[0,1,2,3,4,5,6,7,8,9,10,11] use a list in case only a selected sublist of KCCs have to be used: 0 means all KCCs
-        'output_heads':2
+        'output_heads':2,
+        'micro_batch_size':0,
+        'effective_batch_size':0,
+        'recompute_encoder':0,
+        'sparse_shape_error':0,
+        'shape_error_components':0
 }
 data_study_params = {
 	'batch_size':16,
@@ -152,4 +462,142 @@ transfer_learning={
         'tl_app':'halo_deploy',
         'conv_layer_m':0.1,
         'dense_layer_m':1, 
-}
\ No newline at end of file
+}
+
+checkpoint_params={
+        'resume_flag':0,
+        'checkpoint_freq':1,
+        'max_to_keep':2,
+}
+
+run_executor_params={
+        'isolate_runs':0,
+}
+
+point_cloud_params={
+        'mlp_filters':[64,64,128,256],
+        'compare_voxel_model':1,
+}
+
+sparse_conv_params={
+        'sparse_conv':0,
+        'kernel_size':3,
+}
+
+distribution_params={
+        'distributed':0,
+        'num_workers':2,
+        'worker_hosts':[],
+        'base_port':23456,
+        'scaling_workers':[1,2,4],
+}
+
+hp_search_params={
+        'search_space':{'filter_root':[8,16,24,32],'Depth':[2,3],'learning_rate':[1e-2,1e-3,1e-4],'regression_weight':[2.0,1.0,4.0],'classification_weight':[2.0,1.0,4.0],'shape_error_weight':[1.0,0.5,2.0]},
+        'n_trials':27,
+        'min_epochs':5,
+        'max_epochs':135,
+        'eta':3,
+        'workers':2,
+}
+
+distillation_params={
+        'epistemic_samples':20,
+        'augmentation_copies':1,
+        'augmentation_noise':0.1,
+        'student_epochs':100,
+        'std_loss_weight':0.5,
+}
+
+compression_params={
+        'model_files':{'cnn_model_3d':'model/trained_model_0.h5','unet_hybrid':'unet_model/model/unet_AH_0'},
+        'sparsity':0.5,
+        'quantization':['float16','int8'],
+        'calibration_samples':100,
+        'validation_samples':200,
+        'fine_tune_epochs':0,
+}
+
+progressive_params={
+        'resolution_schedule':[(32,150),(64,50)],
+        'mapping_files':{},
+        'compare_full_resolution':1,
+}
+
+incremental_params={
+        'incremental':0,
+        'replay_capacity':500,
+        'replay_ratio':1.0,
+        'incremental_steps':1000,
+}
+
+inference_server_params={
+        'host':'127.0.0.1',
+        'port':8501,
+        'model_type':'cnn_model_3d',
+        'max_batch_size':32,
+        'max_latency_ms':10,
+        'benchmark_concurrency':[1,4,16,32],
+        'benchmark_requests':200,
+}
+
+model_registry_params={
+        'model_files':{'cnn_model_3d':'model/trained_model_{}.h5'},
+        'memory_cap_mb':1024,
+        'part_configs':['../config/halo_config_files/assembly_config.py','../config/inner_rf_config_files/assembly_config.py','../config/cross_member_config_files/assembly_config.py'],
+}
+
+mc_inference_params={
+        'epistemic_samples':1000,
+        'chunk_size':32,
+        'adaptive_mc':0,
+        'batch_draws':10,
+        'min_draws':20,
+        'max_draws':200,
+        'tolerance':0.05,
+        'abs_tolerance':1e-4,
+        'pred_plots':1,
+        'plot_processes':2,
+}
+
+posterior_ensemble_params={
+        'ensemble_members':20,
+        'ensemble_seed':0,
+        'stacked_model':0,
+        'compare_mc':1,
+}
+
+scan_watcher_params={
+        'watch_folder':'../datasets/scan_drop',
+        'file_pattern':'*.txt',
+        'poll_interval':0.2,
+        'parse_processes':2,
+        'max_batch_size':16,
+        'max_latency_ms':50,
+        'max_pending':64,
+        'archive_processed':1,
+        'metrics_interval':5,
+        'model_type':'cnn_model_3d',
+        'harness_rate':5,
+        'harness_duration':60,
+        'harness_timeout':30,
+}
+
+result_store_params={
+        'store_file':'../trained_models/predictions.db',
+        'user_serials_file':'../leaderboard/user_serials.csv',
+        'buffer_size':1000,
+        'flush_interval':1.0,
+        'benchmark_parts':100000,
+}
+
+compiled_predict_params={
+        'compiled_predict':0,
+        'batch_sizes':[1,8,32],
+        'xla':0,
+        'benchmark_runs':100,
+}
+
+profiling_params={
+        'benchmark':'recompute',
+}
@@ -22,7 +22,6 @@ sys.path.append("../config")
 import pathlib
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import tensorflow as tf
 import tensorflow_probability as tfp
 import csv
@@ -65,8 +64,8 @@ class BayesDeployModel:
 
 		return model
 
-	def model_inference(self,inference_data,inference_model,y_pred,y_actual,plots_path,epistemic_samples=1000,run_id=0):
-		"""model_inference method is used to infer from unknown sample(s) using the trained model 
+	def model_inference(self,inference_data,inference_model,y_pred,y_actual,plots_path,epistemic_samples=1000,run_id=0,chunk_size=32,pred_plots=1,return_iqr=0,plotter=None):
+		"""model_inference method is used to infer from unknown sample(s) using the trained model, the Monte Carlo draws of all the samples are run in chunks of bounded size (refer mc_inference.ChunkedMCInference)
 				
 				:param inference_data: Unknown dataset having same structure as the train dataset
 				:type inference_data: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required) (required)
@@ -74,67 +73,52 @@ class BayesDeployModel:
 				:param inference_model: Trained model
 				:type inference_model: keras.model (required)
 				
-				:param print_result: Flag to indicate if the result needs to be printed, 0 by default, change to 1 in case the results need to be printed on the console
-				:type print_result: int
+				:param epistemic_samples: Number of Monte Carlo draws of each sample, defaults to 1000
+				:type epistemic_samples: int
 
+				:param chunk_size: Maximum number of draws of a forward pass, defaults to 32
+				:type chunk_size: int
+
+				:param pred_plots: Flag to plot the prediction distribution of each sample and KCC, defaults to 1
+				:type pred_plots: int
+
+				:param return_iqr: Flag to also return the inter quartile range of the draws, defaults to 0
+				:type return_iqr: int
+
+				:param plotter: background plotter (refer uncertainty_viz.AsyncPlotter), the plots are generated in the inference process if None, defaults to None
+				:type plotter: AsyncPlotter
+
+				:returns: prediction mean, epistemic std, aleatoric std (and inter quartile range if return_iqr is 1) of each sample
+				:rtype: numpy.array [samples*assembly_kccs]
 		"""		
-		#result=inference_model.(inference_data)
-		y_std=np.zeros_like(y_pred)
-		y_aleatoric_std=np.zeros_like(y_pred)
+		from mc_inference import ChunkedMCInference
+		from uncertainty_viz import submit_plot
+
 		plots_path_run_id=plots_path+'/plots_run_id_'+str(run_id)
 		pathlib.Path(plots_path_run_id).mkdir(parents=True, exist_ok=True)
 
-		for i in range(len(inference_data)):
-			
-			from scipy.stats import norm
-			inference_sample=inference_data[i,:,:,:,:]
-			print(inference_sample.shape)
-			input_sample=np.array([inference_sample]*epistemic_samples)
-			print(input_sample.shape)
-			# input_sample=tf.cast(input_sample, tf.float32)
-			# init = tf.global_variables_initializer()
-			# with tf.Session() as sess:
-			output=inference_model(input_sample)
-			output_mean=output.mean()
-			aleatoric_std=output.stddev()
-			#print(output_mean)
-			#print(aleatoric_std)
-			# 	sess.run(init)
-			# 	mean=sess.run(output_mean)
-			# 	print(mean)
-			#print((input_sample[0,:,:,:,:]==input_sample[50,:,:,:,:]).all())
-			#output=inference_model(input_sample)
-			#output_mean=output.mean()
-			pred_mean=np.array(output_mean).mean(axis=0)
-			aleatoric_mean=np.array(aleatoric_std).mean(axis=0)
-			pred_std=np.array(output_mean).std(axis=0,ddof=1)
-			output_mean=np.array(output_mean)
-			
-			print(pred_mean)
-			print(pred_std)
-			print(aleatoric_mean)
-			print(output_mean.shape,aleatoric_std.shape)
-			
-			pred_plots=1
-			
-			if(pred_plots==1):
-				for j in range(y_pred.shape[1]):
-					plot_data=output_mean[:,j]
-					actual_obv=y_actual[i,j]
-					plt.hist(plot_data, range=(actual_obv-0.5,actual_obv+0.5),bins=40)
-					plt.axvline(x=actual_obv,label="Actual Value = "+str(actual_obv),c='r')
-					plt.axvline(x=pred_mean[j],label="Prediction Mean = "+str(actual_obv),c='c')
-					plt.axvline(x=pred_mean[j]+norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]+norm.ppf(0.95)*pred_std[j]),c='b')
-					plt.axvline(x=pred_mean[j]-norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]-norm.ppf(0.95)*pred_std[j]),c='b')
-					plt.title("Prediction Distribution for KCC " + str(j) + " sample "+ str(i))
-					#plt.show()
-					plt.savefig(plots_path_run_id+"/"+ "sample_"+ str(i)+"_KCC_" + str(j) +'.png')
-					plt.clf()
-			y_pred[i,:]=pred_mean
-			y_std[i,:]=pred_std
-			y_aleatoric_std[i,:]=aleatoric_mean
-			#print(pred_mean)
-			#print(pred_std)
+		def draw_function(input_chunk):
+			output=inference_model(input_chunk)
+			return [output.mean(),output.stddev()]
+
+		mc_inference=ChunkedMCInference(chunk_size)
+		mc_results=mc_inference.run(draw_function,inference_data,epistemic_samples)
+
+		y_pred=mc_results[0]['mean']
+		y_std=mc_results[0]['std']
+		y_iqr=mc_results[0]['iqr']
+		y_aleatoric_std=mc_results[1]['mean']
+
+		print("Estimated Mean: ",y_pred)
+		print("Estimated STD: ",y_std)
+		print("Estimated Aleatoric Mean: ",y_aleatoric_std)
+
+		if(pred_plots==1):
+			for i in range(len(inference_data)):
+				submit_plot(plotter,mc_results[0]['draws'][i],y_actual[i],y_pred[i],y_std[i],plots_path_run_id+"/"+ "sample_"+ str(i)+"_KCC_",i)
+
+		if(return_iqr==1):
+			return y_pred,y_std,y_aleatoric_std,y_iqr
 
 		return y_pred,y_std,y_aleatoric_std
 	
@@ -193,6 +177,11 @@ if __name__ == '__main__':
 	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
 	activate_tensorboard=cftrain.model_parameters['activate_tensorboard']
 
+	epistemic_samples=cftrain.mc_inference_params['epistemic_samples']
+	chunk_size=cftrain.mc_inference_params['chunk_size']
+	pred_plots=cftrain.mc_inference_params['pred_plots']
+	plot_processes=cftrain.mc_inference_params['plot_processes']
+
 	print('Initializing the Assembly System and Measurement System....')
 	measurement_system=HexagonWlsScanner(data_type,application,system_noise,part_type,data_format)
 	vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
@@ -252,7 +241,13 @@ if __name__ == '__main__':
 		#print('Predicted Values saved to disk...')
 		sys.exit()
 	
-	y_pred,y_std,y_aleatoric_std=deploy_model.model_inference(input_conv_data,inference_model,y_pred,kcc_dataset.values,plots_path)
+	plotter=None
+
+	if(pred_plots==1 and plot_processes>0):
+		from uncertainty_viz import AsyncPlotter
+		plotter=AsyncPlotter(plot_processes)
+
+	y_pred,y_std,y_aleatoric_std,y_iqr=deploy_model.model_inference(input_conv_data,inference_model,y_pred,kcc_dataset.values,plots_path,epistemic_samples=epistemic_samples,chunk_size=chunk_size,pred_plots=pred_plots,return_iqr=1,plotter=plotter)
 
 	avg_std=np.array(y_std).mean(axis=0)
 	avg_aleatoric_std=np.array(y_aleatoric_std).mean(axis=0)
@@ -272,6 +267,8 @@ if __name__ == '__main__':
 
 		np.savetxt((deploy_path+"pred_std.csv"), y_std, delimiter=",")
 		#print('Predicted Standard Deviation Values saved to disk...')
+
+		np.savetxt((deploy_path+"pred_iqr.csv"), y_iqr, delimiter=",")
 		
 		np.savetxt((deploy_path+"aleatoric_std.csv"), y_aleatoric_std, delimiter=",")
 		#print('Predicted Values saved to disk...')
@@ -281,3 +278,7 @@ if __name__ == '__main__':
 
 		print('Model Logs saved to disk...')
 
+	if(plotter is not None):
+		print('Waiting for the prediction distribution plots...')
+		plotter.close()
+
@@ -22,7 +22,6 @@ sys.path.append("../config")
 import pathlib
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import tensorflow as tf
 import tensorflow_probability as tfp
 import csv
@@ -66,7 +65,7 @@ class BayesDeployModel:
 
 		return model
 
-	def model_inference(self,inference_data,inference_model,y_test_list,plots_path,epistemic_samples=20,run_id=0):
+	def model_inference(self,inference_data,inference_model,y_test_list,plots_path,epistemic_samples=20,run_id=0,mc_sampler=None,pred_plots=1,plotter=None):
 		"""model_inference method is used to infer from unknown sample(s) using the trained model 
 				
 				:param inference_data: Unknown dataset having same structure as the train dataset
@@ -78,9 +77,27 @@ class BayesDeployModel:
 				:param print_result: Flag to indicate if the result needs to be printed, 0 by default, change to 1 in case the results need to be printed on the console
 				:type print_result: int
 
+				:param mc_sampler: Adaptive Monte Carlo sampler (refer mc_inference.AdaptiveMCSampler), epistemic_samples draws are made for each sample if None, defaults to None
+				:type mc_sampler: AdaptiveMCSampler
+
+				:param pred_plots: Flag to plot the prediction distribution of each sample and KCC, defaults to 1
+				:type pred_plots: int
+
+				:param plotter: background plotter (refer uncertainty_viz.AsyncPlotter), the plots are generated in the inference loop if None, defaults to None
+				:type plotter: AsyncPlotter
+
+				:returns: prediction, epistemic std, epistemic inter quartile range and aleatoric std vectors, number of Monte Carlo draws of each sample
+				:rtype: list,list,list,list,numpy.array [samples]
 		"""		
 		#result=inference_model.(inference_data)
 		from scipy.stats import iqr
+		from uncertainty_viz import submit_plot
+
+		def draw_function(input_batch):
+			model_outputs=inference_model(input_batch)
+			return [model_outputs[0].mean(),model_outputs[0].stddev(),model_outputs[1]]
+
+		draw_counts=np.zeros(len(inference_data),dtype=int)
 
 		y_preds_reg=np.zeros_like(y_test_list[0])
 		y_preds_cla=np.zeros_like(y_test_list[1])
@@ -102,17 +119,24 @@ class BayesDeployModel:
 
 		for i in range(len(inference_data)):
 			
-			from scipy.stats import norm
 			inference_sample=inference_data[i,:,:,:,:]
-			input_sample=np.array([inference_sample]*epistemic_samples)
-			print(input_sample.shape)
-			model_outputs=inference_model(input_sample)
-			
-			output_reg=model_outputs[0]
-			output_cla=model_outputs[1]
 
-			output_mean=output_reg.mean()
-			aleatoric_std=output_reg.stddev()
+			if(mc_sampler is not None):
+				#Adaptive sampling, the draws are stopped when the std of the regression and classification outputs converges
+				mc_outputs,draw_counts[i]=mc_sampler.sample(draw_function,inference_sample,monitor_outputs=[0,2])
+				output_mean,aleatoric_std,output_cla=mc_outputs
+				print("Number of Monte Carlo draws: ",draw_counts[i])
+			else:
+				input_sample=np.array([inference_sample]*epistemic_samples)
+				print(input_sample.shape)
+				model_outputs=inference_model(input_sample)
+				
+				output_reg=model_outputs[0]
+				output_cla=model_outputs[1]
+
+				output_mean=output_reg.mean()
+				aleatoric_std=output_reg.stddev()
+				draw_counts[i]=epistemic_samples
 
 			pred_mean=np.array(output_mean).mean(axis=0)
 			aleatoric_mean=np.array(aleatoric_std).mean(axis=0)
@@ -133,32 +157,9 @@ class BayesDeployModel:
 			
 			print(output_mean.shape,aleatoric_std.shape,output_cla.shape)
 			
-			pred_plots=1
-			
 			if(pred_plots==1):
-				for j in range(output_mean.shape[1]):
-					plot_data=output_mean[:,j]
-					actual_obv=y_actual_reg[i,j]
-					plt.hist(plot_data, range=(actual_obv-0.5,actual_obv+0.5),bins=40)
-					plt.axvline(x=actual_obv,label="Actual Value = "+str(actual_obv),c='r')
-					plt.axvline(x=pred_mean[j],label="Prediction Mean = "+str(pred_mean[j]),c='c')
-					plt.axvline(x=pred_mean[j]+norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]+norm.ppf(0.95)*pred_std[j]),c='b')
-					plt.axvline(x=pred_mean[j]-norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]-norm.ppf(0.95)*pred_std[j]),c='b')
-					plt.title("Prediction Distribution for KCC " + str(j) + " sample "+ str(i))
-					plt.savefig(plots_path_run_id+"/"+ "reg_sample_"+ str(i)+"_KCC_" + str(j) +'.png')
-					plt.clf()
-				
-				for j in range(output_cla.shape[1]):
-					plot_data=output_cla[:,j]
-					actual_obv=y_actual_cla[i,j]
-					plt.hist(plot_data, range=(0,1),bins=40)
-					plt.axvline(x=actual_obv,label="Actual Value = "+str(actual_obv),c='r')
-					plt.axvline(x=pred_mean_cla[j],label="Prediction Mean = "+str(pred_mean_cla[j]),c='c')
-					plt.axvline(x=pred_mean_cla[j]+norm.ppf(0.95)*pred_std_cla[j], label="95 CI = "+str(pred_mean_cla[j]+norm.ppf(0.95)*pred_std_cla[j]),c='b')
-					plt.axvline(x=pred_mean_cla[j]-norm.ppf(0.95)*pred_std_cla[j], label="95 CI = "+str(pred_mean_cla[j]-norm.ppf(0.95)*pred_std_cla[j]),c='b')
-					plt.title("Prediction Distribution for KCC " + str(j) + " sample "+ str(i))
-					plt.savefig(plots_path_run_id+"/"+ "cla_sample_"+ str(i)+"_KCC_" + str(j) +'.png')
-					plt.clf()
+				submit_plot(plotter,output_mean,y_actual_reg[i],pred_mean,pred_std,plots_path_run_id+"/"+ "reg_sample_"+ str(i)+"_KCC_",i)
+				submit_plot(plotter,output_cla,y_actual_cla[i],pred_mean_cla,pred_std_cla,plots_path_run_id+"/"+ "cla_sample_"+ str(i)+"_KCC_",i,hist_range=(0,1))
 			
 			y_preds_reg[i,:]=pred_mean
 			y_reg_std[i,:]=pred_std
@@ -185,7 +186,7 @@ class BayesDeployModel:
 		aleatoric_vector=[]
 		aleatoric_vector.append(y_reg_aleatoric_std)
 
-		return pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector
+		return pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector,draw_counts
 	
 	def model_mean_eval(self,inference_data,inference_model):
 
@@ -248,6 +249,15 @@ if __name__ == '__main__':
 	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
 	activate_tensorboard=cftrain.model_parameters['activate_tensorboard']
 
+	adaptive_mc=cftrain.mc_inference_params['adaptive_mc']
+	batch_draws=cftrain.mc_inference_params['batch_draws']
+	min_draws=cftrain.mc_inference_params['min_draws']
+	max_draws=cftrain.mc_inference_params['max_draws']
+	tolerance=cftrain.mc_inference_params['tolerance']
+	abs_tolerance=cftrain.mc_inference_params['abs_tolerance']
+	pred_plots=cftrain.mc_inference_params['pred_plots']
+	plot_processes=cftrain.mc_inference_params['plot_processes']
+
 	print('Initializing the Assembly System and Measurement System....')
 	measurement_system=HexagonWlsScanner(data_type,application,system_noise,part_type,data_format)
 	vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
@@ -327,7 +337,21 @@ if __name__ == '__main__':
 		#print('Predicted Values saved to disk...')
 		sys.exit()
 	
-	pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector=deploy_model.model_inference(input_conv_data,inference_model,y_out_test,plots_path)
+	mc_sampler=None
+
+	if(adaptive_mc==1):
+		from mc_inference import AdaptiveMCSampler
+		mc_sampler=AdaptiveMCSampler(batch_draws,min_draws,max_draws,tolerance,abs_tolerance)
+
+	plotter=None
+
+	if(pred_plots==1 and plot_processes>0):
+		from uncertainty_viz import AsyncPlotter
+		plotter=AsyncPlotter(plot_processes)
+
+	pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector,draw_counts=deploy_model.model_inference(input_conv_data,inference_model,y_out_test,plots_path,mc_sampler=mc_sampler,pred_plots=pred_plots,plotter=plotter)
+
+	print("Average Monte Carlo draws per sample: ",draw_counts.mean())
 
 	epistemic_std_avg_reg=np.array(epistemic_vector[0]).mean(axis=0)
 	epistemic_std_avg_cla=np.array(epistemic_vector[1]).mean(axis=0)
@@ -377,8 +401,14 @@ if __name__ == '__main__':
 
 		np.savetxt((deploy_path+"epistemic_std_avg_reg.csv"), epistemic_std_avg_reg, delimiter=",")
 		np.savetxt((deploy_path+"epistemic_std_avg_cla.csv"), epistemic_std_avg_cla, delimiter=",")
+
+		np.savetxt((deploy_path+"mc_draw_counts.csv"), draw_counts, delimiter=",")
 		
 		np.savetxt((deploy_path+"aleatoric_std_avg_reg.csv"), avg_aleatoric_std, delimiter=",")
 
 		print('Model Logs saved to disk...')
 
+	if(plotter is not None):
+		print('Waiting for the prediction distribution plots...')
+		plotter.close()
+
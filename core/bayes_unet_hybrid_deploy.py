@@ -22,7 +22,6 @@ sys.path.append("../config")
 #sys.path.insert(0,parentdir) 
 
 #Importing Required Modules
-import matplotlib.pyplot as plt
 import pathlib
 import numpy as np
 import pandas as pd
@@ -78,7 +77,7 @@ class Unet_DeployModel:
 
 		return model
 
-	def bayes_unet_run_model(self,inference_data,inference_model,y_test_list,plots_path,epistemic_samples=5,run_id=0):
+	def bayes_unet_run_model(self,inference_data,inference_model,y_test_list,plots_path,epistemic_samples=5,run_id=0,mc_sampler=None,pred_plots=1,plotter=None):
 		"""run_train_model function trains the model on the dataset and saves the trained model,logs and plots within the file structure, the function prints the training evaluation metrics
 			
 			:param model: 3D CNN model compiled within the Deep Learning Class, refer https://keras.io/models/model/ for more information 
@@ -104,12 +103,31 @@ class Unet_DeployModel:
 
 			:param run_id: Run id index used in data study to conduct multiple training runs with different dataset sizes, defaults to 0
 			:type run_id: int			
+
+			:param mc_sampler: Adaptive Monte Carlo sampler (refer mc_inference.AdaptiveMCSampler), epistemic_samples draws are made for each sample if None, defaults to None
+			:type mc_sampler: AdaptiveMCSampler
+
+			:param pred_plots: Flag to plot the prediction distribution of each sample and KCC, defaults to 1
+			:type pred_plots: int
+
+			:param plotter: background plotter (refer uncertainty_viz.AsyncPlotter), the plots are generated in the inference loop if None, defaults to None
+			:type plotter: AsyncPlotter
+
+			:returns: prediction, epistemic std, epistemic inter quartile range and aleatoric std vectors, number of Monte Carlo draws of each sample
+			:rtype: list,list,list,list,numpy.array [samples]
 		"""			
 		import tensorflow as tf
 		from tensorflow.keras.models import load_model
 		import tensorflow.keras.backend as K 
 		
 		from scipy.stats import iqr
+		from uncertainty_viz import submit_plot
+
+		def draw_function(input_batch):
+			model_outputs=inference_model(input_batch)
+			return [model_outputs[0].mean(),model_outputs[0].stddev(),model_outputs[1],model_outputs[2]]
+
+		draw_counts=np.zeros(len(inference_data),dtype=int)
 
 		y_preds_reg=np.zeros_like(y_test_list[0])
 		y_preds_cla=np.zeros_like(y_test_list[1])
@@ -135,18 +153,25 @@ class Unet_DeployModel:
 
 		for i in range(len(inference_data)):
 			
-			from scipy.stats import norm
 			inference_sample=inference_data[i,:,:,:,:]
-			input_sample=np.array([inference_sample]*epistemic_samples)
-			print(input_sample.shape)
-			model_outputs=inference_model(input_sample)
-			
-			output_reg=model_outputs[0]
-			output_cla=model_outputs[1]
-			output_shape_error=model_outputs[2]
 
-			output_mean=output_reg.mean()
-			aleatoric_std=output_reg.stddev()
+			if(mc_sampler is not None):
+				#Adaptive sampling, the draws are stopped when the std of the regression and classification outputs converges
+				mc_outputs,draw_counts[i]=mc_sampler.sample(draw_function,inference_sample,monitor_outputs=[0,2])
+				output_mean,aleatoric_std,output_cla,output_shape_error=mc_outputs
+				print("Number of Monte Carlo draws: ",draw_counts[i])
+			else:
+				input_sample=np.array([inference_sample]*epistemic_samples)
+				print(input_sample.shape)
+				model_outputs=inference_model(input_sample)
+				
+				output_reg=model_outputs[0]
+				output_cla=model_outputs[1]
+				output_shape_error=model_outputs[2]
+
+				output_mean=output_reg.mean()
+				aleatoric_std=output_reg.stddev()
+				draw_counts[i]=epistemic_samples
 
 			pred_mean=np.array(output_mean).mean(axis=0)
 			aleatoric_mean=np.array(aleatoric_std).mean(axis=0)
@@ -172,32 +197,9 @@ class Unet_DeployModel:
 			
 			print(output_mean.shape,aleatoric_std.shape,output_cla.shape)
 			
-			pred_plots=1
-			
 			if(pred_plots==1):
-				for j in range(output_mean.shape[1]):
-					plot_data=output_mean[:,j]
-					actual_obv=y_actual_reg[i,j]
-					plt.hist(plot_data, range=(actual_obv-0.5,actual_obv+0.5),bins=40)
-					plt.axvline(x=actual_obv,label="Actual Value = "+str(actual_obv),c='r')
-					plt.axvline(x=pred_mean[j],label="Prediction Mean = "+str(pred_mean[j]),c='c')
-					plt.axvline(x=pred_mean[j]+norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]+norm.ppf(0.95)*pred_std[j]),c='b')
-					plt.axvline(x=pred_mean[j]-norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]-norm.ppf(0.95)*pred_std[j]),c='b')
-					plt.title("Prediction Distribution for KCC " + str(j) + " sample "+ str(i))
-					plt.savefig(plots_path_run_id+"/"+ "reg_sample_"+ str(i)+"_KCC_" + str(j) +'.png')
-					plt.clf()
-				
-				for j in range(output_cla.shape[1]):
-					plot_data=output_cla[:,j]
-					actual_obv=y_actual_cla[i,j]
-					plt.hist(plot_data, range=(0,1),bins=40)
-					plt.axvline(x=actual_obv,label="Actual Value = "+str(actual_obv),c='r')
-					plt.axvline(x=pred_mean_cla[j],label="Prediction Mean = "+str(pred_mean_cla[j]),c='c')
-					plt.axvline(x=pred_mean_cla[j]+norm.ppf(0.95)*pred_std_cla[j], label="95 CI = "+str(pred_mean_cla[j]+norm.ppf(0.95)*pred_std_cla[j]),c='b')
-					plt.axvline(x=pred_mean_cla[j]-norm.ppf(0.95)*pred_std_cla[j], label="95 CI = "+str(pred_mean_cla[j]-norm.ppf(0.95)*pred_std_cla[j]),c='b')
-					plt.title("Prediction Distribution for KCC " + str(j) + " sample "+ str(i))
-					plt.savefig(plots_path_run_id+"/"+ "cla_sample_"+ str(i)+"_KCC_" + str(j) +'.png')
-					plt.clf()
+				submit_plot(plotter,output_mean,y_actual_reg[i],pred_mean,pred_std,plots_path_run_id+"/"+ "reg_sample_"+ str(i)+"_KCC_",i)
+				submit_plot(plotter,output_cla,y_actual_cla[i],pred_mean_cla,pred_std_cla,plots_path_run_id+"/"+ "cla_sample_"+ str(i)+"_KCC_",i,hist_range=(0,1))
 			
 			y_preds_reg[i,:]=pred_mean
 			y_reg_std[i,:]=pred_std
@@ -233,7 +235,7 @@ class Unet_DeployModel:
 		aleatoric_vector=[]
 		aleatoric_vector.append(y_reg_aleatoric_std)
 
-		return pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector
+		return pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector,draw_counts
 
 		
 if __name__ == '__main__':
@@ -275,6 +277,15 @@ if __name__ == '__main__':
 	loss_func=cftrain.model_parameters['loss_func']
 	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
 	activate_tensorboard=cftrain.model_parameters['activate_tensorboard']
+
+	adaptive_mc=cftrain.mc_inference_params['adaptive_mc']
+	batch_draws=cftrain.mc_inference_params['batch_draws']
+	min_draws=cftrain.mc_inference_params['min_draws']
+	max_draws=cftrain.mc_inference_params['max_draws']
+	tolerance=cftrain.mc_inference_params['tolerance']
+	abs_tolerance=cftrain.mc_inference_params['abs_tolerance']
+	pred_plots=cftrain.mc_inference_params['pred_plots']
+	plot_processes=cftrain.mc_inference_params['plot_processes']
 	
 	print('Creating file Structure....')
 	
@@ -396,7 +407,21 @@ if __name__ == '__main__':
 
 	unet_deploy_model=Unet_DeployModel()
 	
-	pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector=unet_deploy_model.bayes_unet_run_model(test_input_conv_data,model,Y_out_test_list,plots_path)
+	mc_sampler=None
+
+	if(adaptive_mc==1):
+		from mc_inference import AdaptiveMCSampler
+		mc_sampler=AdaptiveMCSampler(batch_draws,min_draws,max_draws,tolerance,abs_tolerance)
+
+	plotter=None
+
+	if(pred_plots==1 and plot_processes>0):
+		from uncertainty_viz import AsyncPlotter
+		plotter=AsyncPlotter(plot_processes)
+
+	pred_vector,epistemic_vector,epistemic_vector_iqr,aleatoric_vector,draw_counts=unet_deploy_model.bayes_unet_run_model(test_input_conv_data,model,Y_out_test_list,plots_path,mc_sampler=mc_sampler,pred_plots=pred_plots,plotter=plotter)
+
+	print("Average Monte Carlo draws per sample: ",draw_counts.mean())
 	
 	model_outputs=pred_vector
 
@@ -518,6 +543,8 @@ if __name__ == '__main__':
 
 	np.savetxt((deploy_path+"/pred_iqr_reg.csv"), epistemic_vector_iqr[0], delimiter=",")
 	np.savetxt((deploy_path+"/pred_iqr_cla.csv"), epistemic_vector_iqr[1], delimiter=",")
+
+	np.savetxt((deploy_path+"/mc_draw_counts.csv"), draw_counts, delimiter=",")
 		
 	np.savetxt((deploy_path+"/pred_aleatoric_std_reg.csv"), aleatoric_vector[0], delimiter=",")
 	#print('Predicted Values saved to disk...')
@@ -527,4 +554,8 @@ if __name__ == '__main__':
 		
 	np.savetxt((deploy_path+"/aleatoric_std_avg_reg.csv"), avg_aleatoric_std, delimiter=",")
 
-	print('Model Logs saved to disk...')
\ No newline at end of file
+	print('Model Logs saved to disk...')
+
+	if(plotter is not None):
+		print('Waiting for the prediction distribution plots...')
+		plotter.close()
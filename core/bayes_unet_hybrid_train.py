@@ -40,14 +40,16 @@ from wls400a_system import GetInferenceData
 from data_import import GetTrainData
 from core_model_bayes import Bayes_DLModel
 from training_viz import TrainViz
+from gradient_accumulation import GradientAccumulationTrainer
 from metrics_eval import MetricsEval
 from keras_lr_multiplier import LRMultiplier
 
 class Unet_TrainModel:
-	def __init__(self,batch_size,epochs,split_ratio):
+	def __init__(self,batch_size,epochs,split_ratio,micro_batch_size=0):
 			self.batch_size=batch_size
 			self.epochs=epochs
 			self.split_ratio=split_ratio
+			self.micro_batch_size=micro_batch_size
 			
 
 	def bayes_unet_run_train_model(self,model,X_in,Y_out_list,X_in_test,Y_out_test_list,model_path,logs_path,plots_path,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune'):
@@ -114,7 +116,11 @@ class Unet_TrainModel:
 		checkpointer = tf.keras.callbacks.ModelCheckpoint(model_file_path, verbose=1, save_best_only='val_loss',save_weights_only=True)
 		#Check pointer to save the best model
 		
-		history=model.fit(x=X_in,y=Y_out_list, validation_data=(X_in_test,Y_out_test_list), epochs=self.epochs, batch_size=self.batch_size,callbacks=[checkpointer])
+		if(self.micro_batch_size>0 and self.micro_batch_size<self.batch_size):
+			accumulation_trainer=GradientAccumulationTrainer(self.micro_batch_size,self.batch_size,self.epochs)
+			history=accumulation_trainer.accumulation_fit(model,X_in,Y_out_list,X_in_test,Y_out_test_list,model_file_path)
+		else:
+			history=model.fit(x=X_in,y=Y_out_list, validation_data=(X_in_test,Y_out_test_list), epochs=self.epochs, batch_size=self.batch_size,callbacks=[checkpointer])
 		
 		return model
 
@@ -312,7 +318,14 @@ if __name__ == '__main__':
 	Y_out_list.append(shape_error)
 	Y_out_test_list.append(shape_error_test)
 
-	unet_train_model=Unet_TrainModel(batch_size,epocs,split_ratio)
+	#Gradient accumulation over micro batches to reach the effective batch size, only when a micro batch size is set
+	micro_batch_size=cftrain.encode_decode_params['micro_batch_size']
+	effective_batch_size=cftrain.encode_decode_params['effective_batch_size']
+	if(micro_batch_size>0 and effective_batch_size>0):
+		print('Gradient accumulation, batch size: ',batch_size,' replaced by the effective batch size: ',effective_batch_size)
+		batch_size=effective_batch_size
+
+	unet_train_model=Unet_TrainModel(batch_size,epocs,split_ratio,micro_batch_size)
 	
 	trained_model=unet_train_model.bayes_unet_run_train_model(model,input_conv_data,Y_out_list,test_input_conv_data,Y_out_test_list,model_path,logs_path,plots_path,activate_tensorboard)
 	
@@ -0,0 +1,213 @@
+""" Contains classes and methods to build compiled prediction functions of the deployed models, a concrete function with a fixed input signature is traced for each of the common batch sizes when the model is loaded (optionally compiled with XLA) and warmed up
+The inputs are dispatched directly to the concrete functions, an input is padded to the nearest traced batch size (or split into chunks of the largest) so that the Keras predict overhead and retracing are avoided for small batches, the single scan latency of Keras predict and the compiled functions is benchmarked in the main
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import time
+import pathlib
+import numpy as np
+
+class CompiledPredictor:
+	"""Compiled Predictor Class, the concrete functions refer to the variables of the model so the weights can be loaded after the predictor is built
+
+		:param model: trained model (single or multiple outputs)
+		:type model: keras.models (required)
+
+		:param batch_sizes: batch sizes for which a concrete function is traced, defaults to (1,8,32)
+		:type batch_sizes: tuple or list
+
+		:param xla: Flag to compile the concrete functions with XLA (CPU or GPU), the functions are traced without XLA if the compilation fails, defaults to 0
+		:type xla: int
+	"""
+	def __init__(self,model,batch_sizes=(1,8,32),xla=0):
+		self.model=model
+		self.batch_sizes=sorted(batch_sizes)
+		self.xla=xla
+		self.input_shape=model.inputs[0].shape.as_list()[1:]
+
+		self.build_functions()
+		self.warm_up()
+
+	def build_functions(self):
+		"""Trace a concrete function of the model for each batch size
+		"""
+		import tensorflow as tf
+
+		model=self.model
+
+		if(self.xla==1):
+			predict_function=tf.function(lambda X_in: model(X_in,training=False),experimental_compile=True)
+		else:
+			predict_function=tf.function(lambda X_in: model(X_in,training=False))
+
+		start_time=time.time()
+		self.concrete_functions={batch_size:predict_function.get_concrete_function(tf.TensorSpec([batch_size]+self.input_shape,tf.float32)) for batch_size in self.batch_sizes}
+		self.trace_time=time.time()-start_time
+
+	def warm_up(self):
+		"""Run each concrete function once (kernel selection and XLA compilation), falls back to functions without XLA if the compilation fails
+		"""
+		start_time=time.time()
+
+		try:
+			for batch_size in self.batch_sizes:
+				self.run_function(np.zeros([batch_size]+self.input_shape,dtype=np.float32))
+		except Exception as error:
+			if(self.xla==0):
+				raise
+
+			print('XLA compilation failed, using functions without XLA: ',error)
+			self.xla=0
+			self.build_functions()
+			self.warm_up()
+			return
+
+		self.warmup_time=time.time()-start_time
+		print('Compiled prediction functions for batch sizes: ',self.batch_sizes,' XLA: ',self.xla,' trace time: ',self.trace_time,' warm up time: ',self.warmup_time)
+
+	def run_function(self,X_in):
+		"""Run the concrete function of the batch size of X_in
+
+			:returns: model outputs, list for models with multiple outputs
+			:rtype: list
+		"""
+		import tensorflow as tf
+
+		outputs=self.concrete_functions[len(X_in)](tf.constant(X_in))
+
+		if(isinstance(outputs,(list,tuple))):
+			return [output.numpy() for output in outputs]
+
+		return [outputs.numpy()]
+
+	def get_batch_size(self,n_samples):
+		"""Smallest traced batch size of at least n_samples, the largest batch size if none
+		"""
+		for batch_size in self.batch_sizes:
+			if(batch_size>=n_samples):
+				return batch_size
+
+		return self.batch_sizes[-1]
+
+	def predict(self,X_in):
+		"""Predict using the concrete functions (same outputs as keras predict)
+
+			:param X_in: model input
+			:type X_in: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:returns: model estimates, a list for models with multiple outputs
+			:rtype: numpy.array or list
+		"""
+		X_in=np.asarray(X_in,dtype=np.float32)
+
+		#Empty outputs of the same shape as keras predict
+		if(len(X_in)==0):
+			outputs=[np.zeros([0]+output.shape.as_list()[1:],dtype=np.float32) for output in self.model.outputs]
+			if(len(outputs)==1):
+				return outputs[0]
+			return outputs
+
+		chunk_outputs=[]
+
+		start_index=0
+		while(start_index<len(X_in)):
+			batch_size=self.get_batch_size(len(X_in)-start_index)
+			X_chunk=X_in[start_index:start_index+batch_size]
+			n_chunk=len(X_chunk)
+
+			#The chunk is padded with zeros to the traced batch size, the outputs of the padding are dropped
+			if(n_chunk<batch_size):
+				X_chunk=np.concatenate([X_chunk,np.zeros((batch_size-n_chunk,)+X_chunk.shape[1:],dtype=np.float32)],axis=0)
+
+			chunk_outputs.append([output[0:n_chunk] for output in self.run_function(X_chunk)])
+			start_index=start_index+n_chunk
+
+		outputs=[np.concatenate([chunk[k] for chunk in chunk_outputs],axis=0) for k in range(len(chunk_outputs[0]))]
+
+		if(len(outputs)==1):
+			return outputs[0]
+
+		return outputs
+
+def get_latency(predict_function,X_in,benchmark_runs):
+	"""Latency of predict_function in milliseconds after one warm up call
+
+		:returns: median and 95th percentile latency
+		:rtype: float,float
+	"""
+	predict_function(X_in)
+	latencies=[]
+
+	for i in range(benchmark_runs):
+		start_time=time.time()
+		predict_function(X_in)
+		latencies.append((time.time()-start_time)*1000)
+
+	return np.percentile(latencies,50),np.percentile(latencies,95)
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	from model_deployment import DeployModel
+
+	print("Welcome to Deep Learning for Manufacturing (dlmfg)...")
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	voxel_dim=config.assembly_system['voxel_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+
+	print('Parsing from Training Config File')
+
+	batch_sizes=cftrain.compiled_predict_params['batch_sizes']
+	xla=cftrain.compiled_predict_params['xla']
+	benchmark_runs=cftrain.compiled_predict_params['benchmark_runs']
+
+	#Generate Paths
+	train_path='../trained_models/'+part_type
+	model_path=train_path+'/model'+'/trained_model_0.h5'
+	deploy_path=train_path+'/deploy/'
+	pathlib.Path(deploy_path).mkdir(parents=True, exist_ok=True)
+
+	deploy_model=DeployModel()
+	inference_model=deploy_model.get_model(model_path)
+
+	start_time=time.time()
+	predictor=CompiledPredictor(inference_model,batch_sizes,xla)
+	load_time=time.time()-start_time
+
+	benchmark_results=[]
+
+	#The latency does not depend on the deviation values, random scans are used
+	for batch_size in [1]+[batch_size for batch_size in batch_sizes if batch_size!=1]:
+		X_in=np.random.normal(0,0.5,size=(batch_size,voxel_dim,voxel_dim,voxel_dim,voxel_channels)).astype(np.float32)
+
+		keras_p50,keras_p95=get_latency(inference_model.predict,X_in,benchmark_runs)
+		compiled_p50,compiled_p95=get_latency(predictor.predict,X_in,benchmark_runs)
+
+		benchmark_results.append({'batch_size':batch_size,'keras_predict_p50_ms':keras_p50,'keras_predict_p95_ms':keras_p95,
+								'compiled_p50_ms':compiled_p50,'compiled_p95_ms':compiled_p95,'speed_up':keras_p50/compiled_p50,
+								'xla':predictor.xla,'compile_time_s':load_time})
+
+	import pandas as pd
+	benchmark_df=pd.DataFrame(benchmark_results)
+	benchmark_df.to_csv(deploy_path+'compiled_predict_benchmark.csv')
+
+	print('Compiled Prediction Benchmark')
+	print(benchmark_df)
@@ -141,6 +141,109 @@ class DLModel:
 
 	
 		
+	def sparse_cnn_model_3d(self,occupied_voxels,voxel_dim,deviation_channels,kernel_size=3,filters=32,levels=3):
+		"""Build the sparse 3D CNN model, submanifold sparse convolutions (refer custom_layers.SubmanifoldConv3D) are computed only at the occupied voxels of the mapping index, the input is the sparse voxelized data (refer data_import.GetTrainData.data_convert_sparse_mc)
+
+			:param occupied_voxels: (i,j,k) index of the occupied voxels (refer data_import.GetTrainData.get_occupied_voxels)
+			:type occupied_voxels: numpy.array [n_voxels*3] (required)
+
+			:param voxel_dim: The voxel dimension of the grid of the occupied voxels
+			:type voxel_dim: int (required)
+
+			:param deviation_channels: The number of voxel channels in the input structure
+			:type deviation_channels: int (required)
+
+			:param kernel_size: size of the cubic kernel of the sparse convolutions, defaults to 3
+			:type kernel_size: int
+
+			:param filters: number of filters of the sparse convolutions, defaults to 32
+			:type filters: int
+
+			:param levels: number of sparse convolutions, the active sites are pooled to a coarser grid between the convolutions, defaults to 3
+			:type levels: int
+		"""
+		from tensorflow.keras.layers import Input, Dense, GlobalMaxPooling1D
+		from tensorflow.keras.models import Model
+		from tensorflow.keras import regularizers
+		from custom_layers import SubmanifoldConv3D, SparsePool3D, get_neighbour_table, get_pooling_index
+
+		if(self.output_type=="regression"):
+			final_layer_avt='linear'
+
+		if(self.output_type=="classification"):
+			final_layer_avt='softmax'
+
+		inputs=Input((len(occupied_voxels),deviation_channels))
+		x=inputs
+		sites=occupied_voxels
+		grid_dim=voxel_dim
+
+		for level in range(levels):
+			if(level>0):
+				sites,parent_index=get_pooling_index(sites)
+				grid_dim=(grid_dim+1)//2
+				x=SparsePool3D(len(sites),parent_index,name="sparse_pool_{}".format(level))(x)
+
+			neighbour_table=get_neighbour_table(sites,grid_dim,kernel_size)
+			x=SubmanifoldConv3D(filters,len(sites),kernel_size**3,neighbour_table,activation='relu',name="sparse_conv_{}".format(level))(x)
+
+		x=GlobalMaxPooling1D()(x)
+		x=Dense(64,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+		x=Dense(64,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+		output=Dense(self.output_dimension, activation=final_layer_avt)(x)
+
+		model=Model(inputs, outputs=output, name='Sparse_3D_CNN')
+		model.compile(loss=self.loss_function, optimizer=self.optimizer, metrics=['mae'])
+
+		print("Sparse 3D CNN model successfully compiled")
+		return model
+
+	def sparse_resnet_3d_cnn(self,occupied_voxels,voxel_dim,deviation_channels,kernel_size=3,filters=32,levels=3):
+		"""Build the sparse 3D ResNet model, residual blocks of submanifold sparse convolutions at each level (same structure as resnet_3d_cnn), the parameters are the same as sparse_cnn_model_3d
+		"""
+		from tensorflow.keras.layers import Input, Dense, Add, LeakyReLU, GlobalMaxPooling1D
+		from tensorflow.keras.models import Model
+		from tensorflow.keras import regularizers
+		from custom_layers import SubmanifoldConv3D, SparsePool3D, get_neighbour_table, get_pooling_index
+
+		if(self.output_type=="regression"):
+			final_layer_avt='linear'
+
+		if(self.output_type=="classification"):
+			final_layer_avt='softmax'
+
+		inputs=Input((len(occupied_voxels),deviation_channels))
+		x=inputs
+		sites=occupied_voxels
+		grid_dim=voxel_dim
+
+		for level in range(levels):
+			if(level>0):
+				sites,parent_index=get_pooling_index(sites)
+				grid_dim=(grid_dim+1)//2
+				x=SparsePool3D(len(sites),parent_index,name="sparse_pool_{}".format(level))(x)
+
+			neighbour_table=get_neighbour_table(sites,grid_dim,kernel_size)
+
+			y=SubmanifoldConv3D(filters,len(sites),kernel_size**3,neighbour_table,name="sparse_conv_block_{}_1".format(level))(x)
+			res=y
+			y=LeakyReLU()(y)
+			y=SubmanifoldConv3D(filters,len(sites),kernel_size**3,neighbour_table,name="sparse_conv_block_{}_2".format(level))(y)
+			y=LeakyReLU()(y)
+			y=SubmanifoldConv3D(filters,len(sites),kernel_size**3,neighbour_table,name="sparse_conv_block_{}_3".format(level))(y)
+			y=Add()([res, y])
+			x=LeakyReLU()(y)
+
+		x=GlobalMaxPooling1D()(x)
+		x=Dense(128,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+		x=Dense(64,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+		output=Dense(self.output_dimension, activation=final_layer_avt)(x)
+
+		model=Model(inputs, outputs=output, name='Sparse_Res_3D_CNN')
+		model.compile(loss=self.loss_function, optimizer=self.optimizer, metrics=['mae'])
+
+		return model
+
 	def cnn_model_3d_tl(self,voxel_dim,deviation_channels):
 		"""Build the 3D Model with GlobalMAxPooling3D instead of flatten, this enables input for different voxel dimensions, to be used when the model needs to be leveraged for transfer learning with different size input
 
@@ -150,11 +253,18 @@ class DLModel:
 			:param voxel_channels: The number of voxel channels in the input structure, required to build input to the 3D CNN model
 			:type voxel_channels: int (required)
 		"""
-		from tensorflow.keras.layers import Conv3D, MaxPool3D, Flatten, Dense, Dropout, Input
+		from tensorflow.keras.layers import Conv3D, MaxPool3D, Flatten, Dense, Dropout, Input, GlobalMaxPooling3D
 		from tensorflow.keras.models import Model
 		from tensorflow.keras import regularizers
 
-		inputs = Input(shape=(None,None,None,3,))
+		if(self.output_type=="regression"):
+			final_layer_avt='linear'
+
+		if(self.output_type=="classification"):
+			final_layer_avt='softmax'
+
+		#The voxel dimension is not fixed, the model can be trained and deployed at any voxel dimension of at least 32
+		inputs = Input(shape=(None,None,None,deviation_channels,))
 		cnn3d_1=Conv3D(32, kernel_size=(5,5,5),strides=(2,2,2),activation='relu')(inputs)
 		cnn3d_2=Conv3D(32, kernel_size=(4,4,4),strides=(2,2,2),activation='relu')(cnn3d_1)
 		cnn3d_3=Conv3D(32, kernel_size=(3,3,3),strides=(1,1,1),activation='relu')(cnn3d_2)
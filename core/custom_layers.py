@@ -0,0 +1,343 @@
+""" Contains custom keras layers used by the model builders, the layers are registered as custom objects when models are loaded (refer get_custom_objects)
+"""
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Layer, Conv3D
+
+class RecomputeResBlock(Layer):
+	"""Residual encoder block of the 3D U-Net models (identity 1x1 convolution, two 3x3 convolutions, add and activation) with activation recomputation, only the block input is stored for the backward pass and the intermediate activations are recomputed using tf.recompute_grad, this reduces the activation memory of the encoder at the cost of an additional forward pass of the block during training
+
+		:param out_channel: Number of filters of the convolutions within the block
+		:type out_channel: int (required)
+
+		:param activation: Activation used within the block, defaults to relu
+		:type activation: str
+
+		:param recompute: Flag to recompute the block during the backward pass, defaults to 1, set to 0 to store the activations (same as the standard block)
+		:type recompute: int
+	"""
+	def __init__(self,out_channel,activation='relu',recompute=1,**kwargs):
+
+		super(RecomputeResBlock,self).__init__(**kwargs)
+
+		self.out_channel=out_channel
+		self.activation=activation
+		self.recompute=recompute
+
+		self.identity_conv=Conv3D(out_channel, kernel_size=1, padding='same', use_bias=False, name='Identity')
+		self.conv_1=Conv3D(out_channel, kernel_size=3, padding='same', name='Conv_1')
+		self.conv_2=Conv3D(out_channel, kernel_size=3, padding='same', name='Conv_2')
+		self.activation_function=tf.keras.activations.get(activation)
+
+	def build(self,input_shape):
+		#Variables are created before the recomputed function is traced as variables cannot be created within tf.recompute_grad
+		input_shape=tf.TensorShape(input_shape)
+
+		self.identity_conv.build(input_shape)
+		self.conv_1.build(input_shape)
+		self.conv_2.build(input_shape[:-1].concatenate(self.out_channel))
+
+		super(RecomputeResBlock,self).build(input_shape)
+
+	def block_forward(self,x):
+		"""Forward pass of the residual block
+		"""
+		res=self.identity_conv(x)
+		act1=self.activation_function(self.conv_1(x))
+		conv2=self.conv_2(act1)
+
+		return self.activation_function(res+conv2)
+
+	def call(self,inputs,training=None):
+
+		if(self.recompute==1):
+			return tf.recompute_grad(self.block_forward)(inputs)
+
+		return self.block_forward(inputs)
+
+	def compute_output_shape(self,input_shape):
+		return tf.TensorShape(input_shape)[:-1].concatenate(self.out_channel)
+
+	def get_config(self):
+		config={
+			'out_channel':self.out_channel,
+			'activation':self.activation,
+			'recompute':self.recompute
+		}
+		base_config=super(RecomputeResBlock,self).get_config()
+
+		return dict(list(base_config.items())+list(config.items()))
+
+class VoxelGather(Layer):
+	"""Gathers the voxels occupied by the nodes of the part from a voxel grid output, used to output the shape error only at the occupied voxels so that the loss, metrics and targets scale with the number of nodes rather than the voxel grid volume
+
+		:param occupied_voxels: (i,j,k) index of each occupied voxel (refer data_import.GetTrainData.get_occupied_voxels)
+		:type occupied_voxels: numpy.array [n_voxels*3] (required)
+	"""
+	def __init__(self,occupied_voxels,**kwargs):
+
+		super(VoxelGather,self).__init__(**kwargs)
+
+		self.occupied_voxels=[[int(index) for index in voxel] for voxel in occupied_voxels]
+
+	def build(self,input_shape):
+		input_shape=tf.TensorShape(input_shape)
+		voxel_dim=int(input_shape[1])
+
+		self.flat_index=tf.constant([(i*voxel_dim+j)*voxel_dim+k for i,j,k in self.occupied_voxels],dtype=tf.int32)
+
+		super(VoxelGather,self).build(input_shape)
+
+	def call(self,inputs):
+		input_shape=tf.shape(inputs)
+		flat_inputs=tf.reshape(inputs,[input_shape[0],-1,input_shape[-1]])
+
+		return tf.gather(flat_inputs,self.flat_index,axis=1)
+
+	def compute_output_shape(self,input_shape):
+		input_shape=tf.TensorShape(input_shape)
+
+		return tf.TensorShape([input_shape[0],len(self.occupied_voxels),input_shape[-1]])
+
+	def get_config(self):
+		config={
+			'occupied_voxels':self.occupied_voxels
+		}
+		base_config=super(VoxelGather,self).get_config()
+
+		return dict(list(base_config.items())+list(config.items()))
+
+class PCAReconstruct(Layer):
+	"""Reconstructs the node deviations of each stage from the concatenated PCA basis coefficients (refer shape_error_basis.ShapeErrorBasis), the basis is stored as non-trainable weights so the layer can be appended to a trained model for deployment
+
+		:param n_stages: Number of stages (output heads)
+		:type n_stages: int (required)
+
+		:param n_components: Number of basis vectors of each stage
+		:type n_components: int (required)
+
+		:param point_dim: Number of nodes
+		:type point_dim: int (required)
+
+		:param components: basis of each stage, defaults to None (weights to be loaded)
+		:type components: numpy.array [n_stages*n_components*(3*point_dim)]
+
+		:param mean: mean node deviations of each stage, defaults to None (weights to be loaded)
+		:type mean: numpy.array [n_stages*(3*point_dim)]
+	"""
+	def __init__(self,n_stages,n_components,point_dim,components=None,mean=None,**kwargs):
+
+		super(PCAReconstruct,self).__init__(**kwargs)
+
+		self.n_stages=n_stages
+		self.n_components=n_components
+		self.point_dim=point_dim
+		self.initial_components=components
+		self.initial_mean=mean
+
+	def build(self,input_shape):
+
+		def get_initializer(value):
+			if(value is None):
+				return 'zeros'
+			return tf.keras.initializers.Constant(value)
+
+		self.components=self.add_weight(name='components',shape=(self.n_stages,self.n_components,3*self.point_dim),initializer=get_initializer(self.initial_components),trainable=False)
+		self.mean=self.add_weight(name='mean',shape=(self.n_stages,3*self.point_dim),initializer=get_initializer(self.initial_mean),trainable=False)
+
+		super(PCAReconstruct,self).build(input_shape)
+
+	def call(self,inputs):
+		coefficients=tf.reshape(inputs,[-1,self.n_stages,self.n_components])
+		node_data=tf.einsum('bsk,skn->bsn',coefficients,self.components)+self.mean
+
+		#[samples,stages,(x,y,z),nodes] to [samples,nodes,stages*(x,y,z)]
+		node_data=tf.reshape(node_data,[-1,self.n_stages,3,self.point_dim])
+		node_data=tf.transpose(node_data,[0,3,1,2])
+
+		return tf.reshape(node_data,[-1,self.point_dim,3*self.n_stages])
+
+	def compute_output_shape(self,input_shape):
+		return tf.TensorShape([input_shape[0],self.point_dim,3*self.n_stages])
+
+	def get_config(self):
+		config={
+			'n_stages':self.n_stages,
+			'n_components':self.n_components,
+			'point_dim':self.point_dim
+		}
+		base_config=super(PCAReconstruct,self).get_config()
+
+		return dict(list(base_config.items())+list(config.items()))
+
+def get_neighbour_table(occupied_voxels,voxel_dim,kernel_size=3):
+	"""Neighbour table of the active sites (occupied voxels) for submanifold sparse convolution, the table contains the index of the active site at each kernel offset, offsets that are not active point to an additional zero site (index n_sites)
+
+		:param occupied_voxels: (i,j,k) index of each active site
+		:type occupied_voxels: numpy.array [n_sites*3] (required)
+
+		:param voxel_dim: voxel dimension of the grid of the active sites
+		:type voxel_dim: int (required)
+
+		:param kernel_size: size of the cubic kernel, defaults to 3
+		:type kernel_size: int
+
+		:returns: neighbour table
+		:rtype: numpy.array [n_sites*kernel_size**3]
+	"""
+	occupied_voxels=np.asarray(occupied_voxels,dtype=np.int64)
+	n_sites=len(occupied_voxels)
+
+	kernel_range=np.arange(kernel_size)-kernel_size//2
+	offsets=np.stack(np.meshgrid(kernel_range,kernel_range,kernel_range,indexing='ij'),axis=-1).reshape(-1,3)
+
+	def flat_index(voxels):
+		return (voxels[...,0]*voxel_dim+voxels[...,1])*voxel_dim+voxels[...,2]
+
+	site_index=flat_index(occupied_voxels)
+	site_order=np.argsort(site_index)
+	sorted_site_index=site_index[site_order]
+
+	neighbours=occupied_voxels[:,None,:]+offsets[None,:,:]
+	within_grid=np.all((neighbours>=0)&(neighbours<voxel_dim),axis=-1)
+	neighbour_index=flat_index(np.clip(neighbours,0,voxel_dim-1))
+
+	position=np.clip(np.searchsorted(sorted_site_index,neighbour_index),0,n_sites-1)
+	active=within_grid&(sorted_site_index[position]==neighbour_index)
+
+	return np.where(active,site_order[position],n_sites).astype(np.int32)
+
+def get_pooling_index(occupied_voxels,pool_size=2):
+	"""Active sites of the coarser grid after sparse pooling and the index of the coarse site of each active site
+
+		:param occupied_voxels: (i,j,k) index of each active site
+		:type occupied_voxels: numpy.array [n_sites*3] (required)
+
+		:param pool_size: pooling size, defaults to 2
+		:type pool_size: int
+
+		:returns: coarse active sites, index of the coarse site of each active site
+		:rtype: numpy.array [n_coarse_sites*3], numpy.array [n_sites]
+	"""
+	coarse_voxels,parent_index=np.unique(np.asarray(occupied_voxels,dtype=np.int64)//pool_size,axis=0,return_inverse=True)
+
+	return coarse_voxels,parent_index.reshape(-1).astype(np.int32)
+
+class SubmanifoldConv3D(Layer):
+	"""Submanifold sparse 3D convolution, the convolution is computed only at the active sites (occupied voxels) and only active neighbours contribute, the input and output are the features of the active sites [samples*n_sites*channels] so the compute and memory scale with the number of active sites instead of the voxel grid volume, the neighbour table is stored as a non-trainable weight
+
+		:param filters: Number of filters
+		:type filters: int (required)
+
+		:param n_sites: Number of active sites
+		:type n_sites: int (required)
+
+		:param kernel_volume: Number of kernel offsets (kernel_size**3)
+		:type kernel_volume: int (required)
+
+		:param neighbour_table: neighbour table (refer get_neighbour_table), defaults to None (weights to be loaded)
+		:type neighbour_table: numpy.array [n_sites*kernel_volume]
+
+		:param activation: Activation of the layer, defaults to None (linear)
+		:type activation: str
+	"""
+	def __init__(self,filters,n_sites,kernel_volume,neighbour_table=None,activation=None,**kwargs):
+
+		super(SubmanifoldConv3D,self).__init__(**kwargs)
+
+		self.filters=filters
+		self.n_sites=n_sites
+		self.kernel_volume=kernel_volume
+		self.initial_neighbour_table=neighbour_table
+		self.activation=activation
+		self.activation_function=tf.keras.activations.get(activation)
+
+	def build(self,input_shape):
+		input_channels=int(input_shape[-1])
+
+		table_initializer='zeros'
+		if(self.initial_neighbour_table is not None):
+			table_initializer=tf.keras.initializers.Constant(self.initial_neighbour_table)
+
+		self.neighbour_table=self.add_weight(name='neighbour_table',shape=(self.n_sites,self.kernel_volume),dtype=tf.int32,initializer=table_initializer,trainable=False)
+		self.kernel=self.add_weight(name='kernel',shape=(self.kernel_volume,input_channels,self.filters),initializer='glorot_uniform',trainable=True)
+		self.bias=self.add_weight(name='bias',shape=(self.filters,),initializer='zeros',trainable=True)
+
+		super(SubmanifoldConv3D,self).build(input_shape)
+
+	def call(self,inputs):
+		#Zero site appended for the inactive neighbours
+		padded_inputs=tf.pad(inputs,[[0,0],[0,1],[0,0]])
+
+		outputs=tf.zeros([tf.shape(inputs)[0],self.n_sites,self.filters],dtype=inputs.dtype)
+		for offset in range(self.kernel_volume):
+			neighbour_features=tf.gather(padded_inputs,self.neighbour_table[:,offset],axis=1)
+			outputs+=tf.tensordot(neighbour_features,self.kernel[offset],axes=1)
+
+		return self.activation_function(outputs+self.bias)
+
+	def compute_output_shape(self,input_shape):
+		return tf.TensorShape([input_shape[0],self.n_sites,self.filters])
+
+	def get_config(self):
+		config={
+			'filters':self.filters,
+			'n_sites':self.n_sites,
+			'kernel_volume':self.kernel_volume,
+			'activation':self.activation
+		}
+		base_config=super(SubmanifoldConv3D,self).get_config()
+
+		return dict(list(base_config.items())+list(config.items()))
+
+class SparsePool3D(Layer):
+	"""Sparse max pooling of the active site features to the active sites of a coarser grid (refer get_pooling_index), the index of the coarse site of each active site is stored as a non-trainable weight
+
+		:param n_coarse_sites: Number of active sites of the coarser grid
+		:type n_coarse_sites: int (required)
+
+		:param parent_index: index of the coarse site of each active site, defaults to None (weights to be loaded)
+		:type parent_index: numpy.array [n_sites]
+	"""
+	def __init__(self,n_coarse_sites,parent_index=None,**kwargs):
+
+		super(SparsePool3D,self).__init__(**kwargs)
+
+		self.n_coarse_sites=n_coarse_sites
+		self.initial_parent_index=parent_index
+
+	def build(self,input_shape):
+		index_initializer='zeros'
+		if(self.initial_parent_index is not None):
+			index_initializer=tf.keras.initializers.Constant(self.initial_parent_index)
+
+		self.parent_index=self.add_weight(name='parent_index',shape=(int(input_shape[1]),),dtype=tf.int32,initializer=index_initializer,trainable=False)
+
+		super(SparsePool3D,self).build(input_shape)
+
+	def call(self,inputs):
+		#Segment max over the sites axis
+		site_features=tf.transpose(inputs,[1,0,2])
+		pooled_features=tf.math.unsorted_segment_max(site_features,self.parent_index,self.n_coarse_sites)
+
+		return tf.transpose(pooled_features,[1,0,2])
+
+	def compute_output_shape(self,input_shape):
+		return tf.TensorShape([input_shape[0],self.n_coarse_sites,input_shape[-1]])
+
+	def get_config(self):
+		config={
+			'n_coarse_sites':self.n_coarse_sites
+		}
+		base_config=super(SparsePool3D,self).get_config()
+
+		return dict(list(base_config.items())+list(config.items()))
+
+def get_custom_objects():
+	"""Custom objects to be passed to load_model for models containing the custom layers
+
+		:returns: dictionary of custom layer names and classes
+		:rtype: dict
+	"""
+	return {'RecomputeResBlock':RecomputeResBlock,'VoxelGather':VoxelGather,'PCAReconstruct':PCAReconstruct,'SubmanifoldConv3D':SubmanifoldConv3D,'SparsePool3D':SparsePool3D}
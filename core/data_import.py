@@ -47,7 +47,26 @@ class GetTrainData():
 
 		return voxel_point_index
 
-	#@cuda.jit	
+	def scale_mapping_index(self,point_index,voxel_dim,target_voxel_dim):
+		"""scale_mapping_index is used to obtain the mapping index at a different voxel resolution when no mapping file is available for that resolution, the mapping is exact for coarser resolutions (voxel_dim divisible by target_voxel_dim) and approximate for finer resolutions (refer utilities/voxel_construction.py to construct an exact mapping file)
+
+			:param point_index: mapping index at voxel_dim
+			:type point_index: numpy.array [point_dim*3] (required)
+
+			:param voxel_dim: voxel dimension of the mapping index
+			:type voxel_dim: int (required)
+
+			:param target_voxel_dim: required voxel dimension
+			:type target_voxel_dim: int (required)
+
+			:returns: mapping index (i,j,k) for each node at target_voxel_dim
+			:rtype: numpy.array [point_dim*3]
+		"""
+		scaled_index=np.floor(np.asarray(point_index,dtype=float)*target_voxel_dim/voxel_dim)
+
+		return np.clip(scaled_index,0,target_voxel_dim-1).astype(int)
+
+	#@cuda.jit
 	def data_convert_voxel_mc(self,vrm_system,dataset,point_index,kcc_data=pd.DataFrame({'A' : []})):
 		"""data converts the node deviations to voxelized output 
 
@@ -169,6 +188,214 @@ class GetTrainData():
 		
 		return input_conv_data, kcc_dump,kpi_dump
 
+	def get_occupied_voxels(self,point_index):
+		"""get_occupied_voxels is used to get the voxels occupied by at least one node of the part, used for sparse shape error outputs
+
+			:param point_index: mapping index
+			:type point_index: numpy.array [nodes*3] (required)
+
+			:returns: occupied_voxels, (i,j,k) index of each occupied voxel
+			:rtype: numpy.array [n_voxels*3]
+
+			:returns: node_voxel_index, index of the occupied voxel of each node
+			:rtype: numpy.array [nodes]
+		"""
+		voxel_index=np.asarray(point_index,dtype=float).astype(int)
+		occupied_voxels,node_voxel_index=np.unique(voxel_index,axis=0,return_inverse=True)
+
+		print("Number of occupied voxels: ",len(occupied_voxels))
+
+		return occupied_voxels,node_voxel_index.reshape(-1)
+
+	def data_convert_sparse_mc(self,vrm_system,dataset,point_index,kcc_data=pd.DataFrame({'A' : []})):
+		"""data converts the node deviations to sparse voxelized output, only the voxels occupied by the nodes are stored (same ordering as get_occupied_voxels), the deviation of each voxel is the maximum absolute deviation of the nodes mapped to it (same as data_convert_voxel_mc)
+
+			:param vrm_system: Object of the VRM System class
+			:type file_name: object(VRM_System class) (required)
+
+			:param dataset: list of concatenated dataset consisting of x,y,z deviations for each node
+			:type dataset: list (required)
+
+			:param point_index: mapping index
+			:type point_index: numpy.array [nodes*3] (required)
+
+			:param kcc_data: Process parameter data
+			:type kcc_data: numpy.array [samples*kcc_dim] (required)
+
+			:returns: sparse_conv_data, voxelized data at the occupied voxels
+			:rtype: numpy.array [samples*n_voxels*3]
+
+			:returns: kcc_data_dump, process/parameter data for model output
+			:rtype: numpy.array [samples*kcc_dim]
+
+			:returns: kpi_data_dump, convergent ids of the samples
+			:rtype: list
+		"""
+		point_dim=vrm_system.point_dim
+		noise_level=vrm_system.noise_level
+		noise_type=vrm_system.noise_type
+
+		occupied_voxels,node_voxel_index=self.get_occupied_voxels(point_index[0:point_dim,:])
+
+		run_length=len(dataset[0])
+		sparse_conv_data=np.zeros((run_length,len(occupied_voxels),len(dataset)))
+
+		if isinstance(kcc_data,pd.DataFrame):
+			kcc_dump=kcc_data.values
+		else:
+			kcc_dump=kcc_data
+
+		convergence_flag=dataset[0].iloc[:, point_dim].values
+		convergent_id=list(np.where(convergence_flag==1)[0])
+		print("Number of not convergent solutions: ",int(np.sum(convergence_flag==0)))
+
+		for channel,channel_data in enumerate(dataset):
+			dev_data=channel_data.iloc[:, 0:point_dim].values
+
+			if(noise_type=='uniform'):
+				measurement_noise=np.random.uniform(low=-noise_level, high=noise_level, size=dev_data.shape)
+			else:
+				measurement_noise=np.random.normal(0,noise_level, size=dev_data.shape)
+
+			dev_data=dev_data+measurement_noise
+
+			sparse_conv_data[:,:,channel]=self.node_to_sparse(dev_data,node_voxel_index,len(occupied_voxels))
+
+		print("Convergent IDs ")
+		print(len(convergent_id))
+
+		return sparse_conv_data, kcc_dump,convergent_id
+
+	def node_to_sparse(self,dev_data,node_voxel_index,n_voxels):
+		"""node_to_sparse reduces the deviations of the nodes to the occupied voxels, the deviation of each voxel is the maximum absolute deviation of the nodes mapped to it
+
+			:param dev_data: deviations of a single channel for each node
+			:type dev_data: numpy.array [samples*nodes] (required)
+
+			:param node_voxel_index: index of the occupied voxel of each node (refer get_occupied_voxels)
+			:type node_voxel_index: numpy.array [nodes] (required)
+
+			:param n_voxels: number of occupied voxels
+			:type n_voxels: int (required)
+
+			:returns: sparse_data, deviations at the occupied voxels
+			:rtype: numpy.array [samples*n_voxels]
+		"""
+		sample_index=np.arange(len(dev_data))[:,None]
+		sparse_data=np.zeros((len(dev_data),n_voxels))
+
+		#Nodes are assigned in ascending order of absolute deviation, the last assignment (maximum absolute deviation) is retained for each voxel
+		node_order=np.argsort(np.abs(dev_data),axis=1,kind='stable')
+		sparse_data[sample_index,node_voxel_index[node_order]]=dev_data[sample_index,node_order]
+
+		return sparse_data
+
+	def node_to_voxel(self,node_data,point_index,voxel_dim):
+		"""node_to_voxel converts node deviations (for example reconstructed from the shape error basis) to the voxel grid
+
+			:param node_data: node deviations
+			:type node_data: numpy.array [samples*nodes*channels] (required)
+
+			:param point_index: mapping index
+			:type point_index: numpy.array [nodes*3] (required)
+
+			:param voxel_dim: The voxel dimension of the grid
+			:type voxel_dim: int (required)
+
+			:returns: voxel_data, voxelized data
+			:rtype: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*channels]
+		"""
+		occupied_voxels,node_voxel_index=self.get_occupied_voxels(point_index[0:node_data.shape[1],:])
+
+		sparse_data=np.zeros((node_data.shape[0],len(occupied_voxels),node_data.shape[-1]))
+		for channel in range(node_data.shape[-1]):
+			sparse_data[:,:,channel]=self.node_to_sparse(node_data[:,:,channel],node_voxel_index,len(occupied_voxels))
+
+		return self.sparse_to_voxel(sparse_data,occupied_voxels,voxel_dim)
+
+	def sparse_to_voxel(self,sparse_data,occupied_voxels,voxel_dim):
+		"""sparse_to_voxel converts sparse voxelized data (or sparse model outputs) to the complete voxel grid
+
+			:param sparse_data: sparse voxelized data
+			:type sparse_data: numpy.array [samples*n_voxels*channels] (required)
+
+			:param occupied_voxels: (i,j,k) index of each occupied voxel
+			:type occupied_voxels: numpy.array [n_voxels*3] (required)
+
+			:param voxel_dim: The voxel dimension of the grid
+			:type voxel_dim: int (required)
+
+			:returns: voxel_data, voxelized data
+			:rtype: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*channels]
+		"""
+		sparse_data=np.asarray(sparse_data)
+		voxel_data=np.zeros((sparse_data.shape[0],voxel_dim,voxel_dim,voxel_dim,sparse_data.shape[-1]),dtype=sparse_data.dtype)
+		voxel_data[:,occupied_voxels[:,0],occupied_voxels[:,1],occupied_voxels[:,2],:]=sparse_data
+
+		return voxel_data
+
+	def data_convert_point_mc(self,vrm_system,dataset,nominal_cop,kcc_data=pd.DataFrame({'A' : []})):
+		"""data converts the node deviations to point cloud input (no voxelization), the nominal coordinates of each node are normalized and used as positional features along with the x,y,z deviations
+
+			:param vrm_system: Object of the VRM System class
+			:type file_name: object(VRM_System class) (required)
+
+			:param dataset: list of concatenated dataset consisting of x,y,z deviations for each node
+			:type dataset: list (required)
+
+			:param nominal_cop: nominal cloud of point of the part (refer assembly_system.VRMSimulationModel.get_nominal_cop)
+			:type nominal_cop: numpy.array [nodes*3] (required)
+
+			:param kcc_data: Process parameter data
+			:type kcc_data: numpy.array [samples*kcc_dim] (required)
+
+			:returns: point_data, normalized nominal coordinates and deviations of each node
+			:rtype: numpy.array [samples*nodes*6]
+
+			:returns: kcc_data_dump, process/parameter data for model output
+			:rtype: numpy.array [samples*kcc_dim]
+
+			:returns: kpi_data_dump, convergent ids of the samples
+			:rtype: list
+		"""
+		point_dim=vrm_system.point_dim
+		noise_level=vrm_system.noise_level
+		noise_type=vrm_system.noise_type
+
+		run_length=len(dataset[0])
+		
+		#Nominal coordinates centered and scaled to a unit cube
+		nominal_cop=np.asarray(nominal_cop[0:point_dim,:],dtype=float)
+		nominal_cop=nominal_cop-nominal_cop.mean(axis=0)
+		nominal_cop=nominal_cop/np.max(np.abs(nominal_cop))
+
+		point_data=np.zeros((run_length,point_dim,2*len(dataset)),dtype=np.float32)
+		point_data[:,:,0:3]=nominal_cop
+
+		if isinstance(kcc_data,pd.DataFrame):
+			kcc_dump=kcc_data.values
+		else:
+			kcc_dump=kcc_data
+
+		convergence_flag=dataset[0].iloc[:, point_dim].values
+		convergent_id=list(np.where(convergence_flag==1)[0])
+		print("Number of not convergent solutions: ",int(np.sum(convergence_flag==0)))
+
+		for channel,channel_data in enumerate(dataset):
+			dev_data=channel_data.iloc[:, 0:point_dim].values
+
+			if(noise_type=='uniform'):
+				measurement_noise=np.random.uniform(low=-noise_level, high=noise_level, size=dev_data.shape)
+			else:
+				measurement_noise=np.random.normal(0,noise_level, size=dev_data.shape)
+
+			point_data[:,:,3+channel]=dev_data+measurement_noise
+
+		print("Convergent IDs ")
+		print(len(convergent_id))
+
+		return point_data, kcc_dump,convergent_id
+
 	def data_convert_voxel_sc(self,vrm_system,dataset,point_index):
 			
 			def get_dev_data(y1,y2):   
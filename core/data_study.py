@@ -49,6 +49,8 @@ from metrics_eval import MetricsEval
 from model_train import TrainModel
 from model_deployment import DeployModel
 from metrics_eval import MetricsEval
+from run_executor import RunExecutor
+from isolated_runs import data_study_run
 #from tl_core import TransferLearning
 	
 if __name__ == '__main__':
@@ -106,6 +108,8 @@ if __name__ == '__main__':
 	conv_layer_m=cftrain.transfer_learning['conv_layer_m']
 	dense_layer_m=cftrain.transfer_learning['dense_layer_m']
 
+	isolate_runs=cftrain.run_executor_params['isolate_runs']
+
 	print('Creating file Structure....')
 	folder_name=part_type
 	train_path='../trained_models/'+part_type
@@ -176,7 +180,14 @@ if __name__ == '__main__':
 
 	train_dim=min_train_samples
 
-
+	#Each training run is executed in a fresh worker process, the datasets are saved once and memory mapped by the workers
+	if(isolate_runs==1):
+		run_executor=RunExecutor(train_path+'/shared_data')
+		input_conv_path=run_executor.share_dataset('input_conv_data',input_conv_data)
+		kcc_path=run_executor.share_dataset('kcc_subset_dump',kcc_subset_dump)
+		input_conv_test_path=run_executor.share_dataset('input_conv_data_test',input_conv_data_test)
+		kcc_test_path=run_executor.share_dataset('kcc_subset_dump_test',kcc_subset_dump_test)
+		del input_conv_data,input_conv_data_test
 
 	for i in tqdm(range(no_of_splits)):
 		
@@ -185,6 +196,43 @@ if __name__ == '__main__':
 		if(train_dim>max_dim):
 			train_dim=max_dim
 		
+		if(isolate_runs==1):
+			print("Conducting data study in an isolated worker process on :",train_dim, " samples")
+			run_params={
+				'run_id':run_id,
+				'train_dim':train_dim,
+				'input_conv_path':input_conv_path,
+				'kcc_path':kcc_path,
+				'input_conv_test_path':input_conv_test_path,
+				'kcc_test_path':kcc_test_path,
+				'model_params':{'model_type':model_type,'output_dimension':output_dimension,'optimizer':optimizer,'loss_func':loss_func,
+					'regularizer_coeff':regularizer_coeff,'output_type':output_type,'voxel_dim':voxel_dim,'voxel_channels':voxel_channels,
+					'tl_flag':tl_flag,'tl_type':tl_type,'tl_base':tl_base,'tl_app':tl_app,'conv_layer_m':conv_layer_m,'dense_layer_m':dense_layer_m},
+				'train_params':{'batch_size':batch_size,'epocs':epocs,'split_ratio':split_ratio,'activate_tensorboard':activate_tensorboard},
+				'model_path':model_path,
+				'logs_path':logs_path,
+				'plots_path':plots_path,
+				'deployment_path':deployment_path
+			}
+			run_result=run_executor.run(data_study_run,run_params)
+			eval_metrics=run_result['eval_metrics']
+			eval_metrics_test=run_result['eval_metrics_test']
+
+			datastudy_output[i,0]=train_dim
+			datastudy_output[i,1:assembly_kccs+1]=eval_metrics["Mean Absolute Error"]
+			datastudy_output[i,assembly_kccs+1:(2*assembly_kccs)+1]=eval_metrics["Mean Squared Error"]
+			datastudy_output[i,(2*assembly_kccs)+1:(3*assembly_kccs)+1]=eval_metrics["Root Mean Squared Error"]
+			datastudy_output[i,(3*assembly_kccs)+1:(4*assembly_kccs)+1]=eval_metrics["R Squared"]
+
+			datastudy_output_test[i,0]=train_dim
+			datastudy_output_test[i,1:assembly_kccs+1]=eval_metrics_test["Mean Absolute Error"]
+			datastudy_output_test[i,assembly_kccs+1:(2*assembly_kccs)+1]=eval_metrics_test["Mean Squared Error"]
+			datastudy_output_test[i,(2*assembly_kccs)+1:(3*assembly_kccs)+1]=eval_metrics_test["Root Mean Squared Error"]
+			datastudy_output_test[i,(3*assembly_kccs)+1:(4*assembly_kccs)+1]=eval_metrics_test["R Squared"]
+
+			train_dim=train_dim+train_increment
+			continue
+
 		print('Building 3D CNN model')
 
 		
@@ -0,0 +1,383 @@
+""" The distillation file trains a compact deterministic student model (3D CNN of the size of core_model.DLModel.cnn_model_3d) to match the process parameter predictions of the Bayesian U-Net teacher (refer core_model_bayes.Bayes_DLModel.bayes_unet_model_3d_hybrid), the student predicts the teacher mean, epistemic standard deviation and aleatoric standard deviation in a single forward pass instead of multiple stochastic forward passes of the teacher
+The teacher outputs are computed once for the train samples and the augmented (re-sampled measurement noise) train samples and cached within the model folder, the cache is keyed on the teacher weights file
+The main function runs the distillation and compares the accuracy, uncertainty and throughput of the student and teacher
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+
+class DistillModel:
+	"""Distill Model Class, computes the teacher targets and builds and trains the student model
+
+		:param output_dimension: Number of process parameters (regression and categorical KCCs)
+		:type output_dimension: int (required)
+
+		:param categorical_kccs: Number of categorical KCCs, the categorical KCCs are the last KCCs (refer hybrid_utils.split_kcc)
+		:type categorical_kccs: int (required)
+
+		:param regularizer_coeff: The L2 norm regularization coefficient value used in the fully connected layers of the student
+		:type regularizer_coeff: float (required)
+
+		:param std_epsilon: Small value added to the standard deviations before the log transform, defaults to 1e-6
+		:type std_epsilon: float
+	"""
+	def __init__(self,output_dimension,categorical_kccs,regularizer_coeff,std_epsilon=1e-6):
+
+		self.output_dimension=output_dimension
+		self.categorical_kccs=categorical_kccs
+		self.reg_kccs=output_dimension-categorical_kccs
+		self.regularizer_coeff=regularizer_coeff
+		self.std_epsilon=std_epsilon
+
+	def get_teacher_targets(self,teacher_model,X_in,epistemic_samples=20,batch_size=32,cache_path=None,cache_key=None):
+		"""Compute the teacher mean and standard deviations of the process parameters using epistemic_samples stochastic forward passes of each batch, the targets are loaded from cache_path if it exists and was computed with the same cache_key
+
+			:param teacher_model: Bayesian U-Net model with the regression outputs as a distribution (refer core_model_bayes.Bayes_DLModel.bayes_unet_model_3d_hybrid)
+			:type teacher_model: keras.models (required)
+
+			:param X_in: Voxelized input samples
+			:type X_in: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param epistemic_samples: Number of stochastic forward passes, defaults to 20
+			:type epistemic_samples: int
+
+			:param cache_path: .npz file in which the targets are cached, defaults to None (no caching)
+			:type cache_path: str
+
+			:param cache_key: key of the teacher weights stored with the cached targets (refer get_weights_key), the cache is recomputed if the key differs, defaults to None
+			:type cache_key: str
+
+			:returns: dictionary of regression mean, epistemic std, aleatoric std and classification mean, std
+			:rtype: dict
+		"""
+		target_names=['reg_mean','reg_epistemic_std','reg_aleatoric_std','cla_mean','cla_std']
+
+		if(cache_path is not None and os.path.exists(cache_path)):
+			cached_targets=np.load(cache_path)
+			cached_key=str(cached_targets['cache_key']) if 'cache_key' in cached_targets.files else None
+
+			if(len(cached_targets['reg_mean'])==len(X_in) and cached_key==str(cache_key)):
+				print('Teacher targets loaded from: ',cache_path)
+				return {name:cached_targets[name] for name in target_names}
+
+		teacher_targets={name:[] for name in target_names}
+
+		for start_index in range(0,len(X_in),batch_size):
+			input_batch=X_in[start_index:start_index+batch_size]
+
+			reg_mean_samples=[]
+			reg_aleatoric_samples=[]
+			cla_samples=[]
+
+			#Each call of the Flipout layers samples new weight perturbations
+			for i in range(epistemic_samples):
+				model_outputs=teacher_model(input_batch)
+				reg_mean_samples.append(np.array(model_outputs[0].mean()))
+				reg_aleatoric_samples.append(np.array(model_outputs[0].stddev()))
+				cla_samples.append(np.array(model_outputs[1]))
+
+			reg_mean_samples=np.stack(reg_mean_samples)
+			cla_samples=np.stack(cla_samples)
+
+			teacher_targets['reg_mean'].append(reg_mean_samples.mean(axis=0))
+			teacher_targets['reg_epistemic_std'].append(reg_mean_samples.std(axis=0,ddof=1))
+			teacher_targets['reg_aleatoric_std'].append(np.stack(reg_aleatoric_samples).mean(axis=0))
+			teacher_targets['cla_mean'].append(cla_samples.mean(axis=0))
+			teacher_targets['cla_std'].append(cla_samples.std(axis=0,ddof=1))
+
+		teacher_targets={name:np.concatenate(values) for name,values in teacher_targets.items()}
+
+		if(cache_path is not None):
+			np.savez(cache_path,cache_key=str(cache_key),**teacher_targets)
+			print('Teacher targets cached at: ',cache_path)
+
+		return teacher_targets
+
+	def get_weights_key(self,weights_path):
+		"""Key of a weights file (path and modification time) used to invalidate the cached teacher targets when the teacher is retrained, the index file is used for TensorFlow checkpoints
+
+			:param weights_path: Path to the weights file or checkpoint prefix
+			:type weights_path: str (required)
+
+			:returns: weights key
+			:rtype: str
+		"""
+		if(not os.path.exists(weights_path)):
+			weights_path=weights_path+'.index'
+
+		return os.path.abspath(weights_path)+'_'+str(os.path.getmtime(weights_path))
+
+	def get_student_targets(self,teacher_targets):
+		"""Convert the teacher targets to the student outputs, the standard deviations are learnt as log standard deviations as they span several orders of magnitude
+
+			:returns: list of student targets in the order of the student outputs
+			:rtype: list
+		"""
+		return [
+			teacher_targets['reg_mean'],
+			np.log(teacher_targets['reg_epistemic_std']+self.std_epsilon),
+			np.log(teacher_targets['reg_aleatoric_std']+self.std_epsilon),
+			teacher_targets['cla_mean'],
+			np.log(teacher_targets['cla_std']+self.std_epsilon)
+		]
+
+	def student_model(self,voxel_dim,deviation_channels,optimizer='adam',std_loss_weight=0.5):
+		"""Build the student model, the 3D CNN trunk of core_model.DLModel.cnn_model_3d is shared by the mean and log standard deviation heads
+
+			:param voxel_dim: The voxel dimension of the input
+			:type voxel_dim: int (required)
+
+			:param deviation_channels: The number of voxel channels in the input
+			:type deviation_channels: int (required)
+
+			:param std_loss_weight: Loss weight of the log standard deviation heads relative to the mean heads, defaults to 0.5
+			:type std_loss_weight: float
+		"""
+		from tensorflow.keras.layers import Conv3D, Flatten, Dense, Input
+		from tensorflow.keras.models import Model
+		from tensorflow.keras import regularizers
+
+		inputs=Input((voxel_dim,voxel_dim,voxel_dim,deviation_channels))
+		x=Conv3D(32, kernel_size=(5,5,5),strides=(2,2,2),activation='relu')(inputs)
+		x=Conv3D(32, kernel_size=(4,4,4),strides=(2,2,2),activation='relu')(x)
+		x=Conv3D(32, kernel_size=(3,3,3),strides=(1,1,1),activation='relu')(x)
+		x=Flatten()(x)
+		x=Dense(64,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+		x=Dense(64,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+
+		output_list=[]
+		output_list.append(Dense(self.reg_kccs, activation='linear', name='regression_outputs')(x))
+		output_list.append(Dense(self.reg_kccs, activation='linear', name='regression_epistemic_log_std')(x))
+		output_list.append(Dense(self.reg_kccs, activation='linear', name='regression_aleatoric_log_std')(x))
+		output_list.append(Dense(self.categorical_kccs, activation='sigmoid', name='classification_outputs')(x))
+		output_list.append(Dense(self.categorical_kccs, activation='linear', name='classification_log_std')(x))
+
+		#Classification mean matches the teacher probabilities (soft targets)
+		overall_loss_dict={
+		"regression_outputs":'mse',
+		"regression_epistemic_log_std":'mse',
+		"regression_aleatoric_log_std":'mse',
+		"classification_outputs":'binary_crossentropy',
+		"classification_log_std":'mse'
+		}
+
+		overall_loss_weights={
+		"regression_outputs":1.0,
+		"regression_epistemic_log_std":std_loss_weight,
+		"regression_aleatoric_log_std":std_loss_weight,
+		"classification_outputs":1.0,
+		"classification_log_std":std_loss_weight
+		}
+
+		model=Model(inputs, outputs=output_list, name='Distilled_Student_Model')
+		model.compile(optimizer=optimizer,loss=overall_loss_dict,loss_weights=overall_loss_weights,metrics={"regression_outputs":['mae'],"classification_outputs":['mae']})
+
+		print("Student model successfully compiled")
+		return model
+
+	def train_student(self,model,X_in,teacher_targets,X_in_test,test_teacher_targets,model_path,batch_size,epochs):
+		"""Train the student on the teacher targets, the best student on the test teacher targets is saved as distilled_student.h5
+
+			:returns: trained student model, training history
+			:rtype: keras.models, dict
+		"""
+		from tensorflow.keras.callbacks import ModelCheckpoint
+		from tensorflow.keras.models import load_model
+
+		model_file_path=model_path+'/distilled_student.h5'
+		checkpointer=ModelCheckpoint(model_file_path, verbose=1, save_best_only=True)
+
+		history=model.fit(x=X_in,y=self.get_student_targets(teacher_targets),validation_data=(X_in_test,self.get_student_targets(test_teacher_targets)),epochs=epochs,batch_size=batch_size,callbacks=[checkpointer])
+
+		trained_model=load_model(model_file_path)
+
+		return trained_model,history.history
+
+	def student_predict(self,model,X_in,batch_size=32):
+		"""Single pass prediction of the student, the outputs are in the format of the teacher deployment (refer bayes_unet_hybrid_deploy.Unet_DeployModel.bayes_unet_run_model) for the process parameters
+
+			:returns: predicted mean [regression,classification], epistemic std [regression,classification], aleatoric std [regression]
+			:rtype: list,list,list
+		"""
+		model_outputs=model.predict(X_in,batch_size=batch_size)
+
+		pred_vector=[model_outputs[0],model_outputs[3]]
+		epistemic_vector=[np.exp(model_outputs[1])-self.std_epsilon,np.exp(model_outputs[4])-self.std_epsilon]
+		aleatoric_vector=[np.exp(model_outputs[2])-self.std_epsilon]
+
+		return pred_vector,epistemic_vector,aleatoric_vector
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	import hybrid_utils as hy_util
+
+	from assembly_system import VRMSimulationModel
+	from data_import import GetTrainData
+	from core_model_bayes import Bayes_DLModel
+	from metrics_eval import MetricsEval
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	part_name=config.assembly_system['part_name']
+	assembly_type=config.assembly_system['assembly_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	assembly_kpis=config.assembly_system['assembly_kpis']
+	voxel_dim=config.assembly_system['voxel_dim']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	mapping_index=config.assembly_system['mapping_index']
+	aritifical_noise=config.assembly_system['aritifical_noise']
+	data_folder=config.assembly_system['data_folder']
+	kcc_folder=config.assembly_system['kcc_folder']
+	kcc_files=config.assembly_system['kcc_files']
+	test_kcc_files=config.assembly_system['test_kcc_files']
+	categorical_kccs=config.assembly_system['categorical_kccs']
+
+	print('Parsing from Training Config File')
+
+	model_type=cftrain.model_parameters['model_type']
+	output_type=cftrain.model_parameters['output_type']
+	batch_size=cftrain.model_parameters['batch_size']
+	optimizer=cftrain.model_parameters['optimizer']
+	loss_func=cftrain.model_parameters['loss_func']
+	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
+
+	output_heads=cftrain.encode_decode_params['output_heads']
+	model_depth=cftrain.encode_decode_params['model_depth']
+	inital_filter_dim=cftrain.encode_decode_params['inital_filter_dim']
+
+	epistemic_samples=cftrain.distillation_params['epistemic_samples']
+	augmentation_copies=cftrain.distillation_params['augmentation_copies']
+	augmentation_noise=cftrain.distillation_params['augmentation_noise']
+	student_epochs=cftrain.distillation_params['student_epochs']
+	std_loss_weight=cftrain.distillation_params['std_loss_weight']
+
+	print('Creating file Structure....')
+
+	train_path='../trained_models/'+part_type+'/unet_model'
+	model_path=train_path+'/model'
+	teacher_path=model_path+'/unet_oser_0'
+
+	distillation_path=train_path+'/distillation'
+	pathlib.Path(distillation_path).mkdir(parents=True, exist_ok=True)
+
+	logs_path=distillation_path+'/logs'
+	pathlib.Path(logs_path).mkdir(parents=True, exist_ok=True)
+
+	print('Initializing the Assembly System....')
+
+	vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
+	get_data=GetTrainData()
+	point_index=get_data.load_mapping_index(mapping_index)
+
+	print('Importing and Preprocessing Cloud-of-Point Data')
+
+	def get_input_data(file_names_x,file_names_y,file_names_z):
+		dataset=[]
+		dataset.append(get_data.data_import(file_names_x,data_folder))
+		dataset.append(get_data.data_import(file_names_y,data_folder))
+		dataset.append(get_data.data_import(file_names_z,data_folder))
+		return dataset
+
+	input_dataset=get_input_data(config.encode_decode_construct['input_data_files_x'],config.encode_decode_construct['input_data_files_y'],config.encode_decode_construct['input_data_files_z'])
+	test_input_dataset=get_input_data(config.encode_decode_construct['input_test_data_files_x'],config.encode_decode_construct['input_test_data_files_y'],config.encode_decode_construct['input_test_data_files_z'])
+
+	kcc_dataset=get_data.data_import(kcc_files,kcc_folder)
+	test_kcc_dataset=get_data.data_import(test_kcc_files,kcc_folder)
+
+	input_conv_data,kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,input_dataset,point_index,kcc_dataset)
+	test_input_conv_data,test_kcc_subset_dump,test_kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,test_input_dataset,point_index,test_kcc_dataset)
+
+	#Augmentation set, the train samples voxelized with re-sampled measurement noise
+	augmentation_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,augmentation_noise)
+
+	augmented_conv_data=[input_conv_data]
+	for i in range(augmentation_copies):
+		augmented_data,dump,dump_kpi=get_data.data_convert_voxel_mc(augmentation_system,input_dataset,point_index,kcc_dataset)
+		augmented_conv_data.append(augmented_data)
+
+	augmented_conv_data=np.concatenate(augmented_conv_data,axis=0)
+
+	del input_dataset
+	del test_input_dataset
+
+	kcc_regression_test,kcc_classification_test=hy_util.split_kcc(test_kcc_subset_dump)
+
+	print('Building Bayesian U-Net teacher')
+
+	dl_model=Bayes_DLModel(model_type,assembly_kccs,optimizer,loss_func,regularizer_coeff,output_type)
+	teacher_model=dl_model.bayes_unet_model_3d_hybrid(inital_filter_dim,model_depth,categorical_kccs,voxel_dim,voxel_channels,output_heads)
+	teacher_model.load_weights(teacher_path)
+
+	distill_model=DistillModel(assembly_kccs,categorical_kccs,regularizer_coeff)
+
+	print('Computing Teacher Targets')
+
+	teacher_key=distill_model.get_weights_key(teacher_path)
+	teacher_targets=distill_model.get_teacher_targets(teacher_model,augmented_conv_data,epistemic_samples,batch_size,cache_path=distillation_path+'/teacher_targets_train_'+str(augmentation_copies)+'.npz',cache_key=teacher_key)
+
+	#The test targets are not cached so that the teacher throughput is timed on the forward passes, first call includes graph construction
+	teacher_model(test_input_conv_data[0:batch_size])
+
+	start_time=time.time()
+	test_teacher_targets=distill_model.get_teacher_targets(teacher_model,test_input_conv_data,epistemic_samples,batch_size)
+	teacher_inference_time=time.time()-start_time
+
+	print('Training Student Model')
+
+	student=distill_model.student_model(voxel_dim,voxel_channels,optimizer,std_loss_weight)
+	student,history=distill_model.train_student(student,augmented_conv_data,teacher_targets,test_input_conv_data,test_teacher_targets,distillation_path,batch_size,student_epochs)
+
+	#First call includes graph construction
+	student.predict(test_input_conv_data[0:batch_size],batch_size=batch_size)
+
+	start_time=time.time()
+	pred_vector,epistemic_vector,aleatoric_vector=distill_model.student_predict(student,test_input_conv_data,batch_size)
+	student_inference_time=time.time()-start_time
+
+	print("Computing Metrics..")
+
+	metrics_eval=MetricsEval()
+
+	eval_metrics_reg,accuracy_metrics_df_reg=metrics_eval.metrics_eval_base(pred_vector[0],kcc_regression_test,logs_path)
+	teacher_eval_metrics_reg,teacher_accuracy_metrics_df_reg=metrics_eval.metrics_eval_base(test_teacher_targets['reg_mean'],kcc_regression_test,logs_path)
+
+	accuracy_metrics_df_reg.to_csv(logs_path+'/metrics_test_regression_student.csv')
+	teacher_accuracy_metrics_df_reg.to_csv(logs_path+'/metrics_test_regression_teacher.csv')
+
+	comparison_df=pd.DataFrame({
+		'Student':[accuracy_metrics_df_reg['Mean Absolute Error'].mean(),np.mean(epistemic_vector[0]),np.mean(aleatoric_vector[0]),np.mean(np.abs(pred_vector[1]-kcc_classification_test)),len(test_input_conv_data)/student_inference_time,student.count_params()],
+		'Teacher':[teacher_accuracy_metrics_df_reg['Mean Absolute Error'].mean(),np.mean(test_teacher_targets['reg_epistemic_std']),np.mean(test_teacher_targets['reg_aleatoric_std']),np.mean(np.abs(test_teacher_targets['cla_mean']-kcc_classification_test)),len(test_input_conv_data)/teacher_inference_time,teacher_model.count_params()]
+		},index=['regression_mae','regression_epistemic_std','regression_aleatoric_std','classification_mae','samples_per_second','parameters'])
+
+	#Agreement of the student with the teacher uncertainty
+	comparison_df.loc['epistemic_std_mae_to_teacher']=[np.mean(np.abs(epistemic_vector[0]-test_teacher_targets['reg_epistemic_std'])),np.nan]
+	comparison_df.to_csv(logs_path+'/student_vs_teacher_comparison.csv')
+
+	np.savetxt((logs_path+"/student_predicted_reg.csv"), pred_vector[0], delimiter=",")
+	np.savetxt((logs_path+"/student_pred_std_reg.csv"), epistemic_vector[0], delimiter=",")
+	np.savetxt((logs_path+"/student_pred_aleatoric_std_reg.csv"), aleatoric_vector[0], delimiter=",")
+
+	print("Student vs Teacher Comparison")
+	print(comparison_df)
+
+	print('Distillation Completed Successfully')
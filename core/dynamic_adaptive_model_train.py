@@ -36,9 +36,6 @@ from tqdm import tqdm
 
 import tensorflow as tf
 import tensorflow_probability as tfp
-A = tf.constant([[3, 2], [5, 2]])
-
-print('Dummy TensorFlow initialization to load Cudnn Library: ', tf.eye(2,2))
 
 import matlab.engine
 from pyDOE import lhs
@@ -48,6 +45,11 @@ from scipy.stats import uniform,norm
 import assembly_config as config
 import model_config as cftrain
 
+#The GPU is initialized within the worker processes when the training runs are isolated
+if(cftrain.run_executor_params['isolate_runs']==0):
+	A = tf.constant([[3, 2], [5, 2]])
+	print('Dummy TensorFlow initialization to load Cudnn Library: ', tf.eye(2,2))
+
 #Importing required modules from the package
 from measurement_system import HexagonWlsScanner
 from assembly_system import VRMSimulationModel
@@ -60,6 +62,10 @@ import sampling_config as sampling_config
 
 from metrics_eval import MetricsEval
 from uncertainity_sampling import UncertainitySampling
+from run_state import RunStateManifest, TrainingCheckpoint, get_config_hash
+from run_executor import RunExecutor
+from replay_buffer import ReservoirReplay, get_incremental_epochs
+from isolated_runs import adaptive_run
 #from tl_core import TransferLearning
 
 
@@ -114,6 +120,21 @@ if __name__ == '__main__':
 	max_run_length=cftrain.cae_sim_params['max_run_length']
 	case_study=part_type
 
+	resume_flag=cftrain.checkpoint_params['resume_flag']
+	checkpoint_freq=cftrain.checkpoint_params['checkpoint_freq']
+	max_to_keep=cftrain.checkpoint_params['max_to_keep']
+
+	isolate_runs=cftrain.run_executor_params['isolate_runs']
+
+	incremental=cftrain.incremental_params['incremental']
+	replay_capacity=cftrain.incremental_params['replay_capacity']
+	replay_ratio=cftrain.incremental_params['replay_ratio']
+	incremental_steps=cftrain.incremental_params['incremental_steps']
+
+	mc_chunk_size=cftrain.mc_inference_params['chunk_size']
+	pred_plots=cftrain.mc_inference_params['pred_plots']
+	plot_processes=cftrain.mc_inference_params['plot_processes']
+
 	print('Creating file Structure....')
 	folder_name=part_type
 	train_path='../trained_models/'+part_type+'/adaptive'
@@ -131,6 +152,17 @@ if __name__ == '__main__':
 	deployment_path=train_path+'/deploy'
 	pathlib.Path(deployment_path).mkdir(parents=True, exist_ok=True)
 
+	checkpoint_path=train_path+'/checkpoints'
+	pathlib.Path(checkpoint_path).mkdir(parents=True, exist_ok=True)
+
+	#Run state manifest to resume the adaptive training after an interruption, completed simulations, voxelized data and trained runs are not repeated
+	#The manifest is only resumed with the configuration it was recorded with
+	run_manifest=None
+	config_hash=None
+	if(resume_flag==1):
+		config_hash=get_config_hash([config.assembly_system,cftrain.model_parameters,cftrain.data_study_params,cftrain.transfer_learning,cftrain.cae_sim_params,cftrain.incremental_params])
+		run_manifest=RunStateManifest(train_path+'/run_state.json',config_hash=config_hash)
+
 	print('Initializing....')
 	measurement_system=HexagonWlsScanner(data_type,application,system_noise,part_type,data_format)
 	print('Measurement system initialized')
@@ -144,6 +176,10 @@ if __name__ == '__main__':
 	point_index=get_data.load_mapping_index(mapping_index)
 
 	print('Support systems initialized')
+
+	#Each training run is executed in a fresh worker process, datasets are shared as memory mapped files
+	if(isolate_runs==1):
+		run_executor=RunExecutor(train_path+'/shared_data')
 	
 	kcc_struct=kcc_config.kcc_struct
 	sampling_config=sampling_config.sampling_config
@@ -164,6 +200,10 @@ if __name__ == '__main__':
 	combined_conv_data_list=[]
 	combined_kcc_data_list=[]
 
+	#Incremental training, each run continues from the weights of the previous run and trains on the new samples and a replay of the previous samples
+	if(incremental==1):
+		replay_buffer=ReservoirReplay(replay_capacity)
+
 	eval_metrics_type= ["Mean Absolute Error","Mean Squared Error","Root Mean Squared Error","R Squared"]
 
 	datastudy_output_test=np.zeros((max_run_length,(assembly_kccs+1)*len(eval_metrics_type)+1))
@@ -179,7 +219,6 @@ if __name__ == '__main__':
 		#get uncertainty estimates
 		from cae_simulations import CAESimulations
 		cae_simulations=CAESimulations(simulation_platform,simulation_engine,max_run_length,case_study)
-		test_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['test_sample_dim'])
 
 		file_name=sampling_config['output_file_name_test']+".csv"
 		file_path=kcc_folder+'/'+file_name
@@ -187,18 +226,38 @@ if __name__ == '__main__':
 		file_names_y=sampling_config['datagen_filename_y']+'test'+'_'+str(0)+'.csv'
 		file_names_z=sampling_config['datagen_filename_z']+'test'+'_'+str(0)+'.csv'	
 		
-		np.savetxt(file_path, test_samples, delimiter=",")
-		print('Sampling Completed...')
+		test_shard=None
+		if(resume_flag==1):
+			test_shard=run_manifest.load_shard(0,'test')
+
+		if(test_shard is not None):
+			print('Loading voxelized test data from run state')
+			input_conv_data_test=test_shard['input_conv_data']
+			kcc_subset_dump_test=test_shard['kcc_subset_dump']
+		else:
+			if(resume_flag==1 and run_manifest.is_simulated(0,'test')):
+				print('Test simulations already completed, loading samples')
+				test_samples=np.loadtxt(file_path,delimiter=",")
+			else:
+				test_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['test_sample_dim'])
+				np.savetxt(file_path, test_samples, delimiter=",")
+				print('Sampling Completed...')
+
+				cae_status=cae_simulations.run_simulations(run_id=0,type_flag='test')
+				
+				if(resume_flag==1):
+					run_manifest.mark_simulated(0,'test')
 
-		cae_status=cae_simulations.run_simulations(run_id=0,type_flag='test')
+			print("Pre-processing simulated test data")
+			dataset_test=[]
+			dataset_test.append(get_data.data_import([file_names_x],data_folder))
+			dataset_test.append(get_data.data_import([file_names_y],data_folder))
+			dataset_test.append(get_data.data_import([file_names_z],data_folder))
+					
+			input_conv_data_test, kcc_subset_dump_test,kpi_subset_dump_test=get_data.data_convert_voxel_mc(vrm_system,dataset_test,point_index,test_samples)
 
-		print("Pre-processing simulated test data")
-		dataset_test=[]
-		dataset_test.append(get_data.data_import([file_names_x],data_folder))
-		dataset_test.append(get_data.data_import([file_names_y],data_folder))
-		dataset_test.append(get_data.data_import([file_names_z],data_folder))
-				
-		input_conv_data_test, kcc_subset_dump_test,kpi_subset_dump_test=get_data.data_convert_voxel_mc(vrm_system,dataset_test,point_index,test_samples)
+			if(resume_flag==1):
+				run_manifest.save_shard(0,'test',{'input_conv_data':input_conv_data_test,'kcc_subset_dump':kcc_subset_dump_test})
 
 	if(sampling_validation_flag==1):
 		print('Generating Adaptive Sampling Data...')
@@ -208,25 +267,57 @@ if __name__ == '__main__':
 		#get uncertainty estimates
 		from cae_simulations import CAESimulations
 		cae_simulations=CAESimulations(simulation_platform,simulation_engine,max_run_length,case_study)
-		validate_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['sample_validation_dim'])
 
 		file_name=sampling_config['output_file_name_validate']+".csv"
 		file_path=kcc_folder+'/'+file_name
 		file_names_x=sampling_config['datagen_filename_x']+'validate'+'_'+str(0)+'.csv'
 		file_names_y=sampling_config['datagen_filename_y']+'validate'+'_'+str(0)+'.csv'
 		file_names_z=sampling_config['datagen_filename_z']+'validate'+'_'+str(0)+'.csv'
-			
-		np.savetxt(file_path, validate_samples, delimiter=",")
-		print('Sampling Completed...')
-		cae_status=cae_simulations.run_simulations(run_id=0,type_flag='validate')
-
-		print("Pre-processing simulated test data")
-		dataset_validate=[]
-		dataset_validate.append(get_data.data_import([file_names_x],data_folder))
-		dataset_validate.append(get_data.data_import([file_names_y],data_folder))
-		dataset_validate.append(get_data.data_import([file_names_z],data_folder))
-				
-		input_conv_data_validate, kcc_subset_dump_validate,kpi_subset_dump_validate=get_data.data_convert_voxel_mc(vrm_system,dataset_validate,point_index,validate_samples)
+		
+		validate_shard=None
+		if(resume_flag==1):
+			validate_shard=run_manifest.load_shard(0,'validate')
+
+		if(validate_shard is not None):
+			print('Loading voxelized validation data from run state')
+			input_conv_data_validate=validate_shard['input_conv_data']
+			kcc_subset_dump_validate=validate_shard['kcc_subset_dump']
+		else:
+			if(resume_flag==1 and run_manifest.is_simulated(0,'validate')):
+				print('Validation simulations already completed, loading samples')
+				validate_samples=np.loadtxt(file_path,delimiter=",")
+			else:
+				validate_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['sample_validation_dim'])
+				np.savetxt(file_path, validate_samples, delimiter=",")
+				print('Sampling Completed...')
+				cae_status=cae_simulations.run_simulations(run_id=0,type_flag='validate')
+
+				if(resume_flag==1):
+					run_manifest.mark_simulated(0,'validate')
+
+			print("Pre-processing simulated test data")
+			dataset_validate=[]
+			dataset_validate.append(get_data.data_import([file_names_x],data_folder))
+			dataset_validate.append(get_data.data_import([file_names_y],data_folder))
+			dataset_validate.append(get_data.data_import([file_names_z],data_folder))
+					
+			input_conv_data_validate, kcc_subset_dump_validate,kpi_subset_dump_validate=get_data.data_convert_voxel_mc(vrm_system,dataset_validate,point_index,validate_samples)
+
+			if(resume_flag==1):
+				run_manifest.save_shard(0,'validate',{'input_conv_data':input_conv_data_validate,'kcc_subset_dump':kcc_subset_dump_validate})
+
+	if(isolate_runs==1):
+		print('Sharing test and validation data with the worker processes')
+		input_conv_test_path=run_executor.share_dataset('input_conv_data_test',input_conv_data_test)
+		kcc_test_path=run_executor.share_dataset('kcc_subset_dump_test',kcc_subset_dump_test)
+		input_conv_validate_path=run_executor.share_dataset('input_conv_data_validate',input_conv_data_validate)
+		kcc_validate_path=run_executor.share_dataset('kcc_subset_dump_validate',kcc_subset_dump_validate)
+
+	#Prediction distribution plots of the Bayesian model inference of each run are generated in the background
+	plotter=None
+	if(pred_plots==1 and plot_processes>0):
+		from uncertainty_viz import AsyncPlotter
+		plotter=AsyncPlotter(plot_processes)
 
 	for i in tqdm(range(max_run_length)):
 		
@@ -242,17 +333,36 @@ if __name__ == '__main__':
 		file_names_y=[file_names_y]
 		file_names_z=[file_names_z]
 		
-		if(i==0):
+		train_shard=None
+		if(resume_flag==1):
+			train_shard=run_manifest.load_shard(i,'train')
+
+		if(train_shard is not None):
+			print('Loading voxelized training data from run state for run: ',i)
+			train_dim=sampling_config['sample_dim']+i*sampling_config['adaptive_sample_dim']
+			input_conv_data=train_shard['input_conv_data']
+			kcc_subset_dump=train_shard['kcc_subset_dump']
+
+		if(i==0 and train_shard is None):
 			print('Generating initial samples...')
 		
 			train_dim=sampling_config['sample_dim']
-			initial_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['sample_dim'])
 			file_path=kcc_folder+'/'+file_name
-			np.savetxt(file_path, initial_samples, delimiter=",")
+
+			if(resume_flag==1 and run_manifest.is_simulated(i,'train')):
+				print('Training simulations already completed, loading samples')
+				initial_samples=np.loadtxt(file_path,delimiter=",")
+			else:
+				initial_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['sample_dim'])
+				np.savetxt(file_path, initial_samples, delimiter=",")
+				print('Sampling Completed...')
+				 
+				cae_status=cae_simulations.run_simulations(i,'train')
+
+				if(resume_flag==1):
+					run_manifest.mark_simulated(i,'train')
+			
 			train_samples=initial_samples
-			print('Sampling Completed...')
-			 
-			cae_status=cae_simulations.run_simulations(i,'train')
 			
 			dataset=[]
 			dataset.append(get_data.data_import(file_names_x,data_folder))
@@ -262,22 +372,30 @@ if __name__ == '__main__':
 			input_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,train_samples)
 
 
-		if(i>0):
+		if(i>0 and train_shard is None):
 			
 			print('Adaptive Sampling..')
 
 			#Currently using random sampling
 			file_name=sampling_config['output_file_name_train']+'_'+str(i)+'.csv'
 			train_dim=train_dim+sampling_config['adaptive_sample_dim']
-			#initial_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['adaptive_sample_dim'])
-			adaptive_gen_samples,gmm_model_params=unsap.get_distribution_samples(kcc_subset_dump_validate,y_pred_validate,y_std_validate)
-			
-			np.savetxt(logs_path+'/gmm_model_params_run_'+str(run_id)+'.csv', gmm_model_params, delimiter=",")
 			file_path=kcc_folder+'/'+file_name
-			np.savetxt(file_path,adaptive_gen_samples, delimiter=",")
-			print('Sampling Completed...')
+			
+			if(resume_flag==1 and run_manifest.is_simulated(i,'train')):
+				print('Training simulations already completed, loading samples')
+				adaptive_gen_samples=np.loadtxt(file_path,delimiter=",")
+			else:
+				#initial_samples=adaptive_sampling.inital_sampling_uniform_random(kcc_struct,sampling_config['adaptive_sample_dim'])
+				adaptive_gen_samples,gmm_model_params=unsap.get_distribution_samples(kcc_subset_dump_validate,y_pred_validate,y_std_validate)
+				
+				np.savetxt(logs_path+'/gmm_model_params_run_'+str(run_id)+'.csv', gmm_model_params, delimiter=",")
+				np.savetxt(file_path,adaptive_gen_samples, delimiter=",")
+				print('Sampling Completed...')
+
+				cae_status=cae_simulations.run_simulations(i,'train')
 
-			cae_status=cae_simulations.run_simulations(i,'train')
+				if(resume_flag==1):
+					run_manifest.mark_simulated(i,'train')
 			
 			dataset=[]
 			dataset.append(get_data.data_import(file_names_x,data_folder))
@@ -286,17 +404,106 @@ if __name__ == '__main__':
 			
 			input_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,adaptive_gen_samples)
 
+		if(resume_flag==1 and train_shard is None):
+			run_manifest.save_shard(i,'train',{'input_conv_data':input_conv_data,'kcc_subset_dump':kcc_subset_dump})
+
+		if(incremental==1):
+			#The replay is sampled before the new samples are added, the order is the same when the runs are resumed
+			replay_conv_data,replay_kcc_data=replay_buffer.sample(int(replay_ratio*len(input_conv_data)))
+			replay_buffer.add(input_conv_data,kcc_subset_dump)
+		else:
+			combined_conv_data_list.append(input_conv_data)
+			combined_kcc_data_list.append(kcc_subset_dump)
+
+		if(resume_flag==1 and run_manifest.is_complete(i)):
+			print('Run already completed, restoring results for run: ',i)
+			datastudy_output_test[i,:]=run_manifest.get_run(i)['metrics']
+
+			if(model_type=='Bayesian 3D Convolution Neural Network'):
+				validate_pred_shard=run_manifest.load_shard(i,'validate_preds')
+				y_pred_validate=validate_pred_shard['y_pred']
+				y_std_validate=validate_pred_shard['y_std']
+			continue
+
+		run_epocs=epocs
+		initial_weights_path=None
 
-		combined_conv_data_list.append(input_conv_data)
-		combined_kcc_data_list.append(kcc_subset_dump)
+		if(incremental==1):
+			combined_conv_data=input_conv_data
+			combined_kcc_data=kcc_subset_dump
 
-		print('Concatenating dataset')
-		print(len(combined_conv_data_list))
+			if(replay_conv_data is not None):
+				combined_conv_data=np.concatenate([input_conv_data,replay_conv_data],axis=0)
+				combined_kcc_data=np.concatenate([kcc_subset_dump,replay_kcc_data],axis=0)
+				run_epocs=get_incremental_epochs(len(combined_conv_data),batch_size,incremental_steps,split_ratio)
+
+				if(model_type=='Bayesian 3D Convolution Neural Network'):
+					initial_weights_path=model_path+'/Bayes_trained_model_'+str(run_id-1)
+				else:
+					initial_weights_path=model_path+'/trained_model_'+str(run_id-1)+'.h5'
+
+				print('Incremental training from: ',initial_weights_path,' epochs: ',run_epocs)
+		else:
+			print('Concatenating dataset')
+			print(len(combined_conv_data_list))
+
+			combined_conv_data=np.concatenate(combined_conv_data_list,axis=0)
+			combined_kcc_data=np.concatenate(combined_kcc_data_list,axis=0)
 
-		combined_conv_data=np.concatenate(combined_conv_data_list,axis=0)
-		combined_kcc_data=np.concatenate(combined_kcc_data_list,axis=0)
 		print(combined_conv_data.shape,combined_kcc_data.shape)
 		
+		if(isolate_runs==1):
+			print('Running training in an isolated worker process for run: ',i)
+
+			run_params={
+				'run_id':run_id,
+				'train_dim':train_dim,
+				'input_conv_path':run_executor.share_dataset('combined_conv_data',combined_conv_data),
+				'kcc_path':run_executor.share_dataset('combined_kcc_data',combined_kcc_data),
+				'input_conv_validate_path':input_conv_validate_path,
+				'kcc_validate_path':kcc_validate_path,
+				'input_conv_test_path':input_conv_test_path,
+				'kcc_test_path':kcc_test_path,
+				'model_params':{'model_type':model_type,'learning_type':learning_type,'output_dimension':output_dimension,'optimizer':optimizer,'loss_func':loss_func,
+					'regularizer_coeff':regularizer_coeff,'output_type':output_type,'voxel_dim':voxel_dim,'voxel_channels':voxel_channels,
+					'tl_type':tl_type,'tl_base':tl_base,'tl_app':tl_app,'conv_layer_m':conv_layer_m,'dense_layer_m':dense_layer_m,'initial_weights_path':initial_weights_path},
+				'train_params':{'batch_size':batch_size,'epocs':run_epocs,'split_ratio':split_ratio,'activate_tensorboard':activate_tensorboard},
+				'mc_chunk_size':mc_chunk_size,
+				'pred_plots':pred_plots,
+				'checkpoint_params':{'resume_flag':resume_flag,'checkpoint_freq':checkpoint_freq,'max_to_keep':max_to_keep,
+					'manifest_path':train_path+'/run_state.json','checkpoint_path':checkpoint_path,'config_hash':config_hash},
+				'model_path':model_path,
+				'logs_path':logs_path,
+				'plots_path':plots_path,
+				'deployment_path':deployment_path
+			}
+			del combined_conv_data,combined_kcc_data
+
+			run_result=run_executor.run(adaptive_run,run_params)
+
+			from uncertainty_viz import submit_plot_tasks
+			submit_plot_tasks(plotter,run_result['plot_tasks'])
+			
+			eval_metrics_test=run_result['eval_metrics_test']
+			y_pred_validate=run_result['y_pred_validate']
+			y_std_validate=run_result['y_std_validate']
+
+			datastudy_output_test[i,0]=train_dim
+			datastudy_output_test[i,1:assembly_kccs+1]=eval_metrics_test["Mean Absolute Error"]
+			datastudy_output_test[i,assembly_kccs+1:(2*assembly_kccs)+1]=eval_metrics_test["Mean Squared Error"]
+			datastudy_output_test[i,(2*assembly_kccs)+1:(3*assembly_kccs)+1]=eval_metrics_test["Root Mean Squared Error"]
+			datastudy_output_test[i,(3*assembly_kccs)+1:(4*assembly_kccs)+1]=eval_metrics_test["R Squared"]
+
+			if(resume_flag==1):
+				#Training progress is recorded in the manifest by the worker process
+				run_manifest.reload()
+				
+				if(model_type=='Bayesian 3D Convolution Neural Network'):
+					run_manifest.save_shard(i,'validate_preds',{'y_pred':y_pred_validate,'y_std':y_std_validate})
+				
+				run_manifest.mark_complete(i,datastudy_output_test[i,:])
+			continue
+
 		if(model_type=='Bayesian 3D Convolution Neural Network'):
 			
 			from core_model_bayes import Bayes_DLModel
@@ -305,11 +512,18 @@ if __name__ == '__main__':
 			dl_model=Bayes_DLModel(model_type,output_dimension,optimizer,loss_func,regularizer_coeff,output_type)
 			model=dl_model.bayes_cnn_model_3d(voxel_dim,voxel_channels)
 
+			if(initial_weights_path is not None):
+				model.load_weights(initial_weights_path)
+
 			print('Model summary used for training')
 			print(model.summary())
 
-			train_model=BayesTrainModel(batch_size,epocs,split_ratio)
-			trained_model=train_model.run_train_model(model,combined_conv_data,combined_kcc_data,model_path,logs_path,plots_path,activate_tensorboard,run_id)
+			checkpoint=None
+			if(resume_flag==1):
+				checkpoint=TrainingCheckpoint(model,checkpoint_path+'/run_'+str(run_id),run_manifest,run_id,model_path+'/Bayes_trained_model_'+str(run_id),checkpoint_freq,max_to_keep)
+
+			train_model=BayesTrainModel(batch_size,run_epocs,split_ratio)
+			trained_model=train_model.run_train_model(model,combined_conv_data,combined_kcc_data,model_path,logs_path,plots_path,activate_tensorboard,run_id,checkpoint=checkpoint)
 			print('Training Complete')
 
 
@@ -343,12 +557,19 @@ if __name__ == '__main__':
 
 				if(tl_type=='feature_extractor'):
 					model=transfer_learning.set_fixed_train_params(transfer_model)
+
+			if(initial_weights_path is not None):
+				model.load_weights(initial_weights_path)
 		
 			print('Model summary used for training')
 			print(model.summary())
 			
-			train_model=TrainModel(batch_size,epocs,split_ratio)
-			trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,combined_conv_data,combined_kcc_data,model_path,logs_path,plots_path,activate_tensorboard,run_id)
+			checkpoint=None
+			if(resume_flag==1):
+				checkpoint=TrainingCheckpoint(model,checkpoint_path+'/run_'+str(run_id),run_manifest,run_id,model_path+'/trained_model_'+str(run_id)+'.h5',checkpoint_freq,max_to_keep)
+
+			train_model=TrainModel(batch_size,run_epocs,split_ratio)
+			trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,combined_conv_data,combined_kcc_data,model_path,logs_path,plots_path,activate_tensorboard,run_id,checkpoint=checkpoint)
 
 		print('Training complete for run: ',i)
 
@@ -371,7 +592,7 @@ if __name__ == '__main__':
 			plots_path_validate=plots_path+'/validation_sampling'
 			pathlib.Path(plots_path_validate).mkdir(parents=True, exist_ok=True)
 
-			y_pred_validate,y_std_validate,y_aleatoric_std=deploy_model.model_inference(input_conv_data_validate,inference_model,y_pred,kcc_subset_dump_validate,plots_path_validate,epistemic_samples=1000,run_id=run_id)
+			y_pred_validate,y_std_validate,y_aleatoric_std=deploy_model.model_inference(input_conv_data_validate,inference_model,y_pred,kcc_subset_dump_validate,plots_path_validate,epistemic_samples=1000,run_id=run_id,chunk_size=mc_chunk_size,pred_plots=pred_plots,plotter=plotter)
 			#eval_metrics_test,accuracy_metrics_df_test=metrics_eval.metrics_eval_base(y_pred,kcc_subset_dump_test,logs_path,run_id)
 
 			std_file_path=logs_path+'/'+'uncertainty_validate_'+str(run_id)+'_.csv'
@@ -380,6 +601,9 @@ if __name__ == '__main__':
 			pred_file_path=logs_path+'/'+'predictions_validate_'+str(run_id)+'_.csv'
 			np.savetxt(pred_file_path, y_pred_validate, delimiter=",")
 
+			if(resume_flag==1):
+				run_manifest.save_shard(i,'validate_preds',{'y_pred':y_pred_validate,'y_std':y_std_validate})
+
 
 		print('Inferencing from trained model...')
 		
@@ -398,7 +622,7 @@ if __name__ == '__main__':
 			plots_path_test=plots_path+'/test'
 			pathlib.Path(plots_path_test).mkdir(parents=True, exist_ok=True)
 			y_pred=np.zeros_like(kcc_subset_dump_test)
-			y_pred,y_std,y_aleatoric_std=deploy_model.model_inference(input_conv_data_test,inference_model,y_pred,kcc_subset_dump_test,plots_path_test,epistemic_samples=1000,run_id=run_id)
+			y_pred,y_std,y_aleatoric_std=deploy_model.model_inference(input_conv_data_test,inference_model,y_pred,kcc_subset_dump_test,plots_path_test,epistemic_samples=1000,run_id=run_id,chunk_size=mc_chunk_size,pred_plots=pred_plots,plotter=plotter)
 			eval_metrics_test,accuracy_metrics_df_test=metrics_eval.metrics_eval_base(y_pred,kcc_subset_dump_test,logs_path,run_id)
 
 			std_file_path=logs_path+'/'+'uncertainty_test_'+str(run_id)+'_.csv'
@@ -427,6 +651,10 @@ if __name__ == '__main__':
 		print("Model Testing Complete on samples :",train_dim)
 		print("The Model Test Metrics are ")
 		print(eval_metrics_test)
+
+		if(resume_flag==1):
+			run_manifest.mark_complete(i,datastudy_output_test[i,:])
+
 		K.clear_session()
 
 
@@ -446,6 +674,10 @@ if __name__ == '__main__':
 	
 	print('Dynamic Training complete')
 
+	if(plotter is not None):
+		print('Waiting for the prediction distribution plots...')
+		plotter.close()
+
 	print('Plotting Data Study Validation Results: ')
 	fig_test = ds_output_df_test.iplot(x='Training_Samples',asFigure=True)
 	py.offline.plot(fig_test,filename=logs_path+'/'+"dynamic_training_plot_test.html")
@@ -26,7 +26,7 @@ class Encode_Decode_Model:
 		self.output_dimension=output_dimension
 
 
-	def encode_decode_3d(self,filter_root, depth,input_size=(64,64,64,3), n_class=3):
+	def encode_decode_3d(self,filter_root, depth,input_size=(64,64,64,3), n_class=3,recompute_encoder=0):
 		"""Build the 3D Model using the specified loss function, the inputs are parsed from the assemblyconfig_<case_study_name>.py file
 
 			:param voxel_dim: The voxel dimension of the input, required to build input to the 3D CNN model
@@ -34,6 +34,9 @@ class Encode_Decode_Model:
 
 			:param voxel_channels: The number of voxel channels in the input structure, required to build input to the 3D CNN model
 			:type voxel_channels: int (required)
+
+			:param recompute_encoder: Flag to recompute the encoder blocks during the backward pass instead of storing their intermediate activations (refer custom_layers.RecomputeResBlock), reduces training memory at the cost of additional compute, defaults to 0, the same flag must be used when the trained weights are loaded
+			:type recompute_encoder: int
 		"""
 
 		import tensorflow as tf
@@ -45,6 +48,7 @@ class Encode_Decode_Model:
 		from tensorflow.keras.models import Model
 		from tensorflow.keras.layers import Conv3D, MaxPooling3D, Add, BatchNormalization, Input, Activation, Lambda, Concatenate, Flatten, Dense,UpSampling3D,GlobalAveragePooling3D
 		from tensorflow.keras.utils import plot_model
+		from custom_layers import RecomputeResBlock
 		
 		"""
 		Build UNet model with ResBlock.
@@ -77,23 +81,27 @@ class Encode_Decode_Model:
 		for i in range(depth):
 			out_channel = 2**i * filter_root
 
-			# Residual/Skip connection
-			res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
+			if(recompute_encoder==1):
+				#Encoder block with activation recomputation, the intermediate activations are recomputed during the backward pass
+				act2 = RecomputeResBlock(out_channel, activation=activation, name="RecomputeBlock{}_1".format(i))(x)
+			else:
+				# Residual/Skip connection
+				res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
 
-			# First Conv Block with Conv, BN and activation
-			conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
-			#if batch_norm:
-				#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
-			act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
+				# First Conv Block with Conv, BN and activation
+				conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
+				#if batch_norm:
+					#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
+				act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
 
-			# Second Conv block with Conv and BN only
-			conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
-			#if batch_norm:
-				#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
+				# Second Conv block with Conv and BN only
+				conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
+				#if batch_norm:
+					#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
 
-			resconnection = Add(name="Add{}_1".format(i))([res, conv2])
+				resconnection = Add(name="Add{}_1".format(i))([res, conv2])
 
-			act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
+				act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
 
 			# Max pooling
 			if i < depth - 1:
@@ -155,7 +163,7 @@ class Encode_Decode_Model:
 		#print(model.summary())
 		return model
 
-	def encode_decode_3d_multi_output(self,filter_root, depth,input_size=(64,64,64,3),output_heads=2, n_class=3):
+	def encode_decode_3d_multi_output(self,filter_root, depth,input_size=(64,64,64,3),output_heads=2, n_class=3,recompute_encoder=0):
 		"""Build the 3D Model using the specified loss function, the inputs are parsed from the assemblyconfig_<case_study_name>.py file
 
 			:param voxel_dim: The voxel dimension of the input, required to build input to the 3D CNN model
@@ -163,6 +171,9 @@ class Encode_Decode_Model:
 
 			:param voxel_channels: The number of voxel channels in the input structure, required to build input to the 3D CNN model
 			:type voxel_channels: int (required)
+
+			:param recompute_encoder: Flag to recompute the encoder blocks during the backward pass instead of storing their intermediate activations (refer custom_layers.RecomputeResBlock), reduces training memory at the cost of additional compute, defaults to 0, the same flag must be used when the trained weights are loaded
+			:type recompute_encoder: int
 		"""
 
 		import tensorflow as tf
@@ -174,6 +185,7 @@ class Encode_Decode_Model:
 		from tensorflow.keras.models import Model
 		from tensorflow.keras.layers import Conv3D, MaxPooling3D, Add, BatchNormalization, Input, Activation, Lambda, Concatenate, Flatten, Dense,UpSampling3D,GlobalAveragePooling3D
 		from tensorflow.keras.utils import plot_model
+		from custom_layers import RecomputeResBlock
 		
 		"""
 		Build UNet model with ResBlock.
@@ -206,23 +218,27 @@ class Encode_Decode_Model:
 		for i in range(depth):
 			out_channel = 2**i * filter_root
 
-			# Residual/Skip connection
-			res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
+			if(recompute_encoder==1):
+				#Encoder block with activation recomputation, the intermediate activations are recomputed during the backward pass
+				act2 = RecomputeResBlock(out_channel, activation=activation, name="RecomputeBlock{}_1".format(i))(x)
+			else:
+				# Residual/Skip connection
+				res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
 
-			# First Conv Block with Conv, BN and activation
-			conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
-			#if batch_norm:
-				#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
-			act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
+				# First Conv Block with Conv, BN and activation
+				conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
+				#if batch_norm:
+					#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
+				act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
 
-			# Second Conv block with Conv and BN only
-			conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
-			#if batch_norm:
-				#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
+				# Second Conv block with Conv and BN only
+				conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
+				#if batch_norm:
+					#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
 
-			resconnection = Add(name="Add{}_1".format(i))([res, conv2])
+				resconnection = Add(name="Add{}_1".format(i))([res, conv2])
 
-			act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
+				act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
 
 			# Max pooling
 			if i < depth - 1:
@@ -297,7 +313,7 @@ class Encode_Decode_Model:
 		return model
 
 
-	def encode_decode_3d_multi_output_attention(self,filter_root, depth,input_size=(64,64,64,3),output_heads=2, n_class=3):
+	def encode_decode_3d_multi_output_attention(self,filter_root, depth,input_size=(64,64,64,3),output_heads=2, n_class=3,recompute_encoder=0):
 		"""Build the 3D Model using the specified loss function, the inputs are parsed from the assemblyconfig_<case_study_name>.py file
 
 			:param voxel_dim: The voxel dimension of the input, required to build input to the 3D CNN model
@@ -305,6 +321,9 @@ class Encode_Decode_Model:
 
 			:param voxel_channels: The number of voxel channels in the input structure, required to build input to the 3D CNN model
 			:type voxel_channels: int (required)
+
+			:param recompute_encoder: Flag to recompute the encoder blocks during the backward pass instead of storing their intermediate activations (refer custom_layers.RecomputeResBlock), reduces training memory at the cost of additional compute, defaults to 0, the same flag must be used when the trained weights are loaded
+			:type recompute_encoder: int
 		"""
 
 		import tensorflow as tf
@@ -316,6 +335,7 @@ class Encode_Decode_Model:
 		from tensorflow.keras.models import Model
 		from tensorflow.keras.layers import Conv3D, MaxPooling3D, Add, BatchNormalization, Input, Activation, Lambda, Concatenate, Flatten, Dense,UpSampling3D,GlobalAveragePooling3D
 		from tensorflow.keras.utils import plot_model
+		from custom_layers import RecomputeResBlock
 		
 		from tensorflow.keras.layers import add, multiply
 		"""
@@ -362,23 +382,27 @@ class Encode_Decode_Model:
 		for i in range(depth):
 			out_channel = 2**i * filter_root
 
-			# Residual/Skip connection
-			res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
+			if(recompute_encoder==1):
+				#Encoder block with activation recomputation, the intermediate activations are recomputed during the backward pass
+				act2 = RecomputeResBlock(out_channel, activation=activation, name="RecomputeBlock{}_1".format(i))(x)
+			else:
+				# Residual/Skip connection
+				res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
 
-			# First Conv Block with Conv, BN and activation
-			conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
-			#if batch_norm:
-				#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
-			act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
+				# First Conv Block with Conv, BN and activation
+				conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
+				#if batch_norm:
+					#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
+				act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
 
-			# Second Conv block with Conv and BN only
-			conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
-			#if batch_norm:
-				#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
+				# Second Conv block with Conv and BN only
+				conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
+				#if batch_norm:
+					#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
 
-			resconnection = Add(name="Add{}_1".format(i))([res, conv2])
+				resconnection = Add(name="Add{}_1".format(i))([res, conv2])
 
-			act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
+				act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
 
 			# Max pooling
 			if i < depth - 1:
@@ -455,7 +479,7 @@ class Encode_Decode_Model:
 		#print(model.summary())
 		return model
 
-	def encode_decode_3d_multi_output_attention_hybrid(self,filter_root, depth,input_size=(64,64,64,3),categorical_outputs=25,output_heads=2, n_class=3):
+	def encode_decode_3d_multi_output_attention_hybrid(self,filter_root, depth,input_size=(64,64,64,3),categorical_outputs=25,output_heads=2, n_class=3,recompute_encoder=0,occupied_voxels=None,shape_error_components=0):
 		"""Build the 3D Model using the specified loss function, the inputs are parsed from the assemblyconfig_<case_study_name>.py file
 
 			:param voxel_dim: The voxel dimension of the input, required to build input to the 3D CNN model
@@ -463,6 +487,15 @@ class Encode_Decode_Model:
 
 			:param voxel_channels: The number of voxel channels in the input structure, required to build input to the 3D CNN model
 			:type voxel_channels: int (required)
+
+			:param recompute_encoder: Flag to recompute the encoder blocks during the backward pass instead of storing their intermediate activations (refer custom_layers.RecomputeResBlock), reduces training memory at the cost of additional compute, defaults to 0, the same flag must be used when the trained weights are loaded
+			:type recompute_encoder: int
+
+			:param occupied_voxels: (i,j,k) index of the voxels occupied by the nodes (refer data_import.GetTrainData.get_occupied_voxels), if provided the shape error output is gathered at the occupied voxels so that the shape error loss and metrics are evaluated only on the voxels that carry deviations, defaults to None (shape error output on the complete voxel grid)
+			:type occupied_voxels: numpy.array [n_voxels*3]
+
+			:param shape_error_components: Number of PCA basis coefficients of the shape error of each stage (refer shape_error_basis.ShapeErrorBasis), if greater than 0 the decoder is replaced by a dense head predicting the basis coefficients of each stage, defaults to 0 (shape error output from the decoder)
+			:type shape_error_components: int
 		"""
 
 		import tensorflow as tf
@@ -474,6 +507,7 @@ class Encode_Decode_Model:
 		from tensorflow.keras.models import Model
 		from tensorflow.keras.layers import Conv3D, MaxPooling3D, Add, BatchNormalization, Input, Activation, Lambda, Concatenate, Flatten, Dense,UpSampling3D,GlobalAveragePooling3D
 		from tensorflow.keras.utils import plot_model
+		from custom_layers import RecomputeResBlock
 		
 		from tensorflow.keras.layers import add, multiply
 		"""
@@ -547,23 +581,27 @@ class Encode_Decode_Model:
 		for i in range(depth):
 			out_channel = 2**i * filter_root
 
-			# Residual/Skip connection
-			res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
+			if(recompute_encoder==1):
+				#Encoder block with activation recomputation, the intermediate activations are recomputed during the backward pass
+				act2 = RecomputeResBlock(out_channel, activation=activation, name="RecomputeBlock{}_1".format(i))(x)
+			else:
+				# Residual/Skip connection
+				res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="Identity{}_1".format(i))(x)
 
-			# First Conv Block with Conv, BN and activation
-			conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
-			#if batch_norm:
-				#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
-			act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
+				# First Conv Block with Conv, BN and activation
+				conv1 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_1".format(i))(x)
+				#if batch_norm:
+					#conv1 = BatchNormalization(name="BN{}_1".format(i))(conv1)
+				act1 = Activation(activation, name="Act{}_1".format(i))(conv1)
 
-			# Second Conv block with Conv and BN only
-			conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
-			#if batch_norm:
-				#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
+				# Second Conv block with Conv and BN only
+				conv2 = Conv(out_channel, kernel_size=3, padding='same', name="Conv{}_2".format(i))(act1)
+				#if batch_norm:
+					#conv2 = BatchNormalization(name="BN{}_2".format(i))(conv2)
 
-			resconnection = Add(name="Add{}_1".format(i))([res, conv2])
+				resconnection = Add(name="Add{}_1".format(i))([res, conv2])
 
-			act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
+				act2 = Activation(activation, name="Act{}_2".format(i))(resconnection)
 
 			# Max pooling
 			if i < depth - 1:
@@ -584,42 +622,57 @@ class Encode_Decode_Model:
 		#feature_vector=Flatten()(x)
 		#process_parameter=Dense(self.output_dimension)(feature_vector)
 		
-		# Upsampling
-		for i in range(depth - 2, -1, -1):
-			out_channel = 2**(i) * filter_root
+		if(shape_error_components>0):
+			#Shape error basis coefficients of each stage predicted from the encoder bottleneck, no decoder is required
+			reduced_features=Conv(8, 1, padding='same', activation=activation, name='shape_error_reduce')(x)
+			shape_error_features=Flatten(name='shape_error_flatten')(reduced_features)
+			shape_error_coefficients=Dense(shape_error_components*output_heads, name='shape_error_outputs')(shape_error_features)
+		else:
+			# Upsampling
+			for i in range(depth - 2, -1, -1):
+				out_channel = 2**(i) * filter_root
 
-			# long connection from down sampling path.
-			long_connection = long_connection_store[str(i)]
+				# long connection from down sampling path.
+				long_connection = long_connection_store[str(i)]
 
-			up1 = UpSampling(name="UpSampling{}_1".format(i))(x)
-			up_conv1 = Conv(out_channel, 2, activation='relu', padding='same', name="upConvSam{}_1".format(i))(up1)
+				up1 = UpSampling(name="UpSampling{}_1".format(i))(x)
+				up_conv1 = Conv(out_channel, 2, activation='relu', padding='same', name="upConvSam{}_1".format(i))(up1)
 
-			attention_layer = attention_block(x=long_connection, g=up_conv1, inter_channel=out_channel // 4)
-			#  Concatenate.
+				attention_layer = attention_block(x=long_connection, g=up_conv1, inter_channel=out_channel // 4)
+				#  Concatenate.
 			
-			#up_conc = Concatenate(axis=-1, name="upConcatenate{}_1".format(i))([up_conv1, long_connection])
-			up_conc = Concatenate(axis=-1, name="upConcatenate{}_1".format(i))([up_conv1, attention_layer])
+				#up_conc = Concatenate(axis=-1, name="upConcatenate{}_1".format(i))([up_conv1, long_connection])
+				up_conc = Concatenate(axis=-1, name="upConcatenate{}_1".format(i))([up_conv1, attention_layer])
 
-			#  Convolutions
-			up_conv2 = Conv(out_channel, 3, padding='same', name="upConv{}_1".format(i))(up_conc)
+				#  Convolutions
+				up_conv2 = Conv(out_channel, 3, padding='same', name="upConv{}_1".format(i))(up_conc)
 
-			up_act1 = Activation(activation, name="upAct{}_1".format(i))(up_conv2)
+				up_act1 = Activation(activation, name="upAct{}_1".format(i))(up_conv2)
 
-			up_conv2 = Conv(out_channel, 3, padding='same', name="upConv{}_2".format(i))(up_act1)
+				up_conv2 = Conv(out_channel, 3, padding='same', name="upConv{}_2".format(i))(up_act1)
 
-			# Residual/Skip connection
-			res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="upIdentity{}_1".format(i))(up_conc)
+				# Residual/Skip connection
+				res = Conv(out_channel, kernel_size=1, padding='same', use_bias=False, name="upIdentity{}_1".format(i))(up_conc)
 
-			resconnection = Add(name="upAdd{}_1".format(i))([res, up_conv2])
+				resconnection = Add(name="upAdd{}_1".format(i))([res, up_conv2])
 
-			x = Activation(activation, name="upAct{}_2".format(i))(resconnection)
+				x = Activation(activation, name="upAct{}_2".format(i))(resconnection)
 
 
 		output_list=[]
 		output_list.append(process_parameter_regression)
 		output_list.append(process_parameter_classification)
 
-		output = Conv(n_class*output_heads, 1, padding='same', activation=final_activation, name='shape_error_outputs')(x)
+		if(shape_error_components>0):
+			output = shape_error_coefficients
+		elif(occupied_voxels is None):
+			output = Conv(n_class*output_heads, 1, padding='same', activation=final_activation, name='shape_error_outputs')(x)
+		else:
+			#Sparse shape error output [samples*n_voxels*(n_class*output_heads)], only the occupied voxels are evaluated in the loss
+			from custom_layers import VoxelGather
+			shape_error_grid = Conv(n_class*output_heads, 1, padding='same', activation=final_activation, name='shape_error_grid')(x)
+			output = VoxelGather(occupied_voxels, name='shape_error_outputs')(shape_error_grid)
+		
 		output_list.append(output)
 
 		# for i in range(output_heads):
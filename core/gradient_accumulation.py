@@ -0,0 +1,301 @@
+""" Contains classes and methods to train memory intensive models (3D U-Net encoder-decoders, Bayesian U-Nets) with gradient accumulation, the effective batch is split into micro-batches, the gradients of each micro-batch are computed and accumulated and the optimizer is applied once per effective batch so that the peak activation memory is bound by the micro-batch size
+"""
+
+import numpy as np
+
+class TrainHistory:
+	"""Training history of the gradient accumulation trainer, mimics keras.callbacks.History so that the training plots (refer visualization/training_viz.py) can be generated
+
+		:param history: dictionary of per epoch loss values
+		:type history: dict (required)
+	"""
+	def __init__(self,history):
+		self.history=history
+
+class GradientAccumulationTrainer:
+	"""Gradient Accumulation Trainer Class, trains a compiled model (single or multiple outputs) using the losses, loss weights, metrics and optimizer the model was compiled with, regularization and KL divergence losses (model.losses) are included in the loss, the history has the same keys as the history of keras fit (loss, per output losses and compiled metrics with the val_ prefix for the validation set)
+
+		:param micro_batch_size: number of samples processed in a single forward/backward pass, determines the peak memory
+		:type micro_batch_size: int (required)
+
+		:param effective_batch_size: number of samples over which the gradients are accumulated before an optimizer step
+		:type effective_batch_size: int (required)
+
+		:param epochs: no of epochs to conduct training
+		:type epochs: int (required)
+	"""
+	def __init__(self,micro_batch_size,effective_batch_size,epochs):
+
+		self.micro_batch_size=micro_batch_size
+		self.effective_batch_size=max(effective_batch_size,micro_batch_size)
+		self.epochs=epochs
+
+	def get_losses(self,model):
+		"""Get the loss functions and loss weights of the compiled model in the order of the model outputs
+
+			:param model: compiled keras model
+			:type model: keras.models (required)
+
+			:returns: list of loss functions, list of loss weights
+			:rtype: list,list
+		"""
+		import tensorflow as tf
+
+		loss_functions=[]
+		loss_weights=[]
+
+		for index,output_name in enumerate(model.output_names):
+
+			if(isinstance(model.loss,dict)):
+				loss_function=model.loss[output_name]
+			elif(isinstance(model.loss,(list,tuple))):
+				loss_function=model.loss[index]
+			else:
+				loss_function=model.loss
+
+			if(isinstance(model.loss_weights,dict)):
+				loss_weight=model.loss_weights.get(output_name,1.0)
+			elif(isinstance(model.loss_weights,(list,tuple))):
+				loss_weight=model.loss_weights[index]
+			else:
+				loss_weight=1.0
+
+			if(isinstance(loss_function,str)):
+				loss_function=tf.keras.losses.get(loss_function)
+
+			loss_functions.append(loss_function)
+			loss_weights.append(float(loss_weight))
+
+		return loss_functions,loss_weights
+
+	def get_metrics(self,model,loss_functions):
+		"""Get the metrics the model was compiled with as metric objects with the names reported by keras fit (metric name for a single output, output name and metric name for multiple outputs)
+
+			:param model: compiled keras model
+			:type model: keras.models (required)
+
+			:param loss_functions: loss functions in the order of the model outputs, used to select the accuracy function as keras does
+			:type loss_functions: list (required)
+
+			:returns: list of (metric name, metric object) per output in the order of the model outputs
+			:rtype: list
+		"""
+		import tensorflow as tf
+
+		#Metrics as passed to compile (compiled_metrics from tensorflow 2.2)
+		if(getattr(model,'compiled_metrics',None) is not None):
+			compile_metrics=model.compiled_metrics._user_metrics
+		else:
+			compile_metrics=getattr(model,'_compile_metrics',None)
+
+		multi_output=len(model.output_names)>1
+		output_metrics_list=[]
+
+		for index,output_name in enumerate(model.output_names):
+
+			if(compile_metrics is None):
+				output_metrics=[]
+			elif(isinstance(compile_metrics,dict)):
+				output_metrics=compile_metrics.get(output_name,[])
+			elif(isinstance(compile_metrics,(list,tuple)) and len(compile_metrics)==len(model.output_names) and all(isinstance(metric,(list,tuple)) for metric in compile_metrics)):
+				output_metrics=compile_metrics[index]
+			else:
+				output_metrics=compile_metrics
+
+			if(not isinstance(output_metrics,(list,tuple))):
+				output_metrics=[output_metrics]
+
+			metric_objects=[]
+			for metric in output_metrics:
+
+				if(isinstance(metric,str)):
+					metric_name=metric
+					if(metric in ['accuracy','acc']):
+						loss_name=getattr(loss_functions[index],'__name__',getattr(loss_functions[index],'name',''))
+						if(model.outputs[index].shape[-1]==1 or 'binary_crossentropy' in loss_name):
+							metric_function=tf.keras.metrics.binary_accuracy
+						elif('sparse_categorical_crossentropy' in loss_name):
+							metric_function=tf.keras.metrics.sparse_categorical_accuracy
+						else:
+							metric_function=tf.keras.metrics.categorical_accuracy
+					else:
+						metric_function=tf.keras.metrics.get(metric)
+					metric_object=tf.keras.metrics.MeanMetricWrapper(metric_function,name=metric_name)
+				elif(isinstance(metric,tf.keras.metrics.Metric)):
+					#A copy for each output so that the outputs do not share the metric state
+					metric_object=metric.__class__.from_config(metric.get_config())
+				elif(isinstance(metric,tf.keras.losses.Loss)):
+					metric_object=tf.keras.metrics.MeanMetricWrapper(metric,name=metric.name)
+				else:
+					metric_object=tf.keras.metrics.MeanMetricWrapper(metric,name=metric.__name__)
+
+				if(multi_output):
+					metric_objects.append((output_name+'_'+metric_object.name,metric_object))
+				else:
+					metric_objects.append((metric_object.name,metric_object))
+
+			output_metrics_list.append(metric_objects)
+
+		return output_metrics_list
+
+	def update_metrics(self,output_metrics_list,output_loss_means,y_list,outputs,output_losses,n_samples):
+		"""Update the per output loss means and the metrics with the outputs of a micro batch
+		"""
+		for metric_objects,output_loss_mean,y_true,y_pred,output_loss in zip(output_metrics_list,output_loss_means,y_list,outputs,output_losses):
+			output_loss_mean.update_state(output_loss,sample_weight=n_samples)
+
+			for metric_name,metric_object in metric_objects:
+				metric_object.update_state(y_true,y_pred)
+
+	def get_epoch_metrics(self,model,output_metrics_list,output_loss_means,prefix=''):
+		"""Per output losses (multiple outputs only) and metrics of the epoch, the states are reset for the next epoch
+
+			:returns: dictionary of metric values with the keras fit names
+			:rtype: dict
+		"""
+		epoch_metrics={}
+
+		for output_name,metric_objects,output_loss_mean in zip(model.output_names,output_metrics_list,output_loss_means):
+			if(len(model.output_names)>1):
+				epoch_metrics[prefix+output_name+'_loss']=float(output_loss_mean.result())
+			output_loss_mean.reset_states()
+
+			for metric_name,metric_object in metric_objects:
+				epoch_metrics[prefix+metric_name]=float(metric_object.result())
+				metric_object.reset_states()
+
+		return epoch_metrics
+
+	def accumulation_fit(self,model,X_in,Y_out_list,X_in_test,Y_out_test_list,model_file_path):
+		"""Train the model with gradient accumulation, the weights with the best validation loss are saved at model_file_path
+
+			:param model: compiled keras model
+			:type model: keras.models (required)
+
+			:param X_in: Train dataset input
+			:type X_in: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param Y_out_list: Train dataset outputs in the order of the model outputs
+			:type Y_out_list: list (required)
+
+			:param X_in_test: Validation dataset input
+			:type X_in_test: numpy.array (required)
+
+			:param Y_out_test_list: Validation dataset outputs in the order of the model outputs
+			:type Y_out_test_list: list (required)
+
+			:param model_file_path: path at which the best weights are saved
+			:type model_file_path: str (required)
+
+			:returns: training history with loss, val_loss and the per output losses and compiled metrics of the train and validation sets
+			:rtype: TrainHistory
+		"""
+		import tensorflow as tf
+
+		if(not isinstance(Y_out_list,(list,tuple))):
+			Y_out_list=[Y_out_list]
+			Y_out_test_list=[Y_out_test_list]
+
+		loss_functions,loss_weights=self.get_losses(model)
+		optimizer=model.optimizer
+		trainable_variables=model.trainable_variables
+
+		train_metrics=self.get_metrics(model,loss_functions)
+		val_metrics=self.get_metrics(model,loss_functions)
+		train_loss_means=[tf.keras.metrics.Mean() for output_name in model.output_names]
+		val_loss_means=[tf.keras.metrics.Mean() for output_name in model.output_names]
+
+		def compute_loss(x,y_list,sample_fraction,training):
+			outputs=model(x,training=training)
+
+			if(not isinstance(outputs,(list,tuple))):
+				outputs=[outputs]
+
+			output_losses=[tf.reduce_mean(loss_function(y_true,y_pred)) for loss_function,y_true,y_pred in zip(loss_functions,y_list,outputs)]
+
+			loss=0.0
+			for loss_weight,output_loss in zip(loss_weights,output_losses):
+				loss+=loss_weight*output_loss
+
+			#Model losses (regularization, KL divergence) are added once per effective batch, keras fit also reports them in the validation loss
+			if(model.losses):
+				loss+=tf.add_n(model.losses)
+
+			return loss*sample_fraction,output_losses,outputs
+
+		@tf.function(experimental_relax_shapes=True)
+		def micro_batch_step(x,y_list,sample_fraction):
+			with tf.GradientTape() as tape:
+				loss,output_losses,outputs=compute_loss(x,y_list,sample_fraction,True)
+
+			gradients=tape.gradient(loss,trainable_variables)
+			gradients=[tf.zeros_like(variable) if gradient is None else gradient for gradient,variable in zip(gradients,trainable_variables)]
+
+			return loss,output_losses,outputs,gradients
+
+		@tf.function(experimental_relax_shapes=True)
+		def validation_step(x,y_list,sample_fraction):
+			return compute_loss(x,y_list,sample_fraction,False)
+
+		@tf.function
+		def apply_step(gradients):
+			optimizer.apply_gradients(zip(gradients,trainable_variables))
+
+		train_samples=len(X_in)
+		test_samples=len(X_in_test)
+		history={'loss':[],'val_loss':[]}
+		best_val_loss=np.inf
+
+		print('Training with gradient accumulation, micro batch size: ',self.micro_batch_size,' effective batch size: ',self.effective_batch_size)
+
+		for epoch in range(self.epochs):
+
+			shuffled_index=np.random.permutation(train_samples)
+			epoch_loss=0.0
+
+			for batch_start in range(0,train_samples,self.effective_batch_size):
+				batch_index=shuffled_index[batch_start:batch_start+self.effective_batch_size]
+				accumulated_gradients=[tf.zeros_like(variable) for variable in trainable_variables]
+
+				for micro_start in range(0,len(batch_index),self.micro_batch_size):
+					#Sorted index for faster reads from memory mapped datasets
+					micro_index=np.sort(batch_index[micro_start:micro_start+self.micro_batch_size])
+					sample_fraction=tf.constant(len(micro_index)/len(batch_index),dtype=tf.float32)
+
+					x=tf.convert_to_tensor(X_in[micro_index],dtype=tf.float32)
+					y_list=[tf.convert_to_tensor(y_out[micro_index],dtype=tf.float32) for y_out in Y_out_list]
+
+					loss,output_losses,outputs,gradients=micro_batch_step(x,y_list,sample_fraction)
+					accumulated_gradients=[accumulated+gradient for accumulated,gradient in zip(accumulated_gradients,gradients)]
+					epoch_loss+=float(loss)*len(batch_index)/train_samples
+					self.update_metrics(train_metrics,train_loss_means,y_list,outputs,output_losses,len(micro_index))
+
+				apply_step(accumulated_gradients)
+
+			val_loss=0.0
+			for micro_start in range(0,test_samples,self.micro_batch_size):
+				micro_index=np.arange(micro_start,min(micro_start+self.micro_batch_size,test_samples))
+				sample_fraction=tf.constant(len(micro_index)/test_samples,dtype=tf.float32)
+
+				x=tf.convert_to_tensor(X_in_test[micro_index],dtype=tf.float32)
+				y_list=[tf.convert_to_tensor(y_out[micro_index],dtype=tf.float32) for y_out in Y_out_test_list]
+
+				loss,output_losses,outputs=validation_step(x,y_list,sample_fraction)
+				val_loss+=float(loss)
+				self.update_metrics(val_metrics,val_loss_means,y_list,outputs,output_losses,len(micro_index))
+
+			epoch_metrics={'loss':epoch_loss,'val_loss':val_loss}
+			epoch_metrics.update(self.get_epoch_metrics(model,train_metrics,train_loss_means))
+			epoch_metrics.update(self.get_epoch_metrics(model,val_metrics,val_loss_means,'val_'))
+
+			for metric_name,metric_value in epoch_metrics.items():
+				history.setdefault(metric_name,[]).append(metric_value)
+
+			print('Epoch ',epoch+1,'/',self.epochs,' '+' '.join([metric_name+': '+str(metric_value) for metric_name,metric_value in epoch_metrics.items()]))
+
+			if(val_loss<best_val_loss):
+				print('val_loss improved from ',best_val_loss,' to ',val_loss,' saving model weights to ',model_file_path)
+				best_val_loss=val_loss
+				model.save_weights(model_file_path)
+
+		return TrainHistory(history)
@@ -12,6 +12,32 @@ window.geometry('550x200')
 def deploy_model():
 	os.system('python -W ignore model_deployment.py')
 
+#Handles of the started server processes, a process is started again only if it has exited
+server_processes={}
+
+def start_process(script_name):
+	import subprocess
+
+	process=server_processes.get(script_name)
+
+	if(process is not None and process.poll() is None):
+		print(script_name,' is already running, process id: ',process.pid)
+		return
+
+	server_processes[script_name]=subprocess.Popen(['python','-W','ignore',script_name])
+
+def start_inference_server():
+	#The server keeps the model resident, requests are sent to it by the inference clients (refer inference_benchmark.py)
+	start_process('inference_server.py')
+
+def start_scan_watcher():
+	#The watcher deploys the model on the measurement files exported to the watch folder (refer scan_watcher.py)
+	start_process('scan_watcher.py')
+
 B=Button(window,text="Run Model",command= deploy_model)
 B.pack()
+S=Button(window,text="Start Inference Server",command= start_inference_server)
+S.pack()
+W=Button(window,text="Start Scan Watcher",command= start_scan_watcher)
+W.pack()
 window.mainloop()
\ No newline at end of file
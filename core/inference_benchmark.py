@@ -0,0 +1,132 @@
+""" The inference benchmark client measures the latency and throughput of the inference server (refer core/inference_server.py) for an increasing number of concurrent clients, each client sends single sample node deviation requests to the server
+The latency percentiles, throughput and mean micro-batch size of each concurrency level are saved to the deploy folder
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import json
+import time
+import pathlib
+import threading
+import urllib.request
+import numpy as np
+import pandas as pd
+
+def send_request(url,request_data):
+	"""Send a POST request to the inference server
+
+		:param url: url of the predict endpoint
+		:type url: str (required)
+
+		:param request_data: request, {"deviations": list} or {"measurement_file": str}
+		:type request_data: dict (required)
+
+		:returns: parsed response of the server
+		:rtype: dict
+	"""
+	request=urllib.request.Request(url,data=json.dumps(request_data).encode('utf-8'),headers={'Content-Type':'application/json'})
+
+	with urllib.request.urlopen(request) as response:
+		return json.loads(response.read().decode('utf-8'))
+
+def run_benchmark(url,request_data,concurrency,n_requests):
+	"""Send n_requests requests from concurrency client threads and measure the latency of each request
+
+		:param concurrency: number of concurrent clients
+		:type concurrency: int (required)
+
+		:param n_requests: total number of requests
+		:type n_requests: int (required)
+
+		:returns: benchmark summary of the concurrency level
+		:rtype: dict
+	"""
+	latencies=[]
+	batch_sizes=[]
+	errors=[]
+	lock=threading.Lock()
+
+	def client(client_requests):
+		for i in range(client_requests):
+			start_time=time.time()
+			try:
+				response=send_request(url,request_data)
+			except Exception as error:
+				with lock:
+					errors.append(str(error))
+				continue
+
+			with lock:
+				latencies.append((time.time()-start_time)*1000)
+				batch_sizes.append(response['batch_size'])
+
+	client_requests=[n_requests//concurrency+(1 if i<n_requests%concurrency else 0) for i in range(concurrency)]
+	clients=[threading.Thread(target=client,args=(requests,)) for requests in client_requests]
+
+	start_time=time.time()
+	for thread in clients:
+		thread.start()
+	for thread in clients:
+		thread.join()
+	total_time=time.time()-start_time
+
+	if(len(errors)>0):
+		print('Failed requests: ',len(errors),' first error: ',errors[0])
+
+	return {'concurrency':concurrency,'requests':len(latencies),'failed_requests':len(errors),
+			'throughput_rps':len(latencies)/total_time,'latency_mean_ms':np.mean(latencies),
+			'latency_p50_ms':np.percentile(latencies,50),'latency_p95_ms':np.percentile(latencies,95),
+			'latency_p99_ms':np.percentile(latencies,99),'mean_batch_size':np.mean(batch_sizes)}
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+
+	print('Parsing from Training Config File')
+
+	host=cftrain.inference_server_params['host']
+	port=cftrain.inference_server_params['port']
+	benchmark_concurrency=cftrain.inference_server_params['benchmark_concurrency']
+	benchmark_requests=cftrain.inference_server_params['benchmark_requests']
+
+	deploy_path='../trained_models/'+part_type+'/deploy'
+	pathlib.Path(deploy_path).mkdir(parents=True, exist_ok=True)
+
+	url='http://'+host+':'+str(port)+'/predict'
+
+	#The latency does not depend on the deviation values, a random sample is used for all requests
+	request_data={'deviations':np.random.normal(0,0.5,size=(point_dim,voxel_channels)).tolist()}
+
+	print('Warm up request')
+	send_request(url,request_data)
+
+	benchmark_results=[]
+
+	for concurrency in benchmark_concurrency:
+		print('Benchmarking with concurrent clients: ',concurrency)
+		benchmark_results.append(run_benchmark(url,request_data,concurrency,benchmark_requests))
+
+	benchmark_df=pd.DataFrame(benchmark_results)
+	benchmark_df.to_csv(deploy_path+'/inference_server_benchmark.csv')
+
+	print('Inference Server Benchmark')
+	print(benchmark_df)
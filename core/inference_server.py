@@ -0,0 +1,343 @@
+""" The inference server keeps a trained model (refer model_deployment.DeployModel) and the voxel mapping index resident and serves KCC estimates over HTTP, the concurrent requests are coalesced into micro-batches so that a single model prediction is made for all the requests received within a maximum latency window
+The server accepts node deviations ({"deviations": [nodes*channels] or [samples*nodes*channels]}) or the path of a measurement file ({"measurement_file": path}) as a POST request to /predict, the model is selected with the optional "part_type", "model_type" and "version" fields of the request (refer core/model_registry.py), the benchmark client is core/inference_benchmark.py
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import json
+import time
+import queue
+import threading
+import numpy as np
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+class NodeVoxelizer:
+	"""Node Voxelizer Class, the occupied voxels of the mapping index are computed once and the node deviations of each request are voxelized with vectorized indexing (refer data_import.GetTrainData.node_to_voxel)
+
+		:param point_index: mapping index
+		:type point_index: numpy.array [nodes*3] (required)
+
+		:param voxel_dim: The voxel dimension of the grid
+		:type voxel_dim: int (required)
+	"""
+	def __init__(self,point_index,voxel_dim):
+		from data_import import GetTrainData
+
+		self.get_data=GetTrainData()
+		self.voxel_dim=voxel_dim
+		self.point_dim=len(point_index)
+		self.occupied_voxels,self.node_voxel_index=self.get_data.get_occupied_voxels(point_index)
+
+	def voxelize(self,node_data):
+		"""Voxelize the node deviations, the deviation of each voxel is the maximum absolute deviation of the nodes mapped to it (same as data_import.GetTrainData.data_convert_voxel_mc)
+
+			:param node_data: node deviations
+			:type node_data: numpy.array [samples*nodes*channels] (required)
+
+			:returns: voxel_data, voxelized data
+			:rtype: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*channels]
+		"""
+		sparse_data=np.zeros((node_data.shape[0],len(self.occupied_voxels),node_data.shape[-1]))
+
+		for channel in range(node_data.shape[-1]):
+			sparse_data[:,:,channel]=self.get_data.node_to_sparse(node_data[:,:,channel],self.node_voxel_index,len(self.occupied_voxels))
+
+		return self.get_data.sparse_to_voxel(sparse_data,self.occupied_voxels,self.voxel_dim)
+
+class MicroBatcher:
+	"""Micro Batcher Class, the requests are queued and a worker thread makes a single model prediction for all the requests received within the latency window (or until the batch is full), the result of each request is returned to the waiting request thread
+
+		:param predict_function: prediction function of the model (refer model_registry.RegistryEntry.predict)
+		:type predict_function: function (required)
+
+		:param max_batch_size: Maximum number of samples of a micro-batch
+		:type max_batch_size: int (required)
+
+		:param max_latency_ms: Maximum time the first request of a micro-batch waits for other requests in milliseconds
+		:type max_latency_ms: float (required)
+	"""
+	def __init__(self,predict_function,max_batch_size,max_latency_ms):
+		self.predict_function=predict_function
+		self.max_batch_size=max_batch_size
+		self.max_latency_ms=max_latency_ms
+		self.request_queue=queue.Queue()
+		self.batch_count=0
+		self.sample_count=0
+
+		self.worker=threading.Thread(target=self.run_worker,daemon=True)
+		self.worker.start()
+
+	def submit(self,voxel_data):
+		"""Submit the voxelized input of a request and wait for the result
+
+			:param voxel_data: voxelized input of the request
+			:type voxel_data: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:returns: model estimates of the request and the size of the micro-batch it was predicted in
+			:rtype: numpy.array [samples*assembly_kccs],int
+		"""
+		request={'voxel_data':voxel_data,'done':threading.Event(),'result':None,'error':None,'batch_size':0}
+		self.request_queue.put(request)
+		request['done'].wait()
+
+		if(request['error'] is not None):
+			raise request['error']
+
+		return request['result'],request['batch_size']
+
+	def get_batch(self):
+		"""Block until a request is received and collect the requests received within the latency window
+		"""
+		batch=[self.request_queue.get()]
+		batch_samples=len(batch[0]['voxel_data'])
+		deadline=time.time()+self.max_latency_ms/1000
+
+		while(batch_samples<self.max_batch_size):
+			timeout=deadline-time.time()
+
+			if(timeout<=0):
+				break
+			try:
+				request=self.request_queue.get(timeout=timeout)
+			except queue.Empty:
+				break
+
+			batch.append(request)
+			batch_samples=batch_samples+len(request['voxel_data'])
+
+		return batch
+
+	def run_worker(self):
+		"""Worker thread, a single model prediction is made for each micro-batch, the model is only called from this thread
+		"""
+		while True:
+			batch=self.get_batch()
+			batch_size=int(np.sum([len(request['voxel_data']) for request in batch]))
+
+			try:
+				y_pred=self.predict_function(np.concatenate([request['voxel_data'] for request in batch],axis=0))
+			except Exception as error:
+				for request in batch:
+					request['error']=error
+					request['done'].set()
+				continue
+
+			self.batch_count=self.batch_count+1
+			self.sample_count=self.sample_count+batch_size
+
+			start_index=0
+			for request in batch:
+				end_index=start_index+len(request['voxel_data'])
+				request['result']=y_pred[start_index:end_index]
+				request['batch_size']=batch_size
+				request['done'].set()
+				start_index=end_index
+
+class InferenceService:
+	"""Inference Service Class, the models and their mapping indices are kept resident by the model registry (refer model_registry.ModelRegistry), each model has its own micro batcher
+
+		:param model_registry: registry of the models of the registered parts
+		:type model_registry: ModelRegistry (required)
+
+		:param default_key: (part type, model type, version) used when the request does not specify the model
+		:type default_key: tuple (required)
+
+		:param max_batch_size: Maximum number of samples of a micro-batch
+		:type max_batch_size: int (required)
+
+		:param max_latency_ms: Maximum time a request waits for other requests in milliseconds
+		:type max_latency_ms: float (required)
+	"""
+	def __init__(self,model_registry,default_key,max_batch_size,max_latency_ms):
+		from wls400a_system import GetInferenceData
+
+		self.model_registry=model_registry
+		self.default_key=tuple(default_key)
+		self.max_batch_size=max_batch_size
+		self.max_latency_ms=max_latency_ms
+		self.get_inference_data=GetInferenceData()
+		self.batchers={}
+		self.lock=threading.Lock()
+
+		#Load and warm up the default model so that the first request is not slow
+		self.model_registry.get(*self.default_key)
+
+	def get_key(self,request_data):
+		"""Model key of the request, the fields not given in the request are taken from the default key
+		"""
+		return (request_data.get('part_type',self.default_key[0]),request_data.get('model_type',self.default_key[1]),int(request_data.get('version',self.default_key[2])))
+
+	def get_batcher(self,key):
+		"""Micro batcher of the model key, the model is retrieved from the registry for each micro-batch so that evicted models are reloaded
+		"""
+		with self.lock:
+			if(key not in self.batchers):
+				self.batchers[key]=MicroBatcher(lambda X_in: self.model_registry.get(*key).predict(X_in),self.max_batch_size,self.max_latency_ms)
+
+			return self.batchers[key]
+
+	def get_node_data(self,request_data,voxelizer,voxel_channels):
+		"""Convert the request to node deviations
+
+			:param request_data: parsed request, {"deviations": list} or {"measurement_file": str}
+			:type request_data: dict (required)
+
+			:param voxelizer: voxelizer of the model of the request
+			:type voxelizer: NodeVoxelizer (required)
+
+			:param voxel_channels: The number of deviation channels of the model input
+			:type voxel_channels: int (required)
+
+			:returns: node deviations
+			:rtype: numpy.array [samples*nodes*channels]
+		"""
+		if('measurement_file' in request_data):
+			measurement_data=self.get_inference_data.load_measurement_file(request_data['measurement_file'])
+			node_data=self.get_inference_data.data_pre_processing(measurement_data,voxel_channels)
+		elif('deviations' in request_data):
+			node_data=np.asarray(request_data['deviations'],dtype=float)
+		else:
+			raise ValueError('Request should contain deviations or measurement_file')
+
+		if(node_data.ndim==2):
+			node_data=node_data[np.newaxis,:,:]
+
+		if(node_data.ndim!=3 or node_data.shape[1]!=voxelizer.point_dim or node_data.shape[2]!=voxel_channels):
+			raise ValueError('Expected deviations of shape [samples*'+str(voxelizer.point_dim)+'*'+str(voxel_channels)+'], received '+str(node_data.shape))
+
+		return node_data
+
+	def predict(self,request_data):
+		"""Voxelize the request and predict the KCCs in the next micro-batch of the model of the request
+
+			:param request_data: parsed request, {"deviations": list} or {"measurement_file": str}, optionally with "part_type", "model_type" and "version"
+			:type request_data: dict (required)
+
+			:returns: response with the KCC estimates of each sample
+			:rtype: dict
+		"""
+		start_time=time.time()
+
+		key=self.get_key(request_data)
+		entry=self.model_registry.get(*key)
+
+		voxel_data=entry.voxelizer.voxelize(self.get_node_data(request_data,entry.voxelizer,entry.voxel_channels))
+		y_pred,batch_size=self.get_batcher(key).submit(voxel_data)
+
+		return {'kcc_estimates':y_pred.tolist(),'batch_size':batch_size,'model':list(key),'latency_ms':(time.time()-start_time)*1000}
+
+	def get_status(self):
+		"""Status of the service, number of micro-batches and samples predicted so far by each model and the status of the registry
+		"""
+		with self.lock:
+			batchers=[{'model':list(key),'batches':batcher.batch_count,'samples':batcher.sample_count} for key,batcher in self.batchers.items()]
+
+		return {'status':'ok','batchers':batchers,'registry':self.model_registry.get_status()}
+
+class ThreadedHTTPServer(ThreadingMixIn,HTTPServer):
+	"""HTTP server handling each request in a separate thread, the requests are coalesced by the micro batcher
+	"""
+	daemon_threads=True
+
+def get_request_handler(inference_service):
+	"""Build the request handler class of the server for the given inference service
+
+		:param inference_service: resident inference service
+		:type inference_service: InferenceService (required)
+	"""
+	class InferenceRequestHandler(BaseHTTPRequestHandler):
+
+		def send_json(self,status_code,response):
+			response_body=json.dumps(response).encode('utf-8')
+			self.send_response(status_code)
+			self.send_header('Content-Type','application/json')
+			self.send_header('Content-Length',str(len(response_body)))
+			self.end_headers()
+			self.wfile.write(response_body)
+
+		def do_GET(self):
+			if(self.path=='/health'):
+				self.send_json(200,inference_service.get_status())
+			else:
+				self.send_json(404,{'error':'Unknown path '+self.path})
+
+		def do_POST(self):
+			if(self.path!='/predict'):
+				self.send_json(404,{'error':'Unknown path '+self.path})
+				return
+
+			try:
+				content_length=int(self.headers.get('Content-Length',0))
+				request_data=json.loads(self.rfile.read(content_length).decode('utf-8'))
+				response=inference_service.predict(request_data)
+			except (ValueError,KeyError) as error:
+				self.send_json(400,{'error':str(error)})
+				return
+			except Exception as error:
+				self.send_json(500,{'error':str(error)})
+				return
+
+			self.send_json(200,response)
+
+		def log_message(self,format,*args):
+			#Request logging is disabled, the per request logging dominates the latency at small batch sizes
+			return
+
+	return InferenceRequestHandler
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	from model_registry import ModelRegistry
+
+	print("Welcome to Deep Learning for Manufacturing (dlmfg)...")
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+
+	print('Parsing from Training Config File')
+
+	host=cftrain.inference_server_params['host']
+	port=cftrain.inference_server_params['port']
+	default_model_type=cftrain.inference_server_params['model_type']
+	max_batch_size=cftrain.inference_server_params['max_batch_size']
+	max_latency_ms=cftrain.inference_server_params['max_latency_ms']
+
+	model_files=cftrain.model_registry_params['model_files']
+	memory_cap_mb=cftrain.model_registry_params['memory_cap_mb']
+	part_configs=cftrain.model_registry_params['part_configs']
+
+	model_registry=ModelRegistry(model_files,memory_cap_mb,batch_sizes=cftrain.compiled_predict_params['batch_sizes'],xla=cftrain.compiled_predict_params['xla'])
+	model_registry.register_part(config.assembly_system)
+
+	for part_config in part_configs:
+		model_registry.register_part_config(part_config)
+
+	print('Loading Model and Mapping Index....')
+	inference_service=InferenceService(model_registry,(part_type,default_model_type,0),max_batch_size,max_latency_ms)
+
+	server=ThreadedHTTPServer((host,port),get_request_handler(inference_service))
+	print('Inference server listening on http://'+host+':'+str(port)+'/predict')
+
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		print('Stopping inference server')
+		server.server_close()
@@ -0,0 +1,338 @@
+""" Contains the training runs of the data study and dynamic adaptive training, the runs are executed in isolated worker processes by the run executor (refer utilities/run_executor.py), each run loads the memory mapped datasets, builds and trains a model, evaluates it and returns only the metrics and the paths of the trained model
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+sys.path.append("../transfer_learning")
+
+#Importing Required Modules
+import pathlib
+import numpy as np
+
+from run_executor import load_shared_dataset
+
+def build_transfer_model(model_params):
+	"""Builds the transfer learning model based on the transfer learning parameters
+
+		:param model_params: model parameters, refer data_study_run
+		:type model_params: dict (required)
+	"""
+	from tl_core import TransferLearning
+
+	tl_type=model_params['tl_type']
+	transfer_learning=TransferLearning(tl_type,model_params['tl_base'],model_params['tl_app'],model_params['model_type'],model_params['output_dimension'],model_params['optimizer'],model_params['loss_func'],model_params['regularizer_coeff'],model_params['output_type'])
+	base_model=transfer_learning.get_trained_model()
+
+	print(base_model.summary())
+
+	transfer_model=transfer_learning.build_transfer_model(base_model)
+
+	if(tl_type=='full_fine_tune'):
+		model=transfer_learning.full_fine_tune(transfer_model)
+
+	if(tl_type=='variable_lr'):
+		model=transfer_learning.set_variable_learning_rates(transfer_model,model_params['conv_layer_m'],model_params['dense_layer_m'])
+
+	if(tl_type=='feature_extractor'):
+		model=transfer_learning.set_fixed_train_params(transfer_model)
+
+	return model
+
+def data_study_run(run_params):
+	"""Single data study run, trains the model on the first train_dim samples and tests it on the test dataset
+
+		:param run_params: parameters of the run
+			run_id, train_dim: Run id and number of training samples
+			input_conv_path, kcc_path, input_conv_test_path, kcc_test_path: paths of the shared datasets
+			model_params: model_type, output_dimension, optimizer, loss_func, regularizer_coeff, output_type, voxel_dim, voxel_channels, tl_flag and transfer learning parameters
+			train_params: batch_size, epocs, split_ratio, activate_tensorboard
+			train_path, model_path, logs_path, plots_path, deployment_path: file structure
+		:type run_params: dict (required)
+
+		:returns: validation metrics, test metrics and the path of the trained model
+		:rtype: dict
+	"""
+	from tensorflow.keras import backend as K
+	from core_model import DLModel
+	from model_train import TrainModel
+	from model_deployment import DeployModel
+	from metrics_eval import MetricsEval
+
+	run_id=run_params['run_id']
+	train_dim=run_params['train_dim']
+	model_params=run_params['model_params']
+	train_params=run_params['train_params']
+	logs_path=run_params['logs_path']
+
+	input_conv_data=load_shared_dataset(run_params['input_conv_path'])
+	kcc_subset_dump=load_shared_dataset(run_params['kcc_path'])
+	input_conv_data_test=load_shared_dataset(run_params['input_conv_test_path'])
+	kcc_subset_dump_test=load_shared_dataset(run_params['kcc_test_path'])
+
+	print('Building 3D CNN model')
+
+	if(model_params['tl_flag']==0):
+		dl_model=DLModel(model_params['model_type'],model_params['output_dimension'],model_params['optimizer'],model_params['loss_func'],model_params['regularizer_coeff'],model_params['output_type'])
+		model=dl_model.resnet_3d_cnn(model_params['voxel_dim'],model_params['voxel_channels'])
+
+	if(model_params['tl_flag']==1):
+		model=build_transfer_model(model_params)
+
+	print(model.summary())
+
+	print("Conducting data study study on :",train_dim, " samples")
+	input_conv_subset=np.asarray(input_conv_data[0:train_dim,:,:,:,:])
+	kcc_subset=np.asarray(kcc_subset_dump[0:train_dim,:])
+
+	train_model=TrainModel(train_params['batch_size'],train_params['epocs'],train_params['split_ratio'])
+	trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,input_conv_subset,kcc_subset,run_params['model_path'],logs_path,run_params['plots_path'],train_params['activate_tensorboard'],run_id)
+
+	file_name='metrics_data_study_'+str(train_dim)+'_.csv'
+	accuracy_metrics_df.to_csv(logs_path+'/'+file_name)
+	print("Model Training Complete on samples :",train_dim)
+	print("The Model Validation Metrics are ")
+	print(eval_metrics)
+
+	#Inferring on test dataset
+	deploy_model=DeployModel()
+	metrics_eval=MetricsEval()
+	model_test_path=run_params['model_path']+'/trained_model_'+str(run_id)+'.h5'
+	inference_model=deploy_model.get_model(model_test_path)
+	y_pred=deploy_model.model_inference(np.asarray(input_conv_data_test),inference_model,run_params['deployment_path']);
+	eval_metrics_test,accuracy_metrics_df_test=metrics_eval.metrics_eval_base(y_pred,np.asarray(kcc_subset_dump_test),logs_path,run_id)
+
+	file_name='test_metrics_data_study_'+str(train_dim)+'_.csv'
+	accuracy_metrics_df_test.to_csv(logs_path+'/'+file_name)
+	print("Model Testing Complete on samples :",train_dim)
+	print("The Model Test Metrics are ")
+	print(eval_metrics_test)
+	K.clear_session()
+
+	run_result={
+		'eval_metrics':eval_metrics,
+		'eval_metrics_test':eval_metrics_test,
+		'model_file_path':model_test_path
+	}
+
+	return run_result
+
+def adaptive_run(run_params):
+	"""Single dynamic adaptive training run, trains the model on the combined adaptive samples, estimates the uncertainty on the validation dataset (Bayesian models) to be used for the next sampling step and tests the model on the test dataset
+
+		:param run_params: parameters of the run
+			run_id, train_dim: Run id and number of training samples
+			input_conv_path, kcc_path, input_conv_validate_path, kcc_validate_path, input_conv_test_path, kcc_test_path: paths of the shared datasets
+			model_params: model_type, learning_type, output_dimension, optimizer, loss_func, regularizer_coeff, output_type, voxel_dim, voxel_channels, transfer learning parameters and initial_weights_path (weights of the previous run for incremental training, None to train from scratch)
+			train_params: batch_size, epocs, split_ratio, activate_tensorboard
+			mc_chunk_size: Monte Carlo draws per chunk of the Bayesian model inference (refer mc_inference.py)
+			pred_plots: Flag to plot the prediction distribution of each sample and KCC of the Bayesian model inference, the plot tasks are returned to the parent process (refer uncertainty_viz.DeferredPlotter)
+			checkpoint_params: resume_flag, checkpoint_freq, max_to_keep, manifest_path, checkpoint_path, config_hash
+			model_path, logs_path, plots_path, deployment_path: file structure
+		:type run_params: dict (required)
+
+		:returns: test metrics, validation predictions and uncertainty and prediction distribution plot tasks (Bayesian models) and the path of the trained model
+		:rtype: dict
+	"""
+	from tensorflow.keras import backend as K
+	from metrics_eval import MetricsEval
+	from run_state import RunStateManifest, TrainingCheckpoint
+	from uncertainty_viz import DeferredPlotter
+
+	run_id=run_params['run_id']
+	train_dim=run_params['train_dim']
+	model_params=run_params['model_params']
+	train_params=run_params['train_params']
+	checkpoint_params=run_params['checkpoint_params']
+	mc_chunk_size=run_params['mc_chunk_size']
+	pred_plots=run_params['pred_plots']
+	model_path=run_params['model_path']
+	logs_path=run_params['logs_path']
+	plots_path=run_params['plots_path']
+
+	model_type=model_params['model_type']
+	voxel_dim=model_params['voxel_dim']
+	voxel_channels=model_params['voxel_channels']
+
+	combined_conv_data=load_shared_dataset(run_params['input_conv_path'])
+	combined_kcc_data=load_shared_dataset(run_params['kcc_path'])
+	input_conv_data_test=np.asarray(load_shared_dataset(run_params['input_conv_test_path']))
+	kcc_subset_dump_test=np.asarray(load_shared_dataset(run_params['kcc_test_path']))
+
+	run_manifest=None
+	if(checkpoint_params['resume_flag']==1):
+		run_manifest=RunStateManifest(checkpoint_params['manifest_path'],config_hash=checkpoint_params['config_hash'])
+
+	metrics_eval=MetricsEval()
+
+	run_result={
+		'y_pred_validate':None,
+		'y_std_validate':None,
+		'plot_tasks':[]
+	}
+
+	plotter=DeferredPlotter()
+
+	if(model_type=='Bayesian 3D Convolution Neural Network'):
+
+		from core_model_bayes import Bayes_DLModel
+		from model_train_bayes import BayesTrainModel
+		from bayes_model_deployment import BayesDeployModel
+
+		dl_model=Bayes_DLModel(model_type,model_params['output_dimension'],model_params['optimizer'],model_params['loss_func'],model_params['regularizer_coeff'],model_params['output_type'])
+		model=dl_model.bayes_cnn_model_3d(voxel_dim,voxel_channels)
+		model_file_path=model_path+'/Bayes_trained_model_'+str(run_id)
+
+		if(model_params['initial_weights_path'] is not None):
+			model.load_weights(model_params['initial_weights_path'])
+
+		print('Model summary used for training')
+		print(model.summary())
+
+		checkpoint=None
+		if(checkpoint_params['resume_flag']==1):
+			checkpoint=TrainingCheckpoint(model,checkpoint_params['checkpoint_path']+'/run_'+str(run_id),run_manifest,run_id,model_file_path,checkpoint_params['checkpoint_freq'],checkpoint_params['max_to_keep'])
+
+		train_model=BayesTrainModel(train_params['batch_size'],train_params['epocs'],train_params['split_ratio'])
+		trained_model=train_model.run_train_model(model,combined_conv_data,combined_kcc_data,model_path,logs_path,plots_path,train_params['activate_tensorboard'],run_id,checkpoint=checkpoint)
+		print('Training Complete')
+
+		print('Sampling using trained model...')
+
+		input_conv_data_validate=np.asarray(load_shared_dataset(run_params['input_conv_validate_path']))
+		kcc_subset_dump_validate=np.asarray(load_shared_dataset(run_params['kcc_validate_path']))
+
+		deploy_model=BayesDeployModel()
+		model=dl_model.bayes_cnn_model_3d(voxel_dim,voxel_channels)
+		inference_model=deploy_model.get_model(model,model_file_path,voxel_dim,voxel_channels)
+
+		y_pred=np.zeros_like(kcc_subset_dump_validate)
+
+		plots_path_validate=plots_path+'/validation_sampling'
+		pathlib.Path(plots_path_validate).mkdir(parents=True, exist_ok=True)
+
+		y_pred_validate,y_std_validate,y_aleatoric_std=deploy_model.model_inference(input_conv_data_validate,inference_model,y_pred,kcc_subset_dump_validate,plots_path_validate,epistemic_samples=1000,run_id=run_id,chunk_size=mc_chunk_size,pred_plots=pred_plots,plotter=plotter)
+
+		std_file_path=logs_path+'/'+'uncertainty_validate_'+str(run_id)+'_.csv'
+		np.savetxt(std_file_path, y_std_validate, delimiter=",")
+
+		pred_file_path=logs_path+'/'+'predictions_validate_'+str(run_id)+'_.csv'
+		np.savetxt(pred_file_path, y_pred_validate, delimiter=",")
+
+		run_result['y_pred_validate']=y_pred_validate
+		run_result['y_std_validate']=y_std_validate
+
+		print('Inferencing from trained model...')
+
+		plots_path_test=plots_path+'/test'
+		pathlib.Path(plots_path_test).mkdir(parents=True, exist_ok=True)
+		y_pred=np.zeros_like(kcc_subset_dump_test)
+		y_pred,y_std,y_aleatoric_std=deploy_model.model_inference(input_conv_data_test,inference_model,y_pred,kcc_subset_dump_test,plots_path_test,epistemic_samples=1000,run_id=run_id,chunk_size=mc_chunk_size,pred_plots=pred_plots,plotter=plotter)
+		eval_metrics_test,accuracy_metrics_df_test=metrics_eval.metrics_eval_base(y_pred,kcc_subset_dump_test,logs_path,run_id)
+
+		std_file_path=logs_path+'/'+'uncertainty_test_'+str(run_id)+'_.csv'
+		np.savetxt(std_file_path, y_std, delimiter=",")
+
+		pred_file_path=logs_path+'/'+'predictions_test_'+str(run_id)+'_.csv'
+		np.savetxt(pred_file_path, y_pred, delimiter=",")
+
+		run_result['plot_tasks']=plotter.plot_tasks
+
+	if(model_type=='3D Convolution Neural Network'):
+
+		from core_model import DLModel
+		from model_train import TrainModel
+		from model_deployment import DeployModel
+
+		if(model_params['learning_type']=='Basic'):
+			dl_model=DLModel(model_type,model_params['output_dimension'],model_params['optimizer'],model_params['loss_func'],model_params['regularizer_coeff'],model_params['output_type'])
+			model=dl_model.cnn_model_3d(voxel_dim,voxel_channels)
+
+		if(model_params['learning_type']=='Transfer Learning'):
+			model=build_transfer_model(model_params)
+
+		model_file_path=model_path+'/trained_model_'+str(run_id)+'.h5'
+
+		if(model_params['initial_weights_path'] is not None):
+			model.load_weights(model_params['initial_weights_path'])
+
+		print('Model summary used for training')
+		print(model.summary())
+
+		checkpoint=None
+		if(checkpoint_params['resume_flag']==1):
+			checkpoint=TrainingCheckpoint(model,checkpoint_params['checkpoint_path']+'/run_'+str(run_id),run_manifest,run_id,model_file_path,checkpoint_params['checkpoint_freq'],checkpoint_params['max_to_keep'])
+
+		train_model=TrainModel(train_params['batch_size'],train_params['epocs'],train_params['split_ratio'])
+		trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,combined_conv_data,combined_kcc_data,model_path,logs_path,plots_path,train_params['activate_tensorboard'],run_id,checkpoint=checkpoint)
+
+		print('Inferencing from trained model...')
+
+		deploy_model=DeployModel()
+		inference_model=deploy_model.get_model(model_file_path)
+		y_pred=deploy_model.model_inference(input_conv_data_test,inference_model,run_params['deployment_path']);
+		eval_metrics_test,accuracy_metrics_df_test=metrics_eval.metrics_eval_base(y_pred,kcc_subset_dump_test,logs_path,run_id)
+
+	print('Training complete for run: ',run_id)
+
+	file_name='test_metrics_dynamic_train_'+str(run_id)+'_.csv'
+	accuracy_metrics_df_test.to_csv(logs_path+'/'+file_name)
+	print("Model Testing Complete on samples :",train_dim)
+	print("The Model Test Metrics are ")
+	print(eval_metrics_test)
+	K.clear_session()
+
+	run_result['eval_metrics_test']=eval_metrics_test
+	run_result['model_file_path']=model_file_path
+
+	return run_result
+
+def multi_stage_run(run_params):
+	"""Single run of the multi stage sensor optimization, trains the multi head model on the data sources (sensor locations) selected so far and evaluates it on the test data of the data sources
+
+		:param run_params: parameters of the run
+			x_in_paths, x_test_paths: paths of the shared train and test datasets of each data source (one per model head)
+			y_out_path, y_test_path: paths of the shared train and test process parameters
+			model_params: model_type, output_dimension, voxel_dim, voxel_channels
+			train_params: batch_size, epocs, split_ratio, activate_tensorboard
+			model_path, logs_path, plots_path: file structure
+		:type run_params: dict (required)
+
+		:returns: validation metrics of the trained model
+		:rtype: dict
+	"""
+	from tensorflow.keras import backend as K
+	from multi_head_model import Multi_Head_DLModel
+	from multi_head_train import Multi_Head_TrainModel
+
+	model_params=run_params['model_params']
+	train_params=run_params['train_params']
+
+	x_in=[np.asarray(load_shared_dataset(path)) for path in run_params['x_in_paths']]
+	x_test=[np.asarray(load_shared_dataset(path)) for path in run_params['x_test_paths']]
+	y_out=np.asarray(load_shared_dataset(run_params['y_out_path']))
+	y_test=np.asarray(load_shared_dataset(run_params['y_test_path']))
+
+	dl_model=Multi_Head_DLModel(model_params['model_type'],len(x_in),model_params['output_dimension'])
+	model=dl_model.multi_head_shared_standard_cnn_model_3d(model_params['voxel_dim'],model_params['voxel_channels'])
+
+	train_model=Multi_Head_TrainModel(train_params['batch_size'],train_params['epocs'],train_params['split_ratio'])
+	trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,x_in,y_out,x_test,y_test,run_params['model_path'],run_params['logs_path'],run_params['plots_path'],train_params['activate_tensorboard'])
+	K.clear_session()
+
+	run_result={
+		'eval_metrics':eval_metrics,
+		'accuracy_metrics_df':accuracy_metrics_df,
+		'model_file_path':run_params['model_path']+'/trained_model_0.h5'
+	}
+
+	return run_result
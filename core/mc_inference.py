@@ -0,0 +1,191 @@
+""" Contains classes and methods for chunked Monte Carlo inference of the Bayesian models, the samples and the Monte Carlo draws are tiled into chunks of bounded size so that the replicated input of all the draws of a sample is never materialised
+The mean and standard deviation of each output are computed with streaming (Welford) accumulators, the draws of the outputs (not the inputs) are optionally kept to compute the inter quartile range and plot the prediction distributions
+The adaptive sampler draws the samples of a scan in small batches and stops when the standard deviation estimates converge, the number of draws of each scan is reported to trade latency against the precision of the uncertainty estimates
+"""
+
+import numpy as np
+
+class StreamingMoments:
+	"""Streaming Moments Class, running count, mean and sum of squared deviations of each output of each sample, the chunks are merged with the parallel variant of Welford's algorithm (Chan et al.)
+
+		:param n_samples: number of samples
+		:type n_samples: int (required)
+
+		:param n_outputs: number of outputs of each sample
+		:type n_outputs: int (required)
+	"""
+	def __init__(self,n_samples,n_outputs):
+		self.count=np.zeros(n_samples)
+		self.mean=np.zeros((n_samples,n_outputs))
+		self.m2=np.zeros((n_samples,n_outputs))
+
+	def update(self,sample_index,values):
+		"""Merge the draws of a chunk into the accumulators
+
+			:param sample_index: sample of each draw of the chunk, the draws of a sample are contiguous
+			:type sample_index: numpy.array [draws] (required)
+
+			:param values: outputs of each draw of the chunk
+			:type values: numpy.array [draws*n_outputs] (required)
+		"""
+		samples,starts,counts=np.unique(sample_index,return_index=True,return_counts=True)
+
+		batch_mean=np.add.reduceat(values,starts,axis=0)/counts[:,None]
+		batch_m2=np.add.reduceat((values-np.repeat(batch_mean,counts,axis=0))**2,starts,axis=0)
+
+		count_a=self.count[samples][:,None]
+		count_b=counts[:,None]
+		count=count_a+count_b
+		delta=batch_mean-self.mean[samples]
+
+		self.mean[samples]=self.mean[samples]+delta*count_b/count
+		self.m2[samples]=self.m2[samples]+batch_m2+delta**2*count_a*count_b/count
+		self.count[samples]=count[:,0]
+
+	def get_mean(self):
+		"""Mean of each output of each sample
+		"""
+		return self.mean
+
+	def get_std(self,ddof=1):
+		"""Standard deviation of each output of each sample, sample standard deviation by default (same as numpy.std(ddof=1))
+		"""
+		return np.sqrt(self.m2/np.maximum(self.count-ddof,1)[:,None])
+
+class ChunkedMCInference:
+	"""Chunked Monte Carlo Inference Class
+
+		:param chunk_size: Maximum number of draws (replicated samples) of a forward pass, bounds the memory of the replicated input to chunk_size samples
+		:type chunk_size: int (required)
+	"""
+	def __init__(self,chunk_size):
+		self.chunk_size=chunk_size
+
+	def run(self,draw_function,inference_data,epistemic_samples,keep_draws=1):
+		"""Run epistemic_samples stochastic forward passes of each sample of inference_data in chunks
+
+			:param draw_function: function of the input chunk returning the list of outputs of each draw, for example the mean and standard deviation of the output distribution (refer bayes_model_deployment.BayesDeployModel.model_inference)
+			:type draw_function: function (required)
+
+			:param inference_data: Unknown dataset having same structure as the train dataset
+			:type inference_data: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param epistemic_samples: Number of Monte Carlo draws of each sample
+			:type epistemic_samples: int (required)
+
+			:param keep_draws: Flag to keep the draws of each output to compute the inter quartile range and plot the prediction distributions, defaults to 1
+			:type keep_draws: int
+
+			:returns: list of dict of each output of draw_function with mean, std, iqr and draws [samples*epistemic_samples*n_outputs] (iqr and draws are None if keep_draws is 0)
+			:rtype: list
+		"""
+		n_samples=len(inference_data)
+		total_draws=n_samples*epistemic_samples
+
+		moments=None
+		draws=None
+
+		for start_index in range(0,total_draws,self.chunk_size):
+			draw_index=np.arange(start_index,min(start_index+self.chunk_size,total_draws))
+			sample_index=draw_index//epistemic_samples
+
+			outputs=draw_function(inference_data[sample_index])
+			outputs=[np.asarray(output).reshape(len(draw_index),-1) for output in outputs]
+
+			if(moments is None):
+				moments=[StreamingMoments(n_samples,output.shape[1]) for output in outputs]
+
+				if(keep_draws==1):
+					draws=[np.zeros((n_samples,epistemic_samples,output.shape[1]),dtype=np.float32) for output in outputs]
+
+			for k,output in enumerate(outputs):
+				moments[k].update(sample_index,output)
+
+				if(keep_draws==1):
+					draws[k][sample_index,draw_index%epistemic_samples]=output
+
+		mc_results=[]
+
+		for k in range(len(moments)):
+			output_result={'mean':moments[k].get_mean(),'std':moments[k].get_std(),'iqr':None,'draws':None}
+
+			if(keep_draws==1):
+				output_result['iqr']=np.percentile(draws[k],75,axis=1)-np.percentile(draws[k],25,axis=1)
+				output_result['draws']=draws[k]
+
+			mc_results.append(output_result)
+
+		return mc_results
+
+class AdaptiveMCSampler:
+	"""Adaptive Monte Carlo Sampler Class, the draws of a scan are made in small batches and the sampling is stopped when the running standard deviation of all the monitored outputs changes by less than the tolerance (relative, with an absolute floor) between consecutive batches, or when the hard cap is reached
+
+		:param batch_draws: Number of draws of each batch (replicated copies of the scan in a forward pass)
+		:type batch_draws: int (required)
+
+		:param min_draws: Minimum number of draws before the convergence is checked
+		:type min_draws: int (required)
+
+		:param max_draws: Maximum number of draws of a scan (hard cap)
+		:type max_draws: int (required)
+
+		:param tolerance: Relative change of the running standard deviation between consecutive batches below which the estimate is considered converged
+		:type tolerance: float (required)
+
+		:param abs_tolerance: Absolute change of the running standard deviation below which the estimate is considered converged, used for outputs whose standard deviation is close to zero, defaults to 1e-4
+		:type abs_tolerance: float
+	"""
+	def __init__(self,batch_draws,min_draws,max_draws,tolerance,abs_tolerance=1e-4):
+		self.batch_draws=batch_draws
+		self.min_draws=min_draws
+		self.max_draws=max_draws
+		self.tolerance=tolerance
+		self.abs_tolerance=abs_tolerance
+
+	def sample(self,draw_function,inference_sample,monitor_outputs=[0]):
+		"""Draw batches of Monte Carlo samples of a scan until the standard deviation of the monitored outputs converges
+
+			:param draw_function: function of the input batch returning the list of outputs of each draw (refer ChunkedMCInference.run)
+			:type draw_function: function (required)
+
+			:param inference_sample: voxelized scan
+			:type inference_sample: numpy.array [voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param monitor_outputs: index of the outputs of draw_function whose standard deviation is monitored, defaults to [0]
+			:type monitor_outputs: list
+
+			:returns: list of the draws of each output of draw_function [n_draws*...], number of draws
+			:rtype: list,int
+		"""
+		input_batch=np.repeat(inference_sample[np.newaxis],self.batch_draws,axis=0)
+
+		output_draws=None
+		moments=None
+		prev_std=None
+		n_draws=0
+
+		while(n_draws<self.max_draws):
+			batch_size=min(self.batch_draws,self.max_draws-n_draws)
+			outputs=[np.asarray(output) for output in draw_function(input_batch[0:batch_size])]
+
+			if(output_draws is None):
+				output_draws=[[] for output in outputs]
+				moments=StreamingMoments(1,int(np.sum([outputs[k][0].size for k in monitor_outputs])))
+
+			for k,output in enumerate(outputs):
+				output_draws[k].append(output)
+
+			moments.update(np.zeros(batch_size,dtype=int),np.concatenate([outputs[k].reshape(batch_size,-1) for k in monitor_outputs],axis=1))
+			n_draws=n_draws+batch_size
+
+			if(n_draws<max(self.min_draws,2)):
+				continue
+
+			running_std=moments.get_std()[0]
+
+			if(prev_std is not None and np.all(np.abs(running_std-prev_std)<=np.maximum(self.tolerance*np.abs(prev_std),self.abs_tolerance))):
+				break
+
+			prev_std=running_std
+
+		return [np.concatenate(draws,axis=0) for draws in output_draws],n_draws
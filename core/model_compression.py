@@ -0,0 +1,410 @@
+""" The model compression file exports the trained models for CPU deployment, the kernels of the convolution and dense layers are pruned based on their magnitude (optionally fine tuned with the pruning mask fixed) and the models are converted to TensorFlow Lite with float32, float16 or int8 post-training quantization, int8 quantization is calibrated using a set of voxelized samples of the held-out test split
+The main function exports the models listed in model_config.compression_params (3D CNN or ResNet 3D CNN .h5 models and the U-Net hybrid model), validates the KCC predictions of each exported model against the float model using MetricsEval and saves a latency/accuracy report, variants that fail to convert or run are listed in the report with the error
+The exported models keep the 3D convolutions as TensorFlow ops (SELECT_TF_OPS), the Python TensorFlow Lite interpreter runs them only from TensorFlow 2.5 (builtin CONV_3D and the Flex delegate linked in the pip package), the pinned TensorFlow 2.1.2 converts the models but cannot run them so the main function requires TensorFlow 2.5 or later
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import time
+import zlib
+import pathlib
+import numpy as np
+import pandas as pd
+
+class ModelCompression:
+	"""Model Compression Class, magnitude pruning of the trained model and conversion to TensorFlow Lite
+
+		:param sparsity: Fraction of the kernel weights of each convolution and dense layer set to zero, defaults to 0.5
+		:type sparsity: float
+	"""
+	def __init__(self,sparsity=0.5):
+		self.sparsity=sparsity
+
+	def get_prunable_layers(self,model):
+		"""Layers with a kernel (convolution and dense layers), the bias and batch normalization weights are not pruned
+		"""
+		prunable_layers=[]
+
+		for layer in model.layers:
+			if(hasattr(layer,'layers')):
+				prunable_layers=prunable_layers+self.get_prunable_layers(layer)
+			elif(hasattr(layer,'kernel') and layer.trainable):
+				prunable_layers.append(layer)
+
+		return prunable_layers
+
+	def prune_model(self,model):
+		"""Set the smallest magnitude kernel weights of each prunable layer to zero
+
+			:param model: trained model
+			:type model: keras.models (required)
+
+			:returns: pruning mask of each layer (True for the weights that are kept)
+			:rtype: dict
+		"""
+		masks={}
+
+		for layer in self.get_prunable_layers(model):
+			kernel=layer.kernel.numpy()
+			threshold=np.percentile(np.abs(kernel),self.sparsity*100)
+			masks[layer.name]=np.abs(kernel)>threshold
+			layer.kernel.assign(kernel*masks[layer.name])
+
+		print('Model pruned, sparsity: ',self.get_sparsity(model))
+		return masks
+
+	def get_sparsity(self,model):
+		"""Fraction of the kernel weights of the prunable layers that are zero
+		"""
+		kernels=[layer.kernel.numpy() for layer in self.get_prunable_layers(model)]
+
+		return np.sum([np.sum(kernel==0) for kernel in kernels])/np.sum([kernel.size for kernel in kernels])
+
+	def fine_tune(self,model,masks,X_in,Y_out,epochs,batch_size):
+		"""Fine tune the pruned model (compiled), the pruning mask is re-applied after each batch so that the pruned weights remain zero
+
+			:param masks: pruning mask of each layer (refer prune_model)
+			:type masks: dict (required)
+		"""
+		from tensorflow.keras.callbacks import LambdaCallback
+
+		prunable_layers=[layer for layer in self.get_prunable_layers(model) if layer.name in masks]
+
+		def apply_masks(batch,logs):
+			for layer in prunable_layers:
+				layer.kernel.assign(layer.kernel*masks[layer.name])
+
+		model.fit(x=X_in,y=Y_out,epochs=epochs,batch_size=batch_size,callbacks=[LambdaCallback(on_batch_end=apply_masks)])
+
+		return model
+
+	def convert_tflite(self,model,file_path,quantization='float32',calibration_data=None):
+		"""Convert the model to TensorFlow Lite, Conv3D is not a TensorFlow Lite builtin operation so TensorFlow operations are enabled as a fall back
+
+			:param file_path: path of the .tflite file
+			:type file_path: str (required)
+
+			:param quantization: post-training quantization, float32 (no quantization), float16 (weights) or int8 (weights and activations of the builtin operations), defaults to float32
+			:type quantization: str
+
+			:param calibration_data: samples used to calibrate the int8 activation ranges, required for int8
+			:type calibration_data: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels]
+
+			:returns: size of the .tflite file, size of the compressed .tflite file (the pruned weights are only smaller when compressed) in bytes
+			:rtype: int,int
+		"""
+		import tensorflow as tf
+
+		converter=tf.lite.TFLiteConverter.from_keras_model(model)
+		converter.target_spec.supported_ops=[tf.lite.OpsSet.TFLITE_BUILTINS,tf.lite.OpsSet.SELECT_TF_OPS]
+
+		if(quantization=='float16'):
+			converter.optimizations=[tf.lite.Optimize.DEFAULT]
+			converter.target_spec.supported_types=[tf.float16]
+
+		if(quantization=='int8'):
+			def representative_dataset():
+				for i in range(len(calibration_data)):
+					yield [calibration_data[i:i+1].astype(np.float32)]
+
+			converter.optimizations=[tf.lite.Optimize.DEFAULT]
+			converter.representative_dataset=representative_dataset
+
+		tflite_model=converter.convert()
+
+		with open(file_path,'wb') as tflite_file:
+			tflite_file.write(tflite_model)
+
+		return len(tflite_model),len(zlib.compress(tflite_model))
+
+	def get_output_details(self,interpreter,output_name=None,output_shape=None):
+		"""Output details of the model output to be returned, the converter does not keep the order of the keras outputs so the output is matched by name and then by shape
+
+			:param output_name: name of the keras model output
+			:type output_name: str
+
+			:param output_shape: shape of the keras model output without the batch dimension
+			:type output_shape: list
+
+			:returns: output details of the matching TensorFlow Lite output
+			:rtype: dict
+		"""
+		output_details_list=interpreter.get_output_details()
+
+		if(len(output_details_list)==1):
+			return output_details_list[0]
+
+		matching_details=[]
+		if(output_name is not None):
+			matching_details=[output_details for output_details in output_details_list if output_name in output_details['name']]
+
+		if(len(matching_details)==0 and output_shape is not None):
+			matching_details=[output_details for output_details in output_details_list if list(output_details['shape'][1:])==list(output_shape)]
+
+		if(len(matching_details)!=1):
+			raise ValueError('TensorFlow Lite output could not be matched to the model output '+str(output_name)+' '+str(output_shape)+', outputs: '+str([(output_details['name'],list(output_details['shape'])) for output_details in output_details_list]))
+
+		return matching_details[0]
+
+	def tflite_predict(self,file_path,X_in,output_name=None,output_shape=None):
+		"""Inference using the TensorFlow Lite interpreter, the samples are inferred one at a time as on the line-side PC
+
+			:param file_path: path of the .tflite file
+			:type file_path: str (required)
+
+			:param output_name: name of the keras model output to be returned (refer get_output_details), only needed for models with multiple outputs
+			:type output_name: str
+
+			:param output_shape: shape of the keras model output to be returned without the batch dimension, only needed for models with multiple outputs
+			:type output_shape: list
+
+			:returns: model output, inference time per sample in seconds
+			:rtype: numpy.array, float
+		"""
+		import tensorflow as tf
+
+		interpreter=tf.lite.Interpreter(model_path=file_path)
+		interpreter.allocate_tensors()
+
+		input_details=interpreter.get_input_details()[0]
+		output_details=self.get_output_details(interpreter,output_name,output_shape)
+
+		y_pred=[]
+
+		start_time=time.time()
+		for i in range(len(X_in)):
+			interpreter.set_tensor(input_details['index'],X_in[i:i+1].astype(input_details['dtype']))
+			interpreter.invoke()
+			y_pred.append(interpreter.get_tensor(output_details['index'])[0])
+		inference_time=(time.time()-start_time)/len(X_in)
+
+		return np.array(y_pred),inference_time
+
+def keras_predict(model,X_in,output_index=0):
+	"""Inference using the keras model one sample at a time, used as the float baseline of the TensorFlow Lite models
+
+		:returns: model output, inference time per sample in seconds
+		:rtype: numpy.array, float
+	"""
+	#First call includes graph construction
+	model.predict(X_in[0:1])
+
+	y_pred=[]
+
+	start_time=time.time()
+	for i in range(len(X_in)):
+		model_outputs=model.predict(X_in[i:i+1])
+		if(isinstance(model_outputs,list)):
+			model_outputs=model_outputs[output_index]
+		y_pred.append(model_outputs[0])
+	inference_time=(time.time()-start_time)/len(X_in)
+
+	return np.array(y_pred),inference_time
+
+def check_tflite_version(min_version=(2,5)):
+	"""Check that the installed TensorFlow can run the exported 3D convolution models with the Python TensorFlow Lite interpreter
+
+		:param min_version: minimum TensorFlow version (major,minor), defaults to (2,5)
+		:type min_version: tuple
+
+		:returns: installed TensorFlow version
+		:rtype: str
+	"""
+	import tensorflow as tf
+
+	tf_version=tuple(int(version) for version in tf.__version__.split('.')[0:2])
+
+	if(tf_version<min_version):
+		raise RuntimeError('TensorFlow '+'.'.join(str(version) for version in min_version)+' or later is required to run the TensorFlow Lite 3D convolution models, installed: '+tf.__version__)
+
+	return tf.__version__
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	import hybrid_utils as hy_util
+
+	from tensorflow.keras.models import load_model
+	from assembly_system import VRMSimulationModel
+	from data_import import GetTrainData
+	from encode_decode_model import Encode_Decode_Model
+	from metrics_eval import MetricsEval
+	from custom_layers import get_custom_objects
+	from tensorflow.lite.python.convert import ConverterError
+
+	try:
+		check_tflite_version()
+	except RuntimeError as error:
+		print(error)
+		sys.exit(1)
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	part_name=config.assembly_system['part_name']
+	assembly_type=config.assembly_system['assembly_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	assembly_kpis=config.assembly_system['assembly_kpis']
+	voxel_dim=config.assembly_system['voxel_dim']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	mapping_index=config.assembly_system['mapping_index']
+	aritifical_noise=config.assembly_system['aritifical_noise']
+	data_folder=config.assembly_system['data_folder']
+	kcc_folder=config.assembly_system['kcc_folder']
+	test_file_names_x=config.assembly_system['test_data_files_x']
+	test_file_names_y=config.assembly_system['test_data_files_y']
+	test_file_names_z=config.assembly_system['test_data_files_z']
+	test_kcc_files=config.assembly_system['test_kcc_files']
+	categorical_kccs=config.assembly_system['categorical_kccs']
+
+	print('Parsing from Training Config File')
+
+	batch_size=cftrain.model_parameters['batch_size']
+
+	model_files=cftrain.compression_params['model_files']
+	sparsity=cftrain.compression_params['sparsity']
+	quantization_types=cftrain.compression_params['quantization']
+	calibration_samples=cftrain.compression_params['calibration_samples']
+	validation_samples=cftrain.compression_params['validation_samples']
+	fine_tune_epochs=cftrain.compression_params['fine_tune_epochs']
+
+	print('Creating file Structure....')
+
+	train_path='../trained_models/'+part_type
+
+	compression_path=train_path+'/compressed_models'
+	pathlib.Path(compression_path).mkdir(parents=True, exist_ok=True)
+
+	logs_path=compression_path+'/logs'
+	pathlib.Path(logs_path).mkdir(parents=True, exist_ok=True)
+
+	vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
+	get_data=GetTrainData()
+	point_index=get_data.load_mapping_index(mapping_index)
+
+	#Calibration (also used to fine tune the pruned models) and validation samples are disjoint samples of the held-out test split (not seen in training), voxelized once and reused for all exports
+	calibration_file=compression_path+'/calibration_test_data.npz'
+
+	if(os.path.exists(calibration_file)):
+		print('Loading calibration and validation samples from: ',calibration_file)
+		voxel_cache=np.load(calibration_file)
+		calibration_data=voxel_cache['calibration_data']
+		calibration_kccs=voxel_cache['calibration_kccs']
+		validation_data=voxel_cache['validation_data']
+		validation_kccs=voxel_cache['validation_kccs']
+	else:
+		print('Importing and Preprocessing Cloud-of-Point Test Data')
+
+		dataset=[]
+		dataset.append(get_data.data_import(test_file_names_x,data_folder))
+		dataset.append(get_data.data_import(test_file_names_y,data_folder))
+		dataset.append(get_data.data_import(test_file_names_z,data_folder))
+		kcc_dataset=get_data.data_import(test_kcc_files,kcc_folder)
+
+		input_conv_data,kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,kcc_dataset)
+		input_conv_data=input_conv_data[kpi_subset_dump]
+		kcc_subset_dump=kcc_subset_dump[kpi_subset_dump,:]
+
+		if(len(input_conv_data)<=calibration_samples):
+			raise ValueError('The test split has '+str(len(input_conv_data))+' samples, reduce compression_params[\'calibration_samples\'] so that validation samples are left')
+
+		calibration_data=input_conv_data[0:calibration_samples]
+		calibration_kccs=kcc_subset_dump[0:calibration_samples]
+		validation_data=input_conv_data[calibration_samples:calibration_samples+validation_samples]
+		validation_kccs=kcc_subset_dump[calibration_samples:calibration_samples+validation_samples]
+
+		np.savez(calibration_file,calibration_data=calibration_data,calibration_kccs=calibration_kccs,validation_data=validation_data,validation_kccs=validation_kccs)
+
+	model_compression=ModelCompression(sparsity)
+	metrics_eval=MetricsEval()
+
+	report_rows=[]
+
+	for model_name,model_file in model_files.items():
+
+		print('Exporting model: ',model_name)
+
+		model_file_path=train_path+'/'+model_file
+
+		#The U-Net models are saved as weights, the architecture is rebuilt as in the U-Net deployment (refer u_net_model_deploy_multi_output_hybrid.py)
+		if(model_name=='unet_hybrid'):
+			input_size=(voxel_dim,voxel_dim,voxel_dim,voxel_channels)
+
+			occupied_voxels=None
+			if(cftrain.encode_decode_params['sparse_shape_error']==1):
+				occupied_voxels,node_voxel_index=get_data.get_occupied_voxels(point_index[0:point_dim,:])
+
+			dl_model_unet=Encode_Decode_Model(assembly_kccs)
+			model=dl_model_unet.encode_decode_3d_multi_output_attention_hybrid(cftrain.encode_decode_params['inital_filter_dim'],cftrain.encode_decode_params['model_depth'],input_size,categorical_kccs,cftrain.encode_decode_params['output_heads'],voxel_channels,recompute_encoder=cftrain.encode_decode_params['recompute_encoder'],occupied_voxels=occupied_voxels,shape_error_components=cftrain.encode_decode_params['shape_error_components'])
+			model.load_weights(model_file_path)
+			validation_y,dump=hy_util.split_kcc(validation_kccs)
+		else:
+			model=load_model(model_file_path,custom_objects=get_custom_objects())
+			validation_y=validation_kccs
+
+		def add_report_row(variant,y_pred,inference_time,size,compressed_size,model_sparsity):
+			eval_metrics,accuracy_metrics_df=metrics_eval.metrics_eval_base(y_pred,validation_y,logs_path)
+			accuracy_metrics_df.to_csv(logs_path+'/metrics_'+model_name+'_'+variant+'.csv')
+
+			report_rows.append({
+				'model':model_name,
+				'variant':variant,
+				'size_mb':size/1e6,
+				'compressed_size_mb':compressed_size/1e6,
+				'sparsity':model_sparsity,
+				'latency_ms':inference_time*1000,
+				'mae':accuracy_metrics_df['Mean Absolute Error'].mean(),
+				'r2':accuracy_metrics_df['R Squared'].mean(),
+				'error':''
+			})
+
+		float_file_path=compression_path+'/'+model_name+'_float32.tflite'
+		float_size,float_compressed_size=model_compression.convert_tflite(model,float_file_path)
+
+		y_pred,inference_time=keras_predict(model,validation_data)
+		add_report_row('keras_float32',y_pred,inference_time,float_size,float_compressed_size,model_compression.get_sparsity(model))
+
+		masks=model_compression.prune_model(model)
+
+		#The U-Net shape error targets are not part of the calibration set, the U-Net is only pruned
+		if(fine_tune_epochs>0 and model_name!='unet_hybrid'):
+			model=model_compression.fine_tune(model,masks,calibration_data,calibration_kccs,fine_tune_epochs,batch_size)
+
+		model.save_weights(compression_path+'/'+model_name+'_pruned')
+
+		for quantization in ['float32']+quantization_types:
+			tflite_file_path=compression_path+'/'+model_name+'_pruned_'+quantization+'.tflite'
+
+			try:
+				size,compressed_size=model_compression.convert_tflite(model,tflite_file_path,quantization,calibration_data)
+				y_pred,inference_time=model_compression.tflite_predict(tflite_file_path,validation_data,model.output_names[0],model.outputs[0].shape.as_list()[1:])
+				add_report_row('tflite_pruned_'+quantization,y_pred,inference_time,size,compressed_size,model_compression.get_sparsity(model))
+			except (ConverterError,ValueError,RuntimeError) as error:
+				print('Conversion failed for: ',model_name,quantization)
+				print(error)
+				report_rows.append({'model':model_name,'variant':'tflite_pruned_'+quantization,'error':str(error)})
+
+	report_df=pd.DataFrame(report_rows)
+
+	#Accuracy loss relative to the float model
+	float_mae=report_df[report_df['variant']=='keras_float32'].set_index('model')['mae']
+	report_df['mae_increase']=report_df['mae']-report_df['model'].map(float_mae)
+
+	report_df.to_csv(logs_path+'/compression_report.csv',index=False)
+
+	print('Latency and Accuracy Report')
+	print(report_df)
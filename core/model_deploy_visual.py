@@ -20,7 +20,6 @@ sys.path.append("../config")
 import numpy as np
 import pandas as pd
 import tensorflow as tf
-import csv
 import logging
 tf.get_logger().setLevel(logging.ERROR)
 
@@ -64,7 +63,7 @@ class DeployModel:
 
 		return inference_model
 
-	def model_inference(self,inference_data,inference_model,deploy_path,print_result=1,plot_result=1,append_result=0):
+	def model_inference(self,inference_data,inference_model,deploy_path,print_result=1,plot_result=1,append_result=0,result_store=None,part_serials=None,model_type=None,model_version=None):
 		"""model_inference method is used to infer from unknown sample(s) using the trained model 
 				
 				:param inference_data: Unknown dataset having same structure as the train dataset
@@ -76,6 +75,21 @@ class DeployModel:
 				:param print_result: Flag to indicate if the result needs to be printed, 0 by default, change to 1 in case the results need to be printed on the console
 				:type print_result: int
 
+				:param append_result: Flag to indicate if the result needs to be appended to the prediction store, 0 by default
+				:type append_result: int
+
+				:param result_store: prediction store the results are appended to, the store of result_store_params['store_file'] is opened for the call if None (refer utilities/result_store.py)
+				:type result_store: PredictionStore
+
+				:param part_serials: serial of each sample, defaults to the time of the call and the sample index, the generated serials are appended to result_store_params['user_serials_file'] so that the leaderboard can join the predictions to the user inputs
+				:type part_serials: list
+
+				:param model_type: model type of the inference model (refer model_registry_params['model_files']), required to append the result
+				:type model_type: str
+
+				:param model_version: version (run id) of the inference model, required to append the result
+				:type model_version: int
+
 		"""		
 		result=inference_model.predict(inference_data)
 		description="The Process Parameters variations are inferred from the obtained measurement data and the trained CNN based model"
@@ -86,12 +100,30 @@ class DeployModel:
 			print(rounded_result)
 		
 		if(append_result==1):
-			with open ("user_preds.csv",'a',newline='') as filedata:
-				#fieldnames = ['kcc1','kcc2','kcc3','kcc4','kcc5','kcc6']                            
-				writer = csv.writer(filedata, delimiter=',')
-				writer.writerow(rounded_result[0,:].tolist())
-				#writer.writerow(dict(zip(fieldnames, rounded_result[0,:].tolist()))) 
-				#filedata.write(rounded_result[0,:].tolist())
+			from result_store import PredictionStore
+			import time
+
+			if(model_type is None or model_version is None):
+				raise ValueError('The model type and version of the inference model are required to append the result')
+
+			if(part_serials is None):
+				part_serials=['user_'+str(int(time.time()*1000))+'_'+str(i) for i in range(len(rounded_result))]
+
+				#One serial per user input row (refer leaderboard/leaderboard_gen.py)
+				serials_file=cftrain.result_store_params['user_serials_file']
+				write_header=not os.path.isfile(serials_file)
+
+				with open(serials_file,'a') as serials_out:
+					if(write_header):
+						serials_out.write('part_serial\n')
+					serials_out.write(''.join([part_serial+'\n' for part_serial in part_serials]))
+
+			if(result_store is None):
+				prediction_store=PredictionStore(cftrain.result_store_params['store_file'])
+				prediction_store.add(part_serials,rounded_result,config.assembly_system['part_type'],model_type,model_version)
+				prediction_store.close()
+			else:
+				result_store.add(part_serials,rounded_result,config.assembly_system['part_type'],model_type,model_version)
 		
 		if(plot_result==1):
 			print("Plotting Results in HTML...")
@@ -149,7 +181,9 @@ if __name__ == '__main__':
 	
 	#Generate Paths
 	train_path='../trained_models/'+part_type
-	model_path=train_path+'/model'+'/trained_model_1.h5'
+	model_type='cnn_model_3d'
+	model_version=1
+	model_path=train_path+'/'+cftrain.model_registry_params['model_files'][model_type].format(model_version)
 	logs_path=train_path+'/logs'
 	deploy_path=train_path+'/deploy/'
 
@@ -187,7 +221,7 @@ if __name__ == '__main__':
 
 	input_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index)
 
-	y_pred=deploy_model.model_inference(input_conv_data,inference_model,deploy_path,print_result=1,plot_result=1);
+	y_pred=deploy_model.model_inference(input_conv_data,inference_model,deploy_path,print_result=1,plot_result=1,model_type=model_type,model_version=model_version);
 
 	#Plot Voxels
 
@@ -232,40 +266,25 @@ if __name__ == '__main__':
 	
 	print("Saving Gradient based Class Activation Map for Process Parameter: ",process_parameter_id)
 
-	camviz=CamViz(inference_model,'leaky_re_lu_8')
+	layer_name='leaky_re_lu_8'
 
-	grad_cam_plot_matlab=np.zeros((len(input_conv_data),point_dim))
-	
-	from tqdm import tqdm
-	print("Saving Grad CAM File...")
-
-	for i in tqdm(range(len(input_conv_data))):
-
-		#Under deafault setting max process param deviations are plotted
-		# Change here for explicit specification of process parameter
+	#Under deafault setting max process param deviations are plotted, the maps of all the process params are computed in a batch
+	from cam_viz import BatchGradCam
+	import time
 
-		layer_name='leaky_re_lu_8'
-		
-		camviz=CamViz(inference_model,layer_name)
+	print("Saving Grad CAM File...")
+	start_time=time.time()
 
-		process_parameter_id=np.argmax(abs(y_pred[i,:]))
-		cop_input=input_conv_data[i:i+1,:,:,:,:]
-		fmap_eval, grad_wrt_fmap_eval=camviz.grad_cam_3d(cop_input,process_parameter_id)
-		
-		alpha_k_c= grad_wrt_fmap_eval.mean(axis=(0,1,2,3)).reshape((1,1,1,-1))
-		Lc_Grad_CAM = np.maximum(np.sum(fmap_eval*alpha_k_c,axis=-1),0).squeeze()
-		scale_factor = np.array(cop_input.shape[1:4])/np.array(Lc_Grad_CAM.shape)
+	batch_grad_cam=BatchGradCam(inference_model,layer_name,mapping_index=point_index)
+	node_cams,cam_pred=batch_grad_cam.root_cause_maps(input_conv_data)
 
-		from scipy.ndimage.interpolation import zoom
-		import tensorflow.keras.backend as K
-		
-		_grad_CAM = zoom(Lc_Grad_CAM,scale_factor)
-		arr_min, arr_max = np.min(_grad_CAM), np.max(_grad_CAM)
-		grad_CAM = (_grad_CAM - arr_min) / (arr_max - arr_min + K.epsilon())
+	print("Grad CAM time for all samples and process parameters: ",time.time()-start_time)
 
-		#print(grad_CAM.shape)
+	process_parameter_ids=np.argmax(abs(y_pred),axis=1)
+	grad_cam_plot_matlab=node_cams[np.arange(len(input_conv_data)),process_parameter_ids,:]
 
-		grad_cam_plot_matlab[i,:]=get_point_cloud.getcopdev_gradcam(grad_CAM,point_index,nominal_cop)
+	for j in range(node_cams.shape[1]):
+		np.savetxt((logs_path+'/grad_cam_pred_'+layer_name+'_kcc_'+str(j)+'.csv'),node_cams[:,j,:], delimiter=",")
 
 	#Saving File
 	np.savetxt((logs_path+'/grad_cam_pred_'+layer_name+'.csv'),grad_cam_plot_matlab, delimiter=",")
@@ -0,0 +1,236 @@
+""" The model registry keeps the trained models of multiple parts (for example halo, inner_rf and cross_member) warm for inference, the models are keyed by part type, model type and version and are loaded lazily with their mapping index and nominal cloud-of-point
+The most recently used models are kept in memory under a memory cap, the least recently used model is evicted when a new model does not fit, the compiled prediction functions of each model (refer core/compiled_predict.py) are traced and warmed up when it is loaded so that the first request after a load does not include the tracing time
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import gc
+import time
+import threading
+import collections
+import numpy as np
+
+class RegistryEntry:
+	"""Registry Entry Class, a loaded model with its resources and compiled predictor
+
+		:param model_path: Path to the trained model
+		:type model_path: str (required)
+
+		:param part_system: assembly system parameters of the part (refer config/assembly_config.py)
+		:type part_system: dict (required)
+
+		:param batch_sizes: batch sizes of the compiled prediction functions (refer compiled_predict.CompiledPredictor), defaults to (1,8,32)
+		:type batch_sizes: tuple
+
+		:param xla: Flag to compile the prediction functions with XLA, defaults to 0
+		:type xla: int
+	"""
+	def __init__(self,model_path,part_system,batch_sizes=(1,8,32),xla=0):
+		from compiled_predict import CompiledPredictor
+		from model_deployment import DeployModel
+		from data_import import GetTrainData
+		from assembly_system import PartType
+		from inference_server import NodeVoxelizer
+
+		voxel_dim=part_system['voxel_dim']
+		voxel_channels=part_system['voxel_channels']
+
+		self.voxel_dim=voxel_dim
+		self.voxel_channels=voxel_channels
+
+		deploy_model=DeployModel()
+		self.inference_model=deploy_model.get_model(model_path)
+
+		get_data=GetTrainData()
+		point_index=get_data.load_mapping_index(part_system['mapping_index'])
+		self.voxelizer=NodeVoxelizer(point_index,voxel_dim)
+
+		part_model=PartType(part_system['assembly_type'],part_system['assembly_kccs'],part_system['assembly_kpis'],part_system['part_name'],part_system['part_type'],voxel_dim,voxel_channels,part_system['point_dim'])
+		cop_file_path='../resources/nominal_cop_files/'+part_system['nominal_cop_filename']
+
+		if(os.path.isfile(cop_file_path)):
+			self.nominal_cop=part_model.get_nominal_cop(cop_file_path)
+		else:
+			print('Nominal COP not found at: ',cop_file_path)
+			self.nominal_cop=None
+
+		#Tracing and a first prediction (kernel selection) of each batch size when the model is loaded
+		start_time=time.time()
+		self.predictor=CompiledPredictor(self.inference_model,batch_sizes,xla)
+		self.warmup_time=time.time()-start_time
+
+		self.memory_bytes=self.get_memory_bytes()
+
+	def predict(self,X_in):
+		"""Predict using the compiled predictor
+
+			:param X_in: voxelized input
+			:type X_in: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:returns: model estimates, a list for models with multiple outputs
+			:rtype: numpy.array or list
+		"""
+		return self.predictor.predict(X_in)
+
+	def get_memory_bytes(self):
+		"""Approximate memory of the entry, the model weights and the mapping and nominal cloud-of-point resources
+		"""
+		memory_bytes=int(np.sum([np.prod(weight.shape.as_list())*weight.dtype.size for weight in self.inference_model.weights]))
+		memory_bytes=memory_bytes+self.voxelizer.occupied_voxels.nbytes+self.voxelizer.node_voxel_index.nbytes
+
+		if(self.nominal_cop is not None):
+			memory_bytes=memory_bytes+self.nominal_cop.nbytes
+
+		return memory_bytes
+
+class ModelRegistry:
+	"""Model Registry Class, least recently used eviction under a memory cap, the registry is thread safe and a model is only loaded once when requested concurrently, the lock is not held while a model is loaded so that the requests of loaded models are not blocked by a cold load
+
+		:param model_files: model file of each model type relative to the trained model folder of the part, {} is replaced by the version
+		:type model_files: dict (required)
+
+		:param memory_cap_mb: Maximum memory of the loaded models in MB, the most recently used model is always kept
+		:type memory_cap_mb: float (required)
+
+		:param trained_models_path: Path to the trained models, defaults to ../trained_models
+		:type trained_models_path: str
+
+		:param batch_sizes: batch sizes of the compiled prediction functions of the entries, defaults to (1,8,32)
+		:type batch_sizes: tuple
+
+		:param xla: Flag to compile the prediction functions of the entries with XLA, defaults to 0
+		:type xla: int
+	"""
+	def __init__(self,model_files,memory_cap_mb,trained_models_path='../trained_models',batch_sizes=(1,8,32),xla=0):
+		self.model_files=model_files
+		self.memory_cap_bytes=memory_cap_mb*1024*1024
+		self.trained_models_path=trained_models_path
+		self.batch_sizes=batch_sizes
+		self.xla=xla
+		self.part_systems={}
+		self.entries=collections.OrderedDict()
+		self.loading={}
+		self.lock=threading.Lock()
+		self.hits=0
+		self.misses=0
+		self.evictions=0
+
+	def register_part(self,part_system):
+		"""Register the assembly system parameters of a part, the models of the part are loaded when requested
+
+			:param part_system: assembly system parameters of the part (refer config/assembly_config.py)
+			:type part_system: dict (required)
+		"""
+		self.part_systems[part_system['part_type']]=part_system
+
+	def register_part_config(self,config_file):
+		"""Register a part from an assembly config file (for example config/halo_config_files/assembly_config.py)
+
+			:param config_file: Path to the assembly config file
+			:type config_file: str (required)
+		"""
+		import importlib.util
+
+		spec=importlib.util.spec_from_file_location('assembly_config_'+str(len(self.part_systems)),config_file)
+		part_config=importlib.util.module_from_spec(spec)
+		spec.loader.exec_module(part_config)
+
+		self.register_part(part_config.assembly_system)
+
+	def get_model_path(self,part_type,model_type,version):
+		"""Path of the trained model of the key
+		"""
+		if(model_type not in self.model_files):
+			raise KeyError('Model type not registered: '+str(model_type))
+
+		return self.trained_models_path+'/'+part_type+'/'+self.model_files[model_type].format(version)
+
+	def get(self,part_type,model_type,version=0):
+		"""Get the registry entry of the key, the entry is loaded if it is not in memory and the least recently used entries are evicted if the memory cap is exceeded
+
+			:param part_type: part type of a registered part
+			:type part_type: str (required)
+
+			:param model_type: model type of model_files
+			:type model_type: str (required)
+
+			:param version: version (run id) of the trained model, defaults to 0
+			:type version: int
+
+			:returns: loaded entry
+			:rtype: RegistryEntry
+		"""
+		key=(part_type,model_type,version)
+
+		while(True):
+			with self.lock:
+				if(key in self.entries):
+					self.hits=self.hits+1
+					self.entries.move_to_end(key)
+					return self.entries[key]
+
+				if(part_type not in self.part_systems):
+					raise KeyError('Part type not registered: '+str(part_type))
+
+				#The first request of the key loads the model, concurrent requests of the key wait for the load
+				loading_event=self.loading.get(key)
+				if(loading_event is None):
+					loading_event=threading.Event()
+					self.loading[key]=loading_event
+					self.misses=self.misses+1
+					model_path=self.get_model_path(part_type,model_type,version)
+					part_system=self.part_systems[part_type]
+					break
+
+			#The entry is checked again after the load, a failed load is retried by the waiting request
+			loading_event.wait()
+
+		entry=None
+		try:
+			print('Loading model: ',key,' from: ',model_path)
+			entry=RegistryEntry(model_path,part_system,self.batch_sizes,self.xla)
+			print('Model loaded, warm up time: ',entry.warmup_time,' memory (MB): ',entry.memory_bytes/(1024*1024))
+		finally:
+			with self.lock:
+				if(entry is not None):
+					self.entries[key]=entry
+					self.evict()
+
+				del self.loading[key]
+				loading_event.set()
+
+		return entry
+
+	def evict(self):
+		"""Evict the least recently used entries until the memory of the loaded entries is within the cap, the lock should be held by the caller
+		"""
+		while(len(self.entries)>1 and self.get_memory_bytes()>self.memory_cap_bytes):
+			key,entry=self.entries.popitem(last=False)
+			print('Evicting model: ',key)
+			del entry
+			self.evictions=self.evictions+1
+
+		gc.collect()
+
+	def get_memory_bytes(self):
+		"""Approximate memory of the loaded entries
+		"""
+		return int(np.sum([entry.memory_bytes for entry in self.entries.values()]))
+
+	def get_status(self):
+		"""Loaded keys (least recently used first), memory and cache statistics of the registry
+		"""
+		return {'loaded':[list(key) for key in self.entries.keys()],'memory_mb':self.get_memory_bytes()/(1024*1024),
+				'memory_cap_mb':self.memory_cap_bytes/(1024*1024),'hits':self.hits,'misses':self.misses,'evictions':self.evictions}
@@ -7,7 +7,8 @@ import sys
 current_path=os.path.dirname(__file__)
 parentdir = os.path.dirname(current_path)
 
-os.environ["CUDA_VISIBLE_DEVICES"]="0" # Nvidia Quadro GV100
+#Devices can be overridden from the environment (CPU workers of the distributed training, refer model_train_distributed.py)
+os.environ.setdefault("CUDA_VISIBLE_DEVICES","0") # Nvidia Quadro GV100
 #os.environ["CUDA_VISIBLE_DEVICES"]="1" # Nvidia Quadro M2000
 
 #Adding Path to various Modules
@@ -39,6 +40,7 @@ from assembly_system import VRMSimulationModel
 from wls400a_system import GetInferenceData
 from data_import import GetTrainData
 from core_model import DLModel
+from custom_layers import get_custom_objects
 from training_viz import TrainViz
 from metrics_eval import MetricsEval
 #from keras_lr_multiplier import LRMultiplier
@@ -63,7 +65,7 @@ class TrainModel:
 			self.split_ratio=split_ratio
 			
 
-	def run_train_model(self,model,X_in,Y_out,model_path,logs_path,plots_path,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune'):
+	def run_train_model(self,model,X_in,Y_out,model_path,logs_path,plots_path,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune',checkpoint=None,split_seed=None):
 		"""run_train_model function trains the model on the dataset and saves the trained model,logs and plots within the file structure, the function prints the training evaluation metrics
 			
 			:param model: 3D CNN model compiled within the Deep Learning Class, refer https://keras.io/models/model/ for more information 
@@ -88,7 +90,13 @@ class TrainModel:
 			:type activate_tensorboard: int
 
 			:param run_id: Run id index used in data study to conduct multiple training runs with different dataset sizes, defaults to 0
-			:type run_id: int			
+			:type run_id: int
+
+			:param checkpoint: Training checkpoint (refer utilities/run_state.py) used to resume an interrupted training from the last saved epoch along with the optimizer state, defaults to None (no resume)
+			:type checkpoint: TrainingCheckpoint
+
+			:param split_seed: Seed of the train/validation split, used to validate different models on the same samples, defaults to None (random split, the run id is used when resuming)
+			:type split_seed: int
 		"""			
 		import tensorflow as tf
 		from sklearn.model_selection import train_test_split
@@ -98,7 +106,11 @@ class TrainModel:
 
 		model_file_path=model_path+'/trained_model_'+str(run_id)+'.h5'
 		
-		X_train, X_test, y_train, y_test = train_test_split(X_in, Y_out, test_size = self.split_ratio)
+		#Fixed split when resuming so that the validation set does not change between restarts
+		if(checkpoint is not None and split_seed is None):
+			split_seed=run_id
+
+		X_train, X_test, y_train, y_test = train_test_split(X_in, Y_out, test_size = self.split_ratio,random_state=split_seed)
 		print("Data Split Completed")
 		
 		#Checkpointer to save the best model
@@ -110,16 +122,23 @@ class TrainModel:
 			tensorboard = TensorBoard(log_dir=logs_path,histogram_freq=1, write_graph=True, write_images=True)
 			callbacks=[checkpointer,tensorboard]
 		
+		initial_epoch=0
+		if(checkpoint is not None):
+			initial_epoch=checkpoint.restore(checkpointer)
+			callbacks.append(checkpoint.get_callback(checkpointer))
+
 		tensorboard = TensorBoard(log_dir=logs_path,histogram_freq=1, write_graph=True, write_images=True)
-		history=model.fit(x=X_train, y=y_train, validation_data=(X_test,y_test), epochs=self.epochs, batch_size=self.batch_size,callbacks=callbacks)
+		history=model.fit(x=X_train, y=y_train, validation_data=(X_test,y_test), epochs=self.epochs, batch_size=self.batch_size,callbacks=callbacks,initial_epoch=initial_epoch)
 		
-		trainviz=TrainViz()
-		trainviz.training_plot(history,plots_path,run_id)
+		#No epochs are run when resuming a completed training, the best model is already saved
+		if(len(history.history)>0):
+			trainviz=TrainViz()
+			trainviz.training_plot(history,plots_path,run_id)
 		
 		if(tl_type=='variable_lr'):
 			inference_model=load_model(model_file_path, custom_objects={'LRMultiplier': LRMultiplier})
 		else:
-			inference_model=load_model(model_file_path)
+			inference_model=load_model(model_file_path,custom_objects=get_custom_objects())
 			
 		y_pred=inference_model.predict(X_test)
 
@@ -167,6 +186,8 @@ if __name__ == '__main__':
 	loss_func=cftrain.model_parameters['loss_func']
 	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
 	activate_tensorboard=cftrain.model_parameters['activate_tensorboard']
+	sparse_conv=cftrain.sparse_conv_params['sparse_conv']
+	kernel_size=cftrain.sparse_conv_params['kernel_size']
 	
 	print('Creating file Structure....')
 	
@@ -199,7 +220,14 @@ if __name__ == '__main__':
 	output_dimension=assembly_kccs
 	
 	dl_model=DLModel(model_type,output_dimension,optimizer,loss_func,regularizer_coeff,output_type)
-	model=dl_model.cnn_model_3d(voxel_dim,voxel_channels)
+	point_index=get_data.load_mapping_index(mapping_index)
+
+	if(sparse_conv==1):
+		#Sparse convolutions only at the voxels occupied by the nodes
+		occupied_voxels,node_voxel_index=get_data.get_occupied_voxels(point_index[0:point_dim,:])
+		model=dl_model.sparse_cnn_model_3d(occupied_voxels,voxel_dim,voxel_channels,kernel_size)
+	else:
+		model=dl_model.cnn_model_3d(voxel_dim,voxel_channels)
 	print(model.summary())
 	#sys.exit()
 	print('Training 3D CNN model')
@@ -213,15 +241,49 @@ if __name__ == '__main__':
 	dataset.append(get_data.data_import(file_names_x,data_folder))
 	dataset.append(get_data.data_import(file_names_y,data_folder))
 	dataset.append(get_data.data_import(file_names_z,data_folder))
-	point_index=get_data.load_mapping_index(mapping_index)
 
 	kcc_dataset=get_data.data_import(kcc_files,kcc_folder)
-	input_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,kcc_dataset)
 	
-	train_model=TrainModel(batch_size,epocs,split_ratio)
-	trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,input_conv_data,kcc_subset_dump,model_path,logs_path,plots_path,activate_tensorboard)
+	if(sparse_conv==1):
+		input_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_sparse_mc(vrm_system,dataset,point_index,kcc_dataset)
+	else:
+		input_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,kcc_dataset)
+	
+	distributed=cftrain.distribution_params['distributed']
+
+	if(distributed==1):
+		#Multi-worker data parallel training with local CPU worker processes
+		from run_executor import RunExecutor
+		from model_train_distributed import run_local_workers
+
+		num_workers=cftrain.distribution_params['num_workers']
+		run_executor=RunExecutor(train_path+'/shared_data')
+
+		#The workers build the same (dense or sparse) architecture within the distribution strategy
+		model_params={'model_type':model_type,'output_dimension':output_dimension,'optimizer':optimizer,'loss_func':loss_func,'regularizer_coeff':regularizer_coeff,'output_type':output_type,'voxel_dim':voxel_dim,'voxel_channels':voxel_channels,
+			'sparse_conv':sparse_conv,'kernel_size':kernel_size}
+
+		if(sparse_conv==1):
+			model_params['occupied_voxels_path']=run_executor.share_dataset('occupied_voxels',occupied_voxels)
+
+		#Same samples as the single process training so that the two modes are comparable
+		run_params={
+			'input_conv_path':run_executor.share_dataset('input_conv_data',input_conv_data),
+			'kcc_path':run_executor.share_dataset('kcc_subset_dump',kcc_subset_dump),
+			'model_params':model_params,
+			'train_params':{'batch_size':batch_size,'epocs':epocs,'split_ratio':split_ratio},
+			'model_path':model_path,
+			'logs_path':logs_path
+		}
+
+		results=run_local_workers(run_executor,run_params,num_workers,cftrain.distribution_params['base_port'])
+		eval_metrics=results[0]['metrics']
+		print('Distributed training throughput (samples/sec): ',results[0]['samples_per_second'])
+	else:
+		train_model=TrainModel(batch_size,epocs,split_ratio)
+		trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,input_conv_data,kcc_subset_dump,model_path,logs_path,plots_path,activate_tensorboard)
 	
-	accuracy_metrics_df.to_csv(logs_path+'/metrics_train.csv')
+		accuracy_metrics_df.to_csv(logs_path+'/metrics_train.csv')
 
 	print("Model Training Complete..")
 	print("The Model Validation Metrics are ")
@@ -62,7 +62,7 @@ class BayesTrainModel:
 			self.split_ratio=split_ratio
 			
 
-	def run_train_model(self,model,X_in,Y_out,model_path,logs_path,plots_path,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune'):
+	def run_train_model(self,model,X_in,Y_out,model_path,logs_path,plots_path,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune',checkpoint=None):
 		"""run_train_model function trains the model on the dataset and saves the trained model,logs and plots within the file structure, the function prints the training evaluation metrics
 			
 			:param model: 3D CNN model compiled within the Deep Learning Class, refer https://keras.io/models/model/ for more information 
@@ -87,19 +87,34 @@ class BayesTrainModel:
 			:type activate_tensorboard: int
 
 			:param run_id: Run id index used in data study to conduct multiple training runs with different dataset sizes, defaults to 0
-			:type run_id: int			
+			:type run_id: int
+
+			:param checkpoint: Training checkpoint (refer utilities/run_state.py) used to resume an interrupted training from the last saved epoch along with the optimizer state, defaults to None (no resume)
+			:type checkpoint: TrainingCheckpoint
 		"""			
 		from sklearn.model_selection import train_test_split
 		import tensorflow as tf
 
 		model_file_path=model_path+'/Bayes_trained_model_'+str(run_id)
-		X_train, X_test, y_train, y_test = train_test_split(X_in, Y_out, test_size = self.split_ratio)
+		#Fixed split when resuming so that the validation set does not change between restarts
+		split_seed=None
+		if(checkpoint is not None):
+			split_seed=run_id
+
+		X_train, X_test, y_train, y_test = train_test_split(X_in, Y_out, test_size = self.split_ratio,random_state=split_seed)
 		print("Data Split Completed")
 		
 		#tensorboard_callback = tf.keras.callbacks.TensorBoard(log_dir='C:\\Users\\sinha_s\\Desktop\\dlmfg_package\\dlmfg\\trained_models\\inner_rf_assembly\\logs',histogram_freq=1)
 		checkpointer = tf.keras.callbacks.ModelCheckpoint(model_file_path, verbose=1, save_best_only='val_loss',save_weights_only=True)
+		callbacks=[checkpointer]
+
+		initial_epoch=0
+		if(checkpoint is not None):
+			initial_epoch=checkpoint.restore(checkpointer)
+			callbacks.append(checkpoint.get_callback(checkpointer))
+
 		#Check pointer to save the best model
-		history=model.fit(X_train, y_train, validation_data=(X_test,y_test), epochs=self.epochs, batch_size=self.batch_size,callbacks=[checkpointer])
+		history=model.fit(X_train, y_train, validation_data=(X_test,y_test), epochs=self.epochs, batch_size=self.batch_size,callbacks=callbacks,initial_epoch=initial_epoch)
 		
 		#y_pred=model.predict(X_test)
 		# y_pred=model(X_test)
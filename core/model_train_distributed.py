@@ -0,0 +1,325 @@
+""" The distributed model train file trains the 3D CNN model with multi-worker data parallel training (tf.distribute MultiWorkerMirroredStrategy) on CPU workers, each worker trains on its own shard of the dataset (read from the memory mapped shared datasets one batch at a time) and the gradients and metrics are all-reduced across the workers
+The main function launches the workers as local processes (or runs a single worker of a multi machine cluster given the task index as argument) and reports the training throughput (samples per second) for different number of workers
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import json
+import time
+import pathlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+from run_executor import RunExecutor, load_shared_dataset
+
+def get_tf_config(worker_hosts,task_index):
+	"""get_tf_config returns the TF_CONFIG cluster specification of a worker
+
+		:param worker_hosts: host:port of each worker
+		:type worker_hosts: list (required)
+
+		:param task_index: index of the worker within worker_hosts, worker 0 is the chief
+		:type task_index: int (required)
+
+		:returns: TF_CONFIG json string
+		:rtype: str
+	"""
+	tf_config={
+		'cluster':{'worker':worker_hosts},
+		'task':{'type':'worker','index':task_index}
+	}
+
+	return json.dumps(tf_config)
+
+def get_local_hosts(num_workers,base_port):
+	"""get_local_hosts returns the host:port of local workers for testing on a single machine
+	"""
+	return ['localhost:'+str(base_port+task_index) for task_index in range(num_workers)]
+
+def distributed_worker_run(run_params):
+	"""Single worker of the distributed training, the worker joins the cluster, trains on its shard of the train and validation datasets and the chief worker saves the best model and evaluates the model on the complete validation dataset
+
+		:param run_params: parameters of the worker
+			worker_hosts, task_index: cluster specification
+			input_conv_path, kcc_path: paths of the shared datasets
+			model_params: model_type, output_dimension, optimizer, loss_func, regularizer_coeff, output_type, voxel_dim, voxel_channels, sparse_conv, kernel_size, occupied_voxels_path (sparse_conv only)
+			train_params: batch_size (per worker), epocs, split_ratio
+			model_path, logs_path: file structure
+		:type run_params: dict (required)
+
+		:returns: throughput of the worker, metrics (chief worker only)
+		:rtype: dict
+	"""
+	worker_hosts=run_params['worker_hosts']
+	task_index=run_params['task_index']
+	num_workers=len(worker_hosts)
+
+	#The cluster specification and devices are set before Tensorflow is initialized
+	os.environ['TF_CONFIG']=get_tf_config(worker_hosts,task_index)
+	os.environ['CUDA_VISIBLE_DEVICES']='-1'
+
+	import tensorflow as tf
+	from core_model import DLModel
+	from metrics_eval import MetricsEval
+
+	#CPU threads shared between the local workers
+	if(run_params.get('local_workers',0)==1):
+		threads_per_worker=max(1,multiprocessing.cpu_count()//num_workers)
+		tf.config.threading.set_intra_op_parallelism_threads(threads_per_worker)
+		tf.config.threading.set_inter_op_parallelism_threads(2)
+
+	strategy=tf.distribute.experimental.MultiWorkerMirroredStrategy()
+
+	model_params=run_params['model_params']
+	train_params=run_params['train_params']
+
+	input_conv_data=load_shared_dataset(run_params['input_conv_path'])
+	kcc_subset_dump=load_shared_dataset(run_params['kcc_path'])
+
+	#Same split on all workers
+	samples=len(input_conv_data)
+	shuffled_index=np.random.RandomState(0).permutation(samples)
+	test_dim=int(samples*train_params['split_ratio'])
+	train_index=np.sort(shuffled_index[test_dim:])
+	test_index=np.sort(shuffled_index[:test_dim])
+
+	batch_size=train_params['batch_size']
+	global_batch_size=batch_size*num_workers
+
+	#All workers run the same number of steps of the global batch
+	steps_per_epoch=max(1,len(train_index)//global_batch_size)
+	validation_steps=max(1,len(test_index)//global_batch_size)
+
+	def load_batch(index,sample_ids):
+		#Only the samples of the batch are read from the memory mapped datasets
+		batch_index=np.sort(index[sample_ids.numpy()])
+		return input_conv_data[batch_index].astype(np.float32),kcc_subset_dump[batch_index].astype(np.float32)
+
+	def get_dataset(index):
+		#The dataset holds the sample positions only, each worker keeps its own shard of the positions
+		dataset=tf.data.Dataset.range(len(index)).shard(num_workers,task_index)
+		dataset=dataset.shuffle(len(index)//num_workers+1,seed=task_index).repeat().batch(global_batch_size)
+		dataset=dataset.map(lambda sample_ids: tf.py_function(lambda ids: load_batch(index,ids),[sample_ids],[tf.float32,tf.float32]))
+		dataset=dataset.map(lambda X_batch,y_batch: (tf.ensure_shape(X_batch,[None]+list(input_conv_data.shape[1:])),tf.ensure_shape(y_batch,[None]+list(kcc_subset_dump.shape[1:]))))
+
+		#The datasets are sharded explicitly, the global batch is split into per worker batches by the strategy
+		options=tf.data.Options()
+		options.experimental_distribute.auto_shard_policy=tf.data.experimental.AutoShardPolicy.OFF
+
+		return dataset.with_options(options).prefetch(1)
+
+	train_dataset=get_dataset(train_index)
+	test_dataset=get_dataset(test_index)
+
+	with strategy.scope():
+		dl_model=DLModel(model_params['model_type'],model_params['output_dimension'],model_params['optimizer'],model_params['loss_func'],model_params['regularizer_coeff'],model_params['output_type'])
+
+		if(model_params.get('sparse_conv',0)==1):
+			occupied_voxels=load_shared_dataset(model_params['occupied_voxels_path'])
+			model=dl_model.sparse_cnn_model_3d(occupied_voxels,model_params['voxel_dim'],model_params['voxel_channels'],model_params['kernel_size'])
+		else:
+			model=dl_model.cnn_model_3d(model_params['voxel_dim'],model_params['voxel_channels'])
+
+	model_file_path=run_params['model_path']+'/trained_model_distributed_'+str(num_workers)+'.h5'
+
+	#Only the chief worker writes the model
+	callbacks=[]
+	if(task_index==0):
+		callbacks.append(tf.keras.callbacks.ModelCheckpoint(model_file_path, verbose=1, save_best_only=True, monitor='val_loss'))
+
+	start_time=time.time()
+	history=model.fit(train_dataset, epochs=train_params['epocs'], steps_per_epoch=steps_per_epoch, validation_data=test_dataset, validation_steps=validation_steps, callbacks=callbacks, verbose=2*(task_index==0))
+	train_time=time.time()-start_time
+
+	samples_trained=train_params['epocs']*steps_per_epoch*global_batch_size
+
+	result={
+		'task_index':task_index,
+		'num_workers':num_workers,
+		'train_time_s':train_time,
+		'samples_per_second':samples_trained/train_time,
+		'loss':history.history['loss'][-1],
+		'val_loss':history.history['val_loss'][-1]
+	}
+
+	if(task_index==0):
+		model.load_weights(model_file_path)
+		y_pred=model.predict(input_conv_data[test_index])
+
+		metrics_eval=MetricsEval()
+		eval_metrics,accuracy_metrics_df=metrics_eval.metrics_eval_base(y_pred,kcc_subset_dump[test_index],run_params['logs_path'])
+		accuracy_metrics_df.to_csv(run_params['logs_path']+'/metrics_train_distributed_'+str(num_workers)+'.csv')
+
+		result['model_file_path']=model_file_path
+		result['metrics']=accuracy_metrics_df.mean().to_dict()
+
+	return result
+
+def run_local_workers(run_executor,run_params,num_workers,base_port):
+	"""Launch the workers of the distributed training as local processes
+
+		:param run_executor: run executor used to launch the worker processes
+		:type run_executor: RunExecutor (required)
+
+		:param run_params: parameters of the run (refer distributed_worker_run) without the cluster specification
+		:type run_params: dict (required)
+
+		:param num_workers: number of local workers
+		:type num_workers: int (required)
+
+		:param base_port: port of the first worker, the workers use consecutive ports
+		:type base_port: int (required)
+
+		:returns: result of each worker
+		:rtype: list
+	"""
+	worker_hosts=get_local_hosts(num_workers,base_port)
+
+	run_params_list=[]
+	for task_index in range(num_workers):
+		worker_params=dict(run_params)
+		worker_params['worker_hosts']=worker_hosts
+		worker_params['task_index']=task_index
+		worker_params['local_workers']=1
+		run_params_list.append(worker_params)
+
+	return run_executor.run_parallel(distributed_worker_run,run_params_list,workers=num_workers)
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	from assembly_system import VRMSimulationModel
+	from data_import import GetTrainData
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	part_name=config.assembly_system['part_name']
+	assembly_type=config.assembly_system['assembly_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	assembly_kpis=config.assembly_system['assembly_kpis']
+	voxel_dim=config.assembly_system['voxel_dim']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	mapping_index=config.assembly_system['mapping_index']
+	file_names_x=config.assembly_system['data_files_x']
+	file_names_y=config.assembly_system['data_files_y']
+	file_names_z=config.assembly_system['data_files_z']
+	aritifical_noise=config.assembly_system['aritifical_noise']
+	data_folder=config.assembly_system['data_folder']
+	kcc_folder=config.assembly_system['kcc_folder']
+	kcc_files=config.assembly_system['kcc_files']
+
+	print('Parsing from Training Config File')
+
+	model_params={
+		'model_type':cftrain.model_parameters['model_type'],
+		'output_dimension':assembly_kccs,
+		'optimizer':cftrain.model_parameters['optimizer'],
+		'loss_func':cftrain.model_parameters['loss_func'],
+		'regularizer_coeff':cftrain.model_parameters['regularizer_coeff'],
+		'output_type':cftrain.model_parameters['output_type'],
+		'voxel_dim':voxel_dim,
+		'voxel_channels':voxel_channels
+	}
+
+	train_params={
+		'batch_size':cftrain.model_parameters['batch_size'],
+		'epocs':cftrain.model_parameters['epocs'],
+		'split_ratio':cftrain.model_parameters['split_ratio']
+	}
+
+	worker_hosts=cftrain.distribution_params['worker_hosts']
+	base_port=cftrain.distribution_params['base_port']
+	scaling_workers=cftrain.distribution_params['scaling_workers']
+
+	print('Creating file Structure....')
+
+	train_path='../trained_models/'+part_type
+	pathlib.Path(train_path).mkdir(parents=True, exist_ok=True)
+
+	model_path=train_path+'/model'
+	pathlib.Path(model_path).mkdir(parents=True, exist_ok=True)
+
+	logs_path=train_path+'/logs'
+	pathlib.Path(logs_path).mkdir(parents=True, exist_ok=True)
+
+	run_executor=RunExecutor(train_path+'/shared_data')
+	input_conv_path=os.path.join(run_executor.shared_path,'input_conv_data.npy')
+	kcc_path=os.path.join(run_executor.shared_path,'kcc_subset_dump.npy')
+
+	run_params={
+		'input_conv_path':input_conv_path,
+		'kcc_path':kcc_path,
+		'model_params':model_params,
+		'train_params':train_params,
+		'model_path':model_path,
+		'logs_path':logs_path
+	}
+
+	if(len(worker_hosts)>0):
+		#Worker of a multi machine cluster, the datasets are expected to be shared at the same path on each machine
+		run_params['worker_hosts']=worker_hosts
+		run_params['task_index']=int(sys.argv[1])
+
+		result=distributed_worker_run(run_params)
+		print(result)
+		sys.exit()
+
+	print('Importing and Preprocessing Cloud-of-Point Data')
+
+	vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
+	get_data=GetTrainData()
+
+	dataset=[]
+	dataset.append(get_data.data_import(file_names_x,data_folder))
+	dataset.append(get_data.data_import(file_names_y,data_folder))
+	dataset.append(get_data.data_import(file_names_z,data_folder))
+	point_index=get_data.load_mapping_index(mapping_index)
+
+	kcc_dataset=get_data.data_import(kcc_files,kcc_folder)
+	input_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,kcc_dataset)
+
+	run_executor.share_dataset('input_conv_data',input_conv_data[kpi_subset_dump])
+	run_executor.share_dataset('kcc_subset_dump',kcc_subset_dump[kpi_subset_dump,:])
+	del input_conv_data
+
+	scaling_report=[]
+	for num_workers in scaling_workers:
+		print('Distributed training with local workers: ',num_workers)
+
+		#Different ports for each launch as the ports of the previous cluster may not be released yet
+		results=run_local_workers(run_executor,run_params,num_workers,base_port)
+		base_port=base_port+num_workers
+
+		chief_result=results[0]
+		scaling_report.append({
+			'num_workers':num_workers,
+			'samples_per_second':chief_result['samples_per_second'],
+			'samples_per_second_per_worker':chief_result['samples_per_second']/num_workers,
+			'train_time_s':chief_result['train_time_s'],
+			'val_loss':chief_result['val_loss'],
+			'mean_absolute_error':chief_result['metrics']['Mean Absolute Error'],
+			'r_squared':chief_result['metrics']['R Squared']
+		})
+
+	scaling_df=pd.DataFrame(scaling_report)
+	scaling_df['scaling_efficiency']=scaling_df['samples_per_second_per_worker']/scaling_df['samples_per_second_per_worker'].iloc[0]
+	scaling_df.to_csv(logs_path+'/distributed_scaling_report.csv')
+
+	print('Distributed Training Scaling Report')
+	print(scaling_df)
@@ -40,6 +40,8 @@ from training_viz import TrainViz
 from metrics_eval import MetricsEval
 #from model_train import TrainModel
 from keras_lr_multiplier import LRMultiplier
+from run_executor import RunExecutor
+from isolated_runs import multi_stage_run
 
 if __name__ == '__main__':
 
@@ -79,6 +81,8 @@ if __name__ == '__main__':
 	loss_func=cftrain.model_parameters['loss_func']
 	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
 	activate_tensorboard=cftrain.model_parameters['activate_tensorboard']
+
+	isolate_runs=cftrain.run_executor_params['isolate_runs']
 	
 	print('Parsing Multi-Stage System')
 
@@ -120,6 +124,47 @@ if __name__ == '__main__':
 
 		return model_path,logs_path,plots_path
 
+	#The datasets of each data source are shared with the worker processes once, in the order they are added
+	if(isolate_runs==1):
+		run_executor=RunExecutor(train_path+'/shared_data')
+		x_in_paths=[]
+		x_test_paths=[]
+
+	def train_stage_model(run_id):
+		"""Train the multi head model on the data sources selected so far, in an isolated worker process if isolate_runs is set
+		"""
+		model_path,logs_path,plots_path=folder_struc(train_path+'/run_'+str(run_id))
+		print('Resources at: ',train_path+'/run_'+str(run_id))
+
+		if(isolate_runs==1):
+			for k in range(len(x_in_paths),len(x_in)):
+				x_in_paths.append(run_executor.share_dataset('x_in_'+str(k),x_in[k]))
+				x_test_paths.append(run_executor.share_dataset('x_test_'+str(k),x_test[k]))
+
+			run_params={
+				'x_in_paths':list(x_in_paths),
+				'x_test_paths':list(x_test_paths),
+				'y_out_path':y_out_path,
+				'y_test_path':y_test_path,
+				'model_params':{'model_type':model_type,'output_dimension':output_dimension,'voxel_dim':voxel_dim,'voxel_channels':voxel_channels},
+				'train_params':{'batch_size':batch_size,'epocs':epocs,'split_ratio':split_ratio,'activate_tensorboard':activate_tensorboard},
+				'model_path':model_path,
+				'logs_path':logs_path,
+				'plots_path':plots_path
+			}
+
+			print('Running training in an isolated worker process for run: ',run_id)
+			run_result=run_executor.run(multi_stage_run,run_params)
+			accuracy_metrics_df=run_result['accuracy_metrics_df']
+		else:
+			dl_model=Multi_Head_DLModel(model_type,len(x_in),output_dimension)
+			model=dl_model.multi_head_shared_standard_cnn_model_3d(voxel_dim,voxel_channels)
+
+			train_model=Multi_Head_TrainModel(batch_size,epocs,split_ratio)
+			trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,x_in,y_out,x_test,y_test,model_path,logs_path,plots_path,activate_tensorboard)
+
+		return model_path,logs_path,plots_path,accuracy_metrics_df
+
 	#Objects of Measurement System, Assembly System, Get Inference Data
 	print('Building Sensor Arcitecture and training models...')
 	
@@ -135,6 +180,10 @@ if __name__ == '__main__':
 	y_out=get_data.data_import(kcc_files,kcc_folder)
 	y_test=get_data.data_import(test_kcc_files,kcc_folder)
 
+	if(isolate_runs==1):
+		y_out_path=run_executor.share_dataset('y_out',np.asarray(y_out))
+		y_test_path=run_executor.share_dataset('y_test',np.asarray(y_test))
+
 	#accuracy_metrics_df=pd.read_csv('metrics_data_study_100_.csv')
 	metrics_list=['KCC_ID','MAE','MSE','RMSE','R2']
 	
@@ -161,8 +210,6 @@ if __name__ == '__main__':
 			if(len(inital_stage_list)>0):
 				print('Building Model for inital given sensor system: ', inital_stage_list)
 				model_heads=len(inital_stage_list)
-				dl_model=Multi_Head_DLModel(model_type,model_heads,output_dimension)
-				model=dl_model.multi_head_shared_standard_cnn_model_3d(voxel_dim,voxel_channels)
 
 				print('Getting data from the data sources: ')
 
@@ -191,9 +238,7 @@ if __name__ == '__main__':
 
 				print('Total data sources: ',len(x_test))
 
-				train_model=Multi_Head_TrainModel(batch_size,epocs,split_ratio)		
-				model_path,logs_path,plots_path=folder_struc(train_path+'/run_'+str(i))
-				trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,x_in,y_out,x_test,y_test,model_path,logs_path,plots_path,activate_tensorboard)
+				model_path,logs_path,plots_path,accuracy_metrics_df=train_stage_model(i)
 
 				sensor_list=inital_stage_list
 				print('Process Parameter Accuarcy Metrics after adding intial sensor:')
@@ -217,8 +262,6 @@ if __name__ == '__main__':
 				
 				model_heads=len(inital_stage_list)
 
-				dl_model=Multi_Head_DLModel(model_type,model_heads,output_dimension)
-				model=dl_model.multi_head_shared_standard_cnn_model_3d(voxel_dim,voxel_channels)
 				
 				for stage in multi_stage_sensor_params:
 					
@@ -245,10 +288,7 @@ if __name__ == '__main__':
 							x_test.append(input_conv_data_test)
 							
 				print('Total data sources: ',len(x_test))
-				train_model=Multi_Head_TrainModel(batch_size,epocs,split_ratio)		
-				model_path,logs_path,plots_path=folder_struc(train_path+'/run_'+str(i))
-				print('Resources at: ',train_path+'/run_'+str(i))
-				trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,x_in,y_out,x_test,y_test,model_path,logs_path,plots_path,activate_tensorboard)
+				model_path,logs_path,plots_path,accuracy_metrics_df=train_stage_model(i)
 				accuracy_metrics_df.to_csv(logs_path+'/metrics_train.csv')
 				
 				sensor_list=inital_stage_list
@@ -329,14 +369,7 @@ if __name__ == '__main__':
 
 				model_heads=len(sensor_list)
 
-				dl_model=Multi_Head_DLModel(model_type,model_heads,output_dimension)
-				model=dl_model.multi_head_shared_standard_cnn_model_3d(voxel_dim,voxel_channels)
-
-				train_model=Multi_Head_TrainModel(batch_size,epocs,split_ratio)		
-				
-				model_path,logs_path,plots_path=folder_struc(train_path+'/run_'+str(i))
-				print('Resources at: ',train_path+'/run_'+str(i))
-				trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,x_in,y_out,x_test,y_test,model_path,logs_path,plots_path,activate_tensorboard)
+				model_path,logs_path,plots_path,accuracy_metrics_df=train_stage_model(i)
 				
 				print('Process Parameter Accuarcy Metrics after adding sensor:')
 				print(accuracy_metrics_df)
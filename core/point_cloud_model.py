@@ -0,0 +1,65 @@
+""" Contains core classes and methods for initializing point cloud deep learning models (PointNet) that consume the node deviations directly without voxelization, the models are compiled in the same way as the 3D CNN models (refer core_model.py) so that the same training, metrics and deployment methods can be used"""
+
+class PointCloudModel:
+	""" Point Cloud Model Class
+
+		:param output_dimension: Number of output nodes for the network equal to number of KCCs for the assembly in case MSE is used as loss function
+		:type output_dimension: int (required)
+
+		:param optimizer: The optimizer to be used while model training, refer: https://keras.io/optimizers/ for more information
+		:type optimizer: keras.optimizer (required)
+
+		:param loss_function: The loss function to be optimized by training the model, refer: https://keras.io/losses/ for more information
+		:type loss_function: keras.losses (required)
+
+		:param regularizer_coeff: The L2 norm regularization coefficient value used in the fully connected layers of the model, refer: https://keras.io/regularizers/ for more information
+		:type regularizer_coeff: float (required)
+
+		:param output_type: The output type of the model which can be regression or classification, this is used to define the output layer of the model, defaults to regression (classification: softmax, regression: linear)
+		:type output_type: str
+	"""
+	def __init__(self,output_dimension,optimizer,loss_function,regularizer_coeff,output_type='regression'):
+		self.output_dimension=output_dimension
+		self.optimizer=optimizer
+		self.loss_function=loss_function
+		self.regularizer_coeff=regularizer_coeff
+		self.output_type=output_type
+
+	def pointnet_model(self,point_dim,point_channels=6,mlp_filters=(64,64,128,256)):
+		"""Build the PointNet model, a shared multi layer perceptron (1x1 convolution) is applied to the features of each node (normalized nominal coordinates and deviations) and the node features are aggregated using global max pooling, the aggregation is invariant to the node order
+
+			:param point_dim: Number of nodes of the part
+			:type point_dim: int (required)
+
+			:param point_channels: Number of features of each node, defaults to 6 (nominal x,y,z and deviation x,y,z, refer data_import.GetTrainData.data_convert_point_mc)
+			:type point_channels: int
+
+			:param mlp_filters: Number of filters of each layer of the shared multi layer perceptron, defaults to (64,64,128,256)
+			:type mlp_filters: tuple or list
+		"""
+		from tensorflow.keras.layers import Conv1D, GlobalMaxPooling1D, Dense, Input
+		from tensorflow.keras.models import Model
+		from tensorflow.keras import regularizers
+
+		if(self.output_type=="regression"):
+			final_layer_avt='linear'
+
+		if(self.output_type=="classification"):
+			final_layer_avt='softmax'
+
+		inputs=Input((point_dim,point_channels))
+		x=inputs
+
+		for i,filters in enumerate(mlp_filters):
+			x=Conv1D(filters, kernel_size=1, activation='relu', name="point_mlp_{}".format(i))(x)
+
+		x=GlobalMaxPooling1D(name="point_max_pooling")(x)
+		x=Dense(128,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+		x=Dense(64,kernel_regularizer=regularizers.l2(self.regularizer_coeff),activation='relu')(x)
+		output=Dense(self.output_dimension, activation=final_layer_avt)(x)
+
+		model=Model(inputs, outputs=output, name='PointNet')
+		model.compile(loss=self.loss_function, optimizer=self.optimizer, metrics=['mae'])
+
+		print("PointNet model successfully compiled")
+		return model
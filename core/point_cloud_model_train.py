@@ -0,0 +1,212 @@
+""" The point cloud model train file trains the PointNet model (refer point_cloud_model.py) directly on the node deviations and nominal coordinates without voxelization, the same training (model_train.TrainModel), metrics and deployment (model_deployment.DeployModel) methods as the 3D CNN model are used
+The main function runs the training and populates the created file structure with the trained model, logs and plots, if enabled the 3D CNN model is trained on the same samples and the throughput and accuracy of both models are compared
+The trained model is deployed on measurement files by converting the measurement to point features with wls400a_system.GetInferenceData.point_cloud_mapping (same normalization of the nominal coordinates as in training)
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import time
+import pathlib
+import pandas as pd
+
+#Importing Config files
+import assembly_config as config
+import model_config as cftrain
+
+#Importing required modules from the package
+from assembly_system import VRMSimulationModel
+from data_import import GetTrainData
+from core_model import DLModel
+from point_cloud_model import PointCloudModel
+from model_train import TrainModel
+
+def get_throughput(model,X_in,batch_size,preprocessing_time=0,preprocessed_samples=None):
+	"""get_throughput returns the number of samples inferred per second including the time to pre-process the samples (voxelization or point cloud conversion)
+
+		:param model: trained model
+		:type model: keras.models (required)
+
+		:param X_in: model input
+		:type X_in: numpy.array (required)
+
+		:param batch_size: inference batch size
+		:type batch_size: int (required)
+
+		:param preprocessing_time: time taken to pre-process the samples
+		:type preprocessing_time: float
+
+		:param preprocessed_samples: number of samples pre-processed in preprocessing_time (all the simulated samples including the non convergent samples), the pre-processing time is scaled to the samples of X_in, defaults to the samples of X_in
+		:type preprocessed_samples: int
+
+		:returns: samples per second of the model, samples per second including pre-processing
+		:rtype: float,float
+	"""
+	#First call includes graph construction
+	model.predict(X_in[0:batch_size],batch_size=batch_size)
+
+	start_time=time.time()
+	model.predict(X_in,batch_size=batch_size)
+	inference_time=time.time()-start_time
+
+	if(preprocessed_samples is None):
+		preprocessed_samples=len(X_in)
+
+	sample_preprocessing_time=preprocessing_time/preprocessed_samples
+
+	return len(X_in)/inference_time,len(X_in)/(inference_time+sample_preprocessing_time*len(X_in))
+
+if __name__ == '__main__':
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	part_name=config.assembly_system['part_name']
+	assembly_type=config.assembly_system['assembly_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	assembly_kpis=config.assembly_system['assembly_kpis']
+	voxel_dim=config.assembly_system['voxel_dim']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	mapping_index=config.assembly_system['mapping_index']
+	file_names_x=config.assembly_system['data_files_x']
+	file_names_y=config.assembly_system['data_files_y']
+	file_names_z=config.assembly_system['data_files_z']
+	aritifical_noise=config.assembly_system['aritifical_noise']
+	data_folder=config.assembly_system['data_folder']
+	kcc_folder=config.assembly_system['kcc_folder']
+	kcc_files=config.assembly_system['kcc_files']
+
+	print('Parsing from Training Config File')
+
+	model_type=cftrain.model_parameters['model_type']
+	output_type=cftrain.model_parameters['output_type']
+	batch_size=cftrain.model_parameters['batch_size']
+	epocs=cftrain.model_parameters['epocs']
+	split_ratio=cftrain.model_parameters['split_ratio']
+	optimizer=cftrain.model_parameters['optimizer']
+	loss_func=cftrain.model_parameters['loss_func']
+	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
+	activate_tensorboard=cftrain.model_parameters['activate_tensorboard']
+
+	mlp_filters=cftrain.point_cloud_params['mlp_filters']
+	compare_voxel_model=cftrain.point_cloud_params['compare_voxel_model']
+
+	print('Creating file Structure....')
+
+	train_path='../trained_models/'+part_type
+	pathlib.Path(train_path).mkdir(parents=True, exist_ok=True)
+
+	train_path=train_path+'/point_cloud_model'
+	pathlib.Path(train_path).mkdir(parents=True, exist_ok=True)
+
+	model_path=train_path+'/model'
+	pathlib.Path(model_path).mkdir(parents=True, exist_ok=True)
+
+	logs_path=train_path+'/logs'
+	pathlib.Path(logs_path).mkdir(parents=True, exist_ok=True)
+
+	plots_path=train_path+'/plots'
+	pathlib.Path(plots_path).mkdir(parents=True, exist_ok=True)
+
+	print('Initializing the Assembly System....')
+
+	vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
+	get_data=GetTrainData()
+
+	print('Importing and Preprocessing Cloud-of-Point Data')
+
+	dataset=[]
+	dataset.append(get_data.data_import(file_names_x,data_folder))
+	dataset.append(get_data.data_import(file_names_y,data_folder))
+	dataset.append(get_data.data_import(file_names_z,data_folder))
+	kcc_dataset=get_data.data_import(kcc_files,kcc_folder)
+
+	import voxel_config as vc
+	cop_file_name=vc.voxel_parameters['nominal_cop_filename']
+	cop_file_path='../resources/nominal_cop_files/'+cop_file_name
+	print('Importing Nominal COP')
+	nominal_cop=vrm_system.get_nominal_cop(cop_file_path)
+
+	start_time=time.time()
+	point_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_point_mc(vrm_system,dataset,nominal_cop,kcc_dataset)
+	point_preprocessing_time=time.time()-start_time
+
+	#Collect Only Convergent Samples
+	point_data=point_data[kpi_subset_dump]
+	kcc_subset_dump=kcc_subset_dump[kpi_subset_dump,:]
+
+	output_dimension=assembly_kccs
+
+	print('Building PointNet model')
+	point_cloud_model=PointCloudModel(output_dimension,optimizer,loss_func,regularizer_coeff,output_type)
+	model=point_cloud_model.pointnet_model(point_dim,point_data.shape[-1],mlp_filters)
+	print(model.summary())
+
+	if(activate_tensorboard==1):
+		tensorboard_str='tensorboard' + '--logdir '+logs_path
+		print('Visualize at Tensorboard using ', tensorboard_str)
+
+	print('Training PointNet model')
+	#Both models are split with the same seed so that the accuracy is compared on the same validation samples
+	train_model=TrainModel(batch_size,epocs,split_ratio)
+
+	start_time=time.time()
+	trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,point_data,kcc_subset_dump,model_path,logs_path,plots_path,activate_tensorboard,split_seed=0)
+	point_train_time=time.time()-start_time
+
+	accuracy_metrics_df.to_csv(logs_path+'/metrics_train_point_cloud.csv')
+
+	print("The PointNet Model Validation Metrics are ")
+	print(accuracy_metrics_df.mean())
+
+	if(compare_voxel_model==1):
+		#3D CNN model trained on the same samples for comparison
+		point_index=get_data.load_mapping_index(mapping_index)
+
+		start_time=time.time()
+		input_conv_data, voxel_kcc_dump,voxel_kpi_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,kcc_dataset)
+		voxel_preprocessing_time=time.time()-start_time
+
+		input_conv_data=input_conv_data[voxel_kpi_dump]
+		voxel_kcc_dump=voxel_kcc_dump[voxel_kpi_dump,:]
+
+		print('Building 3D CNN model')
+		dl_model=DLModel(model_type,output_dimension,optimizer,loss_func,regularizer_coeff,output_type)
+		voxel_model=dl_model.cnn_model_3d(voxel_dim,voxel_channels)
+
+		voxel_model_path=model_path+'/voxel_model'
+		pathlib.Path(voxel_model_path).mkdir(parents=True, exist_ok=True)
+
+		start_time=time.time()
+		trained_voxel_model,voxel_eval_metrics,voxel_accuracy_metrics_df=train_model.run_train_model(voxel_model,input_conv_data,voxel_kcc_dump,voxel_model_path,logs_path,plots_path,activate_tensorboard,run_id=1,split_seed=0)
+		voxel_train_time=time.time()-start_time
+
+		voxel_accuracy_metrics_df.to_csv(logs_path+'/metrics_train_voxel.csv')
+
+		point_throughput,point_total_throughput=get_throughput(trained_model,point_data,batch_size,point_preprocessing_time,len(dataset[0]))
+		voxel_throughput,voxel_total_throughput=get_throughput(trained_voxel_model,input_conv_data,batch_size,voxel_preprocessing_time,len(dataset[0]))
+
+		comparison_df=pd.DataFrame({
+			'PointNet':[point_preprocessing_time,point_train_time,point_throughput,point_total_throughput,trained_model.count_params()],
+			'3D CNN':[voxel_preprocessing_time,voxel_train_time,voxel_throughput,voxel_total_throughput,trained_voxel_model.count_params()]
+			},index=['preprocessing_time_s','train_time_s','samples_per_second','samples_per_second_with_preprocessing','parameters'])
+
+		comparison_df=pd.concat([comparison_df,pd.DataFrame({'PointNet':accuracy_metrics_df.mean(),'3D CNN':voxel_accuracy_metrics_df.mean()})])
+		comparison_df.to_csv(logs_path+'/point_cloud_vs_voxel_comparison.csv')
+
+		print("PointNet vs 3D CNN Comparison")
+		print(comparison_df)
+
+	print('Training Completed Successfully')
@@ -0,0 +1,337 @@
+""" The posterior ensemble file exports a Bayesian model with Flipout layers (refer core_model_bayes.Bayes_DLModel) as an ensemble of deterministic sub-models, the posterior of the weights of each Flipout layer is sampled once for each member and the members are standard convolution and dense layers
+The inference of any number of scans is then a fixed number of deterministic forward passes, the same weight samples are used for all the scans so the uncertainty estimates of different scans and parts are comparable
+The main function exports the ensemble of the Bayesian 3D CNN and compares the estimates and inference time of the ensemble with Monte Carlo sampling of the Bayesian model
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+
+class PosteriorEnsemble:
+	"""Posterior Ensemble Class, builds, exports and loads the deterministic members
+
+		:param n_members: Number of posterior weight samples (members of the ensemble)
+		:type n_members: int (required)
+
+		:param seed: Seed of the weight samples, the exported ensemble is reproducible, defaults to 0
+		:type seed: int
+	"""
+	def __init__(self,n_members,seed=0):
+		self.n_members=n_members
+		self.seed=seed
+
+	def is_stochastic(self,layer):
+		"""Layers with a weight posterior (Flipout and reparameterization layers of tensorflow_probability)
+		"""
+		return hasattr(layer,'kernel_posterior')
+
+	def get_deterministic_layer(self,layer):
+		"""Clone function of the members, the stochastic layers are replaced by the deterministic layer of the same configuration and the distribution outputs by the mean of the distribution
+
+			:param layer: layer of the Bayesian model
+			:type layer: keras.layers (required)
+		"""
+		import tensorflow as tf
+		import tensorflow_probability as tfp
+
+		if(self.is_stochastic(layer)):
+			use_bias=layer.bias_posterior is not None
+
+			if(hasattr(layer,'filters')):
+				conv_layers={1:tf.keras.layers.Conv1D,2:tf.keras.layers.Conv2D,3:tf.keras.layers.Conv3D}
+				return conv_layers[len(layer.kernel_size)](layer.filters,kernel_size=layer.kernel_size,strides=layer.strides,padding=layer.padding,data_format=layer.data_format,dilation_rate=layer.dilation_rate,activation=layer.activation,use_bias=use_bias,name=layer.name)
+
+			return tf.keras.layers.Dense(layer.units,activation=layer.activation,use_bias=use_bias,name=layer.name)
+
+		if(isinstance(layer,tfp.layers.DistributionLambda)):
+			make_distribution_fn=layer._make_distribution_fn
+			return tf.keras.layers.Lambda(lambda t: make_distribution_fn(t).mean(),name=layer.name)
+
+		return layer.__class__.from_config(layer.get_config())
+
+	def build_member(self,model):
+		"""Build a deterministic member with the architecture of the Bayesian model, the weights of the deterministic layers are copied from the Bayesian model
+
+			:param model: Bayesian model with trained weights
+			:type model: keras.models (required)
+
+			:returns: deterministic member, the weights of the replaced stochastic layers are not set
+			:rtype: keras.models
+		"""
+		import tensorflow as tf
+
+		member=tf.keras.models.clone_model(model,clone_function=self.get_deterministic_layer)
+
+		for layer in model.layers:
+			if(not self.is_stochastic(layer) and len(layer.get_weights())>0):
+				member.get_layer(layer.name).set_weights(layer.get_weights())
+
+		return member
+
+	def sample_member_weights(self,model,member):
+		"""Set the weights of the replaced layers of the member to a sample of the posterior of the Bayesian model
+
+			:param model: Bayesian model with trained weights
+			:type model: keras.models (required)
+
+			:param member: deterministic member (refer build_member)
+			:type member: keras.models (required)
+		"""
+		for layer in model.layers:
+			if(self.is_stochastic(layer)):
+				member_weights=[layer.kernel_posterior.sample().numpy()]
+
+				if(layer.bias_posterior is not None):
+					member_weights.append(layer.bias_posterior.sample().numpy())
+
+				member.get_layer(layer.name).set_weights(member_weights)
+
+	def export(self,model,ensemble_path):
+		"""Sample the members of the ensemble and save the weights of each member
+
+			:param model: Bayesian model with trained weights
+			:type model: keras.models (required)
+
+			:param ensemble_path: Path at which the weights of the members are saved
+			:type ensemble_path: str (required)
+
+			:returns: list of deterministic members
+			:rtype: list
+		"""
+		import tensorflow as tf
+
+		pathlib.Path(ensemble_path).mkdir(parents=True, exist_ok=True)
+		tf.random.set_seed(self.seed)
+
+		members=[]
+
+		for k in range(self.n_members):
+			member=self.build_member(model)
+			self.sample_member_weights(model,member)
+			member.save_weights(ensemble_path+'/member_'+str(k)+'.h5')
+			members.append(member)
+
+		print('Posterior ensemble exported to: ',ensemble_path)
+
+		return members
+
+	def load(self,model,ensemble_path):
+		"""Load the members of an exported ensemble, the Bayesian model provides the architecture
+
+			:param model: Bayesian model (the weights are not used)
+			:type model: keras.models (required)
+
+			:param ensemble_path: Path at which the weights of the members are saved
+			:type ensemble_path: str (required)
+
+			:returns: list of deterministic members
+			:rtype: list
+		"""
+		members=[]
+
+		for k in range(self.n_members):
+			member=self.build_member(model)
+			member.load_weights(ensemble_path+'/member_'+str(k)+'.h5')
+			members.append(member)
+
+		return members
+
+	def get_stacked_model(self,members):
+		"""Single model with all the members, each output is stacked along the second axis [samples*n_members*...] so that the ensemble is evaluated in a single predict call
+
+			:param members: list of deterministic members
+			:type members: list (required)
+
+			:returns: stacked model
+			:rtype: keras.models
+		"""
+		import tensorflow as tf
+
+		inputs=tf.keras.layers.Input(members[0].input_shape[1:])
+		member_outputs=[member(inputs) for member in members]
+
+		if(isinstance(member_outputs[0],(list,tuple))):
+			stacked_outputs=[tf.keras.layers.Lambda(lambda t: tf.stack(t,axis=1))([outputs[i] for outputs in member_outputs]) for i in range(len(member_outputs[0]))]
+		else:
+			stacked_outputs=tf.keras.layers.Lambda(lambda t: tf.stack(t,axis=1))(member_outputs)
+
+		return tf.keras.Model(inputs,stacked_outputs,name='posterior_ensemble')
+
+	def ensemble_predict(self,members,X_in,batch_size=32,stacked_model=None):
+		"""Predict with each member of the ensemble
+
+			:param members: list of deterministic members
+			:type members: list (required)
+
+			:param X_in: voxelized input
+			:type X_in: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param stacked_model: stacked model of the members (refer get_stacked_model), the members are evaluated one after the other if None, defaults to None
+			:type stacked_model: keras.models
+
+			:returns: list of the predictions of each member for each output [n_members*samples*...]
+			:rtype: list
+		"""
+		if(stacked_model is not None):
+			y_pred=stacked_model.predict(X_in,batch_size=batch_size)
+
+			if(not isinstance(y_pred,list)):
+				y_pred=[y_pred]
+
+			return [np.swapaxes(output,0,1) for output in y_pred]
+
+		member_preds=[]
+
+		for member in members:
+			y_pred=member.predict(X_in,batch_size=batch_size)
+
+			if(not isinstance(y_pred,list)):
+				y_pred=[y_pred]
+
+			member_preds.append(y_pred)
+
+		return [np.stack([y_pred[i] for y_pred in member_preds],axis=0) for i in range(len(member_preds[0]))]
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+
+	from assembly_system import VRMSimulationModel
+	from data_import import GetTrainData
+	from core_model_bayes import Bayes_DLModel
+	from metrics_eval import MetricsEval
+	from mc_inference import ChunkedMCInference
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	part_name=config.assembly_system['part_name']
+	assembly_type=config.assembly_system['assembly_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	assembly_kpis=config.assembly_system['assembly_kpis']
+	voxel_dim=config.assembly_system['voxel_dim']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	mapping_index=config.assembly_system['mapping_index']
+	file_names_x=config.assembly_system['test_data_files_x']
+	file_names_y=config.assembly_system['test_data_files_y']
+	file_names_z=config.assembly_system['test_data_files_z']
+	aritifical_noise=config.assembly_system['aritifical_noise']
+	data_folder=config.assembly_system['data_folder']
+	kcc_folder=config.assembly_system['kcc_folder']
+	kcc_files=config.assembly_system['test_kcc_files']
+
+	print('Parsing from Training Config File')
+
+	model_type=cftrain.model_parameters['model_type']
+	output_type=cftrain.model_parameters['output_type']
+	batch_size=cftrain.model_parameters['batch_size']
+	optimizer=cftrain.model_parameters['optimizer']
+	loss_func=cftrain.model_parameters['loss_func']
+	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
+
+	chunk_size=cftrain.mc_inference_params['chunk_size']
+
+	ensemble_members=cftrain.posterior_ensemble_params['ensemble_members']
+	ensemble_seed=cftrain.posterior_ensemble_params['ensemble_seed']
+	stacked_model_flag=cftrain.posterior_ensemble_params['stacked_model']
+	compare_mc=cftrain.posterior_ensemble_params['compare_mc']
+
+	print('Creating file Structure....')
+
+	train_path='../trained_models/'+part_type
+	model_path=train_path+'/model'
+	bayes_model_path=model_path+'/Bayes_trained_model_0'
+	ensemble_path=model_path+'/posterior_ensemble_0'
+
+	logs_path=train_path+'/logs'
+	pathlib.Path(logs_path).mkdir(parents=True, exist_ok=True)
+
+	vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
+	get_data=GetTrainData()
+
+	print('Importing and Preprocessing Cloud-of-Point Data')
+
+	dataset=[]
+	dataset.append(get_data.data_import(file_names_x,data_folder))
+	dataset.append(get_data.data_import(file_names_y,data_folder))
+	dataset.append(get_data.data_import(file_names_z,data_folder))
+	point_index=get_data.load_mapping_index(mapping_index)
+	kcc_dataset=get_data.data_import(kcc_files,kcc_folder)
+
+	input_conv_data,kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,point_index,kcc_dataset)
+
+	print('Exporting Posterior Ensemble')
+
+	output_dimension=assembly_kccs
+	dl_model=Bayes_DLModel(model_type,output_dimension,optimizer,loss_func,regularizer_coeff,output_type)
+	model=dl_model.bayes_cnn_model_3d(voxel_dim,voxel_channels)
+	model.load_weights(bayes_model_path)
+
+	posterior_ensemble=PosteriorEnsemble(ensemble_members,ensemble_seed)
+	members=posterior_ensemble.export(model,ensemble_path)
+
+	stacked_model=None
+	if(stacked_model_flag==1):
+		stacked_model=posterior_ensemble.get_stacked_model(members)
+
+	#Warm up of the members before timing
+	posterior_ensemble.ensemble_predict(members,input_conv_data[0:1],batch_size,stacked_model)
+
+	start_time=time.time()
+	ensemble_preds=posterior_ensemble.ensemble_predict(members,input_conv_data,batch_size,stacked_model)[0]
+	ensemble_time=time.time()-start_time
+
+	y_pred=ensemble_preds.mean(axis=0)
+	y_std=ensemble_preds.std(axis=0,ddof=1)
+
+	metrics_eval=MetricsEval()
+	eval_metrics,accuracy_metrics_df=metrics_eval.metrics_eval_base(y_pred,kcc_subset_dump,logs_path)
+	accuracy_metrics_df.to_csv(logs_path+'/metrics_posterior_ensemble.csv')
+
+	np.savetxt(logs_path+'/posterior_ensemble_predicted.csv',y_pred,delimiter=",")
+	np.savetxt(logs_path+'/posterior_ensemble_std.csv',y_std,delimiter=",")
+
+	print("The Posterior Ensemble Validation Metrics are ")
+	print(accuracy_metrics_df.mean())
+
+	if(compare_mc==1):
+		print('Monte Carlo Sampling with the same number of draws')
+
+		def draw_function(input_chunk):
+			output=model(input_chunk)
+			return [output.mean()]
+
+		mc_inference=ChunkedMCInference(chunk_size)
+
+		start_time=time.time()
+		mc_results=mc_inference.run(draw_function,input_conv_data,ensemble_members,keep_draws=0)
+		mc_time=time.time()-start_time
+
+		mc_eval_metrics,mc_accuracy_metrics_df=metrics_eval.metrics_eval_base(mc_results[0]['mean'],kcc_subset_dump,logs_path)
+
+		comparison_df=pd.DataFrame({
+			'Posterior Ensemble':[ensemble_time,len(input_conv_data)/ensemble_time,accuracy_metrics_df['Mean Absolute Error'].mean(),np.mean(y_std)],
+			'Monte Carlo':[mc_time,len(input_conv_data)/mc_time,mc_accuracy_metrics_df['Mean Absolute Error'].mean(),np.mean(mc_results[0]['std'])]
+			},index=['inference_time_s','scans_per_s','mae','mean_epistemic_std'])
+
+		comparison_df.to_csv(logs_path+'/posterior_ensemble_vs_mc.csv')
+
+		print("Posterior Ensemble vs Monte Carlo Sampling")
+		print(comparison_df)
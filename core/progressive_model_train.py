@@ -0,0 +1,226 @@
+""" The progressive model train file trains the global pooling 3D CNN model (refer core_model.DLModel.cnn_model_3d_tl) with a resolution schedule, most epochs are trained at a low voxel resolution and the model is fine tuned at the full voxel resolution, the model accepts any voxel resolution so the same weights are used at each stage of the schedule
+The main function runs the progressive training and, if enabled, trains the same model at the full resolution for the same number of epochs and reports the wall clock time and accuracy of both trainings
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+
+class ProgressiveTrainModel:
+	"""Progressive Train Model Class, the train and validation split is fixed for all the stages of the resolution schedule
+
+		:param batch_size: mini batch size while training the model
+		:type batch_size: int (required)
+
+		:param split_ratio: train and validation split for the model
+		:type split_ratio: float (required)
+	"""
+	def __init__(self,batch_size,split_ratio):
+		self.batch_size=batch_size
+		self.split_ratio=split_ratio
+
+	def run_progressive_train(self,model,resolution_data,Y_out,resolution_schedule,model_path,logs_path,run_id=0):
+		"""Train the model at each stage of the resolution schedule, the best model (validation loss) of the last stage is saved, the validation losses of different resolutions are not comparable so the earlier stages are not check pointed
+
+			:param model: compiled model that accepts any voxel resolution (refer core_model.DLModel.cnn_model_3d_tl)
+			:type model: keras.models (required)
+
+			:param resolution_data: voxelized input at each voxel dimension of the schedule
+			:type resolution_data: dict (required)
+
+			:param Y_out: Process Parameters/KCCs of the samples
+			:type Y_out: numpy.array [samples*assembly_kccs] (required)
+
+			:param resolution_schedule: list of (voxel dimension, epochs) of each stage
+			:type resolution_schedule: list (required)
+
+			:returns: trained model, train time of each stage, validation metrics at the last voxel dimension
+			:rtype: keras.models, pandas.DataFrame, pandas.DataFrame
+		"""
+		from sklearn.model_selection import train_test_split
+		from tensorflow.keras.models import load_model
+		from tensorflow.keras.callbacks import ModelCheckpoint
+		from metrics_eval import MetricsEval
+
+		model_file_path=model_path+'/progressive_model_'+str(run_id)+'.h5'
+
+		train_index,test_index=train_test_split(np.arange(len(Y_out)),test_size=self.split_ratio,random_state=run_id)
+
+		stage_times=[]
+		initial_epoch=0
+
+		for stage,(voxel_dim,epochs) in enumerate(resolution_schedule):
+			print('Training stage: ',stage,' voxel dimension: ',voxel_dim,' epochs: ',epochs)
+
+			X_in=resolution_data[voxel_dim]
+			callbacks=[]
+
+			if(stage==len(resolution_schedule)-1):
+				callbacks.append(ModelCheckpoint(model_file_path, verbose=1, save_best_only=True))
+
+			start_time=time.time()
+			model.fit(x=X_in[train_index],y=Y_out[train_index],validation_data=(X_in[test_index],Y_out[test_index]),epochs=initial_epoch+epochs,initial_epoch=initial_epoch,batch_size=self.batch_size,callbacks=callbacks)
+			stage_times.append({'stage':stage,'voxel_dim':voxel_dim,'epochs':epochs,'train_time_s':time.time()-start_time})
+
+			initial_epoch=initial_epoch+epochs
+
+		inference_model=load_model(model_file_path)
+
+		final_voxel_dim=resolution_schedule[-1][0]
+		y_pred=inference_model.predict(resolution_data[final_voxel_dim][test_index])
+
+		metrics_eval=MetricsEval()
+		eval_metrics,accuracy_metrics_df=metrics_eval.metrics_eval_base(y_pred,Y_out[test_index],logs_path)
+
+		return inference_model,pd.DataFrame(stage_times),accuracy_metrics_df
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+
+	from assembly_system import VRMSimulationModel
+	from data_import import GetTrainData
+	from core_model import DLModel
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	part_name=config.assembly_system['part_name']
+	assembly_type=config.assembly_system['assembly_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	assembly_kpis=config.assembly_system['assembly_kpis']
+	voxel_dim=config.assembly_system['voxel_dim']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	mapping_index=config.assembly_system['mapping_index']
+	file_names_x=config.assembly_system['data_files_x']
+	file_names_y=config.assembly_system['data_files_y']
+	file_names_z=config.assembly_system['data_files_z']
+	aritifical_noise=config.assembly_system['aritifical_noise']
+	data_folder=config.assembly_system['data_folder']
+	kcc_folder=config.assembly_system['kcc_folder']
+	kcc_files=config.assembly_system['kcc_files']
+
+	print('Parsing from Training Config File')
+
+	model_type=cftrain.model_parameters['model_type']
+	output_type=cftrain.model_parameters['output_type']
+	batch_size=cftrain.model_parameters['batch_size']
+	split_ratio=cftrain.model_parameters['split_ratio']
+	optimizer=cftrain.model_parameters['optimizer']
+	loss_func=cftrain.model_parameters['loss_func']
+	regularizer_coeff=cftrain.model_parameters['regularizer_coeff']
+
+	resolution_schedule=cftrain.progressive_params['resolution_schedule']
+	mapping_files=cftrain.progressive_params['mapping_files']
+	compare_full_resolution=cftrain.progressive_params['compare_full_resolution']
+
+	print('Creating file Structure....')
+
+	train_path='../trained_models/'+part_type+'/progressive_model'
+	pathlib.Path(train_path).mkdir(parents=True, exist_ok=True)
+
+	model_path=train_path+'/model'
+	pathlib.Path(model_path).mkdir(parents=True, exist_ok=True)
+
+	logs_path=train_path+'/logs'
+	pathlib.Path(logs_path).mkdir(parents=True, exist_ok=True)
+
+	get_data=GetTrainData()
+
+	print('Importing and Preprocessing Cloud-of-Point Data')
+
+	dataset=[]
+	dataset.append(get_data.data_import(file_names_x,data_folder))
+	dataset.append(get_data.data_import(file_names_y,data_folder))
+	dataset.append(get_data.data_import(file_names_z,data_folder))
+	kcc_dataset=get_data.data_import(kcc_files,kcc_folder)
+
+	point_index=get_data.load_mapping_index(mapping_index)
+
+	#Voxelized input at each resolution of the schedule, the mapping index is scaled from the assembly mapping file if no mapping file is given for the resolution
+	resolution_data={}
+	voxelization_times={}
+
+	for stage_voxel_dim,epochs in resolution_schedule:
+		if(stage_voxel_dim in resolution_data):
+			continue
+
+		if(stage_voxel_dim in mapping_files):
+			stage_point_index=get_data.load_mapping_index(mapping_files[stage_voxel_dim])
+		else:
+			stage_point_index=get_data.scale_mapping_index(point_index,voxel_dim,stage_voxel_dim)
+
+		vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,stage_voxel_dim,voxel_channels,point_dim,aritifical_noise)
+
+		start_time=time.time()
+		input_conv_data,kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,dataset,stage_point_index,kcc_dataset)
+		voxelization_times[stage_voxel_dim]=time.time()-start_time
+
+		#Collect Only Convergent Samples
+		resolution_data[stage_voxel_dim]=input_conv_data[kpi_subset_dump]
+		kcc_subset_dump=kcc_subset_dump[kpi_subset_dump,:]
+
+	del dataset
+
+	output_dimension=assembly_kccs
+	train_model=ProgressiveTrainModel(batch_size,split_ratio)
+
+	print('Progressive Resolution Training')
+
+	dl_model=DLModel(model_type,output_dimension,optimizer,loss_func,regularizer_coeff,output_type)
+	model=dl_model.cnn_model_3d_tl(voxel_dim,voxel_channels)
+
+	trained_model,stage_times_df,accuracy_metrics_df=train_model.run_progressive_train(model,resolution_data,kcc_subset_dump,resolution_schedule,model_path,logs_path)
+
+	stage_times_df.to_csv(logs_path+'/progressive_stage_times.csv')
+	accuracy_metrics_df.to_csv(logs_path+'/metrics_progressive.csv')
+
+	print("The Progressive Model Validation Metrics are ")
+	print(accuracy_metrics_df.mean())
+
+	if(compare_full_resolution==1):
+		#Same number of epochs at the full resolution from the start
+		final_voxel_dim=resolution_schedule[-1][0]
+		total_epochs=int(np.sum([epochs for stage_voxel_dim,epochs in resolution_schedule]))
+
+		print('Full Resolution Training')
+
+		dl_model=DLModel(model_type,output_dimension,optimizer,loss_func,regularizer_coeff,output_type)
+		full_model=dl_model.cnn_model_3d_tl(final_voxel_dim,voxel_channels)
+
+		trained_full_model,full_stage_times_df,full_accuracy_metrics_df=train_model.run_progressive_train(full_model,resolution_data,kcc_subset_dump,[(final_voxel_dim,total_epochs)],model_path,logs_path,run_id=1)
+
+		full_accuracy_metrics_df.to_csv(logs_path+'/metrics_full_resolution.csv')
+
+		progressive_time=stage_times_df['train_time_s'].sum()
+		full_time=full_stage_times_df['train_time_s'].sum()
+
+		comparison_df=pd.DataFrame({
+			'Progressive':[progressive_time,np.sum([voxelization_times[dim] for dim in voxelization_times]),accuracy_metrics_df['Mean Absolute Error'].mean(),accuracy_metrics_df['R Squared'].mean()],
+			'Full Resolution':[full_time,voxelization_times[final_voxel_dim],full_accuracy_metrics_df['Mean Absolute Error'].mean(),full_accuracy_metrics_df['R Squared'].mean()]
+			},index=['train_time_s','voxelization_time_s','mae','r2'])
+
+		comparison_df.loc['train_time_saving']=[1-progressive_time/full_time,0.0]
+		comparison_df.to_csv(logs_path+'/progressive_vs_full_resolution.csv')
+
+		print("Progressive vs Full Resolution Training")
+		print(comparison_df)
+
+	print('Training Completed Successfully')
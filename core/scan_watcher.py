@@ -0,0 +1,434 @@
+""" The scan watcher deploys a trained model on the measurement files (WLS400 exports) written by the line scanners to a shared folder, new files are detected by polling the folder and are parsed and voxelized in a background process pool
+The voxelized scans are batched into the resident model (refer core/model_registry.py) and the KCC estimates of each scan are written to the prediction store (refer utilities/result_store.py), the number of scans in flight is bounded (backpressure) and the queue depths, throughput and latency are written to a metrics file, the test harness is core/scan_watcher_harness.py
+"""
+
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import glob
+import json
+import time
+import queue
+import shutil
+import pathlib
+import threading
+import collections
+import numpy as np
+
+#Parsing and voxelization resources of each worker process
+worker_state={}
+
+def init_scan_worker(point_index,voxel_dim,voxel_channels):
+	"""Initialize a worker process of the pool, the voxelizer is built once per process
+
+		:param point_index: mapping index
+		:type point_index: numpy.array [nodes*3] (required)
+
+		:param voxel_dim: The voxel dimension of the grid
+		:type voxel_dim: int (required)
+
+		:param voxel_channels: The number of deviation channels of the model input
+		:type voxel_channels: int (required)
+	"""
+	from inference_server import NodeVoxelizer
+	from wls400a_system import GetInferenceData
+
+	worker_state['voxelizer']=NodeVoxelizer(point_index,voxel_dim)
+	worker_state['get_inference_data']=GetInferenceData()
+	worker_state['voxel_channels']=voxel_channels
+
+def preprocess_scan(file_name):
+	"""Parse and voxelize a measurement file in a worker process
+
+		:param file_name: Path to the measurement file
+		:type file_name: str (required)
+
+		:returns: voxelized scan [voxel_dim*voxel_dim*voxel_dim*voxel_channels], parsing and voxelization time
+		:rtype: numpy.array, float
+	"""
+	start_time=time.time()
+
+	get_inference_data=worker_state['get_inference_data']
+	voxelizer=worker_state['voxelizer']
+
+	measurement_data=get_inference_data.load_measurement_file(file_name)
+	node_data=get_inference_data.data_pre_processing(measurement_data,worker_state['voxel_channels'])
+
+	if(node_data.shape[0]!=voxelizer.point_dim or node_data.shape[1]!=worker_state['voxel_channels']):
+		raise ValueError('Expected deviations of shape ['+str(voxelizer.point_dim)+'*'+str(worker_state['voxel_channels'])+'] in '+file_name+', received '+str(node_data.shape))
+
+	voxel_data=voxelizer.voxelize(node_data[np.newaxis,:,:]).astype(np.float32)
+
+	return voxel_data[0],time.time()-start_time
+
+class ScanWatcher:
+	"""Scan Watcher Class, polls the watch folder for new measurement files, a file is reported once its size is unchanged between two polls so that files still being copied are not read
+
+		:param watch_folder: Path to the folder the scanners export to
+		:type watch_folder: str (required)
+
+		:param file_pattern: glob pattern of the measurement files
+		:type file_pattern: str (required)
+	"""
+	def __init__(self,watch_folder,file_pattern):
+		self.watch_folder=watch_folder
+		self.file_pattern=file_pattern
+		self.file_sizes={}
+		self.reported=set()
+
+	def poll(self):
+		"""Poll the watch folder
+
+			:returns: new measurement files, oldest first
+			:rtype: list
+		"""
+		new_files=[]
+		current_files=set()
+
+		for file_name in glob.glob(os.path.join(self.watch_folder,self.file_pattern)):
+			current_files.add(file_name)
+
+			if(file_name in self.reported):
+				continue
+
+			try:
+				file_stat=os.stat(file_name)
+			except OSError:
+				continue
+
+			if(self.file_sizes.get(file_name)==file_stat.st_size):
+				new_files.append((file_stat.st_mtime,file_name))
+				self.reported.add(file_name)
+			else:
+				self.file_sizes[file_name]=file_stat.st_size
+
+		#Forget the files that have been moved or deleted
+		self.reported=self.reported&current_files
+		self.file_sizes={file_name:size for file_name,size in self.file_sizes.items() if file_name in current_files and file_name not in self.reported}
+
+		return [file_name for mtime,file_name in sorted(new_files)]
+
+class ScanStreamDeployment:
+	"""Streaming Deployment Class, the detected scans wait in the backlog until they can be submitted to the process pool, at most max_pending scans are parsed or waiting for the model at any time (backpressure), the parsed scans are batched into the resident model
+
+		:param model_registry: registry of the resident models (refer model_registry.ModelRegistry)
+		:type model_registry: ModelRegistry (required)
+
+		:param model_key: (part type, model type, version) of the model
+		:type model_key: tuple (required)
+
+		:param result_store: store of the KCC estimates, the part serial of a scan is the measurement file name without extension (refer utilities/result_store.py)
+		:type result_store: PredictionStore (required)
+
+		:param parse_processes: Number of parsing and voxelization processes
+		:type parse_processes: int (required)
+
+		:param max_batch_size: Maximum number of scans of a model prediction
+		:type max_batch_size: int (required)
+
+		:param max_latency_ms: Maximum time the first parsed scan of a batch waits for other scans in milliseconds
+		:type max_latency_ms: float (required)
+
+		:param max_pending: Maximum number of scans being parsed or waiting for the model
+		:type max_pending: int (required)
+
+		:param archive_folder: Path to move the processed files to, the files are left in the watch folder if None
+		:type archive_folder: str
+	"""
+	def __init__(self,model_registry,model_key,result_store,parse_processes,max_batch_size,max_latency_ms,max_pending,archive_folder=None):
+		import multiprocessing
+
+		self.model_registry=model_registry
+		self.model_key=tuple(model_key)
+		self.result_store=result_store
+		self.max_batch_size=max_batch_size
+		self.max_latency_ms=max_latency_ms
+		self.max_pending=max_pending
+		self.archive_folder=archive_folder
+
+		#Load and warm up the model before the pool is started
+		entry=self.model_registry.get(*self.model_key)
+		part_system=self.model_registry.part_systems[self.model_key[0]]
+
+		from data_import import GetTrainData
+		point_index=GetTrainData().load_mapping_index(part_system['mapping_index'])
+
+		#Spawned processes do not inherit the tensorflow state of the deployment process
+		self.pool=multiprocessing.get_context('spawn').Pool(parse_processes,initializer=init_scan_worker,initargs=(point_index,entry.voxel_dim,entry.voxel_channels))
+
+		self.backlog=collections.deque()
+		self.ready_queue=queue.Queue()
+		self.lock=threading.Lock()
+		self.in_flight=0
+
+		self.start_time=time.time()
+		self.metrics={'detected':0,'processed':0,'failed':0,'batches':0,'backpressure_events':0,'backpressure_time_s':0.0,
+					'parse_time_s':0.0,'predict_time_s':0.0,'max_pending_observed':0}
+		self.latencies=collections.deque(maxlen=1000)
+		self.backpressure_start=None
+
+	def add_files(self,file_names):
+		"""Add the detected files to the backlog
+		"""
+		detect_time=time.time()
+
+		for file_name in file_names:
+			self.backlog.append((file_name,detect_time))
+
+		self.metrics['detected']=self.metrics['detected']+len(file_names)
+
+	def get_pending(self):
+		"""Number of scans being parsed or waiting for the model
+		"""
+		with self.lock:
+			return self.in_flight+self.ready_queue.qsize()
+
+	def dispatch(self):
+		"""Submit the backlog to the process pool until the pending limit is reached
+		"""
+		while(len(self.backlog)>0 and self.get_pending()<self.max_pending):
+			file_name,detect_time=self.backlog.popleft()
+
+			with self.lock:
+				self.in_flight=self.in_flight+1
+
+			self.pool.apply_async(preprocess_scan,(file_name,),callback=self.get_parse_callback(file_name,detect_time),error_callback=self.get_error_callback(file_name))
+
+		pending=self.get_pending()
+		self.metrics['max_pending_observed']=max(self.metrics['max_pending_observed'],pending)
+
+		#Backpressure, the scans are held in the backlog (files stay in the watch folder) until the model catches up
+		if(len(self.backlog)>0):
+			if(self.backpressure_start is None):
+				self.backpressure_start=time.time()
+				self.metrics['backpressure_events']=self.metrics['backpressure_events']+1
+		elif(self.backpressure_start is not None):
+			self.metrics['backpressure_time_s']=self.metrics['backpressure_time_s']+time.time()-self.backpressure_start
+			self.backpressure_start=None
+
+	def get_parse_callback(self,file_name,detect_time):
+		def parse_callback(parse_result):
+			voxel_data,parse_time=parse_result
+			with self.lock:
+				self.in_flight=self.in_flight-1
+				self.metrics['parse_time_s']=self.metrics['parse_time_s']+parse_time
+				self.ready_queue.put((file_name,detect_time,voxel_data))
+
+		return parse_callback
+
+	def get_error_callback(self,file_name):
+		def error_callback(error):
+			print('Failed to process: ',file_name,error)
+			with self.lock:
+				self.in_flight=self.in_flight-1
+				self.metrics['failed']=self.metrics['failed']+1
+
+		return error_callback
+
+	def get_batch(self,timeout):
+		"""Wait for a parsed scan and collect the scans parsed within the latency window (refer inference_server.MicroBatcher.get_batch)
+
+			:param timeout: Maximum time to wait for the first scan in seconds
+			:type timeout: float (required)
+
+			:returns: list of (file name, detect time, voxelized scan)
+			:rtype: list
+		"""
+		try:
+			batch=[self.ready_queue.get(timeout=timeout)]
+		except queue.Empty:
+			return []
+
+		deadline=time.time()+self.max_latency_ms/1000
+
+		while(len(batch)<self.max_batch_size):
+			remaining_time=deadline-time.time()
+
+			if(remaining_time<=0):
+				break
+			try:
+				batch.append(self.ready_queue.get(timeout=remaining_time))
+			except queue.Empty:
+				break
+
+		return batch
+
+	def run_batch(self,timeout):
+		"""Predict the KCCs of the next batch of parsed scans and write the estimates
+
+			:param timeout: Maximum time to wait for a parsed scan in seconds
+			:type timeout: float (required)
+
+			:returns: number of scans predicted
+			:rtype: int
+		"""
+		batch=self.get_batch(timeout)
+
+		if(len(batch)==0):
+			return 0
+
+		file_names=[file_name for file_name,detect_time,voxel_data in batch]
+
+		#A failed batch is counted and skipped so that the watcher keeps processing the next scans
+		try:
+			start_time=time.time()
+			y_pred=self.model_registry.get(*self.model_key).predict(np.stack([voxel_data for file_name,detect_time,voxel_data in batch],axis=0))
+			self.metrics['predict_time_s']=self.metrics['predict_time_s']+time.time()-start_time
+
+			part_serials=[os.path.splitext(os.path.basename(file_name))[0] for file_name in file_names]
+			self.result_store.add(part_serials,y_pred,*self.model_key)
+		except Exception as error:
+			print('Failed to predict scans: ',file_names,error)
+			self.metrics['failed']=self.metrics['failed']+len(batch)
+			return 0
+
+		write_time=time.time()
+		for file_name,detect_time,voxel_data in batch:
+			self.latencies.append(write_time-detect_time)
+
+		if(self.archive_folder is not None):
+			for file_name in file_names:
+				shutil.move(file_name,os.path.join(self.archive_folder,os.path.basename(file_name)))
+
+		self.metrics['processed']=self.metrics['processed']+len(batch)
+		self.metrics['batches']=self.metrics['batches']+1
+
+		return len(batch)
+
+	def get_metrics(self):
+		"""Queue depths, throughput and latency (detection to result written) of the deployment
+		"""
+		metrics=dict(self.metrics)
+		elapsed_time=time.time()-self.start_time
+
+		with self.lock:
+			metrics['in_flight']=self.in_flight
+			metrics['ready_depth']=self.ready_queue.qsize()
+
+		metrics['backlog_depth']=len(self.backlog)
+		metrics['pending']=metrics['in_flight']+metrics['ready_depth']
+		metrics['backpressure']=int(self.backpressure_start is not None)
+		metrics['elapsed_time_s']=elapsed_time
+		metrics['throughput']=metrics['processed']/max(elapsed_time,1e-6)
+		metrics['mean_batch_size']=metrics['processed']/max(metrics['batches'],1)
+
+		if(len(self.latencies)>0):
+			metrics['latency_p50_ms']=float(np.percentile(self.latencies,50)*1000)
+			metrics['latency_p95_ms']=float(np.percentile(self.latencies,95)*1000)
+
+		return metrics
+
+	def write_metrics(self,metrics_file):
+		"""Write the metrics to a json file, the file is replaced atomically so that readers never see a partial file
+		"""
+		temp_file=metrics_file+'.tmp'
+
+		with open(temp_file,'w') as metrics_out:
+			json.dump(self.get_metrics(),metrics_out,indent=2)
+
+		os.replace(temp_file,metrics_file)
+
+	def run(self,scan_watcher,poll_interval,metrics_file,metrics_interval):
+		"""Watch, parse and predict until interrupted
+
+			:param scan_watcher: watcher of the watch folder
+			:type scan_watcher: ScanWatcher (required)
+
+			:param poll_interval: Interval between the polls of the watch folder in seconds
+			:type poll_interval: float (required)
+
+			:param metrics_file: Path to the metrics file
+			:type metrics_file: str (required)
+
+			:param metrics_interval: Interval between the metrics updates in seconds
+			:type metrics_interval: float (required)
+		"""
+		next_poll=0
+		next_metrics=0
+
+		try:
+			while True:
+				current_time=time.time()
+
+				if(current_time>=next_poll):
+					self.add_files(scan_watcher.poll())
+					next_poll=current_time+poll_interval
+
+				self.dispatch()
+				self.run_batch(timeout=max(next_poll-time.time(),0.001))
+				self.result_store.flush_if_due()
+
+				if(time.time()>=next_metrics):
+					self.write_metrics(metrics_file)
+					next_metrics=time.time()+metrics_interval
+
+		except KeyboardInterrupt:
+			print('Stopping scan watcher')
+
+		finally:
+			self.pool.terminate()
+			self.result_store.flush()
+			self.write_metrics(metrics_file)
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	from model_registry import ModelRegistry
+	from result_store import PredictionStore
+
+	print("Welcome to Deep Learning for Manufacturing (dlmfg)...")
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+
+	print('Parsing from Training Config File')
+
+	watch_folder=cftrain.scan_watcher_params['watch_folder']
+	file_pattern=cftrain.scan_watcher_params['file_pattern']
+	poll_interval=cftrain.scan_watcher_params['poll_interval']
+	parse_processes=cftrain.scan_watcher_params['parse_processes']
+	max_batch_size=cftrain.scan_watcher_params['max_batch_size']
+	max_latency_ms=cftrain.scan_watcher_params['max_latency_ms']
+	max_pending=cftrain.scan_watcher_params['max_pending']
+	archive_processed=cftrain.scan_watcher_params['archive_processed']
+	metrics_interval=cftrain.scan_watcher_params['metrics_interval']
+	model_type=cftrain.scan_watcher_params['model_type']
+
+	model_files=cftrain.model_registry_params['model_files']
+	memory_cap_mb=cftrain.model_registry_params['memory_cap_mb']
+
+	#Generate Paths
+	train_path='../trained_models/'+part_type
+	deploy_path=train_path+'/deploy/'
+	pathlib.Path(deploy_path).mkdir(parents=True, exist_ok=True)
+	pathlib.Path(watch_folder).mkdir(parents=True, exist_ok=True)
+
+	archive_folder=None
+	if(archive_processed==1):
+		archive_folder=os.path.join(watch_folder,'processed')
+		pathlib.Path(archive_folder).mkdir(parents=True, exist_ok=True)
+
+	model_registry=ModelRegistry(model_files,memory_cap_mb,batch_sizes=cftrain.compiled_predict_params['batch_sizes'],xla=cftrain.compiled_predict_params['xla'])
+	model_registry.register_part(config.assembly_system)
+
+	print('Loading Model and Starting Parsing Processes....')
+	result_store=PredictionStore(cftrain.result_store_params['store_file'],cftrain.result_store_params['buffer_size'],cftrain.result_store_params['flush_interval'])
+	scan_deployment=ScanStreamDeployment(model_registry,(part_type,model_type,0),result_store,parse_processes,max_batch_size,max_latency_ms,max_pending,archive_folder)
+	scan_watcher=ScanWatcher(watch_folder,file_pattern)
+
+	print('Watching for measurement files in: ',watch_folder)
+	scan_deployment.run(scan_watcher,poll_interval,deploy_path+'scan_watcher_metrics.json',metrics_interval)
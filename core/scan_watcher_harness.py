@@ -0,0 +1,145 @@
+""" The scan watcher test harness drops synthetic measurement files (in the WLS400 export format read by wls400a_system.GetInferenceData) into the watch folder of the scan watcher (refer core/scan_watcher.py) at a fixed rate and verifies that the watcher sustains the rate
+The end to end latency (file written to estimates written) of each scan, the achieved throughput and the peak queue depths of the watcher are saved to the deploy folder, the scan watcher should be running before the harness is started
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import json
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+
+def write_synthetic_scan(file_name,nominal_cop,deviations):
+	"""Write a synthetic measurement file, the file is written under a temporary name and renamed so that the watcher never reads a partial file
+
+		:param file_name: Path to the measurement file
+		:type file_name: str (required)
+
+		:param nominal_cop: nominal coordinates of the nodes
+		:type nominal_cop: numpy.array [nodes*3] (required)
+
+		:param deviations: x,y,z deviations of the nodes
+		:type deviations: numpy.array [nodes*3] (required)
+	"""
+	n_nodes=len(nominal_cop)
+
+	#Columns 5:8 are the nominal and 10:13 the actual coordinates (refer wls400a_system.GetInferenceData.data_pre_processing)
+	scan_df=pd.DataFrame({'Name':['SF'+str(i) for i in range(n_nodes)],'Type':'SurfacePoint','Feature':'SF','Status':1,'Scanner':0,
+						'X_nom':nominal_cop[:,0],'Y_nom':nominal_cop[:,1],'Z_nom':nominal_cop[:,2],'Tol_low':-1.0,'Tol_high':1.0,
+						'X_act':nominal_cop[:,0]+deviations[:,0],'Y_act':nominal_cop[:,1]+deviations[:,1],'Z_act':nominal_cop[:,2]+deviations[:,2]})
+
+	temp_file=file_name+'.tmp'
+
+	with open(temp_file,'w') as scan_file:
+		for i in range(25):
+			scan_file.write('#Synthetic measurement file meta data line '+str(i)+'\n')
+
+		scan_df.to_csv(scan_file,sep=' ',index=False,float_format='%.4f')
+
+	os.replace(temp_file,file_name)
+
+def read_metrics(metrics_file):
+	"""Read the metrics file of the scan watcher, None if the file is not available yet
+	"""
+	try:
+		with open(metrics_file) as metrics_in:
+			return json.load(metrics_in)
+	except (OSError,ValueError):
+		return None
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	from assembly_system import PartType
+	from result_store import PredictionStore
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	nominal_cop_filename=config.assembly_system['nominal_cop_filename']
+
+	print('Parsing from Training Config File')
+
+	watch_folder=cftrain.scan_watcher_params['watch_folder']
+	harness_rate=cftrain.scan_watcher_params['harness_rate']
+	harness_duration=cftrain.scan_watcher_params['harness_duration']
+	harness_timeout=cftrain.scan_watcher_params['harness_timeout']
+
+	deploy_path='../trained_models/'+part_type+'/deploy/'
+	metrics_file=deploy_path+'scan_watcher_metrics.json'
+	store_file=cftrain.result_store_params['store_file']
+	pathlib.Path(watch_folder).mkdir(parents=True, exist_ok=True)
+
+	part_model=PartType(config.assembly_system['assembly_type'],config.assembly_system['assembly_kccs'],config.assembly_system['assembly_kpis'],config.assembly_system['part_name'],part_type,config.assembly_system['voxel_dim'],config.assembly_system['voxel_channels'],config.assembly_system['point_dim'])
+	nominal_cop=part_model.get_nominal_cop('../resources/nominal_cop_files/'+nominal_cop_filename)
+
+	#The throughput does not depend on the deviation values, random deviations are used for all scans
+	run_id=time.strftime('%Y%m%d%H%M%S')
+	n_scans=int(harness_rate*harness_duration)
+	drop_times={}
+	peak_metrics={'pending':0,'backlog_depth':0,'backpressure_events':0}
+
+	print('Dropping ',n_scans,' synthetic scans at ',harness_rate,' scans per second')
+	start_time=time.time()
+
+	for i in range(n_scans):
+		#Drops are scheduled from the start time so that the rate is sustained when a write is slow
+		time.sleep(max(start_time+i/harness_rate-time.time(),0))
+
+		part_serial='harness_'+run_id+'_'+str(i)
+		write_synthetic_scan(os.path.join(watch_folder,part_serial+'.txt'),nominal_cop,np.random.normal(0,0.5,size=nominal_cop.shape))
+		drop_times[part_serial]=time.time()
+
+		metrics=read_metrics(metrics_file)
+		if(metrics is not None):
+			for key in peak_metrics.keys():
+				peak_metrics[key]=max(peak_metrics[key],metrics[key])
+
+	drop_time=time.time()-start_time
+
+	print('Waiting for the scan watcher to process the scans')
+	prediction_store=PredictionStore(store_file)
+	processed_serials=set()
+	results_df=pd.DataFrame(columns=['part_serial','timestamp'])
+
+	while(len(processed_serials)<n_scans and time.time()-start_time<drop_time+harness_timeout):
+		time.sleep(1)
+
+		if(os.path.isfile(store_file)):
+			results_df=prediction_store.query('SELECT part_serial, MIN(timestamp) AS timestamp FROM predictions WHERE part_serial LIKE ? GROUP BY part_serial',('harness_'+run_id+'_%',))
+			processed_serials=set(results_df['part_serial'])
+
+	prediction_store.close()
+	results_df=results_df[results_df['part_serial'].isin(drop_times.keys())]
+
+	if(len(results_df)==0):
+		print('No scans were processed, check that the scan watcher is running')
+		sys.exit(1)
+
+	latencies=(results_df['timestamp']-results_df['part_serial'].map(drop_times)).values*1000
+	total_time=results_df['timestamp'].max()-start_time
+
+	benchmark_result={'offered_rate':harness_rate,'scans':n_scans,'processed_scans':len(results_df),'throughput':len(results_df)/total_time,
+					'sustained':int(len(results_df)==n_scans and len(results_df)/total_time>=0.95*harness_rate),
+					'latency_p50_ms':np.percentile(latencies,50),'latency_p95_ms':np.percentile(latencies,95),'latency_p99_ms':np.percentile(latencies,99),
+					'peak_pending':peak_metrics['pending'],'peak_backlog':peak_metrics['backlog_depth'],'backpressure_events':peak_metrics['backpressure_events']}
+
+	benchmark_df=pd.DataFrame([benchmark_result])
+	benchmark_df.to_csv(deploy_path+'scan_watcher_benchmark.csv')
+
+	print('Scan Watcher Benchmark')
+	print(benchmark_df)
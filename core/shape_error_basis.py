@@ -0,0 +1,166 @@
+""" Contains classes and methods to compress the stage wise shape error (node deviations) to a low dimensional PCA basis, the U-Net models can be trained to predict the basis coefficients of each stage instead of the complete voxel grid, the node deviations (or voxels) are reconstructed from the coefficients when required (refer custom_layers.PCAReconstruct)
+"""
+
+import numpy as np
+
+class ShapeErrorBasis:
+	"""Shape Error Basis Class, fits an incremental PCA basis on the x,y,z node deviations of a stage, the basis is fit in batches so that the complete dataset is never required in memory
+
+		:param n_components: Number of basis vectors (coefficients predicted by the model)
+		:type n_components: int (required)
+
+		:param batch_size: Number of samples used for each incremental fit, defaults to 500
+		:type batch_size: int
+	"""
+	def __init__(self,n_components,batch_size=500):
+
+		self.n_components=n_components
+		self.batch_size=max(batch_size,n_components)
+		self.components=None
+		self.mean=None
+		self.explained_variance_ratio=None
+
+	def get_node_data(self,dataset,point_dim,start_index=0,end_index=None):
+		"""Stack the x,y,z node deviations of the dataset as a single vector per sample
+
+			:param dataset: list of concatenated dataset consisting of x,y,z deviations for each node
+			:type dataset: list (required)
+
+			:param point_dim: number of nodes
+			:type point_dim: int (required)
+
+			:returns: node deviations [x deviations, y deviations, z deviations]
+			:rtype: numpy.array [samples*(3*point_dim)]
+		"""
+		return np.concatenate([channel_data.iloc[start_index:end_index, 0:point_dim].values for channel_data in dataset],axis=1)
+
+	def fit(self,dataset,point_dim):
+		"""Fit the basis on the node deviations of the dataset using sklearn IncrementalPCA
+
+			:param dataset: list of concatenated dataset consisting of x,y,z deviations for each node
+			:type dataset: list (required)
+
+			:param point_dim: number of nodes
+			:type point_dim: int (required)
+		"""
+		from sklearn.decomposition import IncrementalPCA
+
+		samples=len(dataset[0])
+		incremental_pca=IncrementalPCA(n_components=self.n_components)
+
+		for start_index in range(0,samples,self.batch_size):
+			end_index=start_index+self.batch_size
+
+			#The last batch is merged with the previous batch if it is smaller than the number of components
+			if(samples-end_index<self.n_components):
+				end_index=samples
+
+			incremental_pca.partial_fit(self.get_node_data(dataset,point_dim,start_index,end_index))
+
+			if(end_index==samples):
+				break
+
+		self.components=incremental_pca.components_.astype(np.float32)
+		self.mean=incremental_pca.mean_.astype(np.float32)
+		self.explained_variance_ratio=incremental_pca.explained_variance_ratio_
+
+		print('Shape error basis fitted, explained variance: ',np.sum(self.explained_variance_ratio))
+
+	def transform(self,dataset,point_dim):
+		"""Project the node deviations of the dataset on to the basis, the basis is orthonormal so the squared error of the coefficients is the squared error of the reconstructed node deviations (within the basis)
+
+			:returns: basis coefficients
+			:rtype: numpy.array [samples*n_components]
+		"""
+		node_data=self.get_node_data(dataset,point_dim)
+
+		return np.dot(node_data-self.mean,self.components.T)
+
+	def inverse_transform(self,coefficients,point_dim):
+		"""Reconstruct the node deviations from the basis coefficients
+
+			:param coefficients: basis coefficients
+			:type coefficients: numpy.array [samples*n_components] (required)
+
+			:param point_dim: number of nodes
+			:type point_dim: int (required)
+
+			:returns: node deviations
+			:rtype: numpy.array [samples*point_dim*3]
+		"""
+		node_data=np.dot(coefficients,self.components)+self.mean
+
+		return np.transpose(np.reshape(node_data,(-1,3,point_dim)),(0,2,1))
+
+	def save(self,file_path):
+		"""Save the basis as a .npz file
+		"""
+		np.savez(file_path,components=self.components,mean=self.mean,explained_variance_ratio=self.explained_variance_ratio)
+
+	def load(self,file_path):
+		"""Load a basis saved using save
+		"""
+		basis_data=np.load(file_path)
+
+		self.components=basis_data['components']
+		self.mean=basis_data['mean']
+		self.explained_variance_ratio=basis_data['explained_variance_ratio']
+		self.n_components=self.components.shape[0]
+
+def reconstruct_stages(basis_list,coefficients,point_dim):
+	"""Reconstruct the node deviations of all stages from the concatenated stage coefficients (model shape error output)
+
+		:param basis_list: fitted basis of each stage
+		:type basis_list: list (required)
+
+		:param coefficients: concatenated basis coefficients of each stage
+		:type coefficients: numpy.array [samples*(stages*n_components)] (required)
+
+		:param point_dim: number of nodes
+		:type point_dim: int (required)
+
+		:returns: node deviations of each stage concatenated along the last axis
+		:rtype: numpy.array [samples*point_dim*(3*stages)]
+	"""
+	n_coefficients=int(np.sum([basis.n_components for basis in basis_list]))
+
+	if(coefficients.shape[1]!=n_coefficients):
+		raise ValueError('The model has '+str(coefficients.shape[1])+' basis coefficients, the basis of the '+str(len(basis_list))+' stages have '+str(n_coefficients))
+
+	node_data_list=[]
+	start_index=0
+
+	for basis in basis_list:
+		end_index=start_index+basis.n_components
+		node_data_list.append(basis.inverse_transform(coefficients[:,start_index:end_index],point_dim))
+		start_index=end_index
+
+	return np.concatenate(node_data_list,axis=-1)
+
+def get_reconstruction_model(model,basis_list,point_dim):
+	"""Append the basis reconstruction (refer custom_layers.PCAReconstruct) to a model trained on the basis coefficients, the shape error output of the returned model is the node deviations of each stage
+
+		:param model: model with the shape error basis coefficients as the last output
+		:type model: keras.models (required)
+
+		:param basis_list: fitted basis of each stage
+		:type basis_list: list (required)
+
+		:param point_dim: number of nodes
+		:type point_dim: int (required)
+
+		:returns: model with node deviation outputs [samples*point_dim*(3*stages)]
+		:rtype: keras.models
+	"""
+	from tensorflow.keras.models import Model
+	from custom_layers import PCAReconstruct
+
+	components=np.stack([basis.components for basis in basis_list])
+	mean=np.stack([basis.mean for basis in basis_list])
+
+	if(model.outputs[-1].shape[-1]!=components.shape[0]*components.shape[1]):
+		raise ValueError('The model has '+str(model.outputs[-1].shape[-1])+' basis coefficients, the basis of the '+str(len(basis_list))+' stages have '+str(components.shape[0]*components.shape[1]))
+
+	node_output=PCAReconstruct(len(basis_list),components.shape[1],point_dim,components=components,mean=mean,name='shape_error_nodes')(model.outputs[-1])
+
+	return Model(model.inputs,outputs=model.outputs[:-1]+[node_output],name=model.name+'_Reconstruct')
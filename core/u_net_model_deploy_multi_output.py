@@ -60,7 +60,7 @@ class Unet_DeployModel:
 		The class contains run_train_model method
 	"""	
 			
-	def unet_run_model(self,model,X_in_test,model_path,logs_path,plots_path,test_result=0,Y_out_test_list=0,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune'):
+	def unet_run_model(self,model,X_in_test,model_path,logs_path,plots_path,test_result=0,Y_out_test_list=0,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune',predictor=None):
 		"""run_train_model function trains the model on the dataset and saves the trained model,logs and plots within the file structure, the function prints the training evaluation metrics
 			
 			:param model: 3D CNN model compiled within the Deep Learning Class, refer https://keras.io/models/model/ for more information 
@@ -86,6 +86,9 @@ class Unet_DeployModel:
 
 			:param run_id: Run id index used in data study to conduct multiple training runs with different dataset sizes, defaults to 0
 			:type run_id: int			
+
+			:param predictor: compiled prediction functions of the model (refer compiled_predict.CompiledPredictor), keras predict is used if None
+			:type predictor: CompiledPredictor
 		"""			
 		import tensorflow as tf
 		from tensorflow.keras.models import load_model
@@ -99,7 +102,10 @@ class Unet_DeployModel:
 		model.load_weights(model_file_path)
 		print("Trained Model Weights loaded successfully")
 		print("Conducting Inference...")
-		model_outputs=model.predict(X_in_test)
+		if(predictor is None):
+			model_outputs=model.predict(X_in_test)
+		else:
+			model_outputs=predictor.predict(X_in_test)
 		y_pred=model_outputs[0]
 		print("Inference Completed !")
 		
@@ -310,9 +316,10 @@ if __name__ == '__main__':
 
 	model_depth=cftrain.encode_decode_params['model_depth']
 	inital_filter_dim=cftrain.encode_decode_params['inital_filter_dim']
+	recompute_encoder=cftrain.encode_decode_params['recompute_encoder']
 
 	dl_model_unet=Encode_Decode_Model(output_dimension)
-	model=dl_model_unet.encode_decode_3d_multi_output_attention(inital_filter_dim,model_depth,input_size,output_heads,voxel_channels)
+	model=dl_model_unet.encode_decode_3d_multi_output_attention(inital_filter_dim,model_depth,input_size,output_heads,voxel_channels,recompute_encoder=recompute_encoder)
 
 	print(model.summary())
 	#sys.exit()
@@ -381,8 +388,14 @@ if __name__ == '__main__':
 	
 	unet_deploy_model=Unet_DeployModel()
 
+	#Compiled prediction functions for the common batch sizes (refer compiled_predict.py)
+	predictor=None
+	if(cftrain.compiled_predict_params['compiled_predict']==1):
+		from compiled_predict import CompiledPredictor
+		predictor=CompiledPredictor(model,cftrain.compiled_predict_params['batch_sizes'],cftrain.compiled_predict_params['xla'])
+
 	if(deploy_output==1):
-		y_pred,model_outputs,model,eval_metrics,accuracy_metrics_df,eval_metrics_cop_list,accuracy_metrics_df_cop_list=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output,Y_out_test_list)
+		y_pred,model_outputs,model,eval_metrics,accuracy_metrics_df,eval_metrics_cop_list,accuracy_metrics_df_cop_list=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output,Y_out_test_list,predictor=predictor)
 		
 		accuracy_metrics_df.to_csv(logs_path+'/metrics_test_KCC.csv')
 		
@@ -464,7 +477,7 @@ if __name__ == '__main__':
 			index=index+1
 
 	if(deploy_output==0):
-		y_pred,y_cop_pred_list,model=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output)
+		y_pred,y_cop_pred_list,model=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output,predictor=predictor)
 
 		print('Predicted KCCs')
 		print(y_pred)
\ No newline at end of file
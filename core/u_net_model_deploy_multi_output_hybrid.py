@@ -61,7 +61,7 @@ class Unet_DeployModel:
 		The class contains run_train_model method
 	"""	
 			
-	def unet_run_model(self,model,X_in_test,model_path,logs_path,plots_path,test_result=0,Y_out_test_list=0,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune'):
+	def unet_run_model(self,model,X_in_test,model_path,logs_path,plots_path,test_result=0,Y_out_test_list=0,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune',predictor=None):
 		"""run_train_model function trains the model on the dataset and saves the trained model,logs and plots within the file structure, the function prints the training evaluation metrics
 			
 			:param model: 3D CNN model compiled within the Deep Learning Class, refer https://keras.io/models/model/ for more information 
@@ -87,6 +87,9 @@ class Unet_DeployModel:
 
 			:param run_id: Run id index used in data study to conduct multiple training runs with different dataset sizes, defaults to 0
 			:type run_id: int			
+
+			:param predictor: compiled prediction functions of the model (refer compiled_predict.CompiledPredictor), keras predict is used if None
+			:type predictor: CompiledPredictor
 		"""			
 		import tensorflow as tf
 		from tensorflow.keras.models import load_model
@@ -100,7 +103,10 @@ class Unet_DeployModel:
 		model.load_weights(model_file_path)
 		print("Trained Model Weights loaded successfully")
 		print("Conducting Inference...")
-		model_outputs=model.predict(X_in_test)
+		if(predictor is None):
+			model_outputs=model.predict(X_in_test)
+		else:
+			model_outputs=predictor.predict(X_in_test)
 		y_pred_regression=model_outputs[0]
 		y_pred_classification=model_outputs[1]
 		print("Inference Completed !")
@@ -317,9 +323,23 @@ if __name__ == '__main__':
 
 	model_depth=cftrain.encode_decode_params['model_depth']
 	inital_filter_dim=cftrain.encode_decode_params['inital_filter_dim']
+	recompute_encoder=cftrain.encode_decode_params['recompute_encoder']
+	sparse_shape_error=cftrain.encode_decode_params['sparse_shape_error']
+	shape_error_components=cftrain.encode_decode_params['shape_error_components']
+
+	#The basis coefficient head has shape_error_components outputs per head and a basis is fitted per stage
+	if(shape_error_components>0 and output_heads!=len(encode_decode_multi_output_construct)):
+		raise ValueError('output_heads ('+str(output_heads)+') should be equal to the number of stages ('+str(len(encode_decode_multi_output_construct))+') when shape_error_components is greater than 0')
+
+	point_index=get_data.load_mapping_index(mapping_index)
+
+	#Model trained with sparse shape error outputs, outputs are converted back to the voxel grid for evaluation
+	occupied_voxels=None
+	if(sparse_shape_error==1):
+		occupied_voxels,node_voxel_index=get_data.get_occupied_voxels(point_index[0:point_dim,:])
 
 	dl_model_unet=Encode_Decode_Model(output_dimension)
-	model=dl_model_unet.encode_decode_3d_multi_output_attention_hybrid(inital_filter_dim,model_depth,input_size,categorical_kccs,output_heads,voxel_channels)
+	model=dl_model_unet.encode_decode_3d_multi_output_attention_hybrid(inital_filter_dim,model_depth,input_size,categorical_kccs,output_heads,voxel_channels,recompute_encoder=recompute_encoder,occupied_voxels=occupied_voxels,shape_error_components=shape_error_components)
 
 	print(model.summary())
 	#sys.exit()
@@ -334,8 +354,6 @@ if __name__ == '__main__':
 	
 	print('Importing and Preprocessing Cloud-of-Point Data')
 	
-	point_index=get_data.load_mapping_index(mapping_index)
-	
 	get_point_cloud=GetPointCloud()
 
 	cop_file_name=vc.voxel_parameters['nominal_cop_filename']
@@ -399,9 +417,33 @@ if __name__ == '__main__':
 	
 	unet_deploy_model=Unet_DeployModel()
 
+	#Compiled prediction functions for the common batch sizes (refer compiled_predict.py)
+	predictor=None
+	if(cftrain.compiled_predict_params['compiled_predict']==1):
+		from compiled_predict import CompiledPredictor
+		predictor=CompiledPredictor(model,cftrain.compiled_predict_params['batch_sizes'],cftrain.compiled_predict_params['xla'])
+
 	if(deploy_output==1):
-		model_outputs,model,accuracy_metrics_df_reg,accuracy_metrics_df_cla=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output,Y_out_test_list)
+		model_outputs,model,accuracy_metrics_df_reg,accuracy_metrics_df_cla=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output,Y_out_test_list,predictor=predictor)
 		
+		if(shape_error_components>0):
+			#Node deviations reconstructed from the basis coefficients of each stage
+			from shape_error_basis import ShapeErrorBasis, reconstruct_stages
+			
+			basis_list=[]
+			for stage_index in range(len(encode_decode_multi_output_construct)):
+				shape_error_basis=ShapeErrorBasis(shape_error_components)
+				shape_error_basis.load(model_path+'/shape_error_basis_'+str(stage_index)+'.npz')
+				basis_list.append(shape_error_basis)
+
+			model_outputs=list(model_outputs)
+			node_outputs=reconstruct_stages(basis_list,model_outputs[2],point_dim)
+			model_outputs[2]=get_data.node_to_voxel(node_outputs,point_index,voxel_dim)
+
+		elif(sparse_shape_error==1):
+			model_outputs=list(model_outputs)
+			model_outputs[2]=get_data.sparse_to_voxel(model_outputs[2],occupied_voxels,voxel_dim)
+
 		print("Model Deployment Complete")
 		
 
@@ -500,7 +542,7 @@ if __name__ == '__main__':
 			index=index+1
 
 	if(deploy_output==0):
-		model_outputs,model=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output)
+		model_outputs,model=unet_deploy_model.unet_run_model(model,test_input_conv_data,model_path,logs_path,plots_path,deploy_output,predictor=predictor)
 
 		print('Predicted KCCs')
 		print(model_outputs[0],model_outputs[1])
\ No newline at end of file
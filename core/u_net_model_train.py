@@ -198,9 +198,10 @@ if __name__ == '__main__':
 
 	model_depth=cftrain.encode_decode_params['model_depth']
 	inital_filter_dim=cftrain.encode_decode_params['inital_filter_dim']
+	recompute_encoder=cftrain.encode_decode_params['recompute_encoder']
 
 	dl_model_unet=Encode_Decode_Model(output_dimension)
-	model=dl_model_unet.encode_decode_3d(inital_filter_dim,model_depth,input_size,voxel_channels)
+	model=dl_model_unet.encode_decode_3d(inital_filter_dim,model_depth,input_size,voxel_channels,recompute_encoder=recompute_encoder)
 
 	print(model.summary())
 	#sys.exit()
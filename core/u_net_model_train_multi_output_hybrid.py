@@ -39,7 +39,9 @@ from assembly_system import VRMSimulationModel
 from wls400a_system import GetInferenceData
 from data_import import GetTrainData
 from encode_decode_model import Encode_Decode_Model
+from shape_error_basis import ShapeErrorBasis
 from training_viz import TrainViz
+from gradient_accumulation import GradientAccumulationTrainer
 from metrics_eval import MetricsEval
 from keras_lr_multiplier import LRMultiplier
 
@@ -55,12 +57,16 @@ class Unet_TrainModel:
 		:param split_ratio: train and validation split for the model
 		:type assembly_system: float (required)
 
+		:param micro_batch_size: micro batch size for gradient accumulation, the gradients are accumulated over micro batches up to the batch size (effective batch size) before each optimizer step, defaults to 0 (no gradient accumulation)
+		:type micro_batch_size: int
+
 		The class contains run_train_model method
 	"""	
-	def __init__(self,batch_size,epochs,split_ratio):
+	def __init__(self,batch_size,epochs,split_ratio,micro_batch_size=0):
 			self.batch_size=batch_size
 			self.epochs=epochs
 			self.split_ratio=split_ratio
+			self.micro_batch_size=micro_batch_size
 			
 
 	def unet_run_train_model(self,model,X_in,Y_out_list,X_in_test,Y_out_test_list,model_path,logs_path,plots_path,activate_tensorboard=0,run_id=0,tl_type='full_fine_tune'):
@@ -99,7 +105,11 @@ class Unet_TrainModel:
 		#tensorboard_callback = tf.keras.callbacks.TensorBoard(log_dir='C:\\Users\\sinha_s\\Desktop\\dlmfg_package\\dlmfg\\trained_models\\inner_rf_assembly\\logs',histogram_freq=1)
 		checkpointer = tf.keras.callbacks.ModelCheckpoint(model_file_path, verbose=1, save_best_only=True,monitor='val_loss',save_weights_only=True)
 		#Check pointer to save the best model
-		history=model.fit(x=X_in,y=Y_out_list, validation_data=(X_in_test,Y_out_test_list), epochs=self.epochs, batch_size=self.batch_size,callbacks=[checkpointer])
+		if(self.micro_batch_size>0 and self.micro_batch_size<self.batch_size):
+			accumulation_trainer=GradientAccumulationTrainer(self.micro_batch_size,self.batch_size,self.epochs)
+			history=accumulation_trainer.accumulation_fit(model,X_in,Y_out_list,X_in_test,Y_out_test_list,model_file_path)
+		else:
+			history=model.fit(x=X_in,y=Y_out_list, validation_data=(X_in_test,Y_out_test_list), epochs=self.epochs, batch_size=self.batch_size,callbacks=[checkpointer])
 		
 		def mse_scaled(y_true,y_pred):
 			return K.mean(K.square((y_pred - y_true)/10))
@@ -211,11 +221,25 @@ if __name__ == '__main__':
 
 	model_depth=cftrain.encode_decode_params['model_depth']
 	inital_filter_dim=cftrain.encode_decode_params['inital_filter_dim']
+	recompute_encoder=cftrain.encode_decode_params['recompute_encoder']
+	sparse_shape_error=cftrain.encode_decode_params['sparse_shape_error']
+	shape_error_components=cftrain.encode_decode_params['shape_error_components']
+
+	#The basis coefficient head has shape_error_components outputs per head and a basis is fitted per stage
+	if(shape_error_components>0 and output_heads!=len(encode_decode_multi_output_construct)):
+		raise ValueError('output_heads ('+str(output_heads)+') should be equal to the number of stages ('+str(len(encode_decode_multi_output_construct))+') when shape_error_components is greater than 0')
+
+	point_index=get_data.load_mapping_index(mapping_index)
+
+	#Shape error targets and loss only at the voxels occupied by the nodes
+	occupied_voxels=None
+	if(sparse_shape_error==1):
+		occupied_voxels,node_voxel_index=get_data.get_occupied_voxels(point_index[0:point_dim,:])
 
 	dl_model_unet=Encode_Decode_Model(output_dimension)
 	
 	#changed to attention model
-	model=dl_model_unet.encode_decode_3d_multi_output_attention_hybrid(inital_filter_dim,model_depth,input_size,categorical_kccs,output_heads,voxel_channels)
+	model=dl_model_unet.encode_decode_3d_multi_output_attention_hybrid(inital_filter_dim,model_depth,input_size,categorical_kccs,output_heads,voxel_channels,recompute_encoder=recompute_encoder,occupied_voxels=occupied_voxels,shape_error_components=shape_error_components)
 
 	print(model.summary())
 	#sys.exit()
@@ -236,8 +260,6 @@ if __name__ == '__main__':
 	
 	print('Importing and Preprocessing Cloud-of-Point Data')
 	
-	point_index=get_data.load_mapping_index(mapping_index)
-	
 	input_dataset=[]
 	input_dataset.append(get_data.data_import(input_file_names_x,data_folder))
 	input_dataset.append(get_data.data_import(input_file_names_y,data_folder))
@@ -271,7 +293,7 @@ if __name__ == '__main__':
 	y_shape_error_list=[]
 	y_shape_error_test_list=[]
 
-	for encode_decode_construct in encode_decode_multi_output_construct:
+	for stage_index,encode_decode_construct in enumerate(encode_decode_multi_output_construct):
 		#importing file names for model output
 		print("Importing output data for stage: ",encode_decode_construct)
 		
@@ -293,8 +315,23 @@ if __name__ == '__main__':
 		test_output_dataset.append(get_data.data_import(test_output_file_names_y,data_folder))
 		test_output_dataset.append(get_data.data_import(test_output_file_names_z,data_folder))
 		
-		output_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,output_dataset,point_index,kcc_dataset)
-		test_output_conv_data, test_kcc_subset_dump,test_kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,test_output_dataset,point_index,test_kcc_dataset)
+		if(shape_error_components>0):
+			#Stage shape error compressed to the PCA basis coefficients, the basis is fitted on the convergent train samples
+			kpi_subset_dump=list(np.where(output_dataset[0].iloc[:, point_dim].values==1)[0])
+			test_kpi_subset_dump=list(np.where(test_output_dataset[0].iloc[:, point_dim].values==1)[0])
+
+			shape_error_basis=ShapeErrorBasis(shape_error_components)
+			shape_error_basis.fit([channel_data.iloc[kpi_subset_dump] for channel_data in output_dataset],point_dim)
+			shape_error_basis.save(model_path+'/shape_error_basis_'+str(stage_index)+'.npz')
+
+			output_conv_data=shape_error_basis.transform(output_dataset,point_dim)
+			test_output_conv_data=shape_error_basis.transform(test_output_dataset,point_dim)
+		elif(sparse_shape_error==1):
+			output_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_sparse_mc(vrm_system,output_dataset,point_index,kcc_dataset)
+			test_output_conv_data, test_kcc_subset_dump,test_kpi_subset_dump=get_data.data_convert_sparse_mc(vrm_system,test_output_dataset,point_index,test_kcc_dataset)
+		else:
+			output_conv_data, kcc_subset_dump,kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,output_dataset,point_index,kcc_dataset)
+			test_output_conv_data, test_kcc_subset_dump,test_kpi_subset_dump=get_data.data_convert_voxel_mc(vrm_system,test_output_dataset,point_index,test_kcc_dataset)
 		
 		convergent_train.append(kpi_subset_dump)
 		convergent_test.append(test_kpi_subset_dump)
@@ -329,17 +366,25 @@ if __name__ == '__main__':
 	Y_out_test_list.append(kcc_regression_test)
 	Y_out_test_list.append(kcc_classification_test)
 	
-	shape_error=np.concatenate(y_shape_error_list, axis=4)
-	shape_error_test=np.concatenate(y_shape_error_test_list, axis=4)
+	#Stages are concatenated along the channel axis (last axis for voxel grid, sparse and basis coefficient targets)
+	shape_error=np.concatenate(y_shape_error_list, axis=-1)
+	shape_error_test=np.concatenate(y_shape_error_test_list, axis=-1)
 
 	#Filter for convergent IDs
-	shape_error=shape_error[convergent_ids_train,:,:,:,:]
-	shape_error_test=shape_error_test[convergent_ids_test,:,:,:,:]
+	shape_error=shape_error[convergent_ids_train]
+	shape_error_test=shape_error_test[convergent_ids_test]
 
 	Y_out_list.append(shape_error)
 	Y_out_test_list.append(shape_error_test)
 
-	unet_train_model=Unet_TrainModel(batch_size,epocs,split_ratio)
+	#Gradient accumulation over micro batches to reach the effective batch size, only when a micro batch size is set
+	micro_batch_size=cftrain.encode_decode_params['micro_batch_size']
+	effective_batch_size=cftrain.encode_decode_params['effective_batch_size']
+	if(micro_batch_size>0 and effective_batch_size>0):
+		print('Gradient accumulation, batch size: ',batch_size,' replaced by the effective batch size: ',effective_batch_size)
+		batch_size=effective_batch_size
+
+	unet_train_model=Unet_TrainModel(batch_size,epocs,split_ratio,micro_batch_size)
 	
 	trained_model,accuracy_metrics_df_reg,accuracy_metrics_df_cla=unet_train_model.unet_run_train_model(model,input_conv_data,Y_out_list,test_input_conv_data,Y_out_test_list,model_path,logs_path,plots_path,activate_tensorboard)
 	
@@ -54,8 +54,8 @@ class GetInferenceData():
 			:param voxel_channels: The number of voxel channels that can be extracted from the the measurement file
 			:type voxel_channels: int (required)
 
-			:returns: numpy array of the node deviations (this is similar to what is obtained from the VRM software )
-			:rtype: numpy.array [1*nodes]
+			:returns: numpy array of the node deviations (this is similar to what is obtained from the VRM software ), y deviations for one channel and x,y,z deviations for three channels
+			:rtype: numpy.array [nodes*voxel_channels]
 		"""
 
 		measurement_data_subset=measurement_data.loc[(measurement_data['Name'].str[0:2] == 'SF')]
@@ -67,10 +67,43 @@ class GetInferenceData():
 		if(voxel_channels==1):
 			y_dev_data_filtered=imputed_deviations[:,1:2]
 		if(voxel_channels==3):
-			y_dev_data_filtered=imputed_deviations[:,1:4]
+			y_dev_data_filtered=imputed_deviations[:,0:3]
 		
 		return y_dev_data_filtered
 
+	def point_cloud_mapping(self,measurement_data,nominal_cop,point_dim):
+		"""Map the measured node deviations to point features for input to the PointNet model (refer core/point_cloud_model.py), the nominal coordinates are normalized in the same way as in training (refer data_import.GetTrainData.data_convert_point_mc)
+			
+			:param measurement_data: measurement data imported using load_measurement_file
+			:type measurement_data: pandas.DataFrame (required)
+
+			:param nominal_cop: nominal cloud of point of the part (refer assembly_system.PartType.get_nominal_cop)
+			:type nominal_cop: numpy.array [nodes*3] (required)
+
+			:param point_dim: the number of nodes
+			:type point_dim: int (required)
+
+			:returns: point_data, normalized nominal coordinates and x,y,z deviations of each node (input to the PointNet model)
+			:rtype: numpy.array [1*point_dim*6]
+		"""
+		measurement_data_subset=measurement_data.loc[(measurement_data['Name'].str[0:2] == 'SF')]
+		nominal_coordinates=measurement_data_subset.iloc[:,5:8]
+		actual_coordinates=measurement_data_subset.iloc[:,10:13]
+		deviations=np.nan_to_num(actual_coordinates.values-nominal_coordinates.values)
+
+		if(len(deviations)<point_dim):
+			raise ValueError('The measurement file has '+str(len(deviations))+' surface points, '+str(point_dim)+' nodes are required')
+
+		nominal_cop=np.asarray(nominal_cop[0:point_dim,:],dtype=float)
+		nominal_cop=nominal_cop-nominal_cop.mean(axis=0)
+		nominal_cop=nominal_cop/np.max(np.abs(nominal_cop))
+
+		point_data=np.zeros((1,point_dim,6),dtype=np.float32)
+		point_data[0,:,0:3]=nominal_cop
+		point_data[0,:,3:6]=deviations[0:point_dim,:]
+
+		return point_data
+
 	def voxel_mapping(self,y_dev_data_filtered,voxel_point_index,point_dim,voxel_dim,voxel_channels):
 		"""Map the node deviations to voxel structure for input to the 3D CNN model
 			
@@ -13,21 +13,74 @@ import plotly as py
 from plotly.offline import iplot
 import plotly.express as px
 import plotly.graph_objects as go
+import os
+import sys
+sys.path.append("../utilities")
+sys.path.append("../config")
 
+import assembly_config as config
+import model_config as cftrain
+from result_store import PredictionStore
+
+#Predictions of the users are read from the prediction store (refer utilities/result_store.py) and joined to the user inputs on the part serial (user_inputs.csv: user name, part_serial and KCC inputs)
+#The serials are taken from user_serials.csv (written by the deployment, one serial per input row) if user_inputs.csv has no part_serial column, otherwise the inputs are joined to the predictions on the row position as in earlier versions
+store_file=cftrain.result_store_params['store_file']
+serials_file=cftrain.result_store_params['user_serials_file']
+part_type=config.assembly_system['part_type']
 
-user_preds = pd.read_csv("user_preds.csv")
 user_inputs= pd.read_csv("user_inputs.csv",index_col=None)
 #print(user_inputs.columns.values)
-
 count_user_inputs = user_inputs.shape[0]
-count_user_preds = user_preds.shape[0] 
 
-if(count_user_inputs!=count_user_preds):
-	print("Inconsistency between CAE Simulation and AI Model")
+if(os.path.isfile(store_file)):
+	prediction_store=PredictionStore(store_file)
+	user_preds=prediction_store.get_estimates(part_type)
+	prediction_store.close()
+
+	#Only the predictions of the users in the order they were stored
+	user_preds=user_preds[user_preds['part_serial'].astype(str).str.startswith('user_')]
+	kcc_columns=[column for column in user_preds.columns if column.startswith('kcc_')]
+
+	if('part_serial' not in user_inputs.columns and os.path.isfile(serials_file)):
+		user_serials=pd.read_csv(serials_file)
+
+		if(len(user_serials)==count_user_inputs):
+			user_inputs['part_serial']=user_serials['part_serial'].values
+		else:
+			print("user_serials.csv has ",len(user_serials)," serials for ",count_user_inputs," user inputs, the inputs are joined on the row position")
+
+	input_columns=[column for column in user_inputs.columns[1:] if column!='part_serial']
+
+	if('part_serial' in user_inputs.columns):
+		#The latest prediction of a serial is kept
+		user_preds=user_preds.drop_duplicates('part_serial',keep='last')
+		user_results=user_inputs.merge(user_preds[['part_serial']+kcc_columns],on='part_serial',how='left')
+
+		if(user_results[kcc_columns].isnull().any(axis=1).sum()>0):
+			print("Inconsistency between CAE Simulation and AI Model, inputs without predictions: ",user_results[user_results[kcc_columns].isnull().any(axis=1)]['part_serial'].tolist())
+			user_results=user_results.dropna(subset=kcc_columns)
+
+		user_names=user_results.iloc[:,0:1].values
+		errors=user_results[input_columns].values.astype(float)-user_results[kcc_columns].values
+	else:
+		if(count_user_inputs!=len(user_preds)):
+			print("Inconsistency between CAE Simulation and AI Model")
+
+		count_results=min(count_user_inputs,len(user_preds))
+		user_names=user_inputs.iloc[0:count_results,0:1].values
+		errors=user_inputs[input_columns].iloc[0:count_results,:].values.astype(float)-user_preds[kcc_columns].iloc[0:count_results,:].values
+else:
+	user_preds = pd.read_csv("user_preds.csv")
+
+	count_user_preds = user_preds.shape[0] 
+
+	if(count_user_inputs!=count_user_preds):
+		print("Inconsistency between CAE Simulation and AI Model")
+
+	#print(user_inputs)
+	user_names=user_inputs.iloc[:,0:1].values
+	errors=(user_inputs.iloc[:,1:7].values).astype(np.float)-user_preds.iloc[0:count_user_inputs,:].values
 
-#print(user_inputs)
-user_names=user_inputs.iloc[:,0:1].values
-errors=(user_inputs.iloc[:,1:7].values).astype(np.float)-user_preds.iloc[0:count_user_inputs,:].values
 errors=np.absolute(errors)
 print(errors)
 mae=errors.mean(axis=1)  
@@ -0,0 +1,412 @@
+""" Contains classes and methods for the hyper-parameter search of the 3D U-Net architectures (refer model_base_arch.BaseModelArch.base_model_func), the trials are trained in parallel worker processes (refer utilities/run_executor.py) and poor trials are stopped early using successive halving, the trials and the result of each rung are stored in a sqlite database so that an interrupted search resumes from the last completed trial
+The main function runs the search on the hybrid (regression, classification and shape error) dataset
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../model_selection")
+sys.path.append("../visualization")
+sys.path.append("../utilities")
+sys.path.append("../datasets")
+sys.path.append("../trained_models")
+sys.path.append("../config")
+
+#Importing Required Modules
+import json
+import time
+import sqlite3
+import pathlib
+import numpy as np
+import pandas as pd
+
+from run_executor import RunExecutor, load_shared_dataset
+
+class TrialHyperParameters:
+	"""Trial Hyper Parameters Class, provides the hp interface (Int, Float, Choice) used by the model builders with the fixed values of a trial, hyper-parameters not set for the trial return their default value
+
+		:param values: hyper-parameter values of the trial
+		:type values: dict (required)
+	"""
+	def __init__(self,values):
+		self.values=values
+
+	def Int(self,name,min_value,max_value,step=1,default=None):
+		if(default is None):
+			default=min_value
+		return int(self.values.get(name,default))
+
+	def Float(self,name,min_value,max_value,step=None,sampling=None,default=None):
+		if(default is None):
+			default=min_value
+		return float(self.values.get(name,default))
+
+	def Choice(self,name,values,default=None):
+		if(default is None):
+			default=values[0]
+		return self.values.get(name,default)
+
+class TrialDatabase:
+	"""Trial Database Class, sqlite database of the trials of a search and the validation loss of each trial at each rung, the validation loss is the unweighted sum of the per output validation losses (refer get_unweighted_val_loss) as the loss weights are sampled for each trial
+
+		:param db_path: Path of the sqlite database file, the database is created if it does not exist
+		:type db_path: str (required)
+	"""
+	def __init__(self,db_path):
+
+		self.db_path=db_path
+
+		with sqlite3.connect(self.db_path) as connection:
+			connection.execute('CREATE TABLE IF NOT EXISTS trials (trial_id INTEGER PRIMARY KEY, config TEXT, status TEXT, weights_path TEXT)')
+			connection.execute('CREATE TABLE IF NOT EXISTS rung_results (trial_id INTEGER, rung INTEGER, epochs INTEGER, val_loss REAL, train_time REAL, metrics TEXT, PRIMARY KEY (trial_id, rung))')
+
+	def add_trials(self,configs):
+		"""Add the trials of a new search, existing trials are kept so the search is only sampled once
+		"""
+		with sqlite3.connect(self.db_path) as connection:
+			for trial_id,config in enumerate(configs):
+				connection.execute('INSERT OR IGNORE INTO trials VALUES (?,?,?,?)',(trial_id,json.dumps(config),'running',None))
+
+	def get_trials(self):
+		"""Get the trials of the search
+
+			:returns: dictionary of trial id and hyper-parameter values
+			:rtype: dict
+		"""
+		with sqlite3.connect(self.db_path) as connection:
+			rows=connection.execute('SELECT trial_id, config FROM trials ORDER BY trial_id').fetchall()
+
+		return {trial_id:json.loads(config) for trial_id,config in rows}
+
+	def add_result(self,trial_id,rung,epochs,val_loss,train_time,weights_path,metrics):
+		"""Record the result of a trial at a rung
+		"""
+		with sqlite3.connect(self.db_path) as connection:
+			connection.execute('INSERT OR REPLACE INTO rung_results VALUES (?,?,?,?,?,?)',(trial_id,rung,epochs,val_loss,train_time,json.dumps(metrics)))
+			connection.execute('UPDATE trials SET weights_path=? WHERE trial_id=?',(weights_path,trial_id))
+
+	def get_rung_results(self,rung):
+		"""Get the validation loss of the trials evaluated at a rung
+
+			:returns: dictionary of trial id and validation loss
+			:rtype: dict
+		"""
+		with sqlite3.connect(self.db_path) as connection:
+			rows=connection.execute('SELECT trial_id, val_loss FROM rung_results WHERE rung=?',(rung,)).fetchall()
+
+		return dict(rows)
+
+	def set_status(self,trial_ids,status):
+		"""Set the status (running, stopped, complete) of the trials
+		"""
+		with sqlite3.connect(self.db_path) as connection:
+			connection.executemany('UPDATE trials SET status=? WHERE trial_id=?',[(status,trial_id) for trial_id in trial_ids])
+
+	def get_summary(self):
+		"""Summary of the trials with the validation loss at the last evaluated rung
+
+			:returns: trial summary sorted by the last rung and validation loss
+			:rtype: pandas.DataFrame
+		"""
+		with sqlite3.connect(self.db_path) as connection:
+			summary_df=pd.read_sql_query('SELECT trials.trial_id, trials.config, trials.status, trials.weights_path, rung_results.rung, rung_results.epochs, rung_results.val_loss FROM trials JOIN rung_results ON trials.trial_id=rung_results.trial_id WHERE rung_results.rung=(SELECT MAX(rung) FROM rung_results WHERE rung_results.trial_id=trials.trial_id)',connection)
+
+		return summary_df.sort_values(['rung','val_loss'],ascending=[False,True])
+
+def sample_configs(search_space,n_trials,seed=0):
+	"""Randomly sample the hyper-parameter values of the trials from the search space
+
+		:param search_space: list of values of each hyper-parameter
+		:type search_space: dict (required)
+
+		:param n_trials: number of trials
+		:type n_trials: int (required)
+
+		:returns: list of hyper-parameter values of each trial
+		:rtype: list
+	"""
+	random_state=np.random.RandomState(seed)
+
+	configs=[]
+	for trial in range(n_trials):
+		configs.append({name:values[random_state.randint(len(values))] for name,values in search_space.items()})
+
+	return configs
+
+def get_unweighted_val_loss(history,output_names):
+	"""Best (minimum over the epochs) unweighted sum of the per output validation losses, the weighted val_loss of keras is not comparable between trials with different loss weights
+
+		:param history: history of keras fit
+		:type history: dict (required)
+
+		:param output_names: names of the model outputs
+		:type output_names: list (required)
+
+		:returns: unweighted validation loss
+		:rtype: float
+	"""
+	output_val_losses=np.array([history['val_'+output_name+'_loss'] for output_name in output_names])
+
+	return float(np.min(np.sum(output_val_losses,axis=0)))
+
+def hp_trial_run(run_params):
+	"""Train a single trial up to the epochs of the rung, the training continues from the weights of the previous rung of the trial
+
+		:param run_params: parameters of the trial
+			trial_id, rung, config: trial and hyper-parameter values
+			initial_epoch, epochs: epochs of the previous and current rung
+			input_conv_path, output_paths, input_conv_test_path, output_test_paths: paths of the shared datasets
+			model_params: output_dimension, categorical_kccs, voxel_dim, voxel_channels, output_heads
+			batch_size, search_path: batch size and folder of the trial weights
+		:type run_params: dict (required)
+
+		:returns: unweighted validation loss of the trial
+		:rtype: dict
+	"""
+	from model_base_arch import BaseModelArch
+
+	model_params=run_params['model_params']
+
+	input_conv_data=load_shared_dataset(run_params['input_conv_path'])
+	Y_out_list=[load_shared_dataset(path) for path in run_params['output_paths']]
+	input_conv_data_test=load_shared_dataset(run_params['input_conv_test_path'])
+	Y_out_test_list=[load_shared_dataset(path) for path in run_params['output_test_paths']]
+
+	hp=TrialHyperParameters(run_params['config'])
+	model_arch=BaseModelArch(model_params['output_dimension'])
+	model=model_arch.base_model_func(hp,hp.Int('filter_root',8,32),hp.Choice('Depth',[2,3]),model_params['categorical_kccs'],model_params['voxel_dim'],model_params['voxel_channels'],model_params['output_heads'])
+
+	weights_path=run_params['search_path']+'/trial_'+str(run_params['trial_id'])
+
+	if(run_params['initial_epoch']>0):
+		model.load_weights(weights_path)
+
+	start_time=time.time()
+	history=model.fit(x=input_conv_data,y=Y_out_list,validation_data=(input_conv_data_test,Y_out_test_list),epochs=run_params['epochs'],initial_epoch=run_params['initial_epoch'],batch_size=run_params['batch_size'],verbose=2)
+	train_time=time.time()-start_time
+
+	model.save_weights(weights_path)
+
+	metrics={key:float(values[-1]) for key,values in history.history.items()}
+
+	return {
+		'trial_id':run_params['trial_id'],
+		'rung':run_params['rung'],
+		'epochs':run_params['epochs'],
+		'val_loss':get_unweighted_val_loss(history.history,model.output_names),
+		'train_time':train_time,
+		'weights_path':weights_path,
+		'metrics':metrics
+	}
+
+class SuccessiveHalvingSearch:
+	"""Successive Halving Search Class, all trials are trained for min_epochs, the best 1/eta trials are promoted and trained eta times longer at the next rung until max_epochs, the trials of each rung are trained in parallel worker processes
+
+		:param trial_db: database of the trials of the search
+		:type trial_db: TrialDatabase (required)
+
+		:param run_executor: run executor used to launch the trials
+		:type run_executor: RunExecutor (required)
+
+		:param min_epochs: number of epochs of the first rung
+		:type min_epochs: int (required)
+
+		:param max_epochs: maximum number of epochs of a trial
+		:type max_epochs: int (required)
+
+		:param eta: reduction factor of the number of trials at each rung, defaults to 3
+		:type eta: int
+
+		:param workers: number of parallel worker processes, defaults to 1
+		:type workers: int
+	"""
+	def __init__(self,trial_db,run_executor,min_epochs,max_epochs,eta=3,workers=1):
+
+		self.trial_db=trial_db
+		self.run_executor=run_executor
+		self.min_epochs=min_epochs
+		self.max_epochs=max_epochs
+		self.eta=eta
+		self.workers=workers
+
+	def get_rung_epochs(self):
+		"""Epochs of each rung
+		"""
+		rung_epochs=[]
+		epochs=self.min_epochs
+
+		while(epochs<self.max_epochs):
+			rung_epochs.append(epochs)
+			epochs=epochs*self.eta
+
+		rung_epochs.append(self.max_epochs)
+
+		return rung_epochs
+
+	def search(self,trial_params):
+		"""Run the search, the trials already evaluated at a rung (recorded in the database) are not trained again
+
+			:param trial_params: parameters common to all the trials (refer hp_trial_run)
+			:type trial_params: dict (required)
+
+			:returns: summary of the trials
+			:rtype: pandas.DataFrame
+		"""
+		trials=self.trial_db.get_trials()
+		rung_trials=list(trials.keys())
+		rung_epochs=self.get_rung_epochs()
+
+		for rung,epochs in enumerate(rung_epochs):
+
+			completed_results=self.trial_db.get_rung_results(rung)
+			pending_trials=[trial_id for trial_id in rung_trials if trial_id not in completed_results]
+
+			print('Rung: ',rung,' epochs: ',epochs,' trials: ',len(rung_trials),' pending: ',len(pending_trials))
+
+			run_params_list=[]
+			for trial_id in pending_trials:
+				run_params=dict(trial_params)
+				run_params['trial_id']=trial_id
+				run_params['rung']=rung
+				run_params['config']=trials[trial_id]
+				run_params['epochs']=epochs
+				run_params['initial_epoch']=rung_epochs[rung-1] if rung>0 else 0
+				run_params_list.append(run_params)
+
+			#Results are recorded after each batch of parallel trials so an interruption only loses the running trials
+			for batch_start in range(0,len(run_params_list),self.workers):
+				results=self.run_executor.run_parallel(hp_trial_run,run_params_list[batch_start:batch_start+self.workers],workers=self.workers)
+
+				for result in results:
+					self.trial_db.add_result(result['trial_id'],rung,result['epochs'],result['val_loss'],result['train_time'],result['weights_path'],result['metrics'])
+
+			rung_results=self.trial_db.get_rung_results(rung)
+			ranked_trials=sorted(rung_trials,key=lambda trial_id:rung_results[trial_id])
+
+			if(rung==len(rung_epochs)-1):
+				self.trial_db.set_status(ranked_trials,'complete')
+				break
+
+			promoted_count=max(1,len(ranked_trials)//self.eta)
+			self.trial_db.set_status(ranked_trials[promoted_count:],'stopped')
+			rung_trials=ranked_trials[:promoted_count]
+
+		return self.trial_db.get_summary()
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	import hybrid_utils as hy_util
+	from assembly_system import VRMSimulationModel
+	from data_import import GetTrainData
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	part_name=config.assembly_system['part_name']
+	assembly_type=config.assembly_system['assembly_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	assembly_kpis=config.assembly_system['assembly_kpis']
+	voxel_dim=config.assembly_system['voxel_dim']
+	point_dim=config.assembly_system['point_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	mapping_index=config.assembly_system['mapping_index']
+	aritifical_noise=config.assembly_system['aritifical_noise']
+	data_folder=config.assembly_system['data_folder']
+	kcc_folder=config.assembly_system['kcc_folder']
+	kcc_files=config.assembly_system['kcc_files']
+	test_kcc_files=config.assembly_system['test_kcc_files']
+	categorical_kccs=config.assembly_system['categorical_kccs']
+	encode_decode_multi_output_construct=config.encode_decode_multi_output_construct
+
+	print('Parsing from Training Config File')
+
+	output_heads=cftrain.encode_decode_params['output_heads']
+	batch_size=cftrain.model_parameters['batch_size']
+
+	search_space=cftrain.hp_search_params['search_space']
+	n_trials=cftrain.hp_search_params['n_trials']
+	min_epochs=cftrain.hp_search_params['min_epochs']
+	max_epochs=cftrain.hp_search_params['max_epochs']
+	eta=cftrain.hp_search_params['eta']
+	workers=cftrain.hp_search_params['workers']
+
+	print('Creating file Structure....')
+
+	search_path='../trained_models/'+part_type+'/hp_search'
+	pathlib.Path(search_path).mkdir(parents=True, exist_ok=True)
+
+	trial_db=TrialDatabase(search_path+'/trials.db')
+	trial_db.add_trials(sample_configs(search_space,n_trials))
+
+	run_executor=RunExecutor(search_path+'/shared_data')
+
+	#Datasets are voxelized once and reused when the search is resumed
+	shared_file_names=['input_conv_data','input_conv_data_test','kcc_regression','kcc_classification','shape_error','kcc_regression_test','kcc_classification_test','shape_error_test']
+	shared_paths={name:os.path.join(run_executor.shared_path,name+'.npy') for name in shared_file_names}
+
+	if(not all(os.path.exists(path) for path in shared_paths.values())):
+
+		print('Importing and Preprocessing Cloud-of-Point Data')
+
+		vrm_system=VRMSimulationModel(assembly_type,assembly_kccs,assembly_kpis,part_name,part_type,voxel_dim,voxel_channels,point_dim,aritifical_noise)
+		get_data=GetTrainData()
+		point_index=get_data.load_mapping_index(mapping_index)
+
+		def get_stage_data(file_names_x,file_names_y,file_names_z):
+			dataset=[]
+			dataset.append(get_data.data_import(file_names_x,data_folder))
+			dataset.append(get_data.data_import(file_names_y,data_folder))
+			dataset.append(get_data.data_import(file_names_z,data_folder))
+			return dataset
+
+		kcc_dataset=get_data.data_import(kcc_files,kcc_folder)
+		test_kcc_dataset=get_data.data_import(test_kcc_files,kcc_folder)
+
+		input_conv_data,kcc_subset_dump,convergent_train=get_data.data_convert_voxel_mc(vrm_system,get_stage_data(config.encode_decode_construct['input_data_files_x'],config.encode_decode_construct['input_data_files_y'],config.encode_decode_construct['input_data_files_z']),point_index,kcc_dataset)
+		input_conv_data_test,test_kcc_subset_dump,convergent_test=get_data.data_convert_voxel_mc(vrm_system,get_stage_data(config.encode_decode_construct['input_test_data_files_x'],config.encode_decode_construct['input_test_data_files_y'],config.encode_decode_construct['input_test_data_files_z']),point_index,test_kcc_dataset)
+
+		y_shape_error_list=[]
+		y_shape_error_test_list=[]
+		for encode_decode_construct in encode_decode_multi_output_construct:
+			output_conv_data,dump,convergent_ids=get_data.data_convert_voxel_mc(vrm_system,get_stage_data(encode_decode_construct['output_data_files_x'],encode_decode_construct['output_data_files_y'],encode_decode_construct['output_data_files_z']),point_index,kcc_dataset)
+			test_output_conv_data,dump,test_convergent_ids=get_data.data_convert_voxel_mc(vrm_system,get_stage_data(encode_decode_construct['output_test_data_files_x'],encode_decode_construct['output_test_data_files_y'],encode_decode_construct['output_test_data_files_z']),point_index,test_kcc_dataset)
+
+			convergent_train=list(set(convergent_train).intersection(convergent_ids))
+			convergent_test=list(set(convergent_test).intersection(test_convergent_ids))
+			y_shape_error_list.append(output_conv_data)
+			y_shape_error_test_list.append(test_output_conv_data)
+
+		kcc_regression,kcc_classification=hy_util.split_kcc(kcc_subset_dump[convergent_train,:])
+		kcc_regression_test,kcc_classification_test=hy_util.split_kcc(test_kcc_subset_dump[convergent_test,:])
+
+		run_executor.share_dataset('input_conv_data',input_conv_data[convergent_train])
+		run_executor.share_dataset('input_conv_data_test',input_conv_data_test[convergent_test])
+		run_executor.share_dataset('kcc_regression',kcc_regression)
+		run_executor.share_dataset('kcc_classification',kcc_classification)
+		run_executor.share_dataset('shape_error',np.concatenate(y_shape_error_list,axis=-1)[convergent_train])
+		run_executor.share_dataset('kcc_regression_test',kcc_regression_test)
+		run_executor.share_dataset('kcc_classification_test',kcc_classification_test)
+		run_executor.share_dataset('shape_error_test',np.concatenate(y_shape_error_test_list,axis=-1)[convergent_test])
+
+	trial_params={
+		'input_conv_path':shared_paths['input_conv_data'],
+		'output_paths':[shared_paths['kcc_regression'],shared_paths['kcc_classification'],shared_paths['shape_error']],
+		'input_conv_test_path':shared_paths['input_conv_data_test'],
+		'output_test_paths':[shared_paths['kcc_regression_test'],shared_paths['kcc_classification_test'],shared_paths['shape_error_test']],
+		'model_params':{'output_dimension':assembly_kccs,'categorical_kccs':categorical_kccs,'voxel_dim':voxel_dim,'voxel_channels':voxel_channels,'output_heads':output_heads},
+		'batch_size':batch_size,
+		'search_path':search_path
+	}
+
+	hp_search=SuccessiveHalvingSearch(trial_db,run_executor,min_epochs,max_epochs,eta,workers)
+	summary_df=hp_search.search(trial_params)
+	summary_df.to_csv(search_path+'/hp_search_summary.csv')
+
+	print('Hyper-parameter Search Summary')
+	print(summary_df.head(10))
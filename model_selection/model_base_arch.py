@@ -62,9 +62,9 @@ class BaseModelArch:
 		}
 
 		overall_loss_weights={
-		"regression_outputs":2.0,
-		"classification_outputs":2.0,
-		"shape_error_outputs":1.0
+		"regression_outputs":hp.Choice('regression_weight', values = [2.0,1.0,4.0]),
+		"classification_outputs":hp.Choice('classification_weight', values = [2.0,1.0,4.0]),
+		"shape_error_outputs":hp.Choice('shape_error_weight', values = [1.0,0.5,2.0])
 		}
 
 		overall_metrics_dict={
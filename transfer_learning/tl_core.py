@@ -152,6 +152,83 @@ class TransferLearning:
 
 		return model
 
+	def split_feature_extractor(self,model):
+		"""The split_feature_extractor function splits the model (refer set_fixed_train_params) into the frozen trunk (convolution layers and the pooling/flatten layers after them) and the trainable head (dense layers), the head layers are shared with the model so that training the head also updates the model, a ValueError is raised if the head is not sequential
+
+			:param model: keras model with non trainable convolution layers
+			:type model: keras.model (required)
+
+			:returns: trunk model with the features as output, compiled head model with the features as input
+			:rtype: keras.model, keras.model
+		"""
+		from keras.layers import Input
+		from keras.models import Model
+
+		last_conv_index=max([index for index,layer in enumerate(model.layers) if 'conv' in layer.name])
+		head_index=[index for index,layer in enumerate(model.layers) if index>last_conv_index and len(layer.trainable_weights)>0][0]
+
+		head_layers=model.layers[head_index:]
+
+		#The head is rebuilt by calling the same layers on the feature input, this requires a sequential head
+		for previous_layer,layer in zip(model.layers[head_index-1:-1],head_layers):
+			if(layer.input is not previous_layer.output):
+				raise ValueError('Feature caching requires a sequential head, layer: '+layer.name+' is not connected to the output of layer: '+previous_layer.name)
+
+		feature_tensor=head_layers[0].input
+		trunk_model=Model(inputs=model.input,outputs=feature_tensor)
+
+		feature_input=Input(shape=K.int_shape(feature_tensor)[1:])
+		x=feature_input
+
+		for layer in head_layers:
+			x=layer(x)
+
+		head_model=Model(inputs=feature_input,outputs=x)
+		head_model.compile(loss=self.loss_function, optimizer=self.optimizer, metrics=['mae'])
+
+		return trunk_model,head_model
+
+	def get_cache_key(self,file_paths):
+		"""The get_cache_key function returns the key of the files the cached features depend on (trunk weights and datasets), the path and modification time of each file are used so that the features are recomputed when the base model is retrained or the dataset is regenerated
+
+			:param file_paths: paths of the files
+			:type file_paths: list (required)
+
+			:returns: cache key
+			:rtype: str
+		"""
+		return ';'.join([os.path.abspath(file_path)+'_'+str(os.path.getmtime(file_path)) for file_path in file_paths])
+
+	def get_cached_features(self,trunk_model,X_in,cache_path,batch_size=32,cache_key=None):
+		"""The get_cached_features function runs the frozen trunk once over the dataset and saves the features, the saved features are loaded if they exist for the same number of samples and the same cache key
+
+			:param trunk_model: frozen trunk of the model (refer split_feature_extractor)
+			:type trunk_model: keras.model (required)
+
+			:param X_in: voxelized input
+			:type X_in: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param cache_path: .npz file of the cached features
+			:type cache_path: str (required)
+
+			:param cache_key: key of the trunk weights and datasets (refer get_cache_key), defaults to None
+			:type cache_key: str
+
+			:returns: features of each sample
+			:rtype: numpy.array [samples*feature_dim]
+		"""
+		if(os.path.exists(cache_path)):
+			cached_features=np.load(cache_path)
+			if(len(cached_features['features'])==len(X_in) and str(cached_features['cache_key'])==str(cache_key)):
+				print('Cached features loaded from: ',cache_path)
+				return cached_features['features']
+
+		features=trunk_model.predict(X_in,batch_size=batch_size)
+		np.savez(cache_path,features=features,cache_key=str(cache_key))
+		print('Features cached at: ',cache_path)
+
+		return features
+
 
 	def full_fine_tune(self,model):
 
@@ -305,12 +382,26 @@ if __name__ == '__main__':
 	if(tl_type=='variable_lr'):
 		model=transfer_learning.set_variable_learning_rates(transfer_model,conv_layer_m,dense_layer_m)
 
+	train_model=TrainModel(batch_size,epocs,split_ratio)
+
 	if(tl_type=='feature_extractor'):
 		model=transfer_learning.set_fixed_train_params(transfer_model)
 
-	
-	train_model=TrainModel(batch_size,epocs,split_ratio)
-	trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,input_conv_data,kcc_subset_dump,model_path,logs_path,plots_path,activate_tensorboard,tl_type=tl_type)
+		#The frozen trunk is run once and only the dense head is trained on the cached features
+		trunk_model,head_model=transfer_learning.split_feature_extractor(model)
+		#The features are recomputed if the base model or the dataset files change
+		cache_files=['../pre_trained_models/deterministic_models/'+tl_base]+[data_folder+'/'+file for file in file_names_x+file_names_y+file_names_z]
+		cache_key=transfer_learning.get_cache_key(cache_files)
+		features=transfer_learning.get_cached_features(trunk_model,input_conv_data,model_path+'/cached_features_'+tl_base.replace('.h5','')+'.npz',batch_size,cache_key)
+
+		trained_head,eval_metrics,accuracy_metrics_df=train_model.run_train_model(head_model,features,kcc_subset_dump,model_path,logs_path,plots_path,activate_tensorboard,tl_type=tl_type)
+
+		#The head layers are shared with the full model, the best head weights complete the model for deployment
+		head_model.load_weights(model_path+'/trained_model_0.h5')
+		model.save(model_path+'/tl_feature_extractor_model.h5')
+		print('Full model for deployment saved at: ',model_path+'/tl_feature_extractor_model.h5')
+	else:
+		trained_model,eval_metrics,accuracy_metrics_df=train_model.run_train_model(model,input_conv_data,kcc_subset_dump,model_path,logs_path,plots_path,activate_tensorboard,tl_type=tl_type)
 
 	accuracy_metrics_df.to_csv(logs_path+'/tl_metrics.csv')
 	print("Transfer Learning Based Model Training Complete..")
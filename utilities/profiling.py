@@ -0,0 +1,381 @@
+""" Contains methods to profile the memory and time requirements of model training
+The main function runs one benchmark, selected by model_config.profiling_params['benchmark']. The 'recompute' benchmark reports the memory vs time trade-off of activation recomputation (refer core/custom_layers.py) for the 3D U-Net encoder-decoder at different depths. The 'shape_error_output' benchmark compares the voxel grid decoder with the PCA basis shape error output (refer core/shape_error_basis.py). The 'sparse_conv' benchmark compares the dense and sparse 3D CNN models (refer core/core_model.py) at different voxel resolutions
+Each configuration is profiled in a fresh worker process so that the peak memory of one configuration does not mask another
+"""
+
+import os
+import sys
+current_path=os.path.dirname(__file__)
+parentdir = os.path.dirname(current_path)
+
+#Adding Path to various Modules
+sys.path.append("../core")
+sys.path.append("../utilities")
+sys.path.append("../config")
+
+import time
+import pathlib
+import numpy as np
+import pandas as pd
+
+def peak_memory_mb():
+	"""Peak resident memory of the current process in MB, psutil (not a requirement of the package) is used if the resource module is not available (Windows)
+
+		:returns: peak memory in MB, nan if the memory cannot be measured
+		:rtype: float
+	"""
+	try:
+		import resource
+		#ru_maxrss is in KB on Linux
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024
+	except ImportError:
+		pass
+
+	try:
+		import psutil
+	except ImportError:
+		print('Peak memory not available, install psutil to measure the memory on this platform')
+		return float('nan')
+
+	memory_info=psutil.Process().memory_info()
+	return getattr(memory_info,'peak_wset',memory_info.rss)/(1024*1024)
+
+def estimate_activation_memory(model,batch_size):
+	"""Estimate of the memory required to store the outputs of all layers of the model during a forward pass (float32), the actual memory stored for the backward pass depends on which activations are recomputed
+
+		:param model: keras model
+		:type model: keras.models (required)
+
+		:param batch_size: batch size used for training
+		:type batch_size: int (required)
+
+		:returns: activation memory estimate in MB
+		:rtype: float
+	"""
+	total_elements=0
+
+	for layer in model.layers:
+		output_shapes=layer.output_shape
+
+		if(not isinstance(output_shapes,list)):
+			output_shapes=[output_shapes]
+
+		for output_shape in output_shapes:
+			total_elements+=np.prod([dim for dim in output_shape if dim is not None])
+
+	return total_elements*batch_size*4/(1024*1024)
+
+def recompute_trade_off_run(run_params):
+	"""Profile the training of the attention hybrid U-Net with and without encoder recomputation on random data
+
+		:param run_params: depth, filter_root, voxel_dim, voxel_channels, output_dimension, categorical_kccs, output_heads, batch_size, steps, recompute_encoder
+		:type run_params: dict (required)
+
+		:returns: profile of the configuration (time per step, peak memory, activation estimate)
+		:rtype: dict
+	"""
+	from encode_decode_model import Encode_Decode_Model
+
+	voxel_dim=run_params['voxel_dim']
+	voxel_channels=run_params['voxel_channels']
+	batch_size=run_params['batch_size']
+	output_dimension=run_params['output_dimension']
+	categorical_kccs=run_params['categorical_kccs']
+	output_heads=run_params['output_heads']
+
+	baseline_memory=peak_memory_mb()
+
+	dl_model_unet=Encode_Decode_Model(output_dimension)
+	input_size=(voxel_dim,voxel_dim,voxel_dim,voxel_channels)
+	model=dl_model_unet.encode_decode_3d_multi_output_attention_hybrid(run_params['filter_root'],run_params['depth'],input_size,categorical_kccs,output_heads,voxel_channels,recompute_encoder=run_params['recompute_encoder'])
+
+	x=np.random.rand(batch_size,voxel_dim,voxel_dim,voxel_dim,voxel_channels).astype(np.float32)
+	y_list=[np.random.rand(batch_size,output_dimension-categorical_kccs).astype(np.float32),
+		np.random.randint(0,2,(batch_size,categorical_kccs)).astype(np.float32),
+		np.random.rand(batch_size,voxel_dim,voxel_dim,voxel_dim,voxel_channels*output_heads).astype(np.float32)]
+
+	#First step includes graph construction
+	model.train_on_batch(x,y_list)
+
+	start_time=time.time()
+	for step in range(run_params['steps']):
+		model.train_on_batch(x,y_list)
+	step_time=(time.time()-start_time)/run_params['steps']
+
+	profile={
+		'depth':run_params['depth'],
+		'recompute_encoder':run_params['recompute_encoder'],
+		'batch_size':batch_size,
+		'step_time_s':step_time,
+		'peak_memory_mb':peak_memory_mb(),
+		'training_memory_mb':peak_memory_mb()-baseline_memory,
+		'activation_estimate_mb':estimate_activation_memory(model,batch_size),
+		'parameters':model.count_params()
+	}
+
+	return profile
+
+def shape_error_output_run(run_params):
+	"""Profile the training and deployment of the attention hybrid U-Net with the voxel grid decoder (shape_error_components=0) or with the PCA basis coefficient head, the basis model is deployed with the reconstruction of the node deviations included in the graph
+
+		:param run_params: depth, filter_root, voxel_dim, voxel_channels, output_dimension, categorical_kccs, output_heads, batch_size, steps, point_dim, shape_error_components
+		:type run_params: dict (required)
+
+		:returns: profile of the configuration (time per step, predictions per second, peak memory, output size)
+		:rtype: dict
+	"""
+	from encode_decode_model import Encode_Decode_Model
+	from shape_error_basis import ShapeErrorBasis, get_reconstruction_model
+
+	voxel_dim=run_params['voxel_dim']
+	voxel_channels=run_params['voxel_channels']
+	batch_size=run_params['batch_size']
+	output_dimension=run_params['output_dimension']
+	categorical_kccs=run_params['categorical_kccs']
+	output_heads=run_params['output_heads']
+	point_dim=run_params['point_dim']
+	shape_error_components=run_params['shape_error_components']
+
+	baseline_memory=peak_memory_mb()
+
+	dl_model_unet=Encode_Decode_Model(output_dimension)
+	input_size=(voxel_dim,voxel_dim,voxel_dim,voxel_channels)
+	model=dl_model_unet.encode_decode_3d_multi_output_attention_hybrid(run_params['filter_root'],run_params['depth'],input_size,categorical_kccs,output_heads,voxel_channels,shape_error_components=shape_error_components)
+
+	if(shape_error_components>0):
+		shape_error_shape=(batch_size,shape_error_components*output_heads)
+	else:
+		shape_error_shape=(batch_size,voxel_dim,voxel_dim,voxel_dim,voxel_channels*output_heads)
+
+	x=np.random.rand(batch_size,voxel_dim,voxel_dim,voxel_dim,voxel_channels).astype(np.float32)
+	y_list=[np.random.rand(batch_size,output_dimension-categorical_kccs).astype(np.float32),
+		np.random.randint(0,2,(batch_size,categorical_kccs)).astype(np.float32),
+		np.random.rand(*shape_error_shape).astype(np.float32)]
+
+	#First step includes graph construction
+	model.train_on_batch(x,y_list)
+
+	start_time=time.time()
+	for step in range(run_params['steps']):
+		model.train_on_batch(x,y_list)
+	step_time=(time.time()-start_time)/run_params['steps']
+
+	deploy_model=model
+	if(shape_error_components>0):
+		#Random orthonormal basis, the reconstruction cost does not depend on the basis values
+		basis_list=[]
+		for stage in range(output_heads):
+			shape_error_basis=ShapeErrorBasis(shape_error_components)
+			shape_error_basis.components=np.linalg.qr(np.random.rand(3*point_dim,shape_error_components))[0].T.astype(np.float32)
+			shape_error_basis.mean=np.zeros(3*point_dim,dtype=np.float32)
+			basis_list.append(shape_error_basis)
+		deploy_model=get_reconstruction_model(model,basis_list,point_dim)
+
+	deploy_model.predict(x,batch_size=batch_size)
+
+	start_time=time.time()
+	for step in range(run_params['steps']):
+		model_outputs=deploy_model.predict(x,batch_size=batch_size)
+	predictions_per_second=run_params['steps']*batch_size/(time.time()-start_time)
+
+	profile={
+		'shape_error_components':shape_error_components,
+		'batch_size':batch_size,
+		'step_time_s':step_time,
+		'predictions_per_second':predictions_per_second,
+		'peak_memory_mb':peak_memory_mb(),
+		'training_memory_mb':peak_memory_mb()-baseline_memory,
+		'activation_estimate_mb':estimate_activation_memory(model,batch_size),
+		'parameters':model.count_params(),
+		'model_output_size':int(np.prod(shape_error_shape[1:])),
+		'deployed_output_size':int(np.prod(model_outputs[-1].shape[1:]))
+	}
+
+	return profile
+
+def sparse_conv_run(run_params):
+	"""Profile the training of a dense (cnn_model_3d, resnet_3d_cnn) or sparse (sparse_cnn_model_3d, sparse_resnet_3d_cnn) 3D CNN model on random data at the occupied voxels
+
+		:param run_params: model_variant, occupied_voxels, voxel_dim, voxel_channels, output_dimension, batch_size, steps
+		:type run_params: dict (required)
+
+		:returns: profile of the configuration (time per step, peak memory)
+		:rtype: dict
+	"""
+	from core_model import DLModel
+
+	voxel_dim=run_params['voxel_dim']
+	voxel_channels=run_params['voxel_channels']
+	batch_size=run_params['batch_size']
+	output_dimension=run_params['output_dimension']
+	occupied_voxels=run_params['occupied_voxels']
+	model_variant=run_params['model_variant']
+
+	baseline_memory=peak_memory_mb()
+
+	dl_model=DLModel('3D CNN',output_dimension,'adam','mse',0.01)
+
+	sparse_x=np.random.rand(batch_size,len(occupied_voxels),voxel_channels).astype(np.float32)
+
+	if(model_variant=='sparse_cnn_model_3d'):
+		model=dl_model.sparse_cnn_model_3d(occupied_voxels,voxel_dim,voxel_channels)
+		x=sparse_x
+	elif(model_variant=='sparse_resnet_3d_cnn'):
+		model=dl_model.sparse_resnet_3d_cnn(occupied_voxels,voxel_dim,voxel_channels)
+		x=sparse_x
+	else:
+		model=getattr(dl_model,model_variant)(voxel_dim,voxel_channels)
+		x=np.zeros((batch_size,voxel_dim,voxel_dim,voxel_dim,voxel_channels),dtype=np.float32)
+		x[:,occupied_voxels[:,0],occupied_voxels[:,1],occupied_voxels[:,2],:]=sparse_x
+
+	y=np.random.rand(batch_size,output_dimension).astype(np.float32)
+
+	#First step includes graph construction
+	model.train_on_batch(x,y)
+
+	start_time=time.time()
+	for step in range(run_params['steps']):
+		model.train_on_batch(x,y)
+	step_time=(time.time()-start_time)/run_params['steps']
+
+	profile={
+		'model_variant':model_variant,
+		'voxel_dim':voxel_dim,
+		'active_sites':len(occupied_voxels),
+		'occupancy':len(occupied_voxels)/voxel_dim**3,
+		'batch_size':batch_size,
+		'step_time_s':step_time,
+		'peak_memory_mb':peak_memory_mb(),
+		'training_memory_mb':peak_memory_mb()-baseline_memory,
+		'parameters':model.count_params()
+	}
+
+	return profile
+
+if __name__ == '__main__':
+
+	import assembly_config as config
+	import model_config as cftrain
+	from run_executor import RunExecutor
+
+	print('Parsing from Assembly Config File....')
+
+	part_type=config.assembly_system['part_type']
+	assembly_kccs=config.assembly_system['assembly_kccs']
+	voxel_dim=config.assembly_system['voxel_dim']
+	voxel_channels=config.assembly_system['voxel_channels']
+	categorical_kccs=config.assembly_system['categorical_kccs']
+	point_dim=config.assembly_system['point_dim']
+
+	kcc_sublist=cftrain.encode_decode_params['kcc_sublist']
+	output_heads=cftrain.encode_decode_params['output_heads']
+	inital_filter_dim=cftrain.encode_decode_params['inital_filter_dim']
+	micro_batch_size=cftrain.encode_decode_params['micro_batch_size']
+	batch_size=cftrain.model_parameters['batch_size']
+	benchmark=cftrain.profiling_params['benchmark']
+
+	if(kcc_sublist!=0):
+		output_dimension=len(kcc_sublist)
+	else:
+		output_dimension=assembly_kccs
+
+	#Profiled with the batch size used for each optimizer step
+	if(micro_batch_size>0):
+		batch_size=micro_batch_size
+
+	logs_path='../trained_models/'+part_type+'/unet_model/logs'
+	pathlib.Path(logs_path).mkdir(parents=True, exist_ok=True)
+
+	run_executor=RunExecutor('../trained_models/'+part_type+'/unet_model/shared_data')
+
+	if(benchmark not in ['recompute','shape_error_output','sparse_conv']):
+		raise ValueError('Unknown benchmark: '+str(benchmark)+', refer model_config.profiling_params')
+
+	if(benchmark=='recompute'):
+		run_params_list=[]
+		for depth in [4,5]:
+			for recompute_encoder in [0,1]:
+				run_params_list.append({
+					'depth':depth,
+					'filter_root':inital_filter_dim,
+					'voxel_dim':voxel_dim,
+					'voxel_channels':voxel_channels,
+					'output_dimension':output_dimension,
+					'categorical_kccs':categorical_kccs,
+					'output_heads':output_heads,
+					'batch_size':batch_size,
+					'steps':5,
+					'recompute_encoder':recompute_encoder
+				})
+
+		profiles=[]
+		for run_params in run_params_list:
+			print('Profiling depth: ',run_params['depth'],' recompute encoder: ',run_params['recompute_encoder'])
+			profiles.append(run_executor.run(recompute_trade_off_run,run_params))
+
+		profile_df=pd.DataFrame(profiles)
+		profile_df.to_csv(logs_path+'/recompute_trade_off.csv')
+
+		print('Memory vs Time trade-off of encoder recomputation: ')
+		print(profile_df)
+
+	if(benchmark=='shape_error_output'):
+		#Voxel grid decoder vs PCA basis shape error output
+		model_depth=cftrain.encode_decode_params['model_depth']
+		shape_error_components=cftrain.encode_decode_params['shape_error_components']
+
+		if(shape_error_components==0):
+			shape_error_components=200
+
+		output_profiles=[]
+		for components in [0,shape_error_components]:
+			print('Profiling shape error output, basis components: ',components)
+			output_profiles.append(run_executor.run(shape_error_output_run,{
+				'depth':model_depth,
+				'filter_root':inital_filter_dim,
+				'voxel_dim':voxel_dim,
+				'voxel_channels':voxel_channels,
+				'output_dimension':output_dimension,
+				'categorical_kccs':categorical_kccs,
+				'output_heads':output_heads,
+				'batch_size':batch_size,
+				'steps':5,
+				'point_dim':point_dim,
+				'shape_error_components':components
+			}))
+
+		output_profile_df=pd.DataFrame(output_profiles)
+		output_profile_df.to_csv(logs_path+'/shape_error_output_benchmark.csv')
+
+		print('Voxel grid decoder vs PCA basis shape error output: ')
+		print(output_profile_df)
+
+	if(benchmark=='sparse_conv'):
+		#Dense vs sparse 3D CNN models at the occupied voxels of the mapping index, the mapping index is scaled for higher resolutions
+		from data_import import GetTrainData
+		get_data=GetTrainData()
+		point_index=get_data.load_mapping_index(config.assembly_system['mapping_index'])
+		model_batch_size=cftrain.model_parameters['batch_size']
+
+		sparse_profiles=[]
+		for profile_voxel_dim in [64,128]:
+			scaled_index=get_data.scale_mapping_index(point_index[0:point_dim,:],voxel_dim,profile_voxel_dim)
+			occupied_voxels,node_voxel_index=get_data.get_occupied_voxels(scaled_index)
+
+			for model_variant in ['cnn_model_3d','sparse_cnn_model_3d','resnet_3d_cnn','sparse_resnet_3d_cnn']:
+				print('Profiling ',model_variant,' voxel dimension: ',profile_voxel_dim)
+				sparse_profiles.append(run_executor.run(sparse_conv_run,{
+					'model_variant':model_variant,
+					'occupied_voxels':occupied_voxels,
+					'voxel_dim':profile_voxel_dim,
+					'voxel_channels':voxel_channels,
+					'output_dimension':output_dimension,
+					'batch_size':model_batch_size,
+					'steps':5
+				}))
+
+		sparse_profile_df=pd.DataFrame(sparse_profiles)
+		sparse_profile_df.to_csv(logs_path+'/sparse_conv_benchmark.csv')
+
+		print('Dense vs Sparse 3D CNN models: ')
+		print(sparse_profile_df)
@@ -0,0 +1,79 @@
+""" Contains classes and methods to keep a bounded, uniformly sampled replay of the training data of the previous adaptive learning runs, the incremental adaptive training (refer core/dynamic_adaptive_model_train.py) fine tunes the model on the new adaptive samples mixed with the replay so that the cost of each run does not grow with the dataset """
+
+import numpy as np
+
+class ReservoirReplay:
+	"""Reservoir Replay Class, reservoir sampling of the samples added over all runs, each sample added so far has the same probability of being in the reservoir
+
+		:param capacity: Maximum number of samples in the reservoir
+		:type capacity: int (required)
+
+		:param seed: Seed of the random state, the reservoir is reproducible when the runs are repeated after a resume, defaults to 0
+		:type seed: int
+	"""
+	def __init__(self,capacity,seed=0):
+
+		self.capacity=capacity
+		self.random_state=np.random.RandomState(seed)
+		self.samples_seen=0
+		self.size=0
+		self.X_reservoir=None
+		self.y_reservoir=None
+
+	def add(self,X_in,Y_out):
+		"""Add the samples of a run to the reservoir
+
+			:param X_in: voxelized input of the run
+			:type X_in: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param Y_out: Process Parameters/KCCs of the run
+			:type Y_out: numpy.array [samples*assembly_kccs] (required)
+		"""
+		if(self.X_reservoir is None):
+			self.X_reservoir=np.zeros((self.capacity,)+X_in.shape[1:],dtype=X_in.dtype)
+			self.y_reservoir=np.zeros((self.capacity,)+Y_out.shape[1:],dtype=Y_out.dtype)
+
+		for index in range(len(X_in)):
+			if(self.size<self.capacity):
+				reservoir_index=self.size
+				self.size=self.size+1
+			else:
+				reservoir_index=self.random_state.randint(0,self.samples_seen+1)
+
+			if(reservoir_index<self.capacity):
+				self.X_reservoir[reservoir_index]=X_in[index]
+				self.y_reservoir[reservoir_index]=Y_out[index]
+
+			self.samples_seen=self.samples_seen+1
+
+	def sample(self,n_samples):
+		"""Sample from the reservoir without replacement
+
+			:param n_samples: number of samples, all the samples of the reservoir are returned if the reservoir is smaller
+			:type n_samples: int (required)
+
+			:returns: voxelized input and Process Parameters/KCCs of the replay samples
+			:rtype: numpy.array,numpy.array
+		"""
+		if(self.size==0):
+			return None,None
+
+		sample_index=self.random_state.choice(self.size,min(n_samples,self.size),replace=False)
+
+		return self.X_reservoir[sample_index],self.y_reservoir[sample_index]
+
+def get_incremental_epochs(n_samples,batch_size,max_steps,split_ratio=0.0):
+	"""Number of epochs such that the number of training steps of the run is at most max_steps (at least one epoch)
+
+		:param n_samples: number of samples (new and replay) of the run
+		:type n_samples: int (required)
+
+		:param max_steps: maximum number of training steps
+		:type max_steps: int (required)
+
+		:param split_ratio: fraction of the samples used for validation
+		:type split_ratio: float
+	"""
+	steps_per_epoch=int(np.ceil(n_samples*(1-split_ratio)/batch_size))
+
+	return max(1,max_steps//max(1,steps_per_epoch))
@@ -0,0 +1,257 @@
+""" Contains classes and methods to store the KCC estimates of the deployed models in an indexed SQLite database (no server required), the estimates are buffered and written in batches within a single transaction
+Each estimate is stored as a row (part serial, part type, model type, model version, timestamp, KCC, estimate) indexed by part serial, timestamp, model version and part type and KCC, so that queries such as the last 1000 estimates of a KCC of a part type do not scan the table
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+
+class PredictionStore:
+	"""Prediction Store Class, the database and the indexes are created if they do not exist, the store is thread safe and can be read by other processes while it is written (write ahead logging)
+
+		:param store_file: Path to the SQLite database file
+		:type store_file: str (required)
+
+		:param buffer_size: Number of buffered estimates (rows) after which the buffer is written, defaults to 1000
+		:type buffer_size: int
+
+		:param flush_interval: Maximum time the estimates are buffered in seconds, defaults to 1.0
+		:type flush_interval: float
+	"""
+	def __init__(self,store_file,buffer_size=1000,flush_interval=1.0):
+		self.store_file=store_file
+		self.buffer_size=buffer_size
+		self.flush_interval=flush_interval
+		self.buffer=[]
+		self.last_flush=time.time()
+		self.lock=threading.Lock()
+
+		self.connection=sqlite3.connect(store_file,check_same_thread=False)
+		self.connection.execute('PRAGMA journal_mode=WAL')
+		self.connection.execute('PRAGMA synchronous=NORMAL')
+
+		with self.connection:
+			self.connection.execute('CREATE TABLE IF NOT EXISTS predictions (id INTEGER PRIMARY KEY, part_serial TEXT, part_type TEXT, model_type TEXT, model_version INTEGER, timestamp REAL, kcc INTEGER, estimate REAL)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS idx_part_kcc_time ON predictions (part_type, kcc, timestamp)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS idx_part_serial ON predictions (part_serial)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON predictions (timestamp)')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS idx_model_version ON predictions (model_type, model_version)')
+
+	def add(self,part_serials,y_pred,part_type,model_type,model_version=0,timestamp=None):
+		"""Buffer the KCC estimates of a batch of parts, the buffer is written when it is full or the flush interval has elapsed
+
+			:param part_serials: serial of each part of the batch
+			:type part_serials: list (required)
+
+			:param y_pred: KCC estimates of the batch
+			:type y_pred: numpy.array [samples*assembly_kccs] (required)
+
+			:param part_type: part type of the model
+			:type part_type: str (required)
+
+			:param model_type: model type of the model
+			:type model_type: str (required)
+
+			:param model_version: version (run id) of the model, defaults to 0
+			:type model_version: int
+
+			:param timestamp: time of the estimates, defaults to the current time
+			:type timestamp: float
+		"""
+		if(timestamp is None):
+			timestamp=time.time()
+
+		y_pred=np.asarray(y_pred,dtype=float).reshape(len(part_serials),-1)
+		kccs=range(y_pred.shape[1])
+
+		rows=[(str(part_serial),part_type,model_type,int(model_version),timestamp,kcc,estimate) for part_serial,estimates in zip(part_serials,y_pred.tolist()) for kcc,estimate in zip(kccs,estimates)]
+
+		with self.lock:
+			self.buffer.extend(rows)
+
+			if(len(self.buffer)>=self.buffer_size or time.time()-self.last_flush>=self.flush_interval):
+				self.write_buffer()
+
+	def write_buffer(self):
+		"""Write the buffered estimates in a single transaction, the lock should be held by the caller
+		"""
+		if(len(self.buffer)>0):
+			with self.connection:
+				self.connection.executemany('INSERT INTO predictions (part_serial, part_type, model_type, model_version, timestamp, kcc, estimate) VALUES (?,?,?,?,?,?,?)',self.buffer)
+
+			self.buffer=[]
+
+		self.last_flush=time.time()
+
+	def flush(self):
+		"""Write the buffered estimates
+		"""
+		with self.lock:
+			self.write_buffer()
+
+	def flush_if_due(self):
+		"""Write the buffered estimates if the flush interval has elapsed, for writers that add estimates irregularly
+		"""
+		with self.lock:
+			if(len(self.buffer)>0 and time.time()-self.last_flush>=self.flush_interval):
+				self.write_buffer()
+
+	def close(self):
+		"""Write the buffered estimates and close the database
+		"""
+		with self.lock:
+			self.write_buffer()
+			self.connection.close()
+
+	def query(self,sql,parameters=()):
+		"""Run a query on the database, the buffered estimates are written first so that they are returned
+
+			:returns: query result
+			:rtype: pandas.DataFrame
+		"""
+		with self.lock:
+			self.write_buffer()
+			return pd.read_sql_query(sql,self.connection,params=parameters)
+
+	def get_kcc_estimates(self,part_type,kcc,limit=1000,model_version=None):
+		"""Latest estimates of a KCC of a part type, newest first
+
+			:param part_type: part type of the model
+			:type part_type: str (required)
+
+			:param kcc: index of the KCC
+			:type kcc: int (required)
+
+			:param limit: Maximum number of estimates, defaults to 1000
+			:type limit: int
+
+			:param model_version: version (run id) of the model, estimates of all versions if None
+			:type model_version: int
+
+			:returns: part_serial, timestamp, model_type, model_version and estimate of each estimate
+			:rtype: pandas.DataFrame
+		"""
+		if(model_version is None):
+			return self.query('SELECT part_serial, timestamp, model_type, model_version, estimate FROM predictions WHERE part_type=? AND kcc=? ORDER BY timestamp DESC LIMIT ?',(part_type,int(kcc),int(limit)))
+
+		return self.query('SELECT part_serial, timestamp, model_type, model_version, estimate FROM predictions WHERE part_type=? AND kcc=? AND model_version=? ORDER BY timestamp DESC LIMIT ?',(part_type,int(kcc),int(model_version),int(limit)))
+
+	def get_part_estimates(self,part_serial):
+		"""Estimates of all the KCCs of a part, one row per prediction (a part may be predicted by more than one model)
+
+			:param part_serial: serial of the part
+			:type part_serial: str (required)
+
+			:returns: estimates of the part [predictions*assembly_kccs] with the part type, model and timestamp of each prediction
+			:rtype: pandas.DataFrame
+		"""
+		return self.to_wide(self.query('SELECT * FROM predictions WHERE part_serial=?',(str(part_serial),)))
+
+	def get_estimates(self,part_type=None,start_time=None,end_time=None):
+		"""Estimates of all the KCCs in a time range, one row per prediction in the order the predictions were stored
+
+			:param part_type: part type of the model, all part types if None
+			:type part_type: str
+
+			:param start_time: start of the time range (inclusive), from the first estimate if None
+			:type start_time: float
+
+			:param end_time: end of the time range (exclusive), up to the last estimate if None
+			:type end_time: float
+
+			:returns: estimates [predictions*assembly_kccs] with the part serial, part type, model and timestamp of each prediction
+			:rtype: pandas.DataFrame
+		"""
+		conditions=[]
+		parameters=[]
+
+		if(part_type is not None):
+			conditions.append('part_type=?')
+			parameters.append(part_type)
+		if(start_time is not None):
+			conditions.append('timestamp>=?')
+			parameters.append(start_time)
+		if(end_time is not None):
+			conditions.append('timestamp<?')
+			parameters.append(end_time)
+
+		sql='SELECT * FROM predictions'
+		if(len(conditions)>0):
+			sql=sql+' WHERE '+' AND '.join(conditions)
+
+		return self.to_wide(self.query(sql,tuple(parameters)))
+
+	def to_wide(self,prediction_df):
+		"""Pivot the estimate rows to one row per prediction and one column per KCC (kcc_0, kcc_1, ...), ordered by storage order
+		"""
+		index_columns=['part_serial','part_type','model_type','model_version','timestamp']
+
+		if(len(prediction_df)==0):
+			return pd.DataFrame(columns=index_columns)
+
+		first_id=prediction_df.groupby(index_columns)['id'].min()
+		wide_df=prediction_df.pivot_table(index=index_columns,columns='kcc',values='estimate',aggfunc='last')
+		wide_df.columns=['kcc_'+str(kcc) for kcc in wide_df.columns]
+		wide_df=wide_df.loc[first_id.sort_values().index]
+
+		return wide_df.reset_index()
+
+if __name__ == '__main__':
+
+	import sys
+	import pathlib
+	sys.path.append("../config")
+
+	import model_config as cftrain
+
+	print('Parsing from Training Config File')
+
+	buffer_size=cftrain.result_store_params['buffer_size']
+	flush_interval=cftrain.result_store_params['flush_interval']
+	benchmark_parts=cftrain.result_store_params['benchmark_parts']
+
+	#Benchmark of the store on synthetic estimates of the parts of the package, written to a separate database
+	benchmark_path='../trained_models/result_store_benchmark'
+	pathlib.Path(benchmark_path).mkdir(parents=True, exist_ok=True)
+	store_file=benchmark_path+'/predictions_benchmark.db'
+
+	if(os.path.isfile(store_file)):
+		os.remove(store_file)
+
+	prediction_store=PredictionStore(store_file,buffer_size,flush_interval)
+	part_kccs={'cross_member_assembly':12,'inner_rf_assembly':6,'Halo_debug_run':3}
+	batch_size=32
+
+	print('Writing estimates of parts: ',benchmark_parts)
+	start_time=time.time()
+
+	for part_type,assembly_kccs in part_kccs.items():
+		for start_index in range(0,benchmark_parts,batch_size):
+			part_serials=[part_type+'_'+str(i) for i in range(start_index,min(start_index+batch_size,benchmark_parts))]
+			prediction_store.add(part_serials,np.random.normal(0,0.5,size=(len(part_serials),assembly_kccs)),part_type,'cnn_model_3d',0,timestamp=time.time())
+
+	prediction_store.flush()
+	write_time=time.time()-start_time
+
+	query_times=[]
+	for i in range(10):
+		start_time=time.time()
+		kcc_df=prediction_store.get_kcc_estimates('cross_member_assembly',11,limit=1000)
+		query_times.append((time.time()-start_time)*1000)
+
+	start_time=time.time()
+	part_df=prediction_store.get_part_estimates('cross_member_assembly_0')
+	part_query_time=(time.time()-start_time)*1000
+
+	benchmark_df=pd.DataFrame([{'parts':benchmark_parts*len(part_kccs),'rows':int(prediction_store.query('SELECT COUNT(*) AS n FROM predictions')['n'][0]),
+							'write_time_s':write_time,'kcc_query_rows':len(kcc_df),'kcc_query_median_ms':np.median(query_times),
+							'part_query_ms':part_query_time}])
+	prediction_store.close()
+
+	benchmark_df.to_csv(benchmark_path+'/result_store_benchmark.csv')
+
+	print('Result Store Benchmark')
+	print(benchmark_df)
@@ -0,0 +1,85 @@
+""" Contains classes and methods to execute each training iteration of a study (data study, adaptive training) in a fresh worker process, datasets are shared with the workers as memory mapped .npy files and only metrics and file paths are returned to the parent process, the worker exits after each run releasing the graph, session and allocator memory so the peak memory does not grow with the number of runs """
+
+import os
+import pathlib
+import multiprocessing
+import numpy as np
+
+class RunExecutor:
+	"""Run Executor Class, runs a training function in an isolated worker process
+
+		:param shared_path: Folder in which the datasets shared with the worker processes are saved
+		:type shared_path: str (required)
+
+		:param start_method: multiprocessing start method, defaults to spawn so that the worker starts with a new interpreter with no Tensorflow/CUDA state inherited from the parent
+		:type start_method: str
+	"""
+	def __init__(self,shared_path,start_method='spawn'):
+
+		self.shared_path=shared_path
+		pathlib.Path(shared_path).mkdir(parents=True, exist_ok=True)
+		self.context=multiprocessing.get_context(start_method)
+
+	def share_dataset(self,name,data):
+		"""Save a dataset once as a .npy file to be memory mapped by the worker processes
+
+			:param name: name of the dataset
+			:type name: str (required)
+
+			:param data: dataset to be shared
+			:type data: numpy.array (required)
+
+			:returns: path of the saved dataset
+			:rtype: str
+		"""
+		file_path=os.path.join(self.shared_path,name+'.npy')
+		np.save(file_path,data)
+
+		return file_path
+
+	def run(self,run_function,run_params):
+		"""Run a function in a fresh worker process and return its result, exceptions raised within the worker are re-raised in the parent
+
+			:param run_function: module level function (must be importable by the worker) with a single dictionary argument
+			:type run_function: function (required)
+
+			:param run_params: parameters of the run, must only contain picklable objects (paths, numbers, lists, dictionaries)
+			:type run_params: dict (required)
+
+			:returns: result of the run function (metrics and file paths)
+		"""
+		with self.context.Pool(processes=1,maxtasksperchild=1) as pool:
+			result=pool.apply(run_function,(run_params,))
+
+		return result
+
+	def run_parallel(self,run_function,run_params_list,workers=1):
+		"""Run a function for a list of parameters with a number of parallel worker processes, each worker process is replaced after a single run
+
+			:param run_function: module level function with a single dictionary argument
+			:type run_function: function (required)
+
+			:param run_params_list: list of the parameters of each run
+			:type run_params_list: list (required)
+
+			:param workers: number of parallel worker processes, defaults to 1
+			:type workers: int
+
+			:returns: list of results in the order of run_params_list
+			:rtype: list
+		"""
+		with self.context.Pool(processes=workers,maxtasksperchild=1) as pool:
+			results=pool.map(run_function,run_params_list,chunksize=1)
+
+		return results
+
+def load_shared_dataset(file_path,mmap_mode='r'):
+	"""Load a dataset shared by the run executor, by default the dataset is memory mapped and only the accessed slices are read into memory
+
+		:param file_path: path of the .npy dataset
+		:type file_path: str (required)
+
+		:param mmap_mode: numpy memory map mode, defaults to 'r', None loads the complete dataset into memory
+		:type mmap_mode: str
+	"""
+	return np.load(file_path,mmap_mode=mmap_mode)
@@ -0,0 +1,327 @@
+""" Contains classes and methods to record the state of long training and adaptive learning runs (completed CAE simulations, voxelized data shards, model weights, optimizer state and epoch) so that a relaunched script resumes from where it stopped """
+
+import os
+import json
+import hashlib
+import pathlib
+import numpy as np
+
+def get_config_hash(config_dicts):
+	"""Fingerprint of the configuration of a run, the manifest is only resumed by a run with the same configuration
+
+		:param config_dicts: configuration dictionaries of the run (for example assembly_system and model_parameters)
+		:type config_dicts: list (required)
+
+		:returns: sha256 hash of the configuration
+		:rtype: str
+	"""
+	config_str=json.dumps(config_dicts,sort_keys=True,default=str)
+
+	return hashlib.sha256(config_str.encode('utf-8')).hexdigest()
+
+class RunStateManifest:
+	"""Run State Manifest Class, maintains a json manifest of the state of every run within the train path, the manifest is re-written atomically after every update so a crash never leaves a partially written state
+
+		:param manifest_path: Path of the json manifest file, the file is created if it does not exist and loaded if it does
+		:type manifest_path: str (required)
+
+		:param shard_path: Folder in which the voxelized data shards are saved, defaults to a shards folder next to the manifest
+		:type shard_path: str
+
+		:param config_hash: Fingerprint of the configuration of the run (refer get_config_hash), an existing manifest recorded with a different configuration is not resumed, defaults to None (not checked)
+		:type config_hash: str
+	"""
+	def __init__(self,manifest_path,shard_path=None,config_hash=None):
+
+		self.manifest_path=manifest_path
+
+		if(shard_path is None):
+			shard_path=os.path.join(os.path.dirname(manifest_path),'shards')
+
+		self.shard_path=shard_path
+		pathlib.Path(self.shard_path).mkdir(parents=True, exist_ok=True)
+
+		self.state={'runs':{},'values':{},'config_hash':config_hash}
+
+		if(os.path.exists(manifest_path)):
+			with open(manifest_path) as manifest_file:
+				self.state=json.load(manifest_file)
+
+			if(config_hash is not None and self.state.get('config_hash')!=config_hash):
+				raise ValueError('Run state manifest '+manifest_path+' was recorded with a different configuration, delete the manifest (and shards) to start from scratch or restore the configuration to resume')
+
+			print('Run state manifest found, resuming from: ',manifest_path)
+		else:
+			self.save()
+
+	def reload(self):
+		"""Reload the manifest from disk, required after the manifest is updated by another process (refer utilities/run_executor.py)
+		"""
+		if(os.path.exists(self.manifest_path)):
+			with open(self.manifest_path) as manifest_file:
+				self.state=json.load(manifest_file)
+
+	def save(self):
+		"""Write the manifest to disk, the write is done to a temporary file which then replaces the manifest
+		"""
+		temp_path=self.manifest_path+'.tmp'
+
+		with open(temp_path,'w') as manifest_file:
+			json.dump(self.state,manifest_file,indent=2)
+
+		os.replace(temp_path,self.manifest_path)
+
+	def get_run(self,run_id):
+		"""Get the state dictionary of a run, an empty state is initialized for a new run
+
+			:param run_id: Run id of the training/adaptive learning iteration
+			:type run_id: int (required)
+
+			:returns: state of the run
+			:rtype: dict
+		"""
+		key=str(run_id)
+
+		if(key not in self.state['runs']):
+			self.state['runs'][key]={
+				'simulations':[],
+				'shards':{},
+				'weights_path':None,
+				'checkpoint_path':None,
+				'epoch':0,
+				'metrics':None,
+				'complete':0
+			}
+
+		return self.state['runs'][key]
+
+	def is_simulated(self,run_id,type_flag='train'):
+		"""Check if the CAE simulations of a run have already been completed
+
+			:param run_id: Run id of the simulation
+			:type run_id: int (required)
+
+			:param type_flag: Type of simulation (train, test, validate)
+			:type type_flag: str
+		"""
+		return type_flag in self.get_run(run_id)['simulations']
+
+	def mark_simulated(self,run_id,type_flag='train'):
+		"""Record the CAE simulations of a run as completed
+
+			:param run_id: Run id of the simulation
+			:type run_id: int (required)
+
+			:param type_flag: Type of simulation (train, test, validate)
+			:type type_flag: str
+		"""
+		run_state=self.get_run(run_id)
+
+		if(type_flag not in run_state['simulations']):
+			run_state['simulations'].append(type_flag)
+
+		self.save()
+
+	def save_shard(self,run_id,shard_name,arrays):
+		"""Save a set of numpy arrays (voxelized data, KCCs, predictions) as a shard of the run, each array is saved as a .npy file so that it can be memory mapped when loaded
+
+			:param run_id: Run id of the shard
+			:type run_id: int (required)
+
+			:param shard_name: Name of the shard within the run (train, test, validate)
+			:type shard_name: str (required)
+
+			:param arrays: dictionary of arrays to be saved
+			:type arrays: dict (required)
+		"""
+		file_paths={}
+
+		for key in arrays:
+			file_path=os.path.join(self.shard_path,'run_'+str(run_id)+'_'+shard_name+'_'+key+'.npy')
+			np.save(file_path,np.asarray(arrays[key]))
+			file_paths[key]=file_path
+
+		self.get_run(run_id)['shards'][shard_name]=file_paths
+		self.save()
+
+	def load_shard(self,run_id,shard_name,mmap_mode=None):
+		"""Load a previously saved shard of the run
+
+			:param run_id: Run id of the shard
+			:type run_id: int (required)
+
+			:param shard_name: Name of the shard within the run
+			:type shard_name: str (required)
+
+			:param mmap_mode: numpy memory map mode, defaults to None (load into memory), use 'r' to memory map the arrays
+			:type mmap_mode: str
+
+			:returns: dictionary of arrays, None if the shard was not saved
+			:rtype: dict
+		"""
+		file_paths=self.get_run(run_id)['shards'].get(shard_name)
+
+		if(file_paths is None):
+			return None
+
+		arrays={}
+		for key in file_paths:
+			if(not os.path.exists(file_paths[key])):
+				print('Shard file missing, shard will be regenerated: ',file_paths[key])
+				return None
+			arrays[key]=np.load(file_paths[key],mmap_mode=mmap_mode)
+
+		return arrays
+
+	def update_training(self,run_id,weights_path,checkpoint_path,epoch,best=None):
+		"""Record the training progress of a run
+
+			:param run_id: Run id of the training
+			:type run_id: int (required)
+
+			:param weights_path: Path to the best model weights
+			:type weights_path: str (required)
+
+			:param checkpoint_path: Path to the latest model and optimizer state checkpoint
+			:type checkpoint_path: str (required)
+
+			:param epoch: Number of completed epochs
+			:type epoch: int (required)
+
+			:param best: Best monitored value of the best model checkpoint, restored when resuming so that a worse epoch does not overwrite the best model, defaults to None
+			:type best: float
+		"""
+		run_state=self.get_run(run_id)
+		run_state['weights_path']=weights_path
+		run_state['checkpoint_path']=checkpoint_path
+		run_state['epoch']=int(epoch)
+
+		if(best is not None):
+			run_state['best']=float(best)
+		self.save()
+
+	def mark_complete(self,run_id,metrics=None):
+		"""Record a run as complete, along with a list of metrics to be restored when resuming
+
+			:param run_id: Run id of the training
+			:type run_id: int (required)
+
+			:param metrics: metrics of the run (json serializable)
+			:type metrics: list
+		"""
+		run_state=self.get_run(run_id)
+		run_state['complete']=1
+
+		if(metrics is not None):
+			run_state['metrics']=np.asarray(metrics).tolist()
+
+		self.save()
+
+	def is_complete(self,run_id):
+		"""Check if a run has been completed
+		"""
+		return self.get_run(run_id)['complete']==1
+
+	def set_value(self,key,value):
+		"""Store a global (not run specific) value in the manifest
+		"""
+		self.state['values'][key]=value
+		self.save()
+
+	def get_value(self,key,default=None):
+		"""Retrieve a global value from the manifest
+		"""
+		return self.state['values'].get(key,default)
+
+class TrainingCheckpoint:
+	"""Training Checkpoint Class, saves the model weights, optimizer state and epoch after every epoch using a tf.train.Checkpoint so that model.fit can be resumed using the initial_epoch
+
+		:param model: compiled keras model
+		:type model: keras.model (required)
+
+		:param checkpoint_path: Folder for the checkpoint files
+		:type checkpoint_path: str (required)
+
+		:param manifest: Run state manifest to be updated after each checkpoint, defaults to None
+		:type manifest: RunStateManifest
+
+		:param run_id: Run id of the training
+		:type run_id: int
+
+		:param weights_path: Path to the best weights of the model, recorded in the manifest
+		:type weights_path: str
+
+		:param checkpoint_freq: Frequency (in epochs) of saving the checkpoint
+		:type checkpoint_freq: int
+
+		:param max_to_keep: number of checkpoints to be kept on disk
+		:type max_to_keep: int
+	"""
+	def __init__(self,model,checkpoint_path,manifest=None,run_id=0,weights_path=None,checkpoint_freq=1,max_to_keep=2):
+
+		import tensorflow as tf
+
+		self.model=model
+		self.checkpoint_path=checkpoint_path
+		self.manifest=manifest
+		self.run_id=run_id
+		self.weights_path=weights_path
+		self.checkpoint_freq=checkpoint_freq
+
+		pathlib.Path(checkpoint_path).mkdir(parents=True, exist_ok=True)
+
+		self.epoch=tf.Variable(0,dtype=tf.int64,trainable=False)
+		self.checkpoint=tf.train.Checkpoint(model=model,optimizer=model.optimizer,epoch=self.epoch)
+		self.checkpoint_manager=tf.train.CheckpointManager(self.checkpoint,checkpoint_path,max_to_keep=max_to_keep)
+
+	def restore(self,best_callback=None):
+		"""Restore the latest checkpoint if it exists, optimizer slot variables are restored when they are created on the first training step
+
+			:param best_callback: best model checkpoint (keras ModelCheckpoint with save_best_only) whose best value is restored from the manifest, defaults to None
+			:type best_callback: keras.callbacks.ModelCheckpoint
+
+			:returns: number of completed epochs, to be used as initial_epoch
+			:rtype: int
+		"""
+		latest_checkpoint=self.checkpoint_manager.latest_checkpoint
+
+		if(latest_checkpoint is None):
+			print('No checkpoint found, training from scratch')
+			return 0
+
+		self.checkpoint.restore(latest_checkpoint)
+		initial_epoch=int(self.epoch.numpy())
+
+		if(best_callback is not None and self.manifest is not None and 'best' in self.manifest.get_run(self.run_id)):
+			best_callback.best=self.manifest.get_run(self.run_id)['best']
+			print('Best monitored value restored: ',best_callback.best)
+		print('Checkpoint restored: ',latest_checkpoint,' resuming from epoch: ',initial_epoch)
+
+		return initial_epoch
+
+	def get_callback(self,best_callback=None):
+		"""Keras callback saving the checkpoint at the end of each epoch, should be added after best_callback so that the best value of the epoch is recorded
+
+			:param best_callback: best model checkpoint whose best value is recorded in the manifest, defaults to None
+			:type best_callback: keras.callbacks.ModelCheckpoint
+
+			:returns: callback to be added to model.fit
+			:rtype: keras.callbacks.LambdaCallback
+		"""
+		import tensorflow as tf
+
+		def on_epoch_end(epoch,logs=None):
+			completed_epochs=epoch+1
+			self.epoch.assign(completed_epochs)
+
+			if(completed_epochs%self.checkpoint_freq==0):
+				saved_path=self.checkpoint_manager.save(checkpoint_number=completed_epochs)
+
+				if(self.manifest is not None):
+					best=None
+					if(best_callback is not None):
+						best=best_callback.best
+
+					self.manifest.update_training(self.run_id,self.weights_path,saved_path,completed_epochs,best)
+
+		return tf.keras.callbacks.LambdaCallback(on_epoch_end=on_epoch_end)
@@ -1,4 +1,6 @@
-""" Contains classes and methods to visualize the class activation maps of the model for various root causes """
+""" Contains classes and methods to visualize the class activation maps of the model for various root causes
+The batched Grad-CAM computes the maps of all the KCCs of a batch of samples in a single tape and projects them directly to the nodes of the part
+"""
 
 import numpy as np
 import tensorflow as tf
@@ -91,5 +93,164 @@ class CamViz:
 			#should feature map be normalized?
 			return fmap_eval, grad_wrt_fmap_eval
 
+class BatchGradCam:
+	"""Batched Grad-CAM Class, the heatmap model (feature maps and outputs) and the traced gradient function are built once per model, the gradients of multiple KCCs of a batch of samples are computed in a single tape as a batched Jacobian
+	The class activation maps are interpolated (trilinear) directly at the voxels of the mesh nodes using interpolation weights computed once per mapping index, the upsampled volume is only built when required for plotting
 
+		:param model: trained model (single output of KCC estimates)
+		:type model: keras.models (required)
 
+		:param conv_layer_name: name of the convolution layer (feature maps) of the class activation maps
+		:type conv_layer_name: str (required)
+
+		:param mapping_index: voxel index of each node of the part (refer data_import.GetTrainData.load_mapping_index), required to project the maps to the nodes
+		:type mapping_index: numpy.array [nodes*3]
+
+		:param batch_size: Number of samples of a tape, bounds the memory of the batched Jacobian (batch_size*kccs*feature map), defaults to 8
+		:type batch_size: int
+	"""
+	def __init__(self,model,conv_layer_name,mapping_index=None,batch_size=8):
+		from tensorflow.keras import models
+
+		conv_layer=model.get_layer(conv_layer_name)
+		heatmap_model=models.Model([model.inputs],[conv_layer.output,model.output])
+
+		self.heatmap_model=heatmap_model
+		self.batch_size=batch_size
+		self.input_dim=model.inputs[0].shape.as_list()[1:4]
+		self.fmap_dim=conv_layer.output.shape.as_list()[1:4]
+		self.n_kccs=model.output.shape.as_list()[-1]
+
+		@tf.function(input_signature=[tf.TensorSpec(model.inputs[0].shape,tf.float32),tf.TensorSpec([None],tf.int32)])
+		def cam_function(X_in,kcc_ids):
+			with tf.GradientTape() as gtape:
+				conv_output,predictions=heatmap_model(X_in,training=False)
+				loss=tf.gather(predictions,kcc_ids,axis=1)
+
+			#Gradient of each selected KCC of each sample wrt the feature maps of the sample [samples*kccs*fmap_dim*fmap_dim*fmap_dim*channels]
+			grads=gtape.batch_jacobian(loss,conv_output)
+			alpha_k_c=tf.reduce_mean(grads,axis=[2,3,4])
+			Lc_Grad_CAM=tf.nn.relu(tf.einsum('bxyzc,bkc->bkxyz',conv_output,alpha_k_c))
+
+			return Lc_Grad_CAM,predictions
+
+		self.cam_function=cam_function
+		self.node_interpolation=None
+
+		if(mapping_index is not None):
+			self.node_interpolation=self.get_interpolation(np.asarray(mapping_index)[:,0:3])
+
+	def get_interpolation(self,voxel_coords):
+		"""Trilinear interpolation weights of the feature map grid at the given input voxels, the voxel grid is mapped to the feature map grid with aligned corners (same as scipy.ndimage.zoom)
+
+			:param voxel_coords: voxel index of each point
+			:type voxel_coords: numpy.array [points*3] (required)
+
+			:returns: flat feature map index [points*8], interpolation weight [points*8]
+			:rtype: numpy.array, numpy.array
+		"""
+		input_dim=np.array(self.input_dim,dtype=np.float64)
+		fmap_dim=np.array(self.fmap_dim)
+
+		fmap_coords=np.asarray(voxel_coords,dtype=np.float64)*(fmap_dim-1)/np.maximum(input_dim-1,1)
+		lower=np.clip(np.floor(fmap_coords).astype(int),0,np.maximum(fmap_dim-2,0))
+		upper=np.minimum(lower+1,fmap_dim-1)
+		frac=np.clip(fmap_coords-lower,0,1)
+
+		flat_index=[]
+		weights=[]
+
+		for corner in range(8):
+			select=np.array([(corner>>2)&1,(corner>>1)&1,corner&1])
+			corner_index=np.where(select==1,upper,lower)
+			corner_weight=np.prod(np.where(select==1,frac,1-frac),axis=1)
+
+			flat_index.append(np.ravel_multi_index(corner_index.T,self.fmap_dim))
+			weights.append(corner_weight)
+
+		return np.stack(flat_index,axis=1),np.stack(weights,axis=1)
+
+	def get_cams(self,model_input,kcc_ids=None):
+		"""Normalized class activation maps of the KCCs of each sample, the maps are min-max normalized for each sample and KCC
+
+			:param model_input: voxelized input
+			:type model_input: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param kcc_ids: index of the KCCs, defaults to all KCCs
+			:type kcc_ids: list
+
+			:returns: class activation maps [samples*kccs*fmap_dim*fmap_dim*fmap_dim], model estimates [samples*total_kccs]
+			:rtype: numpy.array, numpy.array
+		"""
+		if(kcc_ids is None):
+			kcc_ids=range(self.n_kccs)
+
+		kcc_ids=np.asarray(kcc_ids,dtype=np.int32)
+
+		cams=np.zeros((len(model_input),len(kcc_ids))+tuple(self.fmap_dim),dtype=np.float32)
+		y_pred=np.zeros((len(model_input),self.n_kccs),dtype=np.float32)
+
+		for start_index in range(0,len(model_input),self.batch_size):
+			end_index=min(start_index+self.batch_size,len(model_input))
+			Lc_Grad_CAM,predictions=self.cam_function(np.asarray(model_input[start_index:end_index],dtype=np.float32),kcc_ids)
+
+			cams[start_index:end_index]=Lc_Grad_CAM.numpy()
+			y_pred[start_index:end_index]=predictions.numpy()
+
+		arr_min=cams.min(axis=(2,3,4),keepdims=True)
+		arr_max=cams.max(axis=(2,3,4),keepdims=True)
+		cams=(cams-arr_min)/(arr_max-arr_min+K.epsilon())
+
+		return cams,y_pred
+
+	def interpolate(self,cams,interpolation):
+		"""Interpolate the class activation maps at the points of the interpolation (refer get_interpolation)
+
+			:returns: interpolated maps [samples*kccs*points]
+			:rtype: numpy.array
+		"""
+		flat_index,weights=interpolation
+		flat_cams=cams.reshape(cams.shape[0:2]+(-1,))
+
+		return np.sum(flat_cams[:,:,flat_index]*weights,axis=-1)
+
+	def project_to_nodes(self,cams):
+		"""Project the class activation maps to the nodes of the mapping index
+
+			:param cams: class activation maps (refer get_cams)
+			:type cams: numpy.array [samples*kccs*fmap_dim*fmap_dim*fmap_dim] (required)
+
+			:returns: class activation of each node [samples*kccs*nodes]
+			:rtype: numpy.array
+		"""
+		if(self.node_interpolation is None):
+			raise ValueError('Mapping index is required to project the class activation maps to the nodes')
+
+		return self.interpolate(cams,self.node_interpolation)
+
+	def upsample(self,cams):
+		"""Upsample the class activation maps to the voxel grid of the input (for volume plots)
+
+			:returns: upsampled maps [samples*kccs*voxel_dim*voxel_dim*voxel_dim]
+			:rtype: numpy.array
+		"""
+		voxel_coords=np.indices(self.input_dim).reshape(3,-1).T
+		upsampled_cams=self.interpolate(cams,self.get_interpolation(voxel_coords))
+
+		return upsampled_cams.reshape(cams.shape[0:2]+tuple(self.input_dim))
+
+	def root_cause_maps(self,model_input,kcc_ids=None):
+		"""Class activation of each node for the KCCs of each sample
+
+			:param model_input: voxelized input
+			:type model_input: numpy.array [samples*voxel_dim*voxel_dim*voxel_dim*deviation_channels] (required)
+
+			:param kcc_ids: index of the KCCs, defaults to all KCCs
+			:type kcc_ids: list
+
+			:returns: class activation of each node [samples*kccs*nodes], model estimates [samples*total_kccs]
+			:rtype: numpy.array, numpy.array
+		"""
+		cams,y_pred=self.get_cams(model_input,kcc_ids)
+
+		return self.project_to_nodes(cams),y_pred
@@ -0,0 +1,121 @@
+"""
+Generate the prediction distribution plots of the Bayesian models, the histogram of the Monte Carlo draws of each KCC of a sample with the actual value, the prediction mean and the 95% confidence interval
+The plots can be generated in a background process pool so that the inference returns as soon as the estimates are computed
+"""
+import numpy as np
+
+def plot_prediction_distribution(plot_task):
+	"""plot and save the prediction distribution of each KCC of a sample
+
+		:param plot_task: summary arrays of the sample, dict with draws [draws*kccs], actual [kccs], pred_mean [kccs], pred_std [kccs], hist_range (None for actual value +/- 0.5), file_prefix (the KCC index and .png are appended) and sample_id
+		:type plot_task: dict (required)
+
+		:returns: number of plots saved
+		:rtype: int
+	"""
+	import matplotlib
+	matplotlib.use('Agg')
+	import matplotlib.pyplot as plt
+	from scipy.stats import norm
+
+	draws=plot_task['draws']
+	pred_mean=plot_task['pred_mean']
+	pred_std=plot_task['pred_std']
+
+	for j in range(draws.shape[1]):
+		actual_obv=plot_task['actual'][j]
+
+		if(plot_task['hist_range'] is None):
+			hist_range=(actual_obv-0.5,actual_obv+0.5)
+		else:
+			hist_range=plot_task['hist_range']
+
+		fig=plt.figure()
+		plt.hist(draws[:,j], range=hist_range,bins=40)
+		plt.axvline(x=actual_obv,label="Actual Value = "+str(actual_obv),c='r')
+		plt.axvline(x=pred_mean[j],label="Prediction Mean = "+str(pred_mean[j]),c='c')
+		plt.axvline(x=pred_mean[j]+norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]+norm.ppf(0.95)*pred_std[j]),c='b')
+		plt.axvline(x=pred_mean[j]-norm.ppf(0.95)*pred_std[j], label="95 CI = "+str(pred_mean[j]-norm.ppf(0.95)*pred_std[j]),c='b')
+		plt.title("Prediction Distribution for KCC " + str(j) + " sample "+ str(plot_task['sample_id']))
+		fig.savefig(plot_task['file_prefix']+str(j)+'.png')
+		plt.close(fig)
+
+	return draws.shape[1]
+
+class AsyncPlotter:
+	"""Background process pool for the prediction distribution plots, the plot tasks are queued to the pool and the plots are generated while the inference continues
+
+		:param processes: Number of plotting processes, defaults to 2
+		:type processes: int
+	"""
+	def __init__(self,processes=2):
+		import multiprocessing
+
+		#Spawned processes do not inherit the tensorflow state of the inference process
+		self.pool=multiprocessing.get_context('spawn').Pool(processes)
+		self.results=[]
+
+	def submit(self,plot_task):
+		"""Queue the plot task of a sample (refer plot_prediction_distribution)
+		"""
+		self.results.append(self.pool.apply_async(plot_prediction_distribution,(plot_task,)))
+
+	def close(self):
+		"""Wait for the queued plots to be saved and stop the pool
+
+			:returns: number of plots saved
+			:rtype: int
+		"""
+		self.pool.close()
+		self.pool.join()
+
+		n_plots=0
+		for result in self.results:
+			try:
+				n_plots=n_plots+result.get()
+			except Exception as error:
+				print('Plotting failed: ',error)
+
+		print('Prediction distribution plots saved: ',n_plots)
+
+		return n_plots
+
+class DeferredPlotter:
+	"""Collects the plot tasks of a worker process of the run executor (refer utilities/run_executor.py), the workers are daemonic and cannot start an AsyncPlotter pool so the tasks are returned to the parent process and submitted to its plotter (refer submit_plot_tasks)
+	"""
+	def __init__(self):
+		self.plot_tasks=[]
+
+	def submit(self,plot_task):
+		"""Keep the plot task of a sample
+		"""
+		self.plot_tasks.append(plot_task)
+
+def submit_plot_tasks(plotter,plot_tasks):
+	"""Plot the tasks collected by a DeferredPlotter in the background if a plotter is given, otherwise in the calling process
+
+		:param plotter: background plotter, the plots are generated in the calling process if None
+		:type plotter: AsyncPlotter (required)
+
+		:param plot_tasks: plot tasks (refer plot_prediction_distribution)
+		:type plot_tasks: list (required)
+	"""
+	for plot_task in plot_tasks:
+		if(plotter is None):
+			plot_prediction_distribution(plot_task)
+		else:
+			plotter.submit(plot_task)
+
+def submit_plot(plotter,draws,actual,pred_mean,pred_std,file_prefix,sample_id,hist_range=None):
+	"""Plot the prediction distribution of a sample in the background if a plotter is given, otherwise in the calling process
+
+		:param plotter: background plotter, the plots are generated in the calling process if None
+		:type plotter: AsyncPlotter (required)
+	"""
+	plot_task={'draws':np.asarray(draws,dtype=np.float32),'actual':np.asarray(actual),'pred_mean':np.asarray(pred_mean),'pred_std':np.asarray(pred_std),
+			'hist_range':hist_range,'file_prefix':file_prefix,'sample_id':sample_id}
+
+	if(plotter is None):
+		plot_prediction_distribution(plot_task)
+	else:
+		plotter.submit(plot_task)